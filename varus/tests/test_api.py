@@ -0,0 +1,318 @@
+"""Tests for varus.api."""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from varus.api import NodeAPIError, NodeAPIServer, NodeClient, NodeUnavailable
+from varus.chain import VarusChain
+from varus.cli import main
+from varus.merkle import verify_proof
+from varus.node import VarusNode
+
+
+@pytest.fixture
+def sock_dir():
+    # Unix socket paths are length-limited; keep them short.
+    with tempfile.TemporaryDirectory(prefix="varus-") as d:
+        yield Path(d)
+
+
+@pytest.fixture
+def served(tmp_path, sock_dir):
+    node = VarusNode(
+        chain_path=tmp_path / "chain.json",
+        inbox_dir=tmp_path / "inbox",
+        socket_path=sock_dir / "node.sock",
+    )
+    node.chain.load()
+    node.submit_block({"n": 1})
+    node.api.start()
+    yield node
+    node.api.stop()
+
+
+def client(node, **kw) -> NodeClient:
+    return NodeClient(node.api.socket_path, **kw)
+
+
+class TestServer:
+    def test_tip(self, served):
+        assert client(served).request("tip")["index"] == 1
+
+    def test_get_by_index_and_hash(self, served):
+        c = client(served)
+        assert c.request("get", index=0)["index"] == 0
+        tip_hash = served.chain.tip.hash
+        assert c.request("get", hash=tip_hash)["index"] == 1
+
+    def test_get_missing_is_not_found(self, served):
+        with pytest.raises(NodeAPIError) as info:
+            client(served).request("get", index=99)
+        assert info.value.code == "not_found"
+
+    def test_status(self, served):
+        status = client(served).request("status")
+        assert status["chain"]["height"] == 2
+
+    def test_range(self, served):
+        served.submit_block({"n": 2})
+        blocks = client(served).request("range", start=1, limit=5)
+        assert [b["index"] for b in blocks] == [1, 2]
+
+    def test_range_time_window(self, served):
+        cutoff = served.chain.tip.timestamp
+        served.submit_block({"n": 2})
+        blocks = client(served).request("range", since=cutoff, limit=5)
+        assert [b["index"] for b in blocks] == [1, 2]
+        early = client(served).request("range", until=cutoff - 1e6)
+        assert early == [served.chain.genesis.to_dict()]
+
+    def test_submit(self, served):
+        block = client(served).request("submit", data={"via": "api"})
+        assert block["index"] == 2
+        assert served.chain.height == 3
+
+    def test_prove(self, served):
+        c = client(served)
+        block = c.request("submit", data={"k": "v"}, hash_version=3)
+        proof = c.request("prove", index=block["index"], key="k")
+        assert verify_proof(proof)
+        with pytest.raises(NodeAPIError) as info:
+            c.request("prove", index=1, key="n")  # not a Merkle block
+        assert info.value.code == "bad_request"
+
+    def test_query(self, served):
+        c = client(served)
+        assert c.request("create_index", name="n", path="n") == {"n": "n"}
+        served.submit_block({"n": 2})
+        served.submit_block({"n": 1})
+        assert [b["index"] for b in c.request("query", equals={"n": 1})] == [1, 3]
+        assert [b["index"] for b in c.request("query", equals={"n": 1}, start=2)] == [3]
+        assert c.request("drop_index", name="n") == {}
+        with pytest.raises(NodeAPIError) as info:
+            c.request("query", equals={"n": 1})
+        assert info.value.code == "bad_request"
+
+    def test_compact(self, served):
+        served.submit_block({"n": 2})
+        snapshot = client(served).request("compact", keep=1)
+        assert snapshot["height"] == 2 and served.chain.pruned_height == 2
+        assert client(served).request("get", index=1)["data"] == {"n": 1}
+        with pytest.raises(NodeAPIError, match="compacted"):
+            client(served).request("compact", height=1)
+
+    def test_submit_requires_object(self, served):
+        with pytest.raises(NodeAPIError):
+            client(served).request("submit", data=[1, 2])
+
+    def test_unknown_op(self, served):
+        with pytest.raises(NodeAPIError) as info:
+            client(served).request("explode")
+        assert info.value.code == "bad_request"
+
+    def test_wrong_chain_is_unavailable(self, served, tmp_path):
+        with pytest.raises(NodeUnavailable):
+            client(served, chain=tmp_path / "other.json").request("tip")
+
+    def test_matching_chain_accepted(self, served, tmp_path):
+        assert client(served, chain=tmp_path / "chain.json").request("tip")["index"] == 1
+
+    def test_several_requests_per_connection(self, served):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(served.api.socket_path))
+            sock.sendall(b'{"op": "tip"}\n{"op": "get", "index": 0}\n')
+            reader = sock.makefile("rb")
+            first, second = json.loads(reader.readline()), json.loads(reader.readline())
+        assert first["result"]["index"] == 1
+        assert second["result"]["index"] == 0
+
+    def test_socket_is_private(self, served):
+        assert served.api.socket_path.stat().st_mode & 0o077 == 0
+
+    def test_second_server_refused(self, served, tmp_path):
+        other = NodeAPIServer(served, served.api.socket_path)
+        with pytest.raises(RuntimeError, match="already listening"):
+            other.start()
+
+    def test_stale_socket_replaced(self, tmp_path, sock_dir):
+        path = sock_dir / "stale.sock"
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(str(path))
+        stale.close()
+        node = VarusNode(chain_path=tmp_path / "c.json", socket_path=path)
+        node.chain.load()
+        node.api.start()
+        try:
+            assert client(node).request("tip")["index"] == 0
+        finally:
+            node.api.stop()
+        assert not path.exists()
+
+
+class TestSubscribe:
+    def test_resume_then_live_blocks(self, served):
+        stream = client(served).subscribe(start=1)
+        assert next(stream)["block"]["index"] == 1
+        threading.Timer(0.05, served.submit_block, args=({"live": True},)).start()
+        event = next(stream)
+        assert event["block"]["index"] == 2 and event["block"]["data"] == {"live": True}
+        stream.close()
+
+    def test_headers_only(self, served):
+        served.submit_block({"n": 2}, hash_version=2)
+        stream = client(served).subscribe(start=2, headers_only=True)
+        block = next(stream)["block"]
+        assert "data" not in block and block["index"] == 2
+        stream.close()
+
+    def test_heartbeat_when_idle(self, served, monkeypatch):
+        monkeypatch.setattr("varus.api.HEARTBEAT_S", 0.05)
+        stream = client(served).subscribe()
+        assert next(stream) == {"event": "heartbeat", "height": 2}
+        stream.close()
+
+    def test_subscriber_limit_is_busy(self, served):
+        served.feed.max_subscribers = 0
+        with pytest.raises(NodeAPIError) as info:
+            next(client(served).subscribe())
+        assert info.value.code == "busy"
+
+    def test_stop_ends_stream(self, served):
+        stream = client(served).subscribe(start=0)
+        next(stream)
+        served.api.stop()
+        assert [event["block"]["index"] for event in stream] == [1]  # then the stream ends
+
+
+class TestClient:
+    def test_no_server(self, sock_dir):
+        with pytest.raises(NodeUnavailable):
+            NodeClient(sock_dir / "missing.sock").request("tip")
+
+
+def test_concurrent_readers_of_lazy_blocks(tmp_path, sock_dir):
+    writer = VarusChain(tmp_path / "chain.json")
+    writer.load()
+    writer.add_blocks([{"n": i, "pad": "x" * 200} for i in range(200)])
+    node = VarusNode(chain_path=tmp_path / "chain.json", socket_path=sock_dir / "node.sock")
+    node.chain.load()  # blocks hold undecoded data until first read
+    node.api.start()
+    errors, results = [], []
+
+    def read():
+        try:
+            for op in ("range", "tip", "range"):
+                results.append(client(node).request(op, start=0, limit=201))
+        except Exception as exc:  # collected for the assertion below
+            errors.append(exc)
+
+    try:
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+    finally:
+        node.api.stop()
+    assert errors == []
+    ranges = [r for r in results if isinstance(r, list)]
+    assert len(ranges) == 16
+    assert all(r[150]["data"]["n"] == 149 for r in ranges)
+
+
+class TestCliUsesDaemon:
+    def run(self, node, args, chain=None):
+        chain = chain or str(node.chain.chain_path)
+        return main(["--chain", chain, "--socket", str(node.api.socket_path)] + args)
+
+    def test_tip_served_by_daemon(self, served, capsys, monkeypatch):
+        monkeypatch.setattr(
+            "varus.cli._get_indexed_chain", lambda args: pytest.fail("read chain from disk")
+        )
+        assert self.run(served, ["tip"]) == 0
+        assert json.loads(capsys.readouterr().out)["index"] == 1
+
+    def test_follow_prints_blocks(self, served, capsys):
+        assert self.run(served, ["follow", "--from", "0", "--limit", "2"]) == 0
+        lines = capsys.readouterr().out.splitlines()
+        assert [json.loads(line)["index"] for line in lines] == [0, 1]
+
+    def test_follow_needs_daemon(self, tmp_path, sock_dir, capsys):
+        args = ["--chain", str(tmp_path / "c.json"), "--socket", str(sock_dir / "none.sock")]
+        assert main(args + ["follow"]) == 1
+        assert "needs a daemon" in capsys.readouterr().err
+
+    def test_add_goes_through_daemon(self, served, capsys):
+        assert self.run(served, ["add", '{"cli": true}']) == 0
+        assert served.chain.height == 3  # appended by the node, not a second writer
+
+    def test_get_missing_via_daemon(self, served):
+        assert self.run(served, ["get", "42"]) == 1
+
+    def test_status_and_list_via_daemon(self, served, capsys):
+        self.run(served, ["status"])
+        assert json.loads(capsys.readouterr().out)["height"] == 2
+        self.run(served, ["list"])
+        assert len(capsys.readouterr().out.strip().splitlines()) == 2
+
+    def test_query_via_daemon_pages(self, served, capsys, monkeypatch):
+        monkeypatch.setattr("varus.cli.MAX_RANGE", 2)
+        for i in range(4):
+            served.submit_block({"kind": "x"})
+        self.run(served, ["index", "add", "kind", "kind"])
+        capsys.readouterr()
+        assert self.run(served, ["query", "--where", "kind=x", "--json"]) == 0
+        assert [b["index"] for b in json.loads(capsys.readouterr().out)] == [2, 3, 4, 5]
+        assert served.chain.indexes == {"kind": "kind"}  # created by the node itself
+
+    def test_other_chain_falls_back_to_disk(self, served, tmp_path, capsys):
+        other = str(tmp_path / "other.json")
+        main(["--chain", other, "init"])
+        capsys.readouterr()
+        assert self.run(served, ["tip"], chain=other) == 0
+        assert json.loads(capsys.readouterr().out)["index"] == 0
+
+    def test_relative_chain_resolved_in_client_cwd(self, served, tmp_path, capsys, monkeypatch):
+        elsewhere = tmp_path / "elsewhere"
+        elsewhere.mkdir()
+        monkeypatch.chdir(elsewhere)  # same relative name, different directory
+        remote = NodeClient(served.api.socket_path, chain="chain.json")
+        monkeypatch.chdir(tmp_path)  # the daemon's directory, where chain.json is its chain
+        with pytest.raises(NodeUnavailable, match="does not serve"):
+            remote.request("submit", data={"cli": True})
+        assert served.chain.height == 2
+
+        monkeypatch.chdir(elsewhere)
+        assert self.run(served, ["add", '{"cli": true}'], chain="chain.json") == 0
+        assert served.chain.height == 2  # appended to ./chain.json, not the daemon's
+        assert (elsewhere / "chain.varus").is_dir()
+        monkeypatch.chdir(tmp_path)
+        assert self.run(served, ["add", '{"cli": true}'], chain="chain.json") == 0
+        assert served.chain.height == 3  # routed to the daemon serving it
+
+    def test_socket_of_other_user_ignored(self, served, monkeypatch):
+        real_stat = os.stat
+
+        def stat(path, *args, **kwargs):
+            result = real_stat(path, *args, **kwargs)
+            if str(path) != str(served.api.socket_path):
+                return result
+            fields = list(result)
+            fields[4] = os.getuid() + 1  # st_uid
+            return os.stat_result(fields)
+
+        monkeypatch.setattr("varus.api.os.stat", stat)
+        with pytest.raises(NodeUnavailable, match="owned by uid"):
+            client(served).request("tip")
+
+    def test_no_daemon_flag(self, served, capsys, monkeypatch):
+        monkeypatch.setattr(
+            "varus.api.NodeClient.request", lambda *a, **k: pytest.fail("contacted daemon")
+        )
+        assert self.run(served, ["--no-daemon", "tip"]) == 0
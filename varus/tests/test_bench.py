@@ -0,0 +1,82 @@
+"""Tests for varus.bench."""
+
+import json
+import random
+
+from varus.bench import MemoryTransport, compare, run_benchmarks, synthetic_payload
+from varus.block import canonical_json
+from varus.cli import main
+
+STAGES = ("append", "load", "validate", "get_by_hash_ms", "merge_blocks", "sync_import")
+
+
+def _report(**stages):
+    run = {"blocks": 100, "payload_bytes": 256}
+    run.update(stages)
+    return {"runs": [run]}
+
+
+class TestRunBenchmarks:
+    def test_report_covers_every_stage(self, tmp_path):
+        report = run_benchmarks(
+            [60, 20], 128, workdir=tmp_path, batch=25, lookups=10, durability="buffered"
+        )
+        assert [run["blocks"] for run in report["runs"]] == [20, 60]
+        run = report["runs"][1]
+        for stage in STAGES:
+            assert stage in run
+        assert run["append"]["blocks_per_sec"] > 0
+        assert run["get_by_hash_ms"]["count"] == 10
+        assert run["sync_export"]["envelopes"] >= 1
+        assert set(run["peak_rss_kib"]) == {"append", "load", "validate", "sync"}
+        assert (tmp_path / "bench-60-128" / "sync" / "chain.varus").is_dir()
+        json.dumps(report)  # serialisable as is
+
+    def test_without_sync(self, tmp_path):
+        (run,) = run_benchmarks([10], workdir=tmp_path, sync=False, durability="buffered")["runs"]
+        assert "merge_blocks" not in run and "sync_import" not in run
+
+    def test_payload_size(self):
+        data = synthetic_payload(7, 1000, random.Random(0))
+        assert 900 <= len(canonical_json(data)) <= 1000
+
+
+class TestCompare:
+    def test_reports_slowdown_beyond_tolerance(self):
+        baseline = _report(load={"seconds": 1.0}, validate={"seconds": 2.0})
+        current = _report(load={"seconds": 1.5}, validate={"seconds": 2.2})
+        (regression,) = compare(current, baseline, tolerance=0.25)
+        assert regression["metric"] == "load.seconds"
+        assert regression["change"] == 0.5
+
+    def test_ignores_timer_noise_and_unmatched_runs(self):
+        baseline = _report(load={"seconds": 0.001})
+        assert compare(_report(load={"seconds": 0.004}), baseline) == []
+        other = {"runs": [{"blocks": 5, "payload_bytes": 256, "load": {"seconds": 9.0}}]}
+        assert compare(other, baseline) == []
+
+
+def test_memory_transport_delivers_between_owners():
+    mailboxes = {}
+    a, b = MemoryTransport(mailboxes, "a"), MemoryTransport(mailboxes, "b")
+    assert a.send(b"hello", "b").success
+    assert a.receive() == []
+    assert b.receive() == [b"hello"]
+    assert b.receive() == []
+
+
+def test_cli_bench_writes_report_and_compares(tmp_path, capsys):
+    out = tmp_path / "report.json"
+    args = ["bench", "--blocks", "20", "--lookups", "5", "--durability", "buffered"]
+    assert main(args + ["--output", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report["runs"][0]["blocks"] == 20
+
+    report["runs"][0]["peak_rss_kib"]["validate"] = 1  # a baseline that used almost no memory
+    (tmp_path / "baseline.json").write_text(json.dumps(report))
+    capsys.readouterr()
+    assert main(args + ["--no-sync", "--compare", str(tmp_path / "baseline.json")]) == 1
+    captured = capsys.readouterr()
+    (regression,) = json.loads(captured.out)["regressions"]
+    assert regression["metric"] == "peak_rss_kib.validate"
+    assert "REGRESSION 20 blocks: peak_rss_kib.validate" in captured.err
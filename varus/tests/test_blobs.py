@@ -0,0 +1,116 @@
+"""Tests for varus.blobs and blob-backed block data."""
+
+import hashlib
+import json
+
+import pytest
+
+from varus.blobs import BLOB_DIR, BlobError, BlobStore, BlobUnavailable, is_reference, references
+from varus.block import canonical_json
+from varus.chain import ChainError, VarusChain
+from varus.cli import main
+
+BIG = {"rows": ["x" * 100] * 50}  # ~5 KB of canonical JSON
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(tmp_path / "blobs")
+
+
+@pytest.fixture
+def chain(tmp_path):
+    c = VarusChain(tmp_path / "chain.json", blob_threshold=1024)
+    c.load()
+    return c
+
+
+class TestBlobStore:
+    def test_put_is_content_addressed_and_deduplicated(self, store):
+        digest = store.put(b"payload")
+        assert digest == hashlib.sha256(b"payload").hexdigest()
+        assert store.put(b"payload") == digest
+        assert store.get(digest) == b"payload"
+        assert store.path(digest).parent.name == digest[:2]
+        assert len(list(store.root.rglob("*"))) == 2  # one fan-out dir, one blob
+
+    def test_put_checks_expected_digest(self, store):
+        with pytest.raises(BlobError):
+            store.put(b"payload", "0" * 64)
+        assert store.missing(["0" * 64]) == ["0" * 64]
+
+    def test_get_missing_and_corrupt(self, store):
+        with pytest.raises(BlobUnavailable):
+            store.get("a" * 64)
+        digest = store.put(b"payload")
+        store.path(digest).write_bytes(b"tampered")
+        with pytest.raises(BlobError, match="corrupt"):
+            store.get(digest)
+
+    def test_rejects_non_digest_names(self, store):
+        with pytest.raises(BlobError):
+            store.path("../../etc/passwd")
+
+    def test_externalize_and_resolve(self, store):
+        data = {"type": "upload", "body": BIG}
+        slim = store.externalize(data, threshold=1024)
+        assert slim["type"] == "upload"
+        assert is_reference(slim["body"])
+        assert slim["body"]["size"] == len(canonical_json(BIG))
+        assert references(slim) == [slim["body"]["$blob"]]
+        assert store.resolve(slim) == data
+
+    def test_reference_lookalike_is_stored_not_followed(self, store):
+        digest = store.put(b'"elsewhere"')
+        lookalike = {"$blob": digest, "size": 11}
+        slim = store.externalize({"item": lookalike, "n": 1}, threshold=None)
+        assert slim["item"]["$blob"] != digest
+        assert slim["n"] == 1
+        assert store.resolve(slim) == {"item": lookalike, "n": 1}
+
+
+class TestChainBlobs:
+    def test_large_items_stored_once_and_referenced(self, chain, tmp_path):
+        first, second = chain.add_blocks([{"doc": BIG, "n": 1}, {"doc": BIG, "n": 2}])
+        assert first.data["doc"] == second.data["doc"]
+        assert is_reference(first.data["doc"])
+        assert len(list((tmp_path / BLOB_DIR).rglob("*"))) == 2
+        assert chain.resolve(first.data) == {"doc": BIG, "n": 1}
+        assert chain.is_valid()
+
+    def test_hash_commits_to_reference_only(self, chain):
+        block = chain.add_block({"doc": BIG})
+        chain.blobs.path(block.data["doc"]["$blob"]).unlink()
+        reloaded = VarusChain(chain.chain_path)
+        reloaded.load()
+        assert reloaded.is_valid()  # validation never reads the blob
+        assert reloaded.missing_blobs() == [block.data["doc"]["$blob"]]
+        with pytest.raises(ChainError, match="not in"):
+            reloaded.resolve(reloaded.tip.data)
+
+    def test_shared_across_chains_in_a_directory(self, chain, tmp_path):
+        other = VarusChain(tmp_path / "other.json", blob_threshold=1024)
+        other.load()
+        chain.add_block({"doc": BIG})
+        assert other.add_block({"doc": BIG}).data == chain.tip.data
+        assert len(list((tmp_path / BLOB_DIR).rglob("*"))) == 2
+
+    def test_threshold_none_keeps_data_inline(self, tmp_path):
+        inline = VarusChain(tmp_path / "inline.json", blob_threshold=None)
+        inline.load()
+        assert inline.add_block({"doc": BIG}).data == {"doc": BIG}
+
+    def test_user_data_shaped_like_a_reference(self, chain):
+        target = chain.add_block({"doc": BIG}).data["doc"]
+        block = chain.add_block({"note": dict(target)})  # a literal copy, not our reference
+        assert block.data["note"] != target
+        assert chain.resolve(block.data) == {"note": target}
+
+
+def test_cli_get_resolve(chain, capsys):
+    chain.add_block({"doc": BIG})
+    args = ["--chain", str(chain.chain_path), "--no-daemon", "get", "1"]
+    assert main(args) == 0
+    assert is_reference(json.loads(capsys.readouterr().out)["data"]["doc"])
+    assert main(args + ["--resolve"]) == 0
+    assert json.loads(capsys.readouterr().out)["data"]["doc"] == BIG
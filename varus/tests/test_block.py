@@ -4,7 +4,8 @@ import time
 
 import pytest
 
-from varus.block import Block
+from varus import block as block_module
+from varus.block import HASH_V1, HASH_V2, Block, PayloadUnavailable, hash_fields
 
 
 def make_block(**kwargs) -> Block:
@@ -78,3 +79,139 @@ class TestBlockSerialization:
         restored = Block.from_dict(block.to_dict())
         assert restored.hash == block.hash
         assert restored.is_valid()
+
+
+class TestHashVersions:
+    def test_new_blocks_use_canonical_encoding(self):
+        block = make_block()
+        assert block.hash_version == HASH_V2
+        assert block.to_dict()["hash_version"] == HASH_V2
+
+    def test_legacy_dict_round_trips_as_version_1(self):
+        legacy = make_block(hash_version=HASH_V1).to_dict()
+        assert "hash_version" not in legacy
+        restored = Block.from_dict(legacy)
+        assert restored.hash_version == HASH_V1
+        assert restored.is_valid()
+
+    def test_versions_hash_differently(self):
+        assert make_block(hash_version=HASH_V1).hash != make_block(hash_version=HASH_V2).hash
+
+    def test_version_1_matches_original_encoding(self):
+        import hashlib
+        import json
+
+        block = make_block(hash_version=HASH_V1)
+        d = {k: v for k, v in block.to_dict().items() if k != "hash"}
+        assert block.hash == hashlib.sha256(json.dumps(d, sort_keys=True).encode()).hexdigest()
+
+    def test_key_order_does_not_matter(self):
+        b1 = make_block(data={"a": 1, "b": 2})
+        b2 = make_block(data={"b": 2, "a": 1})
+        assert b1.hash == b2.hash
+
+    def test_module_hash_fields_matches_block(self):
+        for version in (HASH_V1, HASH_V2):
+            block = make_block(hash_version=version)
+            assert hash_fields(block.hash_fields()) == block.hash
+
+    def test_unknown_version_rejected(self):
+        with pytest.raises(ValueError, match="hash version"):
+            make_block(hash_version=9)
+
+
+class TestCachedPreimage:
+    def test_repeated_validation_reuses_encoding(self, monkeypatch):
+        block = make_block()
+        calls = []
+        real = block_module.payload_digest
+        monkeypatch.setattr(block_module, "payload_digest", lambda d: calls.append(1) or real(d))
+        for _ in range(3):
+            assert block.is_valid()
+        assert calls == []
+
+    def test_header_change_invalidates_cache(self):
+        block = make_block()
+        block.nonce = 99
+        assert not block.is_valid()
+
+    def test_data_assignment_invalidates_cache(self):
+        block = make_block()
+        block.data = {"msg": "other"}
+        assert not block.is_valid()
+
+    def test_digest_survives_concurrent_cache_reset(self):
+        class RacingBlock(Block):
+            def __setattr__(self, name, value):
+                super().__setattr__(name, value)
+                if name == "_payload" and value is not None:
+                    self._forget_encoding()  # a reader's ``data`` access lands here
+
+        expected = make_block(hash_version=HASH_V2).payload_digest()
+        block = RacingBlock(1, 1000.0, {"msg": "hello"}, "abc" * 21 + "a", hash_version=HASH_V2)
+        assert block.payload_digest() == expected
+        assert block.is_valid()
+
+    def test_equality_compares_contents(self):
+        assert make_block() == make_block()
+        assert make_block() != make_block(nonce=1)
+
+
+class TestLazyBlock:
+    def test_blocks_have_no_instance_dict(self):
+        assert not hasattr(make_block(), "__dict__")
+
+    def test_concurrent_first_access(self):
+        class RacingBlock(Block):
+            def __getattribute__(self, name):
+                value = super().__getattribute__(name)
+                if name == "_raw" and value is not None and self.__dict__.pop("race", False):
+                    Block._decoded(self)  # another reader decodes between check and use
+                return value
+
+        original = make_block(data={"k": [1, 2]})
+        header = {k: v for k, v in original.to_dict().items() if k != "data"}
+        block = RacingBlock.from_record(header, b'{"k":[1,2]}')
+        block.race = True
+        assert block.data == {"k": [1, 2]}
+        assert block.hash == original.hash
+
+    def test_from_record_decodes_data_on_first_access(self):
+        original = make_block(data={"k": [1, 2]})
+        header = {k: v for k, v in original.to_dict().items() if k != "data"}
+        block = Block.from_record(header, b'{"k":[1,2]}')
+        assert not block.is_decoded
+        assert block.hash == original.hash
+        assert not block.is_decoded
+        assert block.data == {"k": [1, 2]}
+        assert block.is_decoded
+
+    def test_lazy_block_validates(self):
+        original = make_block()
+        header = {k: v for k, v in original.to_dict().items() if k != "data"}
+        block = Block.from_record(header, b'{"msg":"hello"}')
+        assert block.is_valid()
+        assert block == original
+
+
+class TestHeaderOnlyBlock:
+    def test_header_round_trip_keeps_hash_checkable(self):
+        block = make_block()
+        header_only = Block.from_dict(block.header())
+        assert not header_only.has_payload
+        assert header_only.is_valid()
+        assert header_only.to_dict() == block.header()
+
+    def test_data_access_raises(self):
+        header_only = make_block().without_payload()
+        with pytest.raises(PayloadUnavailable):
+            header_only.data
+
+    def test_version_1_keeps_payload(self):
+        block = make_block(hash_version=HASH_V1)
+        assert block.without_payload() is block
+        assert "data" in block.to_header_dict()
+
+    def test_hash_fields_of_header_only_block(self):
+        header_only = make_block().without_payload()
+        assert hash_fields(header_only.hash_fields()) == header_only.hash
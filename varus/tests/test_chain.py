@@ -5,7 +5,9 @@ import time
 
 import pytest
 
+from varus.block import HASH_V1, HASH_V2, HASH_V3, Block
 from varus.chain import VarusChain, ChainError, GENESIS_HASH
+from varus.merkle import verify_proof
 
 
 @pytest.fixture
@@ -28,6 +30,28 @@ class TestGenesis:
     def test_genesis_data_is_sovereign(self, chain):
         assert chain.genesis.data.get("sovereign") is True
 
+    def test_genesis_keeps_legacy_hash_version(self, chain):
+        assert chain.genesis.hash_version == HASH_V1
+
+
+class TestMixedHashVersions:
+    def test_legacy_blocks_and_new_blocks_coexist(self, tmp_path, chain):
+        legacy = Block(
+            index=1,
+            timestamp=1.0,
+            data={"old": True},
+            previous_hash=chain.genesis.hash,
+            hash_version=HASH_V1,
+        )
+        chain.extend([legacy])
+        new = chain.add_block({"new": True})
+        assert new.hash_version == HASH_V2
+
+        reloaded = VarusChain(tmp_path / "chain.json")
+        reloaded.load()
+        assert [b.hash_version for b in reloaded.all_blocks()] == [HASH_V1, HASH_V1, HASH_V2]
+        assert reloaded.is_valid()
+
 
 class TestAddBlock:
     def test_add_block_increases_height(self, chain):
@@ -61,15 +85,51 @@ class TestPersistence:
         assert c2.height == 2
         assert c2.tip.hash == tip_hash
 
-    def test_chain_file_is_valid_json(self, tmp_path):
+    def test_exported_chain_is_valid_json(self, tmp_path):
         path = tmp_path / "chain.json"
         c = VarusChain(path)
         c.load()
         c.add_block({"k": "v"})
-        raw = json.loads(path.read_text())
+        c.export_json(tmp_path / "export.json")
+        raw = json.loads((tmp_path / "export.json").read_text())
         assert isinstance(raw, list)
         assert len(raw) == 2
 
+    def test_blocks_stored_in_segment_store(self, tmp_path):
+        path = tmp_path / "chain.json"
+        c = VarusChain(path)
+        c.load()
+        c.add_block({"k": "v"})
+        assert (tmp_path / "chain.varus" / "manifest.json").exists()
+        assert not path.exists()
+
+    def test_legacy_json_chain_is_migrated_on_load(self, tmp_path):
+        source = VarusChain(tmp_path / "source.json")
+        source.load()
+        source.add_block({"legacy": True})
+        legacy_path = tmp_path / "legacy.json"
+        source.export_json(legacy_path)
+
+        migrated = VarusChain(legacy_path)
+        migrated.load()
+        assert migrated.height == 2
+        assert migrated.tip.hash == source.tip.hash
+        assert migrated.store.exists()
+
+    def test_import_rejects_tampered_json(self, tmp_path):
+        source = VarusChain(tmp_path / "source.json")
+        source.load()
+        source.add_block({"x": 1})
+        source.export_json(tmp_path / "export.json")
+        raw = json.loads((tmp_path / "export.json").read_text())
+        raw[1]["data"]["x"] = 2
+        (tmp_path / "export.json").write_text(json.dumps(raw))
+
+        target = VarusChain(tmp_path / "target.json")
+        with pytest.raises(ChainError):
+            target.import_json(tmp_path / "export.json")
+        assert not target.store.exists()
+
 
 class TestValidation:
     def test_fresh_chain_is_valid(self, chain):
@@ -121,6 +181,26 @@ class TestQueryMethods:
     def test_get_by_hash_missing_returns_none(self, chain):
         assert chain.get_by_hash("notahash") is None
 
+    def test_get_by_hash_after_reload(self, tmp_path):
+        c1 = VarusChain(tmp_path / "chain.json")
+        c1.load()
+        b = c1.add_block({"find": "me"})
+        c2 = VarusChain(tmp_path / "chain.json")
+        c2.load()
+        assert c2.get_by_hash(b.hash).index == 1
+        assert c2.height_of(b.hash) == 1
+
+    def test_read_block_without_load(self, tmp_path):
+        c1 = VarusChain(tmp_path / "chain.json")
+        c1.load()
+        c1.add_block({"n": 1})
+        b = c1.add_block({"n": 2})
+        cold = VarusChain(tmp_path / "chain.json")
+        assert cold.read_block(1).data == {"n": 1}
+        assert cold.read_tip().hash == b.hash
+        assert cold.read_by_hash(b.hash).index == 2
+        assert cold.height == 0  # nothing loaded into memory
+
     def test_tip_is_last_block(self, chain):
         b = chain.add_block({"last": True})
         assert chain.tip.hash == b.hash
@@ -129,3 +209,298 @@ class TestQueryMethods:
         s = chain.summary()
         for key in ("height", "genesis_hash", "tip_hash", "tip_index", "valid"):
             assert key in s
+
+
+class TestValidatedCheckpoint:
+    def test_add_block_extends_validated_height(self, chain):
+        chain.add_block({"n": 1})
+        assert chain.validated_height == 2
+
+    def test_checkpoint_persisted_and_resumed(self, tmp_path):
+        path = tmp_path / "chain.json"
+        c1 = VarusChain(path)
+        c1.load()
+        c1.add_block({"n": 1})
+        c1.validate()
+        assert c1.store.read_validated()["height"] == 2
+        c2 = VarusChain(path)
+        c2.load()
+        assert c2.validated_height == 2
+
+    def test_incremental_validation_skips_checkpointed_blocks(self, chain, monkeypatch):
+        chain.add_block({"n": 1})
+        chain.add_block({"n": 2})
+        calls = []
+        original = Block.is_valid
+        monkeypatch.setattr(Block, "is_valid", lambda b: calls.append(b) or original(b))
+        chain.validate(full=False)
+        assert calls == []
+
+    def test_incremental_validation_checks_new_blocks(self, chain):
+        chain.add_block({"n": 1})
+        chain._blocks.append(chain._blocks[1])  # unvalidated, wrong index/link
+        assert not chain.is_valid(full=False)
+
+    def test_full_rescan_detects_tampering_below_checkpoint(self, chain):
+        chain.add_block({"n": 1})
+        chain._blocks[1].data["n"] = 99
+        assert chain.is_valid(full=False)
+        assert not chain.is_valid(full=True)
+
+    def test_load_ignores_stale_checkpoint(self, tmp_path):
+        path = tmp_path / "chain.json"
+        c1 = VarusChain(path)
+        c1.load()
+        c1.add_block({"n": 1})
+        c1.validate()
+        c1.store.write_validated(2, "f" * 64)
+        c2 = VarusChain(path)
+        c2.load()
+        assert c2.validated_height == 2  # revalidated from scratch
+
+    def test_verify_sample_detects_tampering(self, chain):
+        for i in range(5):
+            chain.add_block({"n": i})
+        chain._blocks[3].data["n"] = "evil"
+        with pytest.raises(ChainError):
+            chain.verify_sample(sample_size=chain.height)
+        assert chain.validated_height <= 3
+
+    def test_summary_reports_validated_height(self, chain):
+        chain.add_block({"n": 1})
+        assert chain.summary()["validated_height"] == 2
+
+
+class TestBatchAppend:
+    def test_add_blocks_links_batch(self, chain):
+        blocks = chain.add_blocks([{"n": 1}, {"n": 2}, {"n": 3}])
+        assert [b.index for b in blocks] == [1, 2, 3]
+        assert blocks[1].previous_hash == blocks[0].hash
+        assert chain.is_valid()
+
+    def test_add_blocks_persisted(self, tmp_path):
+        path = tmp_path / "chain.json"
+        c1 = VarusChain(path, durability="group")
+        c1.load()
+        c1.add_blocks([{"n": 1}, {"n": 2}])
+        c1.flush()
+        c2 = VarusChain(path)
+        c2.load()
+        assert c2.height == 3
+
+
+class TestLazyLoad:
+    def test_load_does_not_decode_validated_payloads(self, tmp_path, chain):
+        chain.add_blocks([{"n": i} for i in range(5)])
+        chain.validate()  # persist the checkpoint
+        reloaded = VarusChain(tmp_path / "chain.json")
+        reloaded.load()
+        assert not any(b.is_decoded for b in reloaded.all_blocks())
+        assert reloaded.get_block(3).data == {"n": 2}
+
+    def test_links_only_validation_skips_payloads(self, tmp_path, chain):
+        chain.add_blocks([{"n": i} for i in range(5)])
+        chain.validate()  # persist the checkpoint
+        reloaded = VarusChain(tmp_path / "chain.json")
+        reloaded.load()
+        reloaded.validate(links_only=True)
+        assert not any(b.is_decoded for b in reloaded.all_blocks())
+
+    def test_links_only_detects_broken_link(self, chain):
+        chain.add_blocks([{"n": i} for i in range(3)])
+        chain._blocks[2].previous_hash = "0" * 64
+        with pytest.raises(ChainError, match="Block 2 previous_hash"):
+            chain.validate(links_only=True)
+
+    def test_links_only_does_not_detect_payload_tampering(self, chain):
+        chain.add_block({"n": 1})
+        chain._blocks[1].data["n"] = "evil"
+        chain.validate(links_only=True)
+        with pytest.raises(ChainError, match="hash mismatch"):
+            chain.validate()
+
+
+class TestProve:
+    def test_prove_item_of_merkle_block(self, tmp_path):
+        chain = VarusChain(tmp_path / "chain.json", hash_version=HASH_V3)
+        chain.load()
+        block = chain.add_block({"user": "alice", "event": "login", "ip": "10.0.0.1"})
+        assert block.hash_version == HASH_V3
+        assert chain.is_valid()
+
+        cold = VarusChain(tmp_path / "chain.json")  # proves without load()
+        proof = cold.prove(block.hash, "user")
+        assert proof["value"] == "alice"
+        assert proof["header"]["hash"] == block.hash
+        assert verify_proof(proof)
+
+    def test_per_block_override(self, chain):
+        chain.add_block({"a": 1})
+        merkle = chain.add_block({"a": 2}, hash_version=HASH_V3)
+        assert [b.hash_version for b in chain.all_blocks()] == [HASH_V1, HASH_V2, HASH_V3]
+        assert verify_proof(chain.prove(merkle.index, "a"))
+
+    def test_prove_requires_merkle_block(self, chain):
+        chain.add_block({"a": 1})
+        with pytest.raises(ChainError, match="Merkle root"):
+            chain.prove(1, "a")
+
+    def test_prove_unknown_key_or_block(self, chain):
+        chain.add_block({"a": 1}, hash_version=HASH_V3)
+        with pytest.raises(ChainError, match="no item"):
+            chain.prove(1, "b")
+        with pytest.raises(ChainError):
+            chain.prove(9, "a")
+
+
+class TestHeadersOnly:
+    def _full_blocks(self, tmp_path, n=4):
+        full = VarusChain(tmp_path / "full.json")
+        full.load()
+        full.add_blocks([{"n": i} for i in range(n)])
+        return full
+
+    def test_mode_is_recorded_in_store(self, tmp_path):
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        assert VarusChain(tmp_path / "light.json").headers_only
+        assert not VarusChain(tmp_path / "other.json").headers_only
+
+    def test_extend_strips_payloads(self, tmp_path):
+        full = self._full_blocks(tmp_path)
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        light.extend(full.all_blocks()[1:])
+        assert light.genesis.has_payload  # version 1: kept whole
+        assert not any(b.has_payload for b in light.all_blocks()[1:])
+        assert light.is_valid()
+
+        reloaded = VarusChain(tmp_path / "light.json")
+        reloaded.load()
+        assert reloaded.tip.hash == full.tip.hash
+        assert reloaded.summary()["headers_only"] is True
+
+    def test_tampered_header_detected(self, tmp_path):
+        full = self._full_blocks(tmp_path)
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        light.extend(full.all_blocks()[1:])
+        light._blocks[2].timestamp += 1
+        with pytest.raises(ChainError, match="Block 2 hash mismatch"):
+            light.validate()
+
+    def test_cannot_author_blocks(self, tmp_path):
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        with pytest.raises(ChainError, match="headers-only"):
+            light.add_block({"n": 1})
+
+    def test_import_keeps_mode(self, tmp_path):
+        full = self._full_blocks(tmp_path)
+        full.export_json(tmp_path / "export.json")
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        light.import_json(tmp_path / "export.json")
+
+        reloaded = VarusChain(tmp_path / "light.json")
+        reloaded.load()
+        assert reloaded.headers_only
+        assert reloaded.tip.hash == full.tip.hash
+        assert not reloaded.get_block(2).has_payload
+        with pytest.raises(ChainError, match="headers-only"):
+            reloaded.add_block({"n": 1})
+
+    def test_attach_payload(self, tmp_path):
+        full = self._full_blocks(tmp_path)
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        light.extend(full.all_blocks()[1:])
+        light.attach_payload(full.get_block(2))
+        assert light.get_block(2).data == {"n": 1}
+
+        other = Block(3, 1.0, {"n": "x"}, light.get_block(2).hash)
+        with pytest.raises(ChainError, match="does not match"):
+            light.attach_payload(other)
+
+
+class TestIterBlocks:
+    def _timed(self, chain, timestamps):
+        blocks = []
+        for ts in timestamps:
+            previous = (blocks or [chain.tip])[-1]
+            block = Block(chain.height + len(blocks), ts, {"ts": ts}, previous.hash)
+            blocks.append(block)
+        chain.extend(blocks)
+
+    def test_time_window_and_paging(self, chain):
+        self._timed(chain, [100.0, 200.0, 300.0, 400.0])
+        assert [b.index for b in chain.iter_blocks(since=150, until=350)] == [2, 3]
+        assert [b.index for b in chain.iter_blocks(start=2, limit=2)] == [2, 3]
+
+    def test_streams_without_load(self, chain):
+        self._timed(chain, [100.0, 200.0, 300.0])
+        reader = VarusChain(chain.chain_path)
+        blocks = list(reader.iter_blocks(since=200))
+        assert [b.index for b in blocks] == [2, 3]
+        assert reader.all_blocks() == []  # nothing loaded
+        assert not blocks[0].is_decoded
+
+    def test_unsaved_tail_included(self, chain, monkeypatch):
+        self._timed(chain, [100.0])
+        monkeypatch.setattr(chain, "save", lambda: None)
+        chain.add_block({"late": True})
+        assert [b.index for b in chain.iter_blocks(since=150)] == [2]
+
+
+class TestCompact:
+    @pytest.fixture
+    def long_chain(self, tmp_path):
+        c = VarusChain(tmp_path / "chain.json")
+        c.store.segment_size = 256  # a few blocks per segment
+        c.load()
+        c.add_blocks([{"n": i, "kind": "even" if i % 2 == 0 else "odd"} for i in range(30)])
+        return c
+
+    def test_compact_drops_old_blocks_from_memory(self, long_chain):
+        before = [b.to_dict() for b in long_chain.all_blocks()]
+        result = long_chain.compact(keep=10)
+        assert result["height"] == 21 and result["tip_hash"] == before[20]["hash"]
+        assert result["archived_segments"] > 0
+        assert 0 < result["archived_height"] <= 21
+        assert long_chain.pruned_height == 21
+        assert len(long_chain._blocks._tail) == 10
+        assert long_chain.height == 31
+        assert long_chain.get_block(3).to_dict() == before[3]
+        assert [b.to_dict() for b in long_chain.all_blocks()] == before
+        assert long_chain.get_by_hash(before[5]["hash"]).index == 5
+
+    def test_reload_starts_from_snapshot(self, long_chain, monkeypatch):
+        long_chain.compact(height=21)
+        reloaded = VarusChain(long_chain.chain_path)
+        monkeypatch.setattr(reloaded, "validate", lambda **kw: None)  # relies on the snapshot
+        reloaded.load()
+        assert reloaded.pruned_height == 21
+        assert reloaded.validated_height == 21  # the snapshot covers the rest
+        assert reloaded.is_valid()  # a full rescan reads the archive back
+        assert reloaded.read_block(2).data == {"n": 1, "kind": "odd"}
+        reloaded.add_block({"n": "new"})
+        again = VarusChain(long_chain.chain_path)
+        again.load()
+        assert again.height == 32 and again.tip.data == {"n": "new"}
+
+    def test_queries_reach_archived_history(self, long_chain):
+        long_chain.create_index("kind", "kind")
+        long_chain.compact(height=25)
+        hits = long_chain.query(equals={"kind": "even"}, limit=3)
+        assert [b.index for b in hits] == [1, 3, 5]
+        assert [b.index for b in long_chain.iter_blocks(start=2, limit=2)] == [2, 3]
+
+    def test_limits(self, long_chain):
+        with pytest.raises(ChainError, match="validated"):
+            long_chain.compact(height=40)
+        long_chain.compact(height=20)
+        with pytest.raises(ChainError, match="compacted to 20"):
+            long_chain.compact(height=10)
+        with pytest.raises(ChainError, match="compacted into a snapshot"):
+            long_chain.reorg(5, [Block(6, 1.0, {}, long_chain.get_block(5).hash)])
+        assert long_chain.summary()["pruned_height"] == 20
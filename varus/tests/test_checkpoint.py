@@ -0,0 +1,233 @@
+"""Tests for varus.checkpoint and assume-valid bootstrap."""
+
+import importlib.util
+import json
+
+import pytest
+
+from varus.block import Block
+from varus.chain import ChainError, VarusChain
+from varus.checkpoint import (
+    CheckpointError,
+    generate_key,
+    load_trust_set,
+    normalize_checkpoint,
+    sign_checkpoint,
+    verify_checkpoint,
+)
+from varus.cli import main
+from varus.sync import ChainSync
+
+HAS_NACL = importlib.util.find_spec("nacl") is not None
+
+
+def _source(tmp_path, blocks: int = 8) -> VarusChain:
+    chain = VarusChain(tmp_path / "source" / "chain.json")
+    chain.load()
+    chain.add_blocks([{"n": i} for i in range(blocks)])
+    return chain
+
+
+def _record(chain: VarusChain, height: int) -> dict:
+    return {
+        "genesis_hash": chain.genesis.hash,
+        "height": height,
+        "tip_hash": chain.get_block(height - 1).hash,
+        "signer": "ab" * 32,
+        "signature": "cd" * 64,
+    }
+
+
+@pytest.fixture
+def trust_all(monkeypatch):
+    """Accept any signature, so assume-valid mechanics run without pynacl."""
+    monkeypatch.setattr("varus.chain.verify_checkpoint", lambda record, keys: None)
+
+
+@pytest.fixture
+def count_hashes(monkeypatch):
+    hashed = []
+    original = Block.compute_hash
+    monkeypatch.setattr(Block, "compute_hash", lambda b: hashed.append(b.index) or original(b))
+    return hashed
+
+
+@pytest.mark.skipif(not HAS_NACL, reason="pynacl not installed")
+class TestSignatures:
+    def test_sign_and_verify(self):
+        seed, public = generate_key()
+        record = sign_checkpoint("g" * 64, 10, "t" * 64, seed)
+        assert record["signer"] == public
+        verify_checkpoint(record, {public})
+
+    def test_untrusted_signer_rejected(self):
+        seed, _ = generate_key()
+        _, other = generate_key()
+        record = sign_checkpoint("g" * 64, 10, "t" * 64, seed)
+        with pytest.raises(CheckpointError, match="trust set"):
+            verify_checkpoint(record, {other})
+
+    @pytest.mark.parametrize("field, value", [("height", 11), ("tip_hash", "x" * 64)])
+    def test_altered_record_rejected(self, field, value):
+        seed, public = generate_key()
+        record = sign_checkpoint("g" * 64, 10, "t" * 64, seed)
+        record[field] = value
+        with pytest.raises(CheckpointError, match="does not verify"):
+            verify_checkpoint(record, {public})
+
+
+@pytest.mark.skipif(HAS_NACL, reason="pynacl is installed")
+def test_missing_pynacl_explains_install():
+    with pytest.raises(RuntimeError, match="varus\\[signing\\]"):
+        generate_key()
+
+
+def test_malformed_record_rejected():
+    with pytest.raises(CheckpointError, match="Malformed"):
+        verify_checkpoint({"height": 3}, {"ab" * 32})
+
+
+def test_normalize_checkpoint():
+    record = {"genesis_hash": "g" * 64, "height": "5", "tip_hash": "t" * 64, "signer": "AB"}
+    normalized = normalize_checkpoint(record)
+    assert normalized["height"] == 5
+    assert normalized["signer"] == "AB"  # other fields are kept as they are
+
+
+def test_trust_set_formats(tmp_path):
+    listed = tmp_path / "list.json"
+    listed.write_text(json.dumps(["AB" * 32]))
+    keyed = tmp_path / "keyed.json"
+    keyed.write_text(json.dumps({"keys": ["ab" * 32]}))
+    assert load_trust_set(listed) == load_trust_set(keyed) == {"ab" * 32}
+
+
+class TestAssumeValidOnLoad:
+    def test_history_below_checkpoint_is_not_rehashed(self, tmp_path, trust_all, count_hashes):
+        source = _source(tmp_path)
+        chain = VarusChain(source.chain_path)
+        chain.assume_valid(_record(source, 6), set())
+        count_hashes.clear()
+        chain.load()
+        assert sorted(set(count_hashes)) == [6, 7, 8]
+        assert chain.validated_height == chain.height
+        assert chain.assumed_height == 6
+
+    def test_height_given_as_string(self, tmp_path, trust_all, count_hashes):
+        source = _source(tmp_path)
+        record = {**_record(source, 6), "height": "6"}  # verifies as 6 once signed
+        chain = VarusChain(source.chain_path)
+        chain.assume_valid(record, set())
+        count_hashes.clear()
+        chain.load()
+        assert sorted(set(count_hashes)) == [6, 7, 8]
+        assert chain.assumed_height == 6
+
+        fresh = VarusChain(tmp_path / "fresh" / "chain.json")
+        fresh.load()
+        fresh.assume_valid(record, set())
+        assert fresh.assumable(source.all_blocks()[1:]) == 5
+
+    def test_tip_mismatch_rejected(self, tmp_path, trust_all):
+        source = _source(tmp_path)
+        record = _record(source, 6)
+        record["tip_hash"] = "0" * 64
+        chain = VarusChain(source.chain_path)
+        chain.assume_valid(record, set())
+        with pytest.raises(ChainError, match="signed checkpoint tip"):
+            chain.load()
+
+    def test_other_genesis_rejected(self, tmp_path, trust_all):
+        source = _source(tmp_path)
+        record = _record(source, 6)
+        record["genesis_hash"] = "f" * 64
+        chain = VarusChain(source.chain_path)
+        chain.assume_valid(record, set())
+        with pytest.raises(ChainError, match="genesis"):
+            chain.load()
+
+    def test_untrusted_record_rejected(self, tmp_path):
+        source = _source(tmp_path)
+        with pytest.raises(ChainError):
+            source.assume_valid(_record(source, 6), set())
+
+
+class TestVerifyHistory:
+    def _assumed(self, tmp_path) -> VarusChain:
+        source = _source(tmp_path)
+        chain = VarusChain(source.chain_path)
+        chain.assume_valid(_record(source, 6), set())
+        chain.load()
+        return chain
+
+    def test_verifies_in_batches(self, tmp_path, trust_all):
+        chain = self._assumed(tmp_path)
+        assert chain.verify_history(2) == 3
+        assert chain.verify_history(2) == 1
+        assert chain.verify_history(2) == 0
+        assert chain.assumed_height == 0
+
+    def test_progress_survives_reload(self, tmp_path, trust_all):
+        chain = self._assumed(tmp_path)
+        chain.verify_history(2)
+        reloaded = VarusChain(chain.chain_path)
+        reloaded.load()
+        assert reloaded.assumed_height == 6
+        assert reloaded.verify_history() == 0
+
+    def test_tampered_history_detected(self, tmp_path, trust_all):
+        chain = self._assumed(tmp_path)
+        chain.get_block(3).data = {"n": "forged"}
+        with pytest.raises(ChainError, match="Block 3"):
+            chain.verify_history()
+        assert chain.validated_height == 3
+        assert not chain.is_valid(full=False)
+
+
+class TestAssumeValidSync:
+    def test_new_node_skips_rehashing_below_checkpoint(self, tmp_path, trust_all, count_hashes):
+        source = _source(tmp_path)
+        fresh = VarusChain(tmp_path / "fresh" / "chain.json")
+        fresh.load()
+        fresh.assume_valid(_record(source, 6), set())
+        sync = ChainSync(fresh)
+        count_hashes.clear()
+        assert sync._merge_blocks(source.all_blocks()) == 8
+        assert sorted(set(count_hashes)) == [6, 7, 8]
+        assert fresh.tip.hash == source.tip.hash
+        assert fresh.assumed_height == 6
+        assert fresh.verify_history() == 0
+
+    def test_mismatched_checkpoint_checks_everything(self, tmp_path, trust_all, count_hashes):
+        source = _source(tmp_path)
+        record = _record(source, 6)
+        record["tip_hash"] = "0" * 64
+        fresh = VarusChain(tmp_path / "fresh" / "chain.json")
+        fresh.load()
+        fresh.assume_valid(record, set())
+        count_hashes.clear()
+        assert ChainSync(fresh)._merge_blocks(source.all_blocks()) == 8
+        assert sorted(set(count_hashes)) == list(range(1, 9))
+        assert fresh.assumed_height == 0
+
+
+class TestCli:
+    def test_validate_assume_valid(self, tmp_path, trust_all, capsys):
+        source = _source(tmp_path)
+        record = tmp_path / "checkpoint.json"
+        record.write_text(json.dumps(_record(source, 6)))
+        trust = tmp_path / "trust.json"
+        trust.write_text("[]")
+        rc = main(
+            ["--chain", str(source.chain_path), "--no-daemon", "validate",
+             "--assume-valid", str(record), "--trust", str(trust)]
+        )
+        assert rc == 0
+        assert "assumed valid below 6" in capsys.readouterr().out
+
+    def test_assume_valid_needs_trust(self, tmp_path):
+        source = _source(tmp_path)
+        rc = main(
+            ["--chain", str(source.chain_path), "validate", "--assume-valid", "missing.json"]
+        )
+        assert rc == 1
@@ -1,10 +1,13 @@
 """Tests for varus.cli."""
 
 import json
+from pathlib import Path
 
 import pytest
 
+from varus.block import Block
 from varus.cli import main
+from varus.storage import STORE_SUFFIX, VALIDATED_FILE
 
 
 @pytest.fixture
@@ -61,6 +64,20 @@ class TestGet:
         data = json.loads(out)
         assert data["index"] == 0
 
+    def test_get_by_hash(self, chain_path, capsys):
+        run(["init"], chain_path)
+        run(["add", '{"v": 1}'], chain_path)
+        capsys.readouterr()
+        run(["tip"], chain_path)
+        tip = json.loads(capsys.readouterr().out)
+        rc = run(["get", tip["hash"]], chain_path)
+        assert rc == 0
+        assert json.loads(capsys.readouterr().out)["index"] == 1
+
+    def test_get_unknown_hash(self, chain_path):
+        run(["init"], chain_path)
+        assert run(["get", "ab" * 32], chain_path) != 0
+
     def test_get_out_of_range(self, chain_path):
         run(["init"], chain_path)
         rc = run(["get", "999"], chain_path)
@@ -103,6 +120,25 @@ class TestValidate:
         rc = run(["validate"], chain_path)
         assert rc == 0
 
+    def test_quick_validate_exits_zero(self, chain_path):
+        run(["init"], chain_path)
+        run(["add", '{"n": 1}'], chain_path)
+        assert run(["validate", "--quick"], chain_path) == 0
+
+    def test_links_only_validate_exits_zero(self, chain_path, capsys):
+        run(["init"], chain_path)
+        run(["add", '{"n": 1}'], chain_path)
+        assert run(["validate", "--links-only"], chain_path) == 0
+        assert "links only" in capsys.readouterr().out
+
+
+    def test_links_only_validate_does_not_rehash(self, chain_path, monkeypatch):
+        run(["init"], chain_path)
+        run(["add", '{"n": 1}'], chain_path)
+        # nothing validated yet
+        (Path(chain_path).with_suffix(STORE_SUFFIX) / VALIDATED_FILE).unlink()
+        monkeypatch.setattr(Block, "compute_hash", lambda b: pytest.fail("rehashed a block"))
+        assert run(["validate", "--links-only"], chain_path) == 0
 
 class TestList:
     def test_list_shows_genesis(self, chain_path, capsys):
@@ -110,3 +146,119 @@ class TestList:
         run(["list"], chain_path)
         out = capsys.readouterr().out
         assert "0" in out
+
+
+class TestExportImport:
+    def test_export_then_import_round_trip(self, chain_path, tmp_path, capsys):
+        run(["init"], chain_path)
+        run(["add", '{"n": 1}'], chain_path)
+        export_path = str(tmp_path / "export.json")
+        assert run(["export", export_path], chain_path) == 0
+
+        other = str(tmp_path / "other.json")
+        assert run(["import", export_path], other) == 0
+        capsys.readouterr()
+        run(["tip"], other)
+        assert json.loads(capsys.readouterr().out)["index"] == 1
+
+    def test_import_missing_file_fails(self, chain_path, tmp_path):
+        assert run(["import", str(tmp_path / "missing.json")], chain_path) != 0
+
+
+class TestProve:
+    def test_prove_then_verify(self, chain_path, tmp_path, capsys):
+        run(["init"], chain_path)
+        run(["add", "--merkle", '{"user": "alice", "event": "login"}'], chain_path)
+        capsys.readouterr()
+        assert run(["prove", "1", "user"], chain_path) == 0
+        proof_file = tmp_path / "proof.json"
+        proof_file.write_text(capsys.readouterr().out)
+        assert json.loads(proof_file.read_text())["value"] == "alice"
+        assert run(["verify-proof", str(proof_file)], chain_path) == 0
+
+    def test_verify_rejects_tampered_proof(self, chain_path, tmp_path, capsys):
+        run(["init"], chain_path)
+        run(["add", "--merkle", '{"user": "alice"}'], chain_path)
+        capsys.readouterr()
+        run(["prove", "1", "user"], chain_path)
+        proof = json.loads(capsys.readouterr().out)
+        proof["value"] = "mallory"
+        proof_file = tmp_path / "proof.json"
+        proof_file.write_text(json.dumps(proof))
+        assert run(["verify-proof", str(proof_file)], chain_path) == 2
+
+    def test_prove_plain_block_fails(self, chain_path):
+        run(["init"], chain_path)
+        run(["add", '{"user": "alice"}'], chain_path)
+        assert run(["prove", "1", "user"], chain_path) == 1
+
+
+class TestHeadersOnlyInit:
+    def test_light_chain_refuses_add(self, chain_path, capsys):
+        assert run(["init", "--headers-only"], chain_path) == 0
+        assert "headers-only" in capsys.readouterr().out
+        assert run(["add", '{"n": 1}'], chain_path) == 1
+
+
+class TestQuery:
+    def test_index_and_query(self, chain_path, capsys):
+        run(["init"], chain_path)
+        run(["add", '{"type": "vote", "n": 1}'], chain_path)
+        run(["add", '{"type": "post", "n": 2}'], chain_path)
+        assert run(["index", "add", "type", "type"], chain_path) == 0
+        assert run(["index", "add", "n", "n"], chain_path) == 0
+        capsys.readouterr()
+        assert run(["--no-daemon", "query", "--where", "type=vote", "--json"], chain_path) == 0
+        assert [b["index"] for b in json.loads(capsys.readouterr().out)] == [1]
+        assert run(["--no-daemon", "query", "--where", "n=2"], chain_path) == 0
+        assert len(capsys.readouterr().out.strip().splitlines()) == 1
+
+    def test_query_unindexed_field_fails(self, chain_path, capsys):
+        run(["init"], chain_path)
+        assert run(["--no-daemon", "query", "--where", "type=vote"], chain_path) == 1
+        assert "No index" in capsys.readouterr().err
+
+    def test_index_list_and_drop(self, chain_path, capsys):
+        run(["init"], chain_path)
+        run(["index", "add", "sender", "sender.id"], chain_path)
+        capsys.readouterr()
+        run(["--no-daemon", "index", "list"], chain_path)
+        assert capsys.readouterr().out == "sender\tsender.id\n"
+        assert run(["--no-daemon", "index", "drop", "sender"], chain_path) == 0
+        assert run(["--no-daemon", "index", "drop", "sender"], chain_path) == 1
+
+
+class TestCompact:
+    def test_compact_then_read_old_blocks(self, chain_path, capsys):
+        run(["init"], chain_path)
+        for n in range(5):
+            run(["add", json.dumps({"n": n})], chain_path)
+        capsys.readouterr()
+        assert run(["--no-daemon", "compact", "--keep", "2"], chain_path) == 0
+        assert json.loads(capsys.readouterr().out)["height"] == 4
+        assert run(["--no-daemon", "get", "1"], chain_path) == 0
+        assert '"n": 0' in capsys.readouterr().out
+        assert run(["--no-daemon", "compact", "--height", "2"], chain_path) == 1
+        assert "compacted to 4" in capsys.readouterr().err
+
+
+class TestListWindow:
+    def test_from_and_limit(self, chain_path, capsys):
+        run(["init"], chain_path)
+        for n in range(4):
+            run(["add", json.dumps({"n": n})], chain_path)
+        capsys.readouterr()
+        assert run(["--no-daemon", "list", "--from", "2", "--limit", "2"], chain_path) == 0
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [line.split("]")[0].strip("[ ") for line in lines] == ["2", "3"]
+
+    def test_since_accepts_iso_time(self, chain_path, capsys):
+        run(["init"], chain_path)
+        run(["add", '{"n": 1}'], chain_path)
+        capsys.readouterr()
+        assert run(["--no-daemon", "list", "--since", "2000-01-01T00:00:00"], chain_path) == 0
+        assert len(capsys.readouterr().out.strip().splitlines()) == 1  # genesis is at t=0
+
+    def test_bad_time_rejected(self, chain_path):
+        with pytest.raises(SystemExit):
+            run(["list", "--since", "yesterday-ish"], chain_path)
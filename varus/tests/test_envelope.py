@@ -0,0 +1,79 @@
+"""Tests for varus.envelope — compressed, chunked transfer envelopes."""
+
+import json
+
+import pytest
+
+from varus.envelope import (
+    ENCODINGS,
+    EnvelopeError,
+    encode_chunks,
+    iter_blocks,
+    read_envelope,
+    split_envelope,
+)
+
+
+def _blocks(n: int, first: int = 0) -> list[dict]:
+    return [
+        {"index": i, "hash": f"{i:064x}", "data": {"n": i, "pad": "x" * 100}}
+        for i in range(first, first + n)
+    ]
+
+
+def _chunks(blocks, first=0, anchor=None, **kwargs) -> list[bytes]:
+    return list(encode_chunks({"type": "t", "transfer_id": "tx"}, blocks, first, anchor, **kwargs))
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_round_trip(encoding):
+    blocks = _blocks(50)
+    chunks = _chunks(blocks, encoding=encoding, chunk_bytes=1000)
+    decoded = [b for c in chunks for b in iter_blocks(*split_envelope(c))]
+    assert decoded == blocks
+
+
+def test_chunks_are_bounded_and_linked():
+    blocks = _blocks(40, first=10)
+    chunks = [split_envelope(c)[0] for c in _chunks(blocks, 10, "a" * 64, chunk_bytes=1000)]
+    assert len(chunks) > 3
+    assert [c["seq"] for c in chunks] == list(range(len(chunks)))
+    assert [c["final"] for c in chunks] == [False] * (len(chunks) - 1) + [True]
+    assert chunks[0]["anchor_index"] == 9 and chunks[0]["anchor_hash"] == "a" * 64
+    for before, after in zip(chunks, chunks[1:]):
+        assert after["first_index"] == before["first_index"] + before["count"]
+        assert after["anchor_hash"] == before["last_hash"]
+
+
+def test_compression_shrinks_envelopes():
+    blocks = _blocks(200)
+    plain = sum(map(len, _chunks(blocks, encoding="none")))
+    assert sum(map(len, _chunks(blocks, encoding="zlib"))) * 5 < plain
+
+
+def test_empty_transfer_is_one_chunk():
+    (chunk,) = _chunks([], 5, "b" * 64)
+    assert read_envelope(chunk)["blocks"] == []
+
+
+def test_snapshot_starts_without_anchor():
+    header = split_envelope(_chunks(_blocks(2))[0])[0]
+    assert header["first_index"] == 0 and "anchor_hash" not in header
+
+
+def test_truncated_body_rejected():
+    header, body = split_envelope(_chunks(_blocks(20))[0])
+    with pytest.raises(EnvelopeError, match="truncated"):
+        list(iter_blocks(header, body[: len(body) // 2]))
+
+
+def test_count_mismatch_rejected():
+    header, body = split_envelope(_chunks(_blocks(3), encoding="none")[0])
+    header["count"] = 4
+    with pytest.raises(EnvelopeError, match="header says 4"):
+        list(iter_blocks(header, body))
+
+
+def test_plain_json_envelope_has_no_body():
+    envelope = {"type": "varus_chain_advert", "height": 3}
+    assert split_envelope(json.dumps(envelope).encode()) == (envelope, None)
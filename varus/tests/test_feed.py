@@ -0,0 +1,110 @@
+"""Tests for varus.feed."""
+
+import threading
+
+import pytest
+
+from varus.feed import BlockFeed, FeedError
+from varus.node import VarusNode
+
+
+@pytest.fixture
+def node(tmp_path):
+    n = VarusNode(
+        chain_path=tmp_path / "chain.json", inbox_dir=tmp_path / "inbox", socket_path=None
+    )
+    n.chain.load()
+    return n
+
+
+def _indices(events):
+    return [e["block"]["index"] for e in events if e["event"] == "block"]
+
+
+class TestSubscription:
+    def test_receives_appended_blocks(self, node):
+        sub = node.feed.subscribe()
+        node.submit_block({"n": 1})
+        node.submit_block({"n": 2})
+        events = sub.events(0)
+        assert _indices(events) == [1, 2]
+        assert events[0]["block"]["data"] == {"n": 1}
+        assert sub.events(0) == []
+
+    def test_resume_from_height_reads_history(self, node):
+        for i in range(5):
+            node.submit_block({"n": i})
+        sub = node.feed.subscribe(2)
+        node.submit_block({"n": 5})
+        assert _indices(sub.events(0)) == [2, 3, 4, 5, 6]
+        assert _indices(sub.events(0)) == []
+
+    def test_headers_only(self, node):
+        sub = node.feed.subscribe(headers_only=True)
+        node.submit_block({"secret": 1}, hash_version=2)
+        (event,) = sub.events(0)
+        assert "data" not in event["block"] and event["block"]["payload"]
+
+    def test_overflow_falls_back_to_store(self, node):
+        sub = node.feed.subscribe(buffer=2)
+        for i in range(6):
+            node.submit_block({"n": i})
+        assert sub.dropped == 4
+        received = []
+        while len(received) < 6:
+            received += _indices(sub.events(0))
+        assert received == [1, 2, 3, 4, 5, 6]  # nothing lost, still in order
+        assert sub.stats()["buffered"] == 0
+
+    def test_waits_for_next_block(self, node):
+        sub = node.feed.subscribe()
+        timer = threading.Timer(0.05, node.submit_block, args=({"late": True},))
+        timer.start()
+        assert _indices(sub.events(5)) == [1]
+        timer.join()
+
+    def test_rewind_after_truncation(self, node):
+        blocks = [node.chain.genesis] + [node.chain.add_block({"n": i}) for i in range(3)]
+        height = [len(blocks)]
+        feed = BlockFeed(lambda start, limit: blocks[start : start + limit], lambda: height[0])
+        sub = feed.subscribe(1)
+        assert _indices(sub.events(0)) == [1, 2, 3]
+        height[0] = 2  # chain truncated behind the subscriber
+        assert sub.events(0) == [{"event": "rewind", "height": 2}]
+        assert sub.next == 2
+
+    def test_start_above_tip_waits(self, node):
+        sub = node.feed.subscribe(3)
+        node.submit_block({"n": 1})
+        assert sub.events(0) == []
+        node.submit_block({"n": 2})
+        node.submit_block({"n": 3})
+        assert _indices(sub.events(0)) == [3]
+
+    def test_close_wakes_waiter(self, node):
+        sub = node.feed.subscribe()
+        threading.Timer(0.05, sub.close).start()
+        assert sub.events(5) == []
+        assert sub.closed
+
+
+class TestBlockFeed:
+    def test_subscriber_limit(self):
+        feed = BlockFeed(lambda start, limit: [], lambda: 1, max_subscribers=1)
+        feed.subscribe()
+        with pytest.raises(FeedError, match="Too many subscribers"):
+            feed.subscribe()
+
+    def test_unsubscribe_stops_delivery(self, node):
+        sub = node.feed.subscribe()
+        node.feed.unsubscribe(sub)
+        node.submit_block({"n": 1})
+        assert sub.closed and sub.stats()["buffered"] == 0
+        assert node.status()["feed"]["subscribers"] == 0
+
+    def test_inbox_batches_are_published(self, node):
+        sub = node.feed.subscribe()
+        for i in range(3):
+            (node.inbox.inbox_dir / f"{i}.json").write_text('{"k": 1}')
+        node._process_inbox()
+        assert _indices(sub.events(0)) == [1, 2, 3]
@@ -0,0 +1,197 @@
+"""Tests for varus.forks and VarusChain.reorg / side chains."""
+
+import json
+import os
+
+import pytest
+
+from varus.block import Block
+from varus.chain import ChainError, VarusChain
+from varus.cli import main
+from varus.forks import (
+    block_locator,
+    block_work,
+    earliest,
+    find_fork_point,
+    get_fork_choice,
+    locator_anchor,
+    longest,
+)
+
+
+def _hashes(n: int) -> list[str]:
+    return [f"{i:064x}" for i in range(n)]
+
+
+def _chains(tmp_path, shared: int, local: int, remote: int):
+    """Two chains sharing *shared* blocks after genesis, then *local*/*remote* of their own."""
+    base = VarusChain(tmp_path / "a" / "chain.json")
+    base.load()
+    base.add_blocks([{"shared": i} for i in range(shared)])
+    base.export_json(tmp_path / "shared.json")
+    other = VarusChain(tmp_path / "b" / "chain.json")
+    other.import_json(tmp_path / "shared.json")
+    base.add_blocks([{"local": i} for i in range(local)])
+    other.add_blocks([{"remote": i} for i in range(remote)])
+    return base, other
+
+
+class TestLocator:
+    def test_dense_then_exponential_down_to_genesis(self):
+        hashes = _hashes(100)
+        indices = [i for i, _ in block_locator(100, hashes.__getitem__)]
+        assert indices[:8] == list(range(99, 91, -1))
+        assert indices[8:12] == [90, 86, 78, 62]
+        assert indices[-1] == 0
+        assert len(indices) < 16
+
+    def test_anchor_is_highest_shared_entry(self):
+        ours = _hashes(50)
+        theirs = ours[:30] + [f"{i:064x}".replace("0", "f", 1) for i in range(30, 60)]
+        locator = block_locator(60, theirs.__getitem__)
+        anchor = locator_anchor(locator, 50, ours.__getitem__)
+        assert anchor is not None and anchor <= 29
+        assert 29 - anchor < 16  # within the locator's gap at that depth
+
+    def test_anchor_ignores_garbage(self):
+        assert locator_anchor([["x"], [99, "a"], None], 10, _hashes(10).__getitem__) is None
+
+
+class TestFindForkPoint:
+    def _blocks(self, hashes):
+        return [Block.__new__(Block) for _ in hashes]
+
+    def test_binary_search(self):
+        local = _hashes(1000)
+        remote = self._blocks(range(1000))
+        for i, block in enumerate(remote):
+            block.hash = local[i] if i <= 600 else "f" * 64
+        probes = []
+        fork = find_fork_point(remote, 0, 1000, lambda i: probes.append(i) or local[i])
+        assert fork == 600
+        assert len(probes) <= 11
+
+    def test_nothing_shared_past_anchor(self):
+        local = _hashes(10)
+        remote = self._blocks(range(3))
+        for block in remote:
+            block.hash = "f" * 64
+        assert find_fork_point(remote, 5, 10, local.__getitem__) == 4
+
+
+class TestRules:
+    def test_longest_keeps_ours_on_tie(self, tmp_path):
+        local, remote = _chains(tmp_path, 1, 2, 2)
+        ours, theirs = local.all_blocks()[2:], remote.all_blocks()[2:]
+        assert not longest(ours, theirs)
+        assert longest(ours[:1], theirs)
+
+    def test_earliest_prefers_first_seen(self, tmp_path):
+        local, remote = _chains(tmp_path, 0, 1, 3)
+        ours, theirs = local.all_blocks()[1:], remote.all_blocks()[1:]
+        assert not earliest(ours, theirs)  # ours was made first
+        assert earliest(theirs, ours)
+        assert not earliest(ours, ours)
+
+    def test_block_work(self):
+        block = Block.__new__(Block)
+        block.hash = "00f" + "0" * 61
+        assert block_work(block) == 2**8
+        block.hash = "8" + "0" * 63
+        assert block_work(block) == 1
+
+    def test_rule_lookup(self):
+        assert get_fork_choice("heaviest")[0] == "heaviest"
+        assert get_fork_choice(longest) == ("longest", longest)
+        with pytest.raises(ValueError, match="Unknown fork-choice"):
+            get_fork_choice("loudest")
+
+
+class TestReorg:
+    def test_switches_branch_and_keeps_side_chain(self, tmp_path):
+        local, remote = _chains(tmp_path, 2, 2, 3)
+        old_tip = local.tip.hash
+        removed = local.reorg(2, remote.all_blocks()[3:], validated=True, rule="longest")
+        assert [b.data for b in removed] == [{"local": 0}, {"local": 1}]
+        assert local.tip.hash == remote.tip.hash
+        assert local.validated_height == local.height == 6
+
+        (side,) = local.side_chains()
+        assert side["fork_index"] == 2 and side["tip_hash"] == old_tip and side["length"] == 2
+        assert [b.hash for b in local.side_chain(old_tip[:12])] == [b.hash for b in removed]
+        (entry,) = local.reorg_history()
+        assert entry["old_tip"] == old_tip and entry["new_tip"] == remote.tip.hash
+        assert (entry["removed"], entry["added"], entry["rule"]) == (2, 3, "longest")
+
+    def test_entry_is_synced_before_truncation(self, tmp_path, monkeypatch):
+        local, remote = _chains(tmp_path, 2, 2, 3)
+        events = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: (events.append("fsync"), real_fsync(fd)))
+
+        def crash(height):
+            events.append("truncate")
+            raise OSError("power lost")
+
+        monkeypatch.setattr(local.store, "truncate", crash)
+        with pytest.raises(OSError, match="power lost"):
+            local.reorg(2, remote.all_blocks()[3:], validated=True)
+        assert events[-2:] == ["fsync", "truncate"]
+        (entry,) = VarusChain(local.chain_path).reorg_history()
+        assert entry["new_tip"] == remote.tip.hash
+
+    def test_torn_history_line_is_skipped(self, tmp_path):
+        local, remote = _chains(tmp_path, 2, 2, 3)
+        local.reorg(2, remote.all_blocks()[3:], validated=True)
+        with (local.store.root / "reorgs.log").open("a") as fh:
+            fh.write('{"time": 1.0, "fork')
+        assert len(local.reorg_history()) == 1
+
+    def test_reorg_survives_reload(self, tmp_path, monkeypatch):
+        local, remote = _chains(tmp_path, 2, 2, 3)
+        local.reorg(2, remote.all_blocks()[3:], validated=True)
+        reloaded = VarusChain(local.chain_path)
+        monkeypatch.setattr(reloaded, "validate", lambda **kw: None)  # rely on the checkpoint
+        reloaded.load()
+        assert reloaded.tip.hash == remote.tip.hash
+        assert reloaded.validated_height == reloaded.height  # checkpoint moved to the new tip
+        assert reloaded.get_by_hash(local.side_chains()[0]["tip_hash"]) is None
+
+    def test_indexes_follow_reorg(self, tmp_path):
+        local, remote = _chains(tmp_path, 1, 3, 2)
+        local.create_index("local", "local")
+        local.create_index("remote", "remote")
+        local.reorg(1, remote.all_blocks()[2:], validated=True)
+        assert local.query(equals={"local": 0}) == []
+        assert [b.index for b in local.query(equals={"remote": 1})] == [3]
+        reloaded = VarusChain(local.chain_path)
+        assert [b.index for b in reloaded.query(equals={"remote": 0})] == [2]
+
+    def test_branch_must_continue_fork_block(self, tmp_path):
+        local, remote = _chains(tmp_path, 2, 2, 3)
+        with pytest.raises(ChainError, match="does not continue"):
+            local.reorg(1, remote.all_blocks()[3:])
+        assert local.height == 5
+
+    def test_refuses_to_replace_checkpointed_history(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("varus.chain.verify_checkpoint", lambda record, keys: None)
+        local, remote = _chains(tmp_path, 1, 3, 4)
+        local.assume_valid(
+            {
+                "genesis_hash": local.genesis.hash,
+                "height": 4,
+                "tip_hash": local.get_block(3).hash,
+            },
+            set(),
+        )
+        with pytest.raises(ChainError, match="signed checkpoint"):
+            local.reorg(1, remote.all_blocks()[2:])
+
+
+def test_cli_forks(tmp_path, capsys):
+    local, remote = _chains(tmp_path, 1, 1, 2)
+    local.reorg(1, remote.all_blocks()[2:], validated=True, rule="longest")
+    assert main(["--chain", str(local.chain_path), "forks"]) == 0
+    shown = json.loads(capsys.readouterr().out)
+    assert len(shown["side_chains"]) == 1
+    assert shown["reorgs"][0]["rule"] == "longest"
@@ -0,0 +1,182 @@
+"""Tests for varus.host."""
+
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from varus.api import NodeAPIServer, NodeClient, NodeUnavailable
+from varus.cli import main
+from varus.host import ChainHost, named_chain
+
+
+def _drop(host, name, count):
+    inbox = host.nodes[name].inbox.inbox_dir
+    for i in range(count):
+        (inbox / f"{time.time():.6f}_{i:06d}.json").write_text(json.dumps({"n": i}))
+
+
+@pytest.fixture
+def host(tmp_path):
+    h = ChainHost(tmp_path / "chains", ["audit", "payments"], socket_path=None, batch_size=2)
+    h.open()
+    yield h
+    h.close()
+
+
+class TestNamedChain:
+    def test_layout(self, tmp_path):
+        chain_path, inbox = named_chain(tmp_path, "audit")
+        assert chain_path == tmp_path / "audit.json"
+        assert inbox == tmp_path / "audit.inbox"
+
+    @pytest.mark.parametrize("name", ["", "../x", "a/b", ".hidden", "x" * 65])
+    def test_rejects_unsafe_names(self, tmp_path, name):
+        with pytest.raises(ValueError, match="Invalid chain name"):
+            named_chain(tmp_path, name)
+
+
+class TestChainHost:
+    def test_chains_have_own_storage_and_inbox(self, host):
+        audit, payments = host.nodes["audit"], host.nodes["payments"]
+        assert audit.chain.store.root != payments.chain.store.root
+        assert audit.inbox.inbox_dir != payments.inbox.inbox_dir
+        assert audit.chain.blobs.root == payments.chain.blobs.root  # shared blob store
+
+    def test_duplicate_chain_rejected(self, tmp_path):
+        host = ChainHost(tmp_path, ["audit"], socket_path=None)
+        with pytest.raises(ValueError, match="already hosted"):
+            host.add_chain("audit")
+
+    def test_no_chains_added_while_running(self, host):
+        with pytest.raises(RuntimeError, match="before the host starts"):
+            host.add_chain("ledger")
+
+    def test_hot_chain_does_not_starve_others(self, host, monkeypatch):
+        order = []
+
+        def recording(name, process):
+            def _process_inbox(max_batches=None):
+                order.append(name)
+                return process(max_batches)
+
+            return _process_inbox
+
+        for name, node in host.nodes.items():
+            monkeypatch.setattr(node, "_process_inbox", recording(name, node._process_inbox))
+        _drop(host, "audit", 10)
+        _drop(host, "payments", 4)
+        host.run_pending()
+        assert host.nodes["audit"].chain.height == 11
+        assert host.nodes["payments"].chain.height == 5
+        assert order == ["audit", "payments"] * 2 + ["audit"] * 3  # one batch per turn
+
+    def test_health_checked_per_chain(self, host, monkeypatch):
+        checked = []
+        for name, node in host.nodes.items():
+            monkeypatch.setattr(node, "_health_check", lambda name=name: checked.append(name))
+        host.run_pending()
+        assert sorted(checked) == ["audit", "payments"]
+        host.run_pending()
+        assert len(checked) == 2  # not due again until the next tick
+
+    def test_status_lists_every_chain(self, host):
+        host.submit_block("payments", {"amount": 5})
+        status = host.status()
+        assert set(status["chains"]) == {"audit", "payments"}
+        assert status["chains"]["payments"]["chain"]["height"] == 2
+        assert status["dispatcher"]["workers"] == host.workers
+
+    def test_select(self, host):
+        payments = host.nodes["payments"]
+        assert host.select(name="payments") is payments
+        assert host.select(chain=str(payments.chain.chain_path)) is payments
+        assert host.select(chain=str(payments.chain.chain_path), name="audit") is None
+        assert host.select() is None  # ambiguous with two chains
+        assert host.select(name="missing") is None
+
+    def test_loop_appends_to_each_chain(self, tmp_path):
+        host = ChainHost(
+            tmp_path / "chains",
+            ["a", "b", "c"],
+            socket_path=None,
+            workers=2,
+            tick=60,
+            watch="poll",
+            poll_interval=0.02,
+        )
+        host.open()
+        thread = threading.Thread(target=host._loop, daemon=True)
+        thread.start()
+        try:
+            for name in host.nodes:
+                _drop(host, name, 3)
+            deadline = time.time() + 5
+            while time.time() < deadline and any(
+                node.chain.height < 4 for node in host.nodes.values()
+            ):
+                time.sleep(0.01)
+            assert [node.chain.height for node in host.nodes.values()] == [4, 4, 4]
+        finally:
+            host.stop()
+            thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+class TestHostAPI:
+    @pytest.fixture
+    def served(self, host):
+        with tempfile.TemporaryDirectory(prefix="varus-") as d:
+            host.api = NodeAPIServer(host, Path(d) / "node.sock")
+            host.api.start()
+            yield host
+            host.api.stop()
+
+    def test_routes_by_name_and_path(self, served):
+        served.submit_block("payments", {"amount": 1})
+        c = NodeClient(served.api.socket_path)
+        assert c.request("tip", chain_name="payments")["data"] == {"amount": 1}
+        assert c.request("tip", chain_name="audit")["index"] == 0
+        path = served.nodes["payments"].chain.chain_path
+        assert NodeClient(served.api.socket_path, chain=path).request("tip")["index"] == 1
+
+    def test_submit_goes_to_named_chain(self, served):
+        NodeClient(served.api.socket_path).request("submit", chain_name="audit", data={"k": 1})
+        assert served.nodes["audit"].chain.height == 2
+        assert served.nodes["payments"].chain.height == 1
+
+    def test_unhosted_or_unnamed_chain_is_unavailable(self, served):
+        c = NodeClient(served.api.socket_path)
+        with pytest.raises(NodeUnavailable, match="does not serve"):
+            c.request("tip", chain_name="ledger")
+        with pytest.raises(NodeUnavailable, match="several chains"):
+            c.request("tip")
+
+    def test_chains(self, served):
+        chains = NodeClient(served.api.socket_path).request("chains")
+        assert set(chains) == {"audit", "payments"}
+        assert chains["audit"]["height"] == 1
+
+
+class TestCLI:
+    def test_chain_name_selects_chain_and_inbox(self, tmp_path, capsys):
+        args = ["--no-daemon", "--chains-dir", str(tmp_path), "--chain-name", "audit"]
+        assert main(args + ["init"]) == 0
+        assert main(args + ["add", '{"k": 1}']) == 0
+        assert (tmp_path / "audit.varus").is_dir()
+        assert main(args + ["submit", '{"k": 2}']) == 0
+        assert len(list((tmp_path / "audit.inbox").glob("*.json"))) == 1
+        capsys.readouterr()
+        assert main(args + ["tip"]) == 0
+        assert json.loads(capsys.readouterr().out)["data"] == {"k": 1}
+
+    def test_several_names_only_for_daemon(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main(["--chain-name", "a", "--chain-name", "b", "tip"])
+
+    def test_invalid_name(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main(["--chains-dir", str(tmp_path), "--chain-name", "../x", "tip"])
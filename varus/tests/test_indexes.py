@@ -0,0 +1,174 @@
+"""Tests for varus.indexes and VarusChain.query."""
+
+import json
+
+import pytest
+
+from varus.chain import ChainError, VarusChain
+from varus.indexes import INDEX_DIR, FieldIndex
+
+
+@pytest.fixture
+def chain(tmp_path):
+    c = VarusChain(tmp_path / "chain.json")
+    c.load()
+    c.add_blocks(
+        [
+            {"type": "vote", "sender": {"id": "alice"}, "tags": ["a", "b"]},
+            {"type": "post", "sender": {"id": "bob"}, "tags": ["b"]},
+            {"type": "vote", "sender": {"id": "alfred"}},
+            {"type": "vote", "sender": {"id": "bob"}, "n": 3},
+        ]
+    )
+    return c
+
+
+def _indices(blocks) -> list[int]:
+    return [b.index for b in blocks]
+
+
+class TestFieldIndex:
+    def test_extract_paths(self, tmp_path):
+        index = FieldIndex.create(tmp_path, "sender", "sender.id")
+        assert index.extract({"sender": {"id": "x"}}) == ["x"]
+        assert index.extract({"sender": "x"}) == []
+        assert index.extract({}) == []
+
+    def test_lists_index_each_scalar(self, tmp_path):
+        index = FieldIndex.create(tmp_path, "tags", "tags")
+        index.add([(0, {"tags": ["a", "b", {"nested": 1}]}), (1, {"tags": "a"})])
+        assert index.lookup("a") == [0, 1]
+        assert index.lookup("b") == [0]
+
+    def test_values_keep_their_json_type(self, tmp_path):
+        index = FieldIndex.create(tmp_path, "n", "n")
+        index.add([(0, {"n": 1}), (1, {"n": "1"}), (2, {"n": True})])
+        assert index.lookup(1) == [0]
+        assert index.lookup("1") == [1]
+        assert index.lookup(True) == [2]
+
+    def test_prefix(self, tmp_path):
+        index = FieldIndex.create(tmp_path, "who", "who")
+        index.add([(0, {"who": "alice"}), (1, {"who": "bob"}), (2, {"who": "alfred"})])
+        assert index.lookup_prefix("al") == [0, 2]
+        index.add([(3, {"who": "alan"})])
+        assert index.lookup_prefix("al") == [0, 2, 3]
+
+    def test_reopen(self, tmp_path):
+        index = FieldIndex.create(tmp_path, "who", "who")
+        index.add([(0, {"who": "a"}), (1, {}), (2, {"who": "a"})])
+        reopened = FieldIndex.open(index.meta_path)
+        assert reopened.height == 3
+        assert reopened.lookup("a") == [0, 2]
+
+    def test_entries_past_recorded_height_dropped(self, tmp_path):
+        index = FieldIndex.create(tmp_path, "who", "who")
+        index.add([(0, {"who": "a"})])
+        with index.log_path.open("ab") as fh:  # appended, then crashed before the meta update
+            fh.write(b'[1,"a"]\n[2,"a')
+        reopened = FieldIndex.open(index.meta_path)
+        assert reopened.height == 1
+        assert reopened.lookup("a") == [0]
+        assert index.log_path.read_bytes() == b'[0,"a"]\n'
+
+    def test_bad_name_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            FieldIndex.create(tmp_path, "../escape", "x")
+
+
+class TestChainQuery:
+    def test_equality(self, chain):
+        chain.create_index("type", "type")
+        assert _indices(chain.query(equals={"type": "vote"})) == [1, 3, 4]
+
+    def test_index_named_by_path(self, chain):
+        chain.create_index("sender", "sender.id")
+        assert _indices(chain.query(equals={"sender.id": "bob"})) == [2, 4]
+
+    def test_filters_intersect(self, chain):
+        chain.create_index("type", "type")
+        chain.create_index("sender", "sender.id")
+        assert _indices(chain.query(equals={"type": "vote", "sender": "bob"})) == [4]
+        assert _indices(chain.query(equals={"type": "vote"}, prefix={"sender": "al"})) == [1, 3]
+
+    def test_time_range_and_limit(self, chain):
+        chain.create_index("type", "type")
+        cutoff = chain.get_block(3).timestamp
+        assert _indices(chain.query(equals={"type": "vote"}, since=cutoff)) == [3, 4]
+        assert _indices(chain.query(until=cutoff, limit=2)) == [0, 1]
+        assert _indices(chain.query(equals={"type": "vote"}, limit=1, start=2)) == [3]
+
+    def test_maintained_on_append(self, chain):
+        chain.create_index("type", "type")
+        chain.add_block({"type": "post"})
+        assert _indices(chain.query(equals={"type": "post"})) == [2, 5]
+
+    def test_unindexed_field_rejected(self, chain):
+        with pytest.raises(ChainError, match="No index"):
+            chain.query(equals={"type": "vote"})
+
+    def test_conflicting_redeclaration_rejected(self, chain):
+        chain.create_index("type", "type")
+        chain.create_index("type", "type")
+        with pytest.raises(ChainError, match="already exists"):
+            chain.create_index("type", "kind")
+
+    def test_drop(self, chain):
+        chain.create_index("type", "type")
+        chain.drop_index("type")
+        assert chain.indexes == {}
+        assert not (chain.store.root / INDEX_DIR / "type.json").exists()
+
+    def test_query_without_load_reads_only_matches(self, chain, monkeypatch):
+        chain.create_index("type", "type")
+        reader = VarusChain(chain.chain_path)
+        read = []
+        real = reader.store.read_record
+        monkeypatch.setattr(reader.store, "read_record", lambda h: read.append(h) or real(h))
+        blocks = reader.query(equals={"type": "post"})
+        assert _indices(blocks) == [2]
+        assert read == [2]
+        assert not blocks[0].is_decoded
+
+    def test_index_catches_up_after_crash(self, chain):
+        chain.create_index("type", "type")
+        meta = chain.store.root / INDEX_DIR / "type.json"
+        meta.write_text(json.dumps({"path": "type", "height": 2}))  # lost the last update
+        reloaded = VarusChain(chain.chain_path)
+        reloaded.load()
+        assert _indices(reloaded.query(equals={"type": "vote"})) == [1, 3, 4]
+
+    def test_summary_reports_indexes_without_updating_them(self, chain, monkeypatch):
+        chain.create_index("type", "type")
+        meta = chain.store.root / INDEX_DIR / "type.json"
+        meta.write_text(json.dumps({"path": "type", "height": 2}))  # behind the chain
+        reloaded = VarusChain(chain.chain_path)
+        reloaded.load()
+        monkeypatch.setattr(FieldIndex, "add", lambda *a: pytest.fail("index updated"))
+        summary = reloaded.summary(validate=False)
+        assert summary["indexes"] == {"type": "type"}
+        assert summary["index_heights"] == {"type": 2}
+        assert json.loads(meta.read_text())["height"] == 2
+
+    def test_index_rebuilt_when_chain_is_shorter(self, tmp_path, chain):
+        chain.create_index("type", "type")
+        exported = tmp_path / "export.json"
+        raw = [b.to_dict() for b in chain.all_blocks()[:3]]
+        exported.write_text(json.dumps(raw))
+        chain.import_json(exported)
+        assert chain.indexes == {"type": "type"}
+        assert _indices(chain.query(equals={"type": "vote"})) == [1]
+
+    def test_headers_only_chain_has_no_indexes(self, tmp_path):
+        light = VarusChain(tmp_path / "light.json", headers_only=True)
+        light.load()
+        with pytest.raises(ChainError, match="headers-only"):
+            light.create_index("type", "type")
+
+    def test_loaded_blocks_stay_lazy(self, chain):
+        chain.create_index("type", "type")
+        chain.validate()  # so the reload does not rehash
+        reloaded = VarusChain(chain.chain_path)
+        reloaded.load()
+        reloaded.query(equals={"type": "vote"})
+        assert not any(b.is_decoded for b in reloaded.all_blocks()[1:])
@@ -0,0 +1,87 @@
+"""Tests for varus.merkle."""
+
+import copy
+
+import pytest
+
+from varus.block import HASH_V2, HASH_V3, Block
+from varus.merkle import ProofError, merkle_path, merkle_root, root_from_path, verify_proof
+
+
+DATA = {f"k{i:02d}": {"n": i} for i in range(7)}
+
+
+class TestMerkleRoot:
+    def test_root_is_order_independent(self):
+        reordered = dict(reversed(list(DATA.items())))
+        assert merkle_root(DATA) == merkle_root(reordered)
+
+    def test_root_changes_with_any_item(self):
+        changed = dict(DATA, k03={"n": 99})
+        assert merkle_root(changed) != merkle_root(DATA)
+
+    def test_odd_node_is_not_duplicated(self):
+        three = {"a": 1, "b": 2, "c": 3}
+        four = dict(three, d=3)  # duplicating "c" must not collide
+        assert merkle_root(three) != merkle_root(four)
+
+    def test_empty_data_has_a_root(self):
+        assert len(merkle_root({})) == 64
+
+    def test_non_dict_data_rejected(self):
+        with pytest.raises(ProofError):
+            merkle_root([1, 2])
+
+
+class TestMerklePath:
+    @pytest.mark.parametrize("size", [1, 2, 3, 4, 5, 8, 33])
+    def test_every_item_proves_to_root(self, size):
+        data = {f"k{i:03d}": i for i in range(size)}
+        root = merkle_root(data)
+        for key, value in data.items():
+            path = merkle_path(data, key)
+            assert len(path) <= size.bit_length()
+            assert root_from_path(key, value, path) == root
+
+    def test_wrong_value_does_not_prove(self):
+        path = merkle_path(DATA, "k02")
+        assert root_from_path("k02", {"n": 3}, path) != merkle_root(DATA)
+
+    def test_missing_key(self):
+        with pytest.raises(ProofError, match="no item"):
+            merkle_path(DATA, "nope")
+
+
+class TestVerifyProof:
+    @pytest.fixture
+    def proof(self):
+        block = Block(4, 10.0, dict(DATA), "ab" * 32, hash_version=HASH_V3)
+        return {
+            "key": "k05",
+            "value": DATA["k05"],
+            "path": merkle_path(DATA, "k05"),
+            "header": block.header(),
+        }
+
+    def test_valid_proof(self, proof):
+        assert verify_proof(proof)
+
+    @pytest.mark.parametrize(
+        "tamper",
+        [
+            lambda p: p.update(value={"n": 0}),
+            lambda p: p["header"].update(index=5),
+            lambda p: p["header"].update(hash="00" * 32),
+            lambda p: p["path"].pop(),
+            lambda p: p.pop("header"),
+        ],
+    )
+    def test_tampered_proof_fails(self, proof, tamper):
+        proof = copy.deepcopy(proof)
+        tamper(proof)
+        assert not verify_proof(proof)
+
+    def test_version_2_header_rejected(self, proof):
+        block = Block(4, 10.0, dict(DATA), "ab" * 32, hash_version=HASH_V2)
+        proof["header"] = block.header()
+        assert not verify_proof(proof)
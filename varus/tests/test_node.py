@@ -1,11 +1,13 @@
 """Tests for varus.node."""
 
 import json
+import threading
 import time
 
 import pytest
 
-from varus.node import VarusNode, BlockInbox
+from varus.node import BlockInbox, ReadWriteLock, RollingStats, Throughput, VarusNode
+from varus.storage import SegmentStore, store_path
 
 
 @pytest.fixture
@@ -68,3 +70,291 @@ class TestVarusNode:
         item.write_text('{"source": "inbox"}')
         node._process_inbox()
         assert not item.exists()
+
+
+class TestHealthCheck:
+    def test_health_check_is_incremental(self, node):
+        node.submit_block({"x": 1})
+        node.chain._blocks[1].data["x"] = "tampered"
+        node.deep_scan_every = 0
+        node._health_check()
+        assert node.chain.validated_height == 2
+
+    def test_deep_scan_detects_tampering(self, node, caplog):
+        node.submit_block({"x": 1})
+        node.chain._blocks[1].data["x"] = "tampered"
+        node.deep_scan_every = 1
+        node.deep_scan_sample = 10
+        with caplog.at_level("ERROR", logger="varus.node"):
+            node._health_check()
+        assert "CHAIN INTEGRITY FAILURE" in caplog.text
+
+    def test_health_check_excludes_readers(self, node, monkeypatch):
+        held = []
+        is_valid = node.chain.is_valid
+
+        def check(**kwargs):
+            held.append((node._lock._writer, node._lock._readers))
+            return is_valid(**kwargs)
+
+        monkeypatch.setattr(node.chain, "is_valid", check)
+        node._health_check()
+        assert held == [(True, 0)]  # it advances the validated mark
+
+
+class TestBatchedInbox:
+    def test_inbox_batch_is_single_commit(self, node, monkeypatch):
+        for i in range(3):
+            (node.inbox.inbox_dir / f"{i:03d}.json").write_text(json.dumps({"i": i}))
+        commits = []
+        real = node.chain.store.append_many
+        monkeypatch.setattr(
+            node.chain.store, "append_many", lambda recs: commits.append(1) or real(recs)
+        )
+        node._process_inbox()
+        assert len(commits) == 1
+        assert node.chain.height == 4
+        assert [b.data["i"] for b in node.chain.all_blocks()[1:]] == [0, 1, 2]
+
+    def test_bad_inbox_item_does_not_block_batch(self, node):
+        (node.inbox.inbox_dir / "001.json").write_text("not json")
+        (node.inbox.inbox_dir / "002.json").write_text('{"ok": true}')
+        (node.inbox.inbox_dir / "003.json").write_text("[1, 2]")
+        node._process_inbox()
+        assert node.chain.height == 2
+        assert node.inbox.pending() == []
+        rejected = sorted(p.name for p in node.inbox.rejected_dir.iterdir())
+        assert rejected == ["001.json", "003.json"]
+
+    def test_large_inbox_split_into_ordered_batches(self, tmp_path, monkeypatch):
+        node = VarusNode(
+            chain_path=tmp_path / "chain.json",
+            inbox_dir=tmp_path / "inbox",
+            batch_size=4,
+            parse_workers=1,
+        )
+        node.chain.load()
+        for i in range(10):
+            (node.inbox.inbox_dir / f"{i:03d}.json").write_text(json.dumps({"i": i}))
+        commits = []
+        real = node.chain.store.append_many
+
+        def append_many(recs):
+            rows = list(recs)
+            commits.append(len(rows))
+            return real(rows)
+
+        monkeypatch.setattr(node.chain.store, "append_many", append_many)
+        node._process_inbox()
+        assert commits == [4, 4, 2]
+        assert [b.data["i"] for b in node.chain.all_blocks()[1:]] == list(range(10))
+        assert node.inbox.claimed() == []
+
+    def test_throughput_in_status(self, node):
+        for i in range(3):
+            (node.inbox.inbox_dir / f"{i:03d}.json").write_text("{}")
+        node._process_inbox()
+        throughput = node.status()["throughput"]
+        assert throughput["total"] == 3
+        assert throughput["blocks_per_sec"] > 0
+
+
+class TestClaim:
+    def test_claim_moves_oldest_items(self, tmp_path):
+        inbox = BlockInbox(tmp_path / "inbox")
+        for name in ("003.json", "001.json", "002.json", ".tmp.json"):
+            (inbox.inbox_dir / name).write_text("{}")
+        claimed = inbox.claim(limit=2)
+        assert [p.name for p in claimed] == ["001.json", "002.json"]
+        assert all(p.parent == inbox.processing_dir for p in claimed)
+        assert [p.name for p in inbox.pending()] == ["003.json"]
+        assert inbox.count() == 1
+
+    def test_uncommitted_claim_is_replayed(self, tmp_path):
+        node = VarusNode(chain_path=tmp_path / "chain.json", inbox_dir=tmp_path / "inbox")
+        node.chain.load()
+        (node.inbox.inbox_dir / "001.json").write_text('{"n": 1}')
+        node.inbox.claim()  # crash right after claiming
+
+        restarted = VarusNode(chain_path=tmp_path / "chain.json", inbox_dir=tmp_path / "inbox")
+        restarted.chain.load()
+        restarted._recover_claimed()
+        assert restarted.chain.height == 2
+        assert restarted.inbox.claimed() == []
+
+    def test_committed_claim_is_not_appended_twice(self, tmp_path):
+        node = VarusNode(chain_path=tmp_path / "chain.json", inbox_dir=tmp_path / "inbox")
+        node.chain.load()
+        for i in range(3):
+            (node.inbox.inbox_dir / f"{i:03d}.json").write_text(json.dumps({"i": i}))
+        claimed = node.inbox.claim()
+        node.inbox.begin(claimed, node.chain.height)
+        node.chain.add_blocks([{"i": 0}, {"i": 1}])  # crash after a partial commit
+
+        restarted = VarusNode(chain_path=tmp_path / "chain.json", inbox_dir=tmp_path / "inbox")
+        restarted.chain.load()
+        restarted._recover_claimed()
+        assert [b.data["i"] for b in restarted.chain.all_blocks()[1:]] == [0, 1, 2]
+        assert restarted.inbox.claimed() == []
+        assert restarted.inbox.journal() is None
+
+
+    def test_items_kept_until_group_commit_is_synced(self, tmp_path, monkeypatch):
+        node = VarusNode(
+            chain_path=tmp_path / "chain.json",
+            inbox_dir=tmp_path / "inbox",
+            durability="group",
+            group_ms=60_000,
+        )
+        node.chain.load()
+        for i in range(3):
+            (node.inbox.inbox_dir / f"{i:03d}.json").write_text(json.dumps({"i": i}))
+
+        class Crash(Exception):
+            pass
+
+        def crash():
+            raise Crash  # the process dies before the group commit reaches disk
+
+        monkeypatch.setattr(node.chain.store, "sync", crash)
+        with pytest.raises(Crash):
+            node._process_inbox()
+        assert len(node.inbox.claimed()) == 3  # not deleted before the blocks are durable
+        assert node.inbox.journal()["items"] == ["000.json", "001.json", "002.json"]
+        SegmentStore(store_path(tmp_path / "chain.json")).truncate(1)  # the unsynced tail is lost
+
+        restarted = VarusNode(chain_path=tmp_path / "chain.json", inbox_dir=tmp_path / "inbox")
+        restarted.chain.load()
+        restarted._recover_claimed()
+        assert [b.data["i"] for b in restarted.chain.all_blocks()[1:]] == [0, 1, 2]
+        assert restarted.inbox.claimed() == []
+
+class TestEventDrivenLoop:
+    @pytest.mark.parametrize("watch", ["auto", "poll"])
+    def test_submitted_block_appended_without_waiting_for_tick(self, tmp_path, watch):
+        node = VarusNode(
+            chain_path=tmp_path / "chain.json",
+            inbox_dir=tmp_path / "inbox",
+            tick=60,
+            watch=watch,
+            poll_interval=0.02,
+        )
+        node.chain.load()
+        node._running = True
+        thread = threading.Thread(target=node._loop, daemon=True)
+        thread.start()
+        try:
+            time.sleep(0.1)  # let the loop run its first pass and start waiting
+            name = f"{time.time():.6f}_test.json"
+            (node.inbox.inbox_dir / name).write_text('{"fast": true}')
+            deadline = time.time() + 5
+            while node.chain.height < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            assert node.chain.height == 2
+        finally:
+            node.stop()
+            thread.join(timeout=5)
+        assert not thread.is_alive()
+        latency = node.status()["latency_ms"]
+        assert latency["count"] == 1
+        assert latency["last"] < 5000
+
+    def test_latency_ignores_unparseable_names(self, node):
+        (node.inbox.inbox_dir / "block.json").write_text("{}")
+        node._process_inbox()
+        assert node.status()["latency_ms"] == {"count": 0}
+
+
+class TestReadWriteLock:
+    def test_readers_share_writers_exclude(self):
+        lock = ReadWriteLock()
+        events = []
+
+        def write():
+            with lock.write():
+                events.append("w")
+
+        with lock.read():
+            with lock.read():  # a second reader does not wait
+                events.append("nested read")
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.05)
+            assert events == ["nested read"]  # the writer waits for the reader
+        writer.join(timeout=5)
+        assert events == ["nested read", "w"]
+        waits = lock.snapshot()
+        assert waits["read"]["count"] == 2
+        assert waits["write"]["last"] >= 40
+
+    def test_waiting_writer_holds_back_new_readers(self):
+        lock = ReadWriteLock()
+        order = []
+
+        def write():
+            with lock.write():
+                order.append("write")
+
+        def read():
+            with lock.read():
+                order.append("read")
+
+        with lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.05)
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.05)
+            assert order == []
+        writer.join(timeout=5)
+        reader.join(timeout=5)
+        assert order == ["write", "read"]
+
+
+class TestSnapshotStatus:
+    def test_status_does_not_wait_for_writers(self, node):
+        node.submit_block({"n": 1})
+        with node._lock.write():  # e.g. a long append in progress
+            started = time.perf_counter()
+            status = node.status()
+            assert time.perf_counter() - started < 0.5
+        assert status["chain"]["height"] == 2
+        assert status["chain"]["valid"] is True
+        assert status["lock_wait_ms"]["write"]["count"] >= 1
+
+    def test_view_published_after_each_write(self, node):
+        before = node.status()["chain"]
+        node.submit_block({"n": 1})
+        (node.inbox.inbox_dir / "item.json").write_text('{"n": 2}')
+        node._process_inbox()
+        after = node.status()["chain"]
+        assert (before["height"], after["height"]) == (1, 3)
+        assert after["tip_hash"] == node.chain.tip.hash
+
+    def test_status_does_not_rehash(self, node, monkeypatch):
+        node.submit_block({"n": 1})
+        monkeypatch.setattr(node.chain, "validate", lambda **kw: pytest.fail("rehashed"))
+        node.status()
+        node.submit_block({"n": 2})
+        assert node.status()["chain"]["height"] == 3
+
+
+class TestRollingStats:
+    def test_snapshot(self):
+        stats = RollingStats(window=10)
+        for v in range(1, 11):
+            stats.add(float(v))
+        snap = stats.snapshot()
+        assert snap["count"] == 10
+        assert snap["max"] == 10.0
+        assert snap["mean"] == 5.5
+
+
+class TestThroughput:
+    def test_rate_over_window(self):
+        stats = Throughput(window=10)
+        stats.add(50, now=100.0)
+        stats.add(50, now=105.0)
+        assert stats.snapshot(now=106.0) == {"total": 100, "window_s": 10, "blocks_per_sec": 10.0}
+        assert stats.snapshot(now=112.0)["blocks_per_sec"] == 5.0
@@ -0,0 +1,397 @@
+"""Tests for varus.storage."""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+
+import pytest
+
+from varus.storage import (
+    DURABILITY_MODES,
+    SegmentStore,
+    StorageError,
+    decode_record,
+    encode_record,
+    split_record,
+    store_path,
+)
+
+
+def _record(i: int, payload: str = "x") -> dict:
+    digest = hashlib.sha256(f"{i}:{payload}".encode()).hexdigest()
+    return {"index": i, "payload": payload, "hash": digest}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SegmentStore(tmp_path / "chain.varus")
+    s.create()
+    return s
+
+
+class TestStorePath:
+    def test_json_chain_maps_to_varus_dir(self, tmp_path):
+        assert store_path(tmp_path / "audit.json") == tmp_path / "audit.varus"
+
+    def test_varus_dir_used_as_is(self, tmp_path):
+        assert store_path(tmp_path / "audit.varus") == tmp_path / "audit.varus"
+
+
+class TestSegmentStore:
+    def test_create_writes_manifest(self, store):
+        assert store.exists()
+        manifest = json.loads(store.manifest_path.read_text())
+        assert manifest["segments"] == [{"id": 0, "first_index": 0}]
+
+    def test_append_and_read_back(self, store):
+        store.append(_record(0))
+        store.append_many([_record(1), _record(2)])
+        assert [r["index"] for r in store.read_all()] == [0, 1, 2]
+
+    def test_append_is_one_line_per_block(self, store):
+        store.append_many([_record(0), _record(1)])
+        lines = store.segment_path(0).read_bytes().splitlines()
+        assert len(lines) == 2
+
+    def test_segments_roll_at_size_threshold(self, tmp_path):
+        store = SegmentStore(tmp_path / "s.varus", segment_size=64)
+        store.create()
+        store.append_many(_record(i, "y" * 40) for i in range(5))
+        segments = store.segments()
+        assert len(segments) == 5
+        assert [s["first_index"] for s in segments] == [0, 1, 2, 3, 4]
+        assert [r["index"] for r in store.read_all()] == [0, 1, 2, 3, 4]
+
+    def test_rewrite_replaces_contents(self, store):
+        store.append_many([_record(0), _record(1)])
+        store.rewrite([_record(0, "new")])
+        assert list(store.read_all()) == [_record(0, "new")]
+
+    def test_rewrite_failure_keeps_old_store(self, store):
+        store.append_many([_record(0), _record(1)])
+
+        def records():
+            yield _record(0, "new")
+            raise ValueError("bad record")
+
+        with pytest.raises(ValueError):
+            store.rewrite(records())
+        reopened = SegmentStore(store.root)
+        assert [r["index"] for r in reopened.read_all()] == [0, 1]
+        assert sorted(p.name for p in store.root.parent.iterdir()) == ["chain.varus"]
+
+    @pytest.mark.parametrize("built", [True, False])
+    def test_crash_during_swap_is_recovered(self, store, monkeypatch, built):
+        store.append_many([_record(0), _record(1)])
+        rename = os.rename
+
+        def crash(src, dst):
+            if built and dst == store.root:
+                raise KeyboardInterrupt  # killed after moving the old store out
+            if not built and str(dst).endswith("chain.varus.new"):
+                raise KeyboardInterrupt  # killed before the new store was complete
+            rename(src, dst)
+
+        monkeypatch.setattr("varus.storage.os.rename", crash)
+        with pytest.raises(KeyboardInterrupt):
+            store.rewrite([_record(0, "new")])
+        monkeypatch.undo()
+        assert store.root.exists() is not built
+        reopened = SegmentStore(store.root)
+        expected = [_record(0, "new")] if built else [_record(0), _record(1)]
+        assert list(reopened.read_all()) == expected
+        assert sorted(p.name for p in store.root.parent.iterdir()) == ["chain.varus"]
+
+    def test_missing_store_raises(self, tmp_path):
+        with pytest.raises(StorageError):
+            list(SegmentStore(tmp_path / "nope.varus").read_all())
+
+    def test_destroy_removes_directory(self, store):
+        store.destroy()
+        assert not store.root.exists()
+
+
+class TestHeightIndex:
+    def test_height_tracks_appends(self, store):
+        store.append_many([_record(0), _record(1), _record(2)])
+        assert store.height == 3
+
+    def test_read_at_returns_single_record(self, store):
+        store.append_many([_record(i) for i in range(5)])
+        assert store.read_at(3) == _record(3)
+
+    def test_read_at_across_segments(self, tmp_path):
+        store = SegmentStore(tmp_path / "s.varus", segment_size=64)
+        store.create()
+        store.append_many(_record(i, "y" * 40) for i in range(4))
+        assert store.locate(2)[0] == 2
+        assert store.read_at(2)["index"] == 2
+
+    def test_read_at_out_of_range(self, store):
+        with pytest.raises(IndexError):
+            store.read_at(0)
+
+    def test_lookup_hash(self, store):
+        store.append_many([_record(i) for i in range(3)])
+        assert store.lookup_hash(_record(2)["hash"]) == 2
+        assert store.lookup_hash("ab" * 32) is None
+        assert store.lookup_hash("not-hex") is None
+
+    def test_hash_at(self, store):
+        store.append_many([_record(0), _record(1)])
+        assert store.hash_at(1) == _record(1)["hash"]
+
+    def test_index_persists_across_instances(self, store):
+        store.append_many([_record(i) for i in range(3)])
+        reopened = SegmentStore(store.root)
+        assert reopened.height == 3
+        assert reopened.lookup_hash(_record(1)["hash"]) == 1
+
+    def test_index_rebuilds_missing_tail(self, store):
+        store.append_many([_record(i) for i in range(3)])
+        # Simulate a crash after the segment write but before the index write.
+        raw = store.index_path.read_bytes()
+        store.index_path.write_bytes(raw[: len(raw) // 3])
+        reopened = SegmentStore(store.root)
+        assert reopened.height == 3
+        assert reopened.read_at(2) == _record(2)
+
+    def test_index_drops_dangling_entries(self, store):
+        store.append_many([_record(i) for i in range(3)])
+        segment = store.segment_path(0)
+        lines = segment.read_bytes().splitlines(keepends=True)
+        segment.write_bytes(b"".join(lines[:2]))
+        reopened = SegmentStore(store.root)
+        assert reopened.height == 2
+
+
+class TestChecksums:
+    def test_records_carry_crc_prefix(self, store):
+        store.append(_record(0))
+        line = store.segment_path(0).read_bytes()
+        crc, _, body = line.rstrip(b"\n").partition(b" ")
+        assert int(crc, 16) == zlib.crc32(body)
+
+    def test_decode_accepts_unchecksummed_records(self):
+        assert decode_record(b'{"index": 0}\n') == {"index": 0}
+
+    def test_decode_rejects_bad_checksum(self):
+        line = encode_record(_record(0)).replace(b'"x"', b'"y"')
+        with pytest.raises(StorageError):
+            decode_record(line)
+
+    def test_torn_tail_is_truncated_on_open(self, store):
+        store.append_many([_record(0), _record(1)])
+        segment = store.segment_path(0)
+        good_size = segment.stat().st_size
+        with segment.open("ab") as fh:
+            fh.write(encode_record(_record(2))[:-10])  # crash mid-write
+        reopened = SegmentStore(store.root)
+        assert [r["index"] for r in reopened.read_all()] == [0, 1]
+        assert segment.stat().st_size == good_size
+
+    def test_corruption_before_tail_raises(self, store):
+        store.append_many([_record(0), _record(1)])
+        segment = store.segment_path(0)
+        raw = bytearray(segment.read_bytes())
+        raw[12] ^= 0xFF  # flip a byte inside the first record
+        segment.write_bytes(bytes(raw))
+        store.index_path.write_bytes(b"")
+        with pytest.raises(StorageError, match="Corrupt record"):
+            SegmentStore(store.root).height
+
+
+class TestSplitRecord:
+    BLOCK = {
+        "index": 1,
+        "timestamp": 1.5,
+        "data": {"msg": 'has ,"data": inside', "n": [1, 2]},
+        "previous_hash": "ab" * 32,
+        "nonce": 0,
+        "hash": "cd" * 32,
+    }
+
+    def test_data_is_written_last(self):
+        body = encode_record(self.BLOCK).rstrip(b"\n").partition(b" ")[2]
+        assert list(json.loads(body))[-1] == "data"
+
+    def test_split_leaves_data_raw(self):
+        header, raw = split_record(encode_record(self.BLOCK))
+        assert "data" not in header
+        assert header["hash"] == self.BLOCK["hash"]
+        assert json.loads(raw) == self.BLOCK["data"]
+
+    def test_data_in_middle_falls_back_to_full_decode(self):
+        body = json.dumps(self.BLOCK, separators=(",", ":")).encode()
+        record, raw = split_record(body + b"\n")
+        assert raw is None
+        assert record == self.BLOCK
+
+    def test_read_records_matches_read_all(self, store):
+        store.append(self.BLOCK)
+        ((header, raw),) = store.read_records()
+        assert header | {"data": json.loads(raw)} == next(store.read_all())
+        assert store.read_record(0) == (header, raw)
+
+
+class TestDurability:
+    def test_unknown_mode_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            SegmentStore(tmp_path / "s.varus", durability="sometimes")
+
+    @pytest.mark.parametrize("mode", DURABILITY_MODES)
+    def test_all_modes_round_trip(self, tmp_path, mode):
+        store = SegmentStore(tmp_path / "s.varus", durability=mode)
+        store.create()
+        store.append_many([_record(0), _record(1)])
+        store.sync()
+        assert SegmentStore(store.root).height == 2
+
+    def test_fsync_mode_syncs_once_per_batch(self, tmp_path, monkeypatch):
+        calls = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: calls.append(fd) or real_fsync(fd))
+        store = SegmentStore(tmp_path / "s.varus", durability="fsync")
+        store.create()
+        calls.clear()
+        store.append_many([_record(i) for i in range(10)])
+        assert len(calls) == 1
+
+    def test_group_mode_commits_after_group_blocks(self, tmp_path):
+        store = SegmentStore(
+            tmp_path / "s.varus", durability="group", group_blocks=3, group_ms=60_000
+        )
+        store.create()
+        store.append_many([_record(0), _record(1)])
+        assert store.unsynced == 2
+        store.append(_record(2))
+        assert store.unsynced == 0
+
+    def test_group_mode_commits_after_timeout(self, tmp_path):
+        store = SegmentStore(
+            tmp_path / "s.varus", durability="group", group_blocks=1000, group_ms=10
+        )
+        store.create()
+        store.append(_record(0))
+        deadline = time.time() + 2
+        while store.unsynced and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.unsynced == 0
+
+    def test_manifest_replace_leaves_no_temp_file(self, store):
+        store._roll(1)
+        assert not list(store.root.glob("*.tmp"))
+
+
+class TestTimeIndex:
+    def _timed(self, store, timestamps):
+        store.append_many(
+            [dict(_record(i), timestamp=ts) for i, ts in enumerate(timestamps)]
+        )
+
+    def test_window(self, store):
+        self._timed(store, [10.0, 20.0, 30.0, 40.0, 50.0])
+        assert list(store.time_range(20, 40)) == [1, 2, 3]
+        assert list(store.time_range(since=35)) == [3, 4]
+        assert list(store.time_range(until=15)) == [0]
+        assert list(store.time_range(20, 40, start=2)) == [2, 3]
+        assert store.timestamp_at(2) == 30.0
+
+    def test_out_of_order_timestamps(self, store):
+        self._timed(store, [10.0, 50.0, 20.0, 60.0, 25.0, 70.0])
+        assert list(store.time_range(15, 30)) == [2, 4]
+        assert list(store.time_range(since=55)) == [3, 5]
+        assert list(store.time_range(until=20)) == [0, 2]
+
+    def test_missing_index_rebuilt(self, tmp_path, store):
+        self._timed(store, [10.0, 30.0, 20.0])
+        store.time_index_path.unlink()
+        store.late_path.unlink()
+        reopened = SegmentStore(store.root)
+        assert list(reopened.time_range(15, 25)) == [2]
+
+    def test_entries_past_height_dropped(self, tmp_path, store):
+        self._timed(store, [10.0, 20.0])
+        with store.time_index_path.open("ab") as fh:  # entry for a record that was lost
+            fh.write(b"\0" * 16)
+        reopened = SegmentStore(store.root)
+        assert list(reopened.time_range(since=0)) == [0, 1]
+        reopened.append(dict(_record(2), timestamp=30.0))
+        assert list(reopened.time_range(since=25)) == [2]
+
+
+class TestTruncate:
+    def test_across_segments(self, tmp_path):
+        store = SegmentStore(tmp_path / "s.varus", segment_size=64)
+        store.create()
+        store.append_many([dict(_record(i), timestamp=float(i)) for i in range(8)])
+        assert len(store.segments()) > 2
+        kept = store.hash_at(2)
+        store.truncate(3)
+        assert store.height == 3
+        assert store.lookup_hash(_record(5)["hash"]) is None
+        assert all(store.segment_path(s["id"]).exists() for s in store.segments())
+        store.append(dict(_record(3, "other"), timestamp=1.5))
+
+        reopened = SegmentStore(store.root)
+        assert reopened.height == 4
+        assert reopened.hash_at(2) == kept
+        assert reopened.read_at(3)["payload"] == "other"
+        assert list(reopened.time_range(since=1.2)) == [2, 3]
+
+    def test_late_entries_dropped(self, store):
+        store.append_many([dict(_record(i), timestamp=ts) for i, ts in enumerate([10, 30, 20])])
+        store.truncate(2)
+        store.append(dict(_record(2), timestamp=40.0))
+        assert list(store.time_range(15, 25)) == []
+        assert list(store.time_range(since=35)) == [2]
+
+    def test_genesis_kept(self, store):
+        store.append_many([_record(0), _record(1)])
+        with pytest.raises(StorageError):
+            store.truncate(0)
+
+
+class TestArchive:
+    @pytest.fixture
+    def rolled(self, tmp_path):
+        store = SegmentStore(tmp_path / "s.varus", segment_size=200)
+        store.create()
+        store.append_many([dict(_record(i, "y" * 40), timestamp=float(i)) for i in range(12)])
+        return store
+
+    def test_archives_whole_segments_below_height(self, rolled):
+        before = list(rolled.read_all())
+        archived = rolled.archive(7)
+        assert archived and all(s["archived"] for s in archived)
+        assert rolled.archived_height <= 7
+        for segment in archived:
+            assert not rolled.segment_path(segment["id"]).exists()
+            assert rolled.archive_path(segment["id"]).exists()
+        assert not rolled.segments()[-1].get("archived")
+        assert rolled.archive(7) == []  # nothing new
+
+        reopened = SegmentStore(rolled.root)
+        assert list(reopened.read_all()) == before
+        assert reopened.read_at(1) == before[1]
+        assert list(reopened.time_range(2, 4)) == [2, 3, 4]
+        assert [h["index"] for h, _ in reopened.read_records(5)] == list(range(5, 12))
+
+    def test_missing_time_index_rebuilt_from_archive(self, rolled):
+        rolled.archive(12)
+        rolled.time_index_path.unlink()
+        assert list(SegmentStore(rolled.root).time_range(until=1.5)) == [0, 1]
+
+    def test_refuses_to_truncate_archive(self, rolled):
+        rolled.archive(12)
+        with pytest.raises(StorageError, match="archived"):
+            rolled.truncate(1)
+        rolled.truncate(rolled.archived_height)
+        assert rolled.height == rolled.archived_height
+
+    def test_snapshot_round_trip(self, store):
+        assert store.read_snapshot() is None
+        store.write_snapshot({"height": 3, "tip_hash": "ab"})
+        assert store.read_snapshot() == {"height": 3, "tip_hash": "ab"}
@@ -15,9 +15,10 @@ from unittest.mock import patch
 
 import pytest
 
-from varus.block import Block
-from varus.chain import GENESIS_HASH, VarusChain
-from varus.sync import ChainSync, _validate_remote_chain
+from varus.block import Block, PayloadUnavailable
+from varus.chain import VarusChain
+from varus.envelope import read_envelope
+from varus.sync import ChainSync, _parse_blocks
 from varus.chain import ChainError
 
 
@@ -66,8 +67,8 @@ def _make_chain(tmp_path: Path, blocks: int = 0) -> VarusChain:
     return chain
 
 
-def _make_sync(chain: VarusChain, stub: _FileTransportStub) -> ChainSync:
-    sync = ChainSync(chain, agent_name="test-node")
+def _make_sync(chain: VarusChain, stub: _FileTransportStub, **kwargs) -> ChainSync:
+    sync = ChainSync(chain, agent_name="test-node", **kwargs)
     sync._make_transport = lambda: stub  # type: ignore[method-assign]
     return sync
 
@@ -85,64 +86,64 @@ def _chain_snapshot(chain: VarusChain, sender: str = "remote") -> bytes:
 
 
 # ---------------------------------------------------------------------------
-# _validate_remote_chain
+# Validation of received blocks (_merge_blocks -> _extend_from -> _check_suffix)
 # ---------------------------------------------------------------------------
 
-class TestValidateRemoteChain:
+class TestMergeValidation:
+    def _received(self, tmp_path, blocks: int = 2):
+        local, remote, sync, *_ = _pair(tmp_path, 0, blocks)
+        return local, sync, [b.to_dict() for b in remote.all_blocks()]
+
+    def _merge(self, sync: ChainSync, raw: list[dict]) -> int:
+        return sync._merge_blocks(_parse_blocks(raw))
+
     def test_rejects_empty(self):
         with pytest.raises(ChainError, match="empty"):
-            _validate_remote_chain([])
+            _parse_blocks([])
 
-    def test_rejects_bad_genesis_prev_hash(self, tmp_path):
-        chain = _make_chain(tmp_path)
-        raw = [b.to_dict() for b in chain.all_blocks()]
+    def test_ignores_foreign_genesis(self, tmp_path):
+        local, sync, raw = self._received(tmp_path)
         raw[0]["previous_hash"] = "a" * 64
-        # Must recompute hash too to make it "self-consistent" but still wrong genesis
-        raw[0]["hash"] = "a" * 64  # corrupt hash so is_valid() fails
-        with pytest.raises(ChainError):
-            _validate_remote_chain(raw)
+        raw[0]["hash"] = "a" * 64
+        assert self._merge(sync, raw) == 0
+        assert local.height == 1
 
     def test_rejects_tampered_block_hash(self, tmp_path):
-        chain = _make_chain(tmp_path, blocks=2)
-        raw = [b.to_dict() for b in chain.all_blocks()]
-        raw[1]["hash"] = "f" * 64  # tamper
-        with pytest.raises(ChainError, match="hash mismatch"):
-            _validate_remote_chain(raw)
+        local, sync, raw = self._received(tmp_path)
+        raw[2]["hash"] = "f" * 64  # tamper
+        with pytest.raises(ChainError, match="Block 2 hash mismatch"):
+            self._merge(sync, raw)
+        assert local.height == 1
 
     def test_rejects_broken_link(self, tmp_path):
-        chain = _make_chain(tmp_path, blocks=2)
-        raw = [b.to_dict() for b in chain.all_blocks()]
-        # Set block 1's previous_hash to garbage (and recompute its hash so
-        # is_valid passes, but the link from 0→1 is broken)
-        b1 = Block.from_dict(raw[1])
+        local, sync, raw = self._received(tmp_path)
+        # Point block 1 at garbage and recompute its hash, so the block is
+        # self-consistent but the link from 0 to 1 is broken.
         raw[1]["previous_hash"] = "b" * 64
-        raw[1]["hash"] = Block(
-            index=raw[1]["index"],
-            timestamp=raw[1]["timestamp"],
-            data=raw[1]["data"],
-            previous_hash="b" * 64,
-        ).hash
-        with pytest.raises(ChainError, match="link broken"):
-            _validate_remote_chain(raw)
+        raw[1]["hash"] = Block.from_dict(raw[1]).compute_hash()
+        with pytest.raises(ChainError, match="link broken between block 0 and 1"):
+            self._merge(sync, raw)
 
     def test_rejects_wrong_index(self, tmp_path):
-        chain = _make_chain(tmp_path, blocks=1)
-        raw = [b.to_dict() for b in chain.all_blocks()]
+        local, sync, raw = self._received(tmp_path, blocks=1)
         raw[1]["index"] = 99
-        raw[1]["hash"] = Block(
-            index=99,
-            timestamp=raw[1]["timestamp"],
-            data=raw[1]["data"],
-            previous_hash=raw[1]["previous_hash"],
-        ).hash
+        raw[1]["hash"] = Block.from_dict(raw[1]).compute_hash()
         with pytest.raises(ChainError, match="wrong index"):
-            _validate_remote_chain(raw)
+            self._merge(sync, raw)
+
+    def test_rejects_bad_suffix_after_overlap(self, tmp_path):
+        local, remote, sync, *_ = _pair(tmp_path, 2, 2)
+        raw = [b.to_dict() for b in remote.all_blocks()]
+        raw[4]["hash"] = "f" * 64
+        with pytest.raises(ChainError, match="Block 4 hash mismatch"):
+            self._merge(sync, raw)
+        assert local.height == 3
 
-    def test_valid_chain_passes(self, tmp_path):
-        chain = _make_chain(tmp_path, blocks=3)
-        raw = [b.to_dict() for b in chain.all_blocks()]
-        blocks = _validate_remote_chain(raw)
-        assert len(blocks) == 4  # genesis + 3
+    def test_valid_chain_merges(self, tmp_path):
+        local, sync, raw = self._received(tmp_path, blocks=3)
+        assert self._merge(sync, raw) == 3
+        assert local.height == 4  # genesis + 3
+        assert local.is_valid()
 
 
 # ---------------------------------------------------------------------------
@@ -155,16 +156,17 @@ class TestExportChain:
         stub = _FileTransportStub()
         sync = _make_sync(chain, stub)
 
-        envelope_id = sync.export_chain(recipient="peer-a")
+        transfer_id = sync.export_chain(recipient="peer-a")
 
         assert len(stub.sent) == 1
         raw_bytes, recipient = stub.sent[0]
         assert recipient == "peer-a"
-        envelope = json.loads(raw_bytes)
+        envelope = read_envelope(raw_bytes)
         assert envelope["type"] == "varus_chain_snapshot"
         assert envelope["sender"] == "test-node"
-        assert envelope["envelope_id"] == envelope_id
-        assert len(envelope["chain"]) == 3  # genesis + 2
+        assert envelope["transfer_id"] == transfer_id
+        assert envelope["final"] is True
+        assert len(envelope["blocks"]) == 3  # genesis + 2
 
     def test_default_recipient(self, tmp_path):
         chain = _make_chain(tmp_path)
@@ -290,13 +292,14 @@ class TestImportChain:
 
         stub = _FileTransportStub()
         stub.inject(_chain_snapshot(fork_chain))
-        sync = _make_sync(local_chain, stub)
+        sync = _make_sync(local_chain, stub, fork_choice="earliest")  # our block 1 came first
 
         results = sync.import_chain()
 
         # Fork detected — nothing added (genesis matches but block 1 diverges)
         assert results[0]["ok"] is True
         assert results[0]["blocks_added"] == 0
+        assert results[0]["fork"]["reorg"] is False
 
     def test_empty_inbox_returns_empty_list(self, tmp_path):
         chain = _make_chain(tmp_path)
@@ -345,3 +348,527 @@ class TestImportChain:
         reloaded.load()
         assert reloaded.height == 3
         assert reloaded.is_valid()
+
+
+# ---------------------------------------------------------------------------
+# Delta protocol
+# ---------------------------------------------------------------------------
+
+def _deliver(stub_from: _FileTransportStub, stub_to: _FileTransportStub) -> None:
+    """Move everything one stub sent into the other stub's inbox."""
+    for payload, _ in stub_from.sent:
+        stub_to.inject(payload)
+    stub_from.sent.clear()
+
+
+def _pair(tmp_path: Path, local_blocks: int, remote_blocks: int):
+    local = _make_chain(tmp_path / "local", blocks=local_blocks)
+    remote = VarusChain(tmp_path / "remote" / "chain.json")
+    local.export_json(tmp_path / "shared.json")
+    remote.import_json(tmp_path / "shared.json")
+    for i in range(remote_blocks):
+        remote.add_block({"remote": i})
+    local_stub, remote_stub = _FileTransportStub(), _FileTransportStub()
+    local_sync = _make_sync(local, local_stub)
+    remote_sync = _make_sync(remote, remote_stub)
+    local_sync.agent_name, remote_sync.agent_name = "local", "remote"
+    return local, remote, local_sync, remote_sync, local_stub, remote_stub
+
+
+class TestDeltaSync:
+    def test_advert_carries_height_and_tip(self, tmp_path):
+        chain = _make_chain(tmp_path, blocks=2)
+        stub = _FileTransportStub()
+        _make_sync(chain, stub).advertise("peer")
+        envelope = json.loads(stub.sent[0][0])
+        assert envelope["type"] == "varus_chain_advert"
+        assert envelope["height"] == 3
+        assert envelope["tip_hash"] == chain.tip.hash
+
+    def test_advert_is_recorded(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 2, 0)
+        local_sync.advertise("remote")
+        _deliver(local_stub, remote_stub)
+        results = remote_sync.import_chain()
+        assert results[0]["advert"] is True
+        assert remote_sync.peers["local"] == {
+            "height": 3,
+            "tip_hash": local.tip.hash,
+            "headers_only": False,
+            "locator": [[i, local.get_block(i).hash] for i in (2, 1, 0)],
+        }
+
+    def test_export_sends_only_new_blocks(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 5, 3)
+        local_sync.advertise("remote")
+        _deliver(local_stub, remote_stub)
+        remote_sync.import_chain()
+
+        remote_sync.export_chain("local")
+        envelope = read_envelope(remote_stub.sent[0][0])
+        assert envelope["type"] == "varus_chain_delta"
+        assert envelope["anchor_index"] == 5
+        assert envelope["anchor_hash"] == local.tip.hash
+        assert len(envelope["blocks"]) == 3
+
+        _deliver(remote_stub, local_stub)
+        results = local_sync.import_chain()
+        assert results[0]["ok"] is True
+        assert results[0]["blocks_added"] == 3
+        assert local.tip.hash == remote.tip.hash
+        assert local.is_valid()
+
+    def test_unknown_peer_gets_full_snapshot(self, tmp_path):
+        _, _, _, remote_sync, _, remote_stub = _pair(tmp_path, 1, 1)
+        remote_sync.export_chain("stranger")
+        assert read_envelope(remote_stub.sent[0][0])["type"] == "varus_chain_snapshot"
+
+    def test_full_flag_forces_snapshot(self, tmp_path):
+        local, _, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 1)
+        remote_sync.peers["local"] = {"height": local.height, "tip_hash": local.tip.hash}
+        remote_sync.export_chain("local", full=True)
+        assert read_envelope(remote_stub.sent[0][0])["type"] == "varus_chain_snapshot"
+
+    def test_diverged_peer_gets_full_snapshot(self, tmp_path):
+        _, _, _, remote_sync, _, remote_stub = _pair(tmp_path, 1, 1)
+        remote_sync.peers["local"] = {"height": 2, "tip_hash": "e" * 64}
+        remote_sync.export_chain("local")
+        assert read_envelope(remote_stub.sent[0][0])["type"] == "varus_chain_snapshot"
+
+    def test_delta_with_unknown_anchor_rejected(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 2)
+        remote_sync.peers["local"] = {"height": 2, "tip_hash": remote.get_block(1).hash}
+        local.add_blocks([{"local-only": 1}, {"local-only": 2}])  # diverges, as long as remote
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        results = local_sync.import_chain()
+        assert results[0]["ok"] is True  # anchor (block 1) is shared, block 2 forks
+        assert results[0]["blocks_added"] == 0  # a tie keeps the local branch
+
+        remote_sync.peers["local"] = {"height": 3, "tip_hash": remote.get_block(2).hash}
+        remote.add_block({"more": 1})
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        results = local_sync.import_chain()
+        assert results[0]["ok"] is True  # kept in case the missing blocks arrive
+        assert results[0]["transfer"]["staged"] is True
+        assert results[0]["blocks_added"] == 0
+
+    def test_tampered_delta_rejected(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 2)
+        remote_sync.peers["local"] = {"height": local.height, "tip_hash": local.tip.hash}
+        remote_sync.export_chain("local")
+        envelope = read_envelope(remote_stub.sent[0][0])
+        envelope["blocks"][1]["data"]["remote"] = "evil"
+        local_stub.inject(json.dumps(envelope).encode())
+        results = local_sync.import_chain()
+        assert results[0]["ok"] is False
+        assert "hash mismatch" in results[0]["error"]
+        assert local.height == 2
+
+    def test_overlapping_delta_only_appends_new_blocks(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 3)
+        # Peer state is stale: remote thinks local only has genesis.
+        remote_sync.peers["local"] = {"height": 1, "tip_hash": local.genesis.hash}
+        local.extend(remote.all_blocks()[2:3], validated=True)
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        results = local_sync.import_chain()
+        assert results[0]["blocks_added"] == 2
+        assert local.tip.hash == remote.tip.hash
+
+    def test_snapshot_headers_update_peer_state(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 0, 2)
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        local_sync.import_chain()
+        assert local_sync.peers["remote"]["height"] == remote.height
+
+
+class TestForkSync:
+    def test_longer_branch_wins(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 2, 0)
+        local.add_blocks([{"local": 0}])
+        remote.add_blocks([{"remote": i} for i in range(3)])
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        (result,) = local_sync.import_chain()
+        assert result["ok"] is True
+        assert result["blocks_added"] == 3
+        assert result["fork"] == {
+            "fork_index": 2,
+            "local_blocks": 1,
+            "remote_blocks": 3,
+            "rule": "longest",
+            "reorg": True,
+        }
+        assert local.tip.hash == remote.tip.hash
+        assert local.is_valid()
+
+    def test_losing_branch_kept_as_side_chain(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 0)
+        local.add_blocks([{"local": i} for i in range(3)])
+        remote.add_blocks([{"remote": 0}])
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        (result,) = local_sync.import_chain()
+        assert result["blocks_added"] == 0
+        assert result["fork"]["reorg"] is False
+        assert local.side_chains()[0]["tip_hash"] == remote.tip.hash
+        assert local.reorg_history() == []
+
+    def test_only_the_branch_is_rehashed(self, tmp_path, monkeypatch):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 20, 0)
+        local.add_blocks([{"local": 0}])
+        remote.add_blocks([{"remote": i} for i in range(2)])
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        hashed = []
+        original = Block.compute_hash
+        monkeypatch.setattr(Block, "compute_hash", lambda b: hashed.append(b.index) or original(b))
+        local_sync.import_chain()
+        assert sorted(set(hashed)) == [21, 22]
+
+    def test_diverged_peer_gets_delta_from_locator(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 30, 0)
+        local.add_blocks([{"local": 0}])
+        remote.add_blocks([{"remote": i} for i in range(2)])
+        local_sync.advertise("remote")
+        _deliver(local_stub, remote_stub)
+        remote_sync.import_chain()
+
+        remote_sync.export_chain("local")
+        envelope = read_envelope(remote_stub.sent[0][0])
+        assert envelope["type"] == "varus_chain_delta"
+        assert envelope["anchor_index"] == 30
+        assert len(envelope["blocks"]) == 2
+
+        _deliver(remote_stub, local_stub)
+        (result,) = local_sync.import_chain()
+        assert result["blocks_added"] == 2
+        assert local.tip.hash == remote.tip.hash
+
+    def test_custom_rule(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 0)
+        local.add_blocks([{"local": i} for i in range(3)])
+        remote.add_blocks([{"remote": 0}])
+        local_sync = ChainSync(local, fork_choice=lambda ours, theirs: True)
+        local_sync._make_transport = lambda: local_stub
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        (result,) = local_sync.import_chain()
+        assert result["fork"]["rule"] == "<lambda>"
+        assert local.tip.hash == remote.tip.hash
+        assert local.height == 3
+
+
+class TestChunkedTransfer:
+    def _chunked(self, tmp_path, local_blocks=1, remote_blocks=40, **kwargs):
+        pair = _pair(tmp_path, local_blocks, remote_blocks)
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = pair
+        remote_sync.chunk_bytes = 600
+        for name, value in kwargs.items():
+            setattr(remote_sync, name, value)
+        remote_sync.peers["local"] = {"height": local.height, "tip_hash": local.tip.hash}
+        remote_sync.export_chain("local")
+        return pair
+
+    def test_many_chunks_applied_in_order(self, tmp_path):
+        local, remote, local_sync, _, local_stub, remote_stub = self._chunked(tmp_path)
+        assert len(remote_stub.sent) > 4
+        _deliver(remote_stub, local_stub)
+        results = local_sync.import_chain()
+        assert all(r["ok"] and not r["transfer"]["staged"] for r in results)
+        assert sum(r["blocks_added"] for r in results) == 40
+        assert local.tip.hash == remote.tip.hash
+        assert local.is_valid()
+
+    @pytest.mark.parametrize("compression", ["lzma", "none"])
+    def test_other_compressions(self, tmp_path, compression):
+        local, remote, local_sync, _, local_stub, remote_stub = self._chunked(
+            tmp_path, compression=compression
+        )
+        _deliver(remote_stub, local_stub)
+        local_sync.import_chain()
+        assert local.tip.hash == remote.tip.hash
+
+    def test_out_of_order_chunks_staged_until_gap_filled(self, tmp_path):
+        local, remote, local_sync, _, local_stub, remote_stub = self._chunked(tmp_path)
+        chunks = [payload for payload, _ in remote_stub.sent]
+        for payload in reversed(chunks):
+            local_stub.inject(payload)
+        results = local_sync.import_chain()
+        assert all(r["transfer"]["staged"] for r in results[:-1])
+        assert results[-1]["blocks_added"] == 40
+        assert local.tip.hash == remote.tip.hash
+        assert not any((local.store.root / "incoming").iterdir())
+
+    def test_interrupted_transfer_resumes_after_restart(self, tmp_path):
+        local, remote, local_sync, _, local_stub, remote_stub = self._chunked(tmp_path)
+        chunks = [payload for payload, _ in remote_stub.sent]
+        for payload in [chunks[0], *chunks[2:]]:  # chunk 1 lost in transit
+            local_stub.inject(payload)
+        local_sync.import_chain()
+        assert local.height < remote.height
+
+        restarted = VarusChain(local.chain_path)
+        restarted.load()
+        resumed = _make_sync(restarted, local_stub)
+        local_stub.inject(chunks[1])
+        (result,) = resumed.import_chain()
+        assert restarted.tip.hash == remote.tip.hash
+        assert result["blocks_added"] == remote.height - local.height
+
+    def test_blocks_are_appended_as_they_decode(self, tmp_path, monkeypatch):
+        local, remote, local_sync, _, local_stub, remote_stub = self._chunked(
+            tmp_path, chunk_bytes=1 << 20
+        )
+        assert len(remote_stub.sent) == 1
+        monkeypatch.setattr("varus.sync._STREAM_BATCH", 8)
+        extended = []
+        original = local.extend
+        monkeypatch.setattr(
+            local, "extend", lambda b, **kw: extended.append(len(b)) or original(b, **kw)
+        )
+        _deliver(remote_stub, local_stub)
+        local_sync.import_chain()
+        assert extended == [8, 8, 8, 8, 8]
+
+    def test_fork_settled_once_whole_branch_arrived(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 0)
+        local.add_blocks([{"local": i} for i in range(3)])
+        remote.add_blocks([{"remote": i} for i in range(30)])
+        remote_sync.chunk_bytes = 600
+        remote_sync.export_chain("local", full=True)
+        chunks = [payload for payload, _ in remote_stub.sent]
+        for payload in chunks[:-1]:
+            local_stub.inject(payload)
+        results = local_sync.import_chain()
+        assert all(r["blocks_added"] == 0 for r in results)
+        assert local.reorg_history() == []
+
+        local_stub.inject(chunks[-1])
+        (result,) = local_sync.import_chain()
+        assert result["fork"]["reorg"] is True
+        assert local.tip.hash == remote.tip.hash
+
+    def test_corrupt_chunk_rejected(self, tmp_path):
+        local, _, local_sync, _, local_stub, remote_stub = self._chunked(tmp_path)
+        payload = remote_stub.sent[0][0]
+        local_stub.inject(payload[:-40])
+        (result,) = local_sync.import_chain()
+        assert result["ok"] is False
+        assert local.height == 2
+
+
+class TestSuffixOnlyImport:
+    def test_only_suffix_is_rehashed(self, tmp_path, monkeypatch):
+        local, remote, local_sync, _, local_stub, _ = _pair(tmp_path, 5, 2)
+        local_stub.inject(_chain_snapshot(remote))
+        hashed = []
+        original = Block.compute_hash
+        monkeypatch.setattr(Block, "compute_hash", lambda b: hashed.append(b.index) or original(b))
+        results = local_sync.import_chain()
+        assert results[0]["blocks_added"] == 2
+        assert sorted(hashed) == [6, 7]
+
+    def test_tampered_prefix_is_irrelevant_when_tip_matches(self, tmp_path):
+        local, remote, local_sync, _, local_stub, _ = _pair(tmp_path, 2, 1)
+        raw = json.loads(_chain_snapshot(remote))
+        raw["chain"][1]["data"]["n"] = "rewritten"  # prefix we never store
+        local_stub.inject(json.dumps(raw).encode())
+        results = local_sync.import_chain()
+        assert results[0]["blocks_added"] == 1
+        assert local.is_valid()
+        assert local.get_block(1).data == {"n": 0}
+
+    def test_tampered_suffix_rejected(self, tmp_path):
+        local, remote, local_sync, _, local_stub, _ = _pair(tmp_path, 2, 2)
+        raw = json.loads(_chain_snapshot(remote))
+        raw["chain"][-1]["data"]["remote"] = "evil"
+        local_stub.inject(json.dumps(raw).encode())
+        results = local_sync.import_chain()
+        assert results[0]["ok"] is False
+        assert local.height == 3
+
+    def test_identical_snapshots_from_several_peers_deduplicated(self, tmp_path, monkeypatch):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 3)
+        for _ in range(3):
+            remote_sync.export_chain("local", full=True)
+        _deliver(remote_stub, local_stub)
+
+        parsed = []
+        real_loads = json.loads
+        monkeypatch.setattr(
+            "varus.sync.json.loads", lambda b, **kw: parsed.append(1) or real_loads(b, **kw)
+        )
+        results = local_sync.import_chain()
+        assert [r["blocks_added"] for r in results] == [3, 0, 0]
+        assert results[1]["duplicate"] is True
+        assert results[2]["duplicate"] is True
+        assert len(parsed) == 1 + remote.height  # only the first chunk's header and blocks
+        assert local_sync.peers["remote"]["height"] == remote.height
+
+    def test_advert_with_known_tip_still_processed(self, tmp_path):
+        local, _, local_sync, remote_sync, local_stub, remote_stub = _pair(tmp_path, 1, 0)
+        remote_sync.advertise("local")
+        _deliver(remote_stub, local_stub)
+        results = local_sync.import_chain()
+        assert results[0].get("advert") is True
+
+
+class TestBlobSync:
+    BIG = {"rows": ["y" * 100] * 50}
+
+    def _pair(self, tmp_path):
+        local = VarusChain(tmp_path / "a" / "chain.json", blob_threshold=1024)
+        remote = VarusChain(tmp_path / "b" / "chain.json", blob_threshold=1024)
+        local.load()
+        remote.load()
+        local_stub, remote_stub = _FileTransportStub(), _FileTransportStub()
+        local_sync, remote_sync = _make_sync(local, local_stub), _make_sync(remote, remote_stub)
+        local_sync.agent_name, remote_sync.agent_name = "local", "remote"
+        return local, remote, local_sync, remote_sync, local_stub, remote_stub
+
+    def test_blobs_sent_only_when_missing(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = self._pair(tmp_path)
+        remote.add_blocks([{"doc": self.BIG, "n": 1}, {"doc": self.BIG, "n": 2}, {"n": 3}])
+        digest = remote.get_block(1).data["doc"]["$blob"]
+
+        remote_sync.export_chain("local")
+        sent = read_envelope(remote_stub.sent[0][0])["blocks"]
+        assert sent[1]["data"]["doc"] == {"$blob": digest, "size": 5160}  # reference only
+        _deliver(remote_stub, local_stub)
+        result = local_sync.import_chain()[0]
+        assert result["blocks_added"] == 3 and result["blobs_requested"] == 1
+        assert local.missing_blobs() == [digest]
+        assert json.loads(local_stub.sent[-1][0])["digests"] == [digest]
+
+        _deliver(local_stub, remote_stub)
+        assert remote_sync.import_chain()[0]["blobs_sent"] == 1
+        _deliver(remote_stub, local_stub)
+        assert local_sync.import_chain()[0]["blobs_stored"] == 1
+        assert local.missing_blobs() == []
+        assert local.resolve(local.get_block(2).data)["doc"] == self.BIG
+
+        remote.add_block({"doc": self.BIG, "n": 4})  # a blob the peer already has
+        local_sync.advertise("remote")
+        _deliver(local_stub, remote_stub)
+        remote_sync.import_chain()
+        remote_sync.export_chain("local")
+        _deliver(remote_stub, local_stub)
+        result = local_sync.import_chain()[0]
+        assert result["blocks_added"] == 1 and "blobs_requested" not in result
+
+    def test_forged_blob_rejected(self, tmp_path):
+        local, remote, local_sync, remote_sync, local_stub, remote_stub = self._pair(tmp_path)
+        envelope = {
+            "envelope_id": "varus-forged",
+            "type": "varus_blobs",
+            "sender": "mallory",
+            "blobs": {"a" * 64: "{}"},
+        }
+        local_stub.inject(json.dumps(envelope).encode())
+        result = local_sync.import_chain()[0]
+        assert result["ok"] is False and result["blobs_stored"] == 0
+        assert not local.blobs.has("a" * 64)
+
+
+class TestHeadersOnlySync:
+    def _light_pair(self, tmp_path, full_blocks: int = 6):
+        full = _make_chain(tmp_path / "full", blocks=full_blocks)
+        light = VarusChain(tmp_path / "light" / "chain.json", headers_only=True)
+        light.load()
+        full_stub, light_stub = _FileTransportStub(), _FileTransportStub()
+        full_sync, light_sync = _make_sync(full, full_stub), _make_sync(light, light_stub)
+        full_sync.agent_name, light_sync.agent_name = "full", "light"
+        return full, light, full_sync, light_sync, full_stub, light_stub
+
+    def _sync_headers(self, full_sync, light_sync, full_stub, light_stub):
+        light_sync.advertise("full")
+        _deliver(light_stub, full_stub)
+        full_sync.import_chain()
+        full_sync.export_chain("light")
+        _deliver(full_stub, light_stub)
+        return light_sync.import_chain()
+
+    def test_light_peer_receives_headers_only(self, tmp_path):
+        full, light, full_sync, light_sync, full_stub, light_stub = self._light_pair(tmp_path)
+        light_sync.advertise("full")
+        _deliver(light_stub, full_stub)
+        full_sync.import_chain()
+        assert full_sync.peers["light"]["headers_only"] is True
+
+        full_sync.export_chain("light")
+        envelope = read_envelope(full_stub.sent[0][0])
+        assert all("data" not in b for b in envelope["blocks"])
+
+        _deliver(full_stub, light_stub)
+        results = light_sync.import_chain()
+        assert results[0]["blocks_added"] == 6
+        assert light.tip.hash == full.tip.hash
+        assert light.is_valid()
+
+    def test_light_chain_is_smaller_on_disk(self, tmp_path):
+        full, light, full_sync, light_sync, full_stub, light_stub = self._light_pair(tmp_path, 0)
+        full.add_blocks([{"blob": "x" * 2000, "n": i} for i in range(20)])
+        self._sync_headers(full_sync, light_sync, full_stub, light_stub)
+        assert light.height == full.height
+
+        def size(chain):
+            return sum(p.stat().st_size for p in chain.store.root.glob("segment-*"))
+
+        assert size(light) * 5 < size(full)
+
+    def test_light_chain_survives_reload(self, tmp_path):
+        full, light, full_sync, light_sync, full_stub, light_stub = self._light_pair(tmp_path)
+        self._sync_headers(full_sync, light_sync, full_stub, light_stub)
+        reloaded = VarusChain(tmp_path / "light" / "chain.json")
+        reloaded.load()
+        assert reloaded.headers_only
+        assert reloaded.is_valid()
+        assert not reloaded.get_block(3).has_payload
+
+    def test_payloads_fetched_on_demand(self, tmp_path):
+        full, light, full_sync, light_sync, full_stub, light_stub = self._light_pair(tmp_path)
+        self._sync_headers(full_sync, light_sync, full_stub, light_stub)
+        with pytest.raises(PayloadUnavailable):
+            light.get_block(3).data
+
+        light_sync.request_payloads("full", [3, 4])
+        _deliver(light_stub, full_stub)
+        assert full_sync.import_chain()[0]["payloads_sent"] == 2
+        _deliver(full_stub, light_stub)
+        results = light_sync.import_chain()
+        assert results[0]["payloads_attached"] == 2
+        assert light.get_block(3).data == {"n": 2}
+        assert light.is_valid()
+
+    def test_forged_payload_rejected(self, tmp_path):
+        full, light, full_sync, light_sync, full_stub, light_stub = self._light_pair(tmp_path)
+        self._sync_headers(full_sync, light_sync, full_stub, light_stub)
+        forged = full.get_block(2).to_dict()
+        forged["data"] = {"n": "forged"}
+        envelope = {
+            "envelope_id": "varus-forged",
+            "type": "varus_payloads",
+            "sender": "mallory",
+            "blocks": [forged],
+        }
+        light_stub.inject(json.dumps(envelope).encode())
+        result = light_sync.import_chain()[0]
+        assert result["ok"] is False
+        assert result["payloads_attached"] == 0
+        assert not light.get_block(2).has_payload
+
+    def test_full_chain_rejects_headers(self, tmp_path):
+        full, light, full_sync, light_sync, full_stub, light_stub = self._light_pair(tmp_path)
+        self._sync_headers(full_sync, light_sync, full_stub, light_stub)
+        fresh = _make_chain(tmp_path / "fresh")
+        fresh_stub = _FileTransportStub()
+        fresh_sync = _make_sync(fresh, fresh_stub)
+        light_sync.export_chain("fresh", full=True)
+        _deliver(light_stub, fresh_stub)
+        result = fresh_sync.import_chain()[0]
+        assert result["ok"] is False
+        assert fresh.height == 1
@@ -0,0 +1,96 @@
+"""Tests for varus.validation."""
+
+import pytest
+
+from varus import validation
+from varus.block import Block
+from varus.chain import GENESIS_HASH, VarusChain
+from varus.validation import (
+    HASH_MISMATCH,
+    LINK_BROKEN,
+    WRONG_INDEX,
+    compute_hashes,
+    find_first_failure,
+    parallel_hashes,
+)
+
+
+def _blocks(n: int) -> list[Block]:
+    blocks = [Block(index=0, timestamp=0.0, data={"g": True}, previous_hash=GENESIS_HASH)]
+    for i in range(1, n):
+        blocks.append(
+            Block(index=i, timestamp=float(i), data={"n": i}, previous_hash=blocks[-1].hash)
+        )
+    return blocks
+
+
+class TestHashing:
+    def test_parallel_matches_sequential(self):
+        blocks = _blocks(50)
+        assert parallel_hashes(blocks, workers=2) == [b.hash for b in blocks]
+
+    def test_small_ranges_stay_inline(self, monkeypatch):
+        monkeypatch.setattr(
+            validation, "parallel_hashes", lambda *a: pytest.fail("pool used for tiny range")
+        )
+        blocks = _blocks(5)
+        assert compute_hashes(blocks, workers=8) == [b.hash for b in blocks]
+
+
+class TestFindFirstFailure:
+    def test_valid_range(self):
+        assert find_first_failure(_blocks(10)) is None
+
+    def test_hash_mismatch(self):
+        blocks = _blocks(5)
+        blocks[3].data["n"] = "evil"
+        assert find_first_failure(blocks) == (HASH_MISMATCH, 3)
+
+    def test_broken_link(self):
+        blocks = _blocks(5)
+        blocks[2].previous_hash = "0" * 64
+        blocks[2].hash = blocks[2].compute_hash()
+        assert find_first_failure(blocks) == (LINK_BROKEN, 2)
+
+    def test_wrong_index(self):
+        blocks = _blocks(5)
+        blocks[4].index = 9
+        blocks[4].hash = blocks[4].compute_hash()
+        assert find_first_failure(blocks) == (WRONG_INDEX, 4)
+
+    def test_lowest_position_wins(self):
+        blocks = _blocks(6)
+        blocks[4].data["n"] = "evil"
+        blocks[2].index = 7
+        blocks[2].hash = blocks[2].compute_hash()
+        # block 2's rehash also breaks block 3's link, but index 2 comes first
+        assert find_first_failure(blocks) == (WRONG_INDEX, 2)
+
+    def test_hash_reported_before_link_at_same_position(self):
+        blocks = _blocks(4)
+        blocks[2].previous_hash = "0" * 64
+        assert find_first_failure(blocks) == (HASH_MISMATCH, 2)
+
+    def test_anchor_link_checked(self):
+        blocks = _blocks(4)
+        assert find_first_failure(blocks[2:], start_index=2, previous_hash="f" * 64) == (
+            LINK_BROKEN,
+            0,
+        )
+
+    def test_parallel_workers_find_same_failure(self, monkeypatch):
+        monkeypatch.setattr(validation, "PARALLEL_MIN_BLOCKS", 1)
+        blocks = _blocks(40)
+        blocks[33].data["n"] = "evil"
+        assert find_first_failure(blocks, workers=2) == (HASH_MISMATCH, 33)
+
+
+class TestChainIntegration:
+    def test_chain_validate_with_workers(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(validation, "PARALLEL_MIN_BLOCKS", 1)
+        chain = VarusChain(tmp_path / "chain.json", durability="buffered")
+        chain.load()
+        chain.add_blocks([{"n": i} for i in range(20)])
+        assert chain.is_valid(workers=2)
+        chain._blocks[7].data["n"] = "evil"
+        assert not chain.is_valid(workers=2)
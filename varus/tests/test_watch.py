@@ -0,0 +1,117 @@
+"""Tests for varus.watch."""
+
+import threading
+import time
+
+import pytest
+
+from varus.watch import InboxWatcher, InotifyWatcher, PollingWatcher, make_watcher
+
+
+def _inotify_or_skip(path):
+    try:
+        return InotifyWatcher(path)
+    except (OSError, AttributeError) as exc:
+        pytest.skip(f"inotify unavailable: {exc}")
+
+
+def _write_later(path, delay=0.05):
+    timer = threading.Timer(delay, path.write_text, args=('{"k": 1}',))
+    timer.start()
+    return timer
+
+
+class TestPollingWatcher:
+    def test_times_out_without_changes(self, tmp_path):
+        watcher = PollingWatcher(tmp_path, poll_interval=0.01)
+        assert watcher.wait(0.05) is False
+
+    def test_detects_new_file(self, tmp_path):
+        watcher = PollingWatcher(tmp_path, poll_interval=0.01)
+        _write_later(tmp_path / "a.json")
+        assert watcher.wait(2) is True
+
+    def test_wake_returns_early(self, tmp_path):
+        watcher = PollingWatcher(tmp_path, poll_interval=10)
+        watcher.wake()
+        start = time.monotonic()
+        assert watcher.wait(5) is True
+        assert time.monotonic() - start < 1
+
+    def test_added_directory_is_watched(self, tmp_path):
+        first, second = tmp_path / "a", tmp_path / "b"
+        first.mkdir()
+        second.mkdir()
+        watcher = PollingWatcher(first, poll_interval=0.01)
+        watcher.add(second)
+        _write_later(second / "x.json")
+        assert watcher.wait(2) is True
+
+
+class TestInotifyWatcher:
+    def test_detects_new_file_immediately(self, tmp_path):
+        watcher = _inotify_or_skip(tmp_path)
+        try:
+            _write_later(tmp_path / "a.json")
+            start = time.monotonic()
+            assert watcher.wait(5) is True
+            assert time.monotonic() - start < 1
+        finally:
+            watcher.close()
+
+    def test_detects_rename_into_directory(self, tmp_path):
+        inbox = tmp_path / "inbox"
+        inbox.mkdir()
+        watcher = _inotify_or_skip(inbox)
+        try:
+            (tmp_path / "staged.json").write_text("{}")
+            (tmp_path / "staged.json").rename(inbox / "a.json")
+            assert watcher.wait(2) is True
+        finally:
+            watcher.close()
+
+    def test_added_directory_is_watched(self, tmp_path):
+        first, second = tmp_path / "a", tmp_path / "b"
+        first.mkdir()
+        second.mkdir()
+        watcher = _inotify_or_skip(first)
+        try:
+            watcher.add(second)
+            _write_later(second / "x.json")
+            assert watcher.wait(2) is True
+        finally:
+            watcher.close()
+
+    def test_wake(self, tmp_path):
+        watcher = _inotify_or_skip(tmp_path)
+        try:
+            watcher.wake()
+            assert watcher.wait(5) is True
+            assert watcher.wait(0.01) is False  # wake was drained
+        finally:
+            watcher.close()
+
+
+class TestMakeWatcher:
+    def test_poll_mode(self, tmp_path):
+        assert isinstance(make_watcher(tmp_path, "poll"), PollingWatcher)
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            make_watcher(tmp_path, "telepathy")
+
+    def test_auto_returns_a_watcher(self, tmp_path):
+        watcher = make_watcher(tmp_path, "auto")
+        watcher.close()
+
+
+def test_incomplete_watcher_cannot_be_instantiated():
+    class NoAdd(InboxWatcher):
+        def wait(self, timeout):
+            return False
+
+        def wake(self):
+            pass
+
+    with pytest.raises(TypeError, match="add"):
+        NoAdd()
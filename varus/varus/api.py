@@ -0,0 +1,425 @@
+"""Local query API for a running Varus node over a Unix socket.
+
+Requests and responses are newline-delimited JSON objects, one per line, so
+a connection can carry several round trips::
+
+    -> {"op": "tip", "chain": "/var/lib/varus/audit.json"}
+    <- {"ok": true, "result": {"index": 42, "hash": "...", ...}}
+
+Operations:
+
+- ``status``                 — node status dict.
+- ``tip``                    — latest block.
+- ``get``    (index | hash)  — one block.
+- ``range``  (start, limit[, since, until]) — up to ``limit`` blocks from
+  ``start``, optionally only those with ``since <= timestamp <= until``.
+- ``submit`` (data[, hash_version]) — append a block; returns the new block.
+- ``prove``  (index | hash, key)  — Merkle inclusion proof for one data item.
+- ``query``  (equals, prefix, since, until, start, limit) — blocks matching
+  secondary-index filters (see :meth:`VarusChain.query`), at most ``MAX_RANGE``.
+- ``create_index`` (name, path) / ``drop_index`` (name) — manage secondary
+  indexes; both return the remaining ``{name: path}`` indexes.
+- ``compact`` ([height, keep]) — snapshot the chain and archive old segments
+  (see :meth:`VarusChain.compact`); returns the snapshot.
+- ``chains``                 — published chain summary of every hosted chain,
+  by name.
+- ``subscribe`` ([from, headers_only, buffer]) — turn the connection into a
+  stream: after the acknowledgement, the node writes one event line per
+  block appended from height ``from`` on (default: the next block), full or
+  headers only, and a ``heartbeat`` line after ``HEARTBEAT_S`` idle seconds
+  (see :mod:`varus.feed`).  A subscriber that reads slower than blocks are
+  appended is caught up from the chain store, so it applies backpressure to
+  itself rather than to the node.
+
+Every request may name the ``chain`` path and/or the ``chain_name`` it
+expects; a node serving a different chain answers with
+``code: "wrong_chain"`` so the CLI can fall back to reading the chain
+itself.  A :class:`~varus.host.ChainHost` serves all its chains on one
+socket and routes each request by these fields; with several chains hosted,
+one of them must be given.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterator
+
+from .chain import DEFAULT_KEEP_BLOCKS, ChainError
+from .feed import DEFAULT_BUFFER_BLOCKS, MAX_BUFFER_BLOCKS, FeedError, Subscription
+
+if TYPE_CHECKING:
+    from .host import ChainHost
+    from .node import VarusNode
+
+logger = logging.getLogger("varus.api")
+
+MAX_RANGE = 1000  # blocks returned by one ``range`` request
+HEARTBEAT_S = 5.0  # idle seconds before a subscription stream sends a heartbeat
+
+
+class NodeUnavailable(ConnectionError):
+    """Raised when no node is listening on the socket (or it serves another chain)."""
+
+
+class NodeAPIError(Exception):
+    """Raised when the node rejects a request."""
+
+    def __init__(self, message: str, code: str = "error") -> None:
+        super().__init__(message)
+        self.code = code
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            api = self.server.api  # type: ignore[attr-defined]
+            response = api.dispatch(line)
+            stream = response.pop("stream", None)
+            self.wfile.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+            self.wfile.flush()
+            if stream is not None:
+                api.stream(*stream, self.wfile)
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 64  # listen backlog; the default of 5 refuses bursts of readers
+
+
+class NodeAPIServer:
+    """Serve the query API for *node* on *socket_path* from a background thread.
+
+    *node* is a :class:`~varus.node.VarusNode` or a
+    :class:`~varus.host.ChainHost`; requests go to the chain its ``select``
+    picks.
+    """
+
+    def __init__(self, node: "VarusNode | ChainHost", socket_path: str | Path) -> None:
+        self.node = node
+        self.socket_path = Path(socket_path)
+        self._server: _UnixServer | None = None
+        self._thread: threading.Thread | None = None
+        self._streams: set[Subscription] = set()
+        self._streams_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Bind the socket and start serving.
+
+        Raises
+        ------
+        RuntimeError
+            If another node is already listening on the socket.
+        """
+        if self.socket_path.exists():
+            if _is_listening(self.socket_path):
+                raise RuntimeError(f"A Varus node is already listening on {self.socket_path}")
+            self.socket_path.unlink()  # stale socket from a crashed node
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = _UnixServer(str(self.socket_path), _Handler)
+        self._server.api = self  # type: ignore[attr-defined]
+        os.chmod(self.socket_path, 0o600)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="varus-api", daemon=True
+        )
+        self._thread.start()
+        logger.info("Query API listening on %s", self.socket_path)
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        with self._streams_lock:
+            for subscription in self._streams:
+                subscription.close()
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self.socket_path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def dispatch(self, line: bytes) -> dict:
+        """Decode one request line and return the response dict."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as exc:
+            return {"ok": False, "code": "bad_request", "error": str(exc)}
+
+        op = request.get("op")
+        if op == "chains":
+            return {"ok": True, "result": self.node.chains()}
+        chain, name = request.get("chain"), request.get("chain_name")
+        node = self.node.select(chain, name)
+        if node is None:
+            wanted = name if name is not None else chain
+            return {
+                "ok": False,
+                "code": "wrong_chain",
+                "error": f"node does not serve {wanted}" if wanted is not None
+                else "node hosts several chains; name one with 'chain_name'",
+            }
+
+        handler = getattr(self, f"_op_{op}", None)
+        if handler is None:
+            return {"ok": False, "code": "bad_request", "error": f"unknown op {op!r}"}
+        try:
+            result = handler(node, request)
+            if isinstance(result, Subscription):
+                return {"ok": True, "result": result.stats(), "stream": (node, result)}
+            return {"ok": True, "result": result}
+        except FeedError as exc:
+            return {"ok": False, "code": "busy", "error": str(exc)}
+        except (IndexError, KeyError) as exc:
+            return {"ok": False, "code": "not_found", "error": str(exc).strip("'\"")}
+        except (ChainError, ValueError) as exc:
+            return {"ok": False, "code": "bad_request", "error": str(exc)}
+        except Exception as exc:  # surfaced to the client, node keeps serving
+            logger.exception("API request failed: %s", op)
+            return {"ok": False, "code": "error", "error": str(exc)}
+
+    def _op_status(self, node: "VarusNode", request: dict) -> dict:
+        return node.status()
+
+    def _op_tip(self, node: "VarusNode", request: dict) -> dict:
+        with node._lock.read():
+            return node.chain.tip.to_dict()
+
+    def _op_get(self, node: "VarusNode", request: dict) -> dict:
+        with node._lock.read():
+            if "hash" in request:
+                block = node.chain.get_by_hash(request["hash"])
+                if block is None:
+                    raise KeyError(f"No block with hash {request['hash']}")
+                return block.to_dict()
+            return node.chain.get_block(int(request["index"])).to_dict()
+
+    def _op_range(self, node: "VarusNode", request: dict) -> list[dict]:
+        start = max(0, int(request.get("start", 0)))
+        limit = min(MAX_RANGE, max(0, int(request.get("limit", MAX_RANGE))))
+        with node._lock.read():
+            blocks = node.chain.iter_blocks(
+                request.get("since"), request.get("until"), start, limit
+            )
+            return [b.to_dict() for b in blocks]
+
+    def _op_submit(self, node: "VarusNode", request: dict) -> dict:
+        data = request.get("data")
+        if not isinstance(data, dict):
+            raise ValueError("submit requires a JSON object in 'data'")
+        return node.submit_block(data, request.get("hash_version")).to_dict()
+
+    def _op_prove(self, node: "VarusNode", request: dict) -> dict:
+        block = request["hash"] if "hash" in request else int(request["index"])
+        with node._lock.read():
+            return node.chain.prove(block, request["key"])
+
+    def _op_query(self, node: "VarusNode", request: dict) -> list[dict]:
+        limit = min(MAX_RANGE, max(0, int(request.get("limit", MAX_RANGE))))
+        with node._lock.read():
+            blocks = node.chain.query(
+                equals=request.get("equals"),
+                prefix=request.get("prefix"),
+                since=request.get("since"),
+                until=request.get("until"),
+                limit=limit,
+                start=max(0, int(request.get("start", 0))),
+            )
+            return [b.to_dict() for b in blocks]
+
+    def _op_create_index(self, node: "VarusNode", request: dict) -> dict:
+        with node._writing():
+            node.chain.create_index(request["name"], request["path"])
+            return node.chain.indexes
+
+    def _op_drop_index(self, node: "VarusNode", request: dict) -> dict:
+        with node._writing():
+            node.chain.drop_index(request["name"])
+            return node.chain.indexes
+
+    def _op_compact(self, node: "VarusNode", request: dict) -> dict:
+        height = request.get("height")
+        keep = int(request.get("keep", DEFAULT_KEEP_BLOCKS))
+        with node._writing():
+            return node.chain.compact(None if height is None else int(height), keep)
+
+    def _op_subscribe(self, node: "VarusNode", request: dict) -> Subscription:
+        start = request.get("from")
+        buffer = int(request.get("buffer", DEFAULT_BUFFER_BLOCKS))
+        return node.feed.subscribe(
+            None if start is None else max(0, int(start)),
+            headers_only=bool(request.get("headers_only", False)),
+            buffer=min(MAX_BUFFER_BLOCKS, max(1, buffer)),
+        )
+
+    def stream(self, node: "VarusNode", subscription: Subscription, wfile: BinaryIO) -> None:
+        """Write *subscription*'s events to *wfile* until it closes or the client leaves."""
+        with self._streams_lock:
+            self._streams.add(subscription)
+        last_write = time.monotonic()
+        try:
+            while not subscription.closed:
+                events = subscription.events(HEARTBEAT_S)
+                idle = time.monotonic() - last_write >= HEARTBEAT_S
+                if not events and idle and not subscription.closed:
+                    events = [{"event": "heartbeat", "height": node.chain.height}]
+                if not events:
+                    continue
+                for event in events:
+                    wfile.write(json.dumps(event, separators=(",", ":")).encode() + b"\n")
+                wfile.flush()
+                last_write = time.monotonic()
+        except OSError:
+            pass  # subscriber went away
+        finally:
+            node.feed.unsubscribe(subscription)
+            with self._streams_lock:
+                self._streams.discard(subscription)
+
+
+def _is_listening(socket_path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        try:
+            sock.connect(str(socket_path))
+            return True
+        except OSError:
+            return False
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class NodeClient:
+    """Blocking client for :class:`NodeAPIServer`.
+
+    Parameters
+    ----------
+    socket_path:
+        Path of the node's Unix socket.
+    chain:
+        Chain path the caller expects the node to serve, resolved against the
+        caller's working directory; requests fail with
+        :class:`NodeUnavailable` if the node serves a different chain.
+    timeout:
+        Socket timeout in seconds.
+    """
+
+    def __init__(
+        self, socket_path: str | Path, chain: str | Path | None = None, timeout: float = 5.0
+    ) -> None:
+        self.socket_path = Path(socket_path)
+        self.chain = str(Path(chain).resolve()) if chain is not None else None
+        self.timeout = timeout
+
+    def _connect(self, sock: socket.socket) -> None:
+        """Connect *sock* to the node, refusing a socket another user owns.
+
+        The default socket lives in a world-writable directory, so anyone
+        could bind it first; only sockets of this user (or root) are trusted.
+        """
+        owner = os.stat(self.socket_path).st_uid
+        if owner not in (os.getuid(), 0):
+            raise PermissionError(f"socket is owned by uid {owner}, not by this user")
+        sock.connect(str(self.socket_path))
+
+    def request(self, op: str, **params: Any) -> Any:
+        """Send one request and return its ``result``.
+
+        Raises
+        ------
+        NodeUnavailable
+            If nothing is listening, the socket belongs to another user or
+            the node serves another chain.
+        NodeAPIError
+            If the node rejected the request.
+        """
+        payload = {"op": op, **params}
+        if self.chain is not None:
+            payload["chain"] = self.chain
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                self._connect(sock)
+                sock.sendall(json.dumps(payload).encode() + b"\n")
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError as exc:
+            raise NodeUnavailable(f"No Varus node at {self.socket_path}: {exc}") from exc
+        if not line:
+            raise NodeUnavailable(f"Varus node at {self.socket_path} closed the connection")
+
+        return _result(json.loads(line))
+
+    def subscribe(
+        self,
+        start: int | None = None,
+        headers_only: bool = False,
+        buffer: int = DEFAULT_BUFFER_BLOCKS,
+    ) -> Iterator[dict]:
+        """Yield stream events for blocks appended from height *start* on.
+
+        Blocks arrive as ``{"event": "block", "block": {...}}``; ``heartbeat``
+        and ``rewind`` events are yielded too.  Runs until the node closes
+        the stream; close the generator to unsubscribe.
+
+        Raises
+        ------
+        NodeUnavailable
+            If nothing is listening, the socket belongs to another user, the
+            node serves another chain, or the connection drops.
+        NodeAPIError
+            If the node rejected the subscription.
+        """
+        payload: dict[str, Any] = {"op": "subscribe", "headers_only": headers_only}
+        payload["buffer"] = buffer
+        if start is not None:
+            payload["from"] = start
+        if self.chain is not None:
+            payload["chain"] = self.chain
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            self._connect(sock)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+        except OSError as exc:
+            sock.close()
+            raise NodeUnavailable(f"No Varus node at {self.socket_path}: {exc}") from exc
+        with sock, sock.makefile("rb") as reader:
+            try:
+                ack = reader.readline()
+                if not ack:
+                    raise NodeUnavailable(
+                        f"Varus node at {self.socket_path} closed the connection"
+                    )
+                _result(json.loads(ack))
+                sock.settimeout(max(self.timeout, HEARTBEAT_S * 3))
+                for line in reader:
+                    yield json.loads(line)
+            except OSError as exc:
+                raise NodeUnavailable(f"Lost the stream from {self.socket_path}: {exc}") from exc
+
+
+def _result(response: dict) -> Any:
+    if response.get("ok"):
+        return response.get("result")
+    if response.get("code") == "wrong_chain":
+        raise NodeUnavailable(response.get("error", "wrong chain"))
+    raise NodeAPIError(response.get("error", "request failed"), response.get("code", "error"))
@@ -0,0 +1,322 @@
+"""Benchmarks for chain append, load, validation, lookups and sync at scale.
+
+:func:`run_benchmarks` builds a synthetic chain of each requested size with
+payloads of about ``payload_bytes`` of JSON, then measures:
+
+- ``append``        -- :meth:`VarusChain.add_blocks` throughput, in batches
+- ``load``          -- :meth:`VarusChain.load` of the finished chain
+- ``validate``      -- a full :meth:`VarusChain.validate` (every block rehashed)
+- ``get_by_hash_ms`` -- latency of :meth:`VarusChain.get_by_hash` for random blocks
+- ``merge_blocks``  -- :meth:`ChainSync._merge_blocks` of the whole chain into a
+  chain holding only its genesis block
+- ``sync_export`` / ``sync_import`` -- a full snapshot sent and received
+  through :class:`MemoryTransport`, an in-process stand-in for SKComm's
+  FileTransport, so no skcomm install or shared directory is needed
+- ``peak_rss_kib``  -- the process's peak resident set size after each stage
+  (process-wide, so later and larger runs include earlier ones)
+
+Results are a JSON-serialisable dict; :func:`compare` lists the metrics of a
+run that got slower (or bigger) than a saved baseline by more than a
+tolerance, so runs before and after an upgrade can be checked in CI::
+
+    varus bench --blocks 10000,100000 --output before.json
+    varus bench --blocks 10000,100000 --compare before.json
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from . import __version__
+from .block import DEFAULT_HASH_VERSION
+from .chain import ChainError, VarusChain
+from .storage import DEFAULT_DURABILITY
+from .sync import ChainSync
+
+DEFAULT_SIZES = (10_000,)
+DEFAULT_PAYLOAD_BYTES = 256  # approximate canonical JSON size of each block's data
+DEFAULT_APPEND_BATCH = 1000  # blocks per add_blocks() commit
+DEFAULT_LOOKUPS = 1000  # get_by_hash() calls timed per run
+DEFAULT_TOLERANCE = 0.25  # allowed slowdown before compare() reports a regression
+RESULT_FORMAT = 1
+
+# Metrics compare() checks (lower is better) and the absolute change below
+# which a difference is treated as timer noise.
+_COMPARED = (
+    ("append", "seconds", 0.01),
+    ("load", "seconds", 0.01),
+    ("validate", "seconds", 0.01),
+    ("get_by_hash_ms", "p50", 0.01),
+    ("merge_blocks", "seconds", 0.01),
+    ("sync_import", "seconds", 0.01),
+    ("peak_rss_kib", "validate", 1024),
+)
+
+
+# ---------------------------------------------------------------------------
+# Stand-in transport
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SendResult:
+    success: bool = True
+    error: str | None = None
+
+
+class MemoryTransport:
+    """In-process stand-in for ``skcomm.transports.file.FileTransport``.
+
+    Transports sharing one *mailboxes* dict deliver to each other:
+    :meth:`send` appends to the recipient's mailbox and :meth:`receive`
+    drains the owner's.
+    """
+
+    def __init__(self, mailboxes: dict[str, list[bytes]], owner: str) -> None:
+        self.mailboxes = mailboxes
+        self.owner = owner
+
+    def send(self, envelope_bytes: bytes, recipient: str) -> SendResult:
+        self.mailboxes.setdefault(recipient, []).append(envelope_bytes)
+        return SendResult()
+
+    def receive(self) -> list[bytes]:
+        return self.mailboxes.pop(self.owner, [])
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+def synthetic_payload(index: int, payload_bytes: int, rng: random.Random) -> dict[str, Any]:
+    """Block data of roughly *payload_bytes* of canonical JSON."""
+    body = max(0, payload_bytes - 40) // 2
+    return {"seq": index, "kind": "bench", "body": rng.randbytes(body).hex()}
+
+
+def peak_rss_kib() -> int | None:
+    """Peak resident set size of this process in KiB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+
+def _rate(blocks: int, seconds: float) -> dict[str, float]:
+    return {
+        "seconds": round(seconds, 6),
+        "blocks_per_sec": round(blocks / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def _distribution(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "p50": round(ordered[len(ordered) // 2], 6),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+def _store_bytes(chain: VarusChain) -> int:
+    return sum(p.stat().st_size for p in chain.store.root.rglob("*") if p.is_file())
+
+
+def _genesis_copy(source: VarusChain, path: Path) -> VarusChain:
+    """A new chain at *path* holding only *source*'s genesis block."""
+    seed = path.parent / "genesis.json"
+    seed.parent.mkdir(parents=True, exist_ok=True)
+    seed.write_text(json.dumps([source.genesis.to_dict()]))
+    chain = VarusChain(path, durability=source.store.durability)
+    chain.import_json(seed)
+    return chain
+
+
+def bench_chain(
+    blocks: int,
+    workdir: str | Path,
+    payload_bytes: int = DEFAULT_PAYLOAD_BYTES,
+    batch: int = DEFAULT_APPEND_BATCH,
+    lookups: int = DEFAULT_LOOKUPS,
+    durability: str = DEFAULT_DURABILITY,
+    hash_version: int = DEFAULT_HASH_VERSION,
+    sync: bool = True,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Build a chain of *blocks* blocks after genesis under *workdir* and measure it.
+
+    Raises
+    ------
+    ChainError
+        If the chain or a synced copy of it does not come out whole.
+    """
+    root = Path(workdir) / f"bench-{blocks}-{payload_bytes}"
+    rng = random.Random(seed)
+    result: dict[str, Any] = {"blocks": blocks, "payload_bytes": payload_bytes, "batch": batch}
+    rss: dict[str, int | None] = {}
+
+    chain = VarusChain(root / "chain.json", durability=durability, hash_version=hash_version)
+    chain.load()
+    elapsed = 0.0
+    for start in range(0, blocks, max(1, batch)):
+        data = [
+            synthetic_payload(i, payload_bytes, rng)
+            for i in range(start, min(blocks, start + max(1, batch)))
+        ]
+        started = time.perf_counter()
+        chain.add_blocks(data)
+        elapsed += time.perf_counter() - started
+    started = time.perf_counter()
+    chain.flush()
+    elapsed += time.perf_counter() - started
+    result["append"] = _rate(blocks, elapsed)
+    rss["append"] = peak_rss_kib()
+    del chain
+
+    loaded = VarusChain(root / "chain.json", durability=durability, hash_version=hash_version)
+    started = time.perf_counter()
+    loaded.load()
+    result["load"] = {"seconds": round(time.perf_counter() - started, 6)}
+    rss["load"] = peak_rss_kib()
+    if loaded.height != blocks + 1:
+        raise ChainError(f"Benchmark chain has {loaded.height} blocks, expected {blocks + 1}")
+
+    started = time.perf_counter()
+    loaded.validate(full=True)
+    result["validate"] = _rate(loaded.height, time.perf_counter() - started)
+    rss["validate"] = peak_rss_kib()
+
+    samples = []
+    for _ in range(lookups):
+        block_hash = loaded.get_block(rng.randrange(loaded.height)).hash
+        started = time.perf_counter()
+        found = loaded.get_by_hash(block_hash)
+        samples.append((time.perf_counter() - started) * 1000)
+        if found is None:
+            raise ChainError(f"get_by_hash missed block {block_hash[:12]}")
+    result["get_by_hash_ms"] = _distribution(samples)
+    result["store_bytes"] = _store_bytes(loaded)
+
+    if sync:
+        result.update(_bench_sync(loaded, root))
+        rss["sync"] = peak_rss_kib()
+    result["peak_rss_kib"] = rss
+    return result
+
+
+def _bench_sync(chain: VarusChain, root: Path) -> dict[str, Any]:
+    remote = chain.all_blocks()
+    receiver = _genesis_copy(chain, root / "merge" / "chain.json")
+    started = time.perf_counter()
+    added = ChainSync(receiver, transport=MemoryTransport({}, "merge"))._merge_blocks(remote)
+    merge = _rate(added, time.perf_counter() - started)
+    if receiver.height != chain.height:
+        raise ChainError(f"_merge_blocks produced {receiver.height} blocks of {chain.height}")
+    del remote, receiver
+
+    mailboxes: dict[str, list[bytes]] = {}
+    sender = ChainSync(
+        chain, agent_name="bench-sender", transport=MemoryTransport(mailboxes, "bench-sender")
+    )
+    started = time.perf_counter()
+    sender.export_chain("bench-receiver", full=True)
+    export_s = time.perf_counter() - started
+    envelopes = mailboxes.get("bench-receiver", [])
+    sent_bytes = sum(len(e) for e in envelopes)
+
+    receiver = _genesis_copy(chain, root / "sync" / "chain.json")
+    sync = ChainSync(
+        receiver,
+        agent_name="bench-receiver",
+        transport=MemoryTransport(mailboxes, "bench-receiver"),
+        fetch_blobs=False,
+    )
+    started = time.perf_counter()
+    sync.import_chain()
+    imported = _rate(chain.height - 1, time.perf_counter() - started)
+    if receiver.tip.hash != chain.tip.hash:
+        raise ChainError(f"Synced copy stopped at height {receiver.height} of {chain.height}")
+    return {
+        "merge_blocks": merge,
+        "sync_export": {
+            **_rate(chain.height, export_s),
+            "envelopes": len(envelopes),
+            "bytes": sent_bytes,
+        },
+        "sync_import": imported,
+    }
+
+
+def run_benchmarks(
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    payload_bytes: int = DEFAULT_PAYLOAD_BYTES,
+    workdir: str | Path | None = None,
+    **options: Any,
+) -> dict[str, Any]:
+    """Benchmark a chain of each size (smallest first) and return the JSON report.
+
+    Chains are built under *workdir*, or a temporary directory removed
+    afterwards.  *options* are passed to :func:`bench_chain`.
+    """
+    sizes = sorted(set(sizes))
+    report: dict[str, Any] = {
+        "format": RESULT_FORMAT,
+        "varus_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"sizes": sizes, "payload_bytes": payload_bytes, **options},
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="varus-bench-") as scratch:
+        base = Path(workdir) if workdir is not None else Path(scratch)
+        for size in sizes:
+            report["runs"].append(bench_chain(size, base, payload_bytes, **options))
+    return report
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> list[dict[str, Any]]:
+    """Metrics of *current* more than *tolerance* (a fraction) worse than in *baseline*.
+
+    Runs are matched on ``blocks`` and ``payload_bytes``; runs or metrics
+    missing from either report are skipped.
+    """
+    previous = {(r["blocks"], r["payload_bytes"]): r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in current.get("runs", []):
+        before = previous.get((run["blocks"], run["payload_bytes"]))
+        if before is None:
+            continue
+        for stage, field, noise in _COMPARED:
+            new = (run.get(stage) or {}).get(field)
+            old = (before.get(stage) or {}).get(field)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > noise:
+                regressions.append(
+                    {
+                        "blocks": run["blocks"],
+                        "payload_bytes": run["payload_bytes"],
+                        "metric": f"{stage}.{field}",
+                        "baseline": old,
+                        "current": new,
+                        "change": round(new / old - 1, 3) if old else None,
+                    }
+                )
+    return regressions
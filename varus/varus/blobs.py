@@ -0,0 +1,147 @@
+"""Content-addressed store for large block payload items.
+
+Items of a block's ``data`` whose canonical JSON encoding is larger than a
+threshold are written once to the blob store, keyed by the SHA-256 of that
+encoding, and the block keeps only a reference in their place::
+
+    {"attachment": {"$blob": "3fa9...e1", "size": 1048576}, "type": "upload"}
+
+The block hash commits to the reference, and through its digest to the
+content, so hashing and validating the block never read the blob and sync
+envelopes carry only the reference.  :meth:`BlobStore.resolve` puts the
+content back, checking it against the digest.  Identical items are stored
+once however many blocks -- or chains sharing the directory -- use them.
+A data item that has the shape of a reference is stored as a blob whatever
+its size, so user data can never be mistaken for a reference.
+
+Layout (next to the chain by default, shared by chains in that directory)::
+
+    varus_blobs/
+        3f/
+            3fa9...e1
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Iterable
+
+from .block import canonical_json
+from .storage import write_atomic
+
+BLOB_DIR = "varus_blobs"
+BLOB_KEY = "$blob"
+DEFAULT_BLOB_THRESHOLD = 64 * 1024  # bytes of canonical JSON per data item
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobUnavailable(LookupError):
+    """Raised when a referenced blob is not in the local store."""
+
+
+class BlobError(ValueError):
+    """Raised for a blob whose content does not match its digest."""
+
+
+def is_reference(value: Any) -> bool:
+    """True if *value* is a blob reference as written by :meth:`BlobStore.externalize`."""
+    return (
+        isinstance(value, dict)
+        and value.keys() == {BLOB_KEY, "size"}
+        and isinstance(value[BLOB_KEY], str)
+        and _DIGEST_RE.match(value[BLOB_KEY]) is not None
+    )
+
+
+def references(data: Any) -> list[str]:
+    """Digests of the blobs referenced by the items of *data*, in item order."""
+    if not isinstance(data, dict):
+        return []
+    return [value[BLOB_KEY] for value in data.values() if is_reference(value)]
+
+
+class BlobStore:
+    """Directory of blobs named by the SHA-256 of their content."""
+
+    def __init__(self, root: str | Path, durable: bool = True) -> None:
+        self.root = Path(root)
+        self.durable = durable
+
+    def path(self, digest: str) -> Path:
+        if not _DIGEST_RE.match(digest):
+            raise BlobError(f"Not a blob digest: {digest!r}")
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def missing(self, digests: Iterable[str]) -> list[str]:
+        """The distinct *digests* not in the store, in first-seen order."""
+        return [d for d in dict.fromkeys(digests) if not self.has(d)]
+
+    def put(self, content: bytes, digest: str | None = None) -> str:
+        """Store *content* (once) and return its digest.
+
+        Pass the expected *digest* for content received from elsewhere.
+
+        Raises
+        ------
+        BlobError
+            If *content* does not hash to *digest*.
+        """
+        actual = hashlib.sha256(content).hexdigest()
+        if digest is not None and digest != actual:
+            raise BlobError(f"Blob content does not match digest {digest[:12]}")
+        path = self.path(actual)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, content, self.durable)
+        return actual
+
+    def get(self, digest: str) -> bytes:
+        """Return the content stored under *digest*, checked against it.
+
+        Raises
+        ------
+        BlobUnavailable
+            If the blob is not in the store.
+        BlobError
+            If the stored content no longer matches its digest.
+        """
+        try:
+            content = self.path(digest).read_bytes()
+        except FileNotFoundError:
+            raise BlobUnavailable(f"Blob {digest[:12]} is not in {self.root}") from None
+        if hashlib.sha256(content).hexdigest() != digest:
+            raise BlobError(f"Blob {digest[:12]} is corrupt")
+        return content
+
+    def externalize(self, data: dict[str, Any], threshold: int | None) -> dict[str, Any]:
+        """Return *data* with every item larger than *threshold* bytes moved to the store.
+
+        An item that merely looks like a reference is always stored too, so
+        :meth:`resolve` gives it back as written instead of following it.
+        ``threshold=None`` moves only those.
+        """
+        if not isinstance(data, dict):
+            return data
+        out = {}
+        for key, value in data.items():
+            encoded = canonical_json(value)
+            if is_reference(value) or (threshold is not None and len(encoded) > threshold):
+                value = {BLOB_KEY: self.put(encoded), "size": len(encoded)}
+            out[key] = value
+        return out
+
+    def resolve(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Return *data* with every blob reference replaced by the stored item."""
+        if not isinstance(data, dict) or not references(data):
+            return data
+        return {
+            key: json.loads(self.get(value[BLOB_KEY])) if is_reference(value) else value
+            for key, value in data.items()
+        }
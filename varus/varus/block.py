@@ -1,65 +1,341 @@
-"""Block model for the Varus sovereign chain."""
+"""Block model for the Varus sovereign chain.
+
+Hash versions
+-------------
+Every block records the encoding its hash commits to, so blocks of all
+versions can coexist on one chain:
+
+- ``1`` — legacy: SHA-256 of ``json.dumps(block_dict, sort_keys=True)``.
+  The genesis block stays on version 1 so its hash never changes.
+- ``2`` — canonical: SHA-256 of a minimal, key-sorted JSON header
+  (``v``, ``index``, ``timestamp``, ``previous_hash``, ``nonce``,
+  ``payload``) where ``payload`` is the SHA-256 of the canonical JSON of
+  ``data``.  New blocks use version 2 by default.
+- ``3`` — Merkle: the same header with ``v: 3``, where ``payload`` is a
+  Merkle root over the items of ``data`` (see :mod:`varus.merkle`), so
+  single items can be proven with an inclusion proof.
+
+The preimage bytes are cached on the block.  Reading ``block.data`` hands
+out the mutable dict, so it drops the cached encoding; everything else that
+only needs to hash or serialize the block reuses it.
+
+Blocks use ``__slots__``, and blocks loaded from the segment store keep
+``data`` as raw JSON bytes until it is first needed (see
+:meth:`Block.from_record`), so header-only work such as listing blocks or
+checking links never decodes payloads.
+
+A version-2/3 block can also be held as a bare header (no ``data`` at all,
+see :meth:`Block.without_payload`): its hash is still checkable from the
+header's ``payload`` commitment, which is what headers-only (light) chains
+store.  Reading ``data`` from such a block raises :class:`PayloadUnavailable`.
+"""
 
 import hashlib
 import json
-import time
-from dataclasses import dataclass, field, asdict
 from typing import Any
 
+HASH_V1 = 1
+HASH_V2 = 2
+HASH_V3 = 3
+HASH_VERSIONS = (HASH_V1, HASH_V2, HASH_V3)
+DEFAULT_HASH_VERSION = HASH_V2
+
+_NO_PAYLOAD = object()  # ``Block._data`` of a header-only block
+
+
+class PayloadUnavailable(LookupError):
+    """Raised when reading ``data`` from a header-only block."""
+
+
+def canonical_json(value: Any) -> bytes:
+    """Deterministic minimal JSON: sorted keys, no whitespace, UTF-8."""
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+def payload_digest(data: Any) -> str:
+    """SHA-256 of the canonical encoding of a block's ``data``."""
+    return hashlib.sha256(canonical_json(data)).hexdigest()
+
+
+def _v1_preimage(index, timestamp, data, previous_hash, nonce) -> bytes:
+    block_dict = {
+        "index": index,
+        "timestamp": timestamp,
+        "data": data,
+        "previous_hash": previous_hash,
+        "nonce": nonce,
+    }
+    return json.dumps(block_dict, sort_keys=True).encode()
+
+
+def payload_commitment(version: int, data: Any) -> str:
+    """The ``payload`` field of a version-2 or version-3 header."""
+    if version == HASH_V3:
+        from .merkle import merkle_root
+
+        return merkle_root(data)
+    return payload_digest(data)
+
+
+def header_preimage(
+    index, timestamp, previous_hash, nonce, payload: str, version: int = HASH_V2
+) -> bytes:
+    """Header preimage (version 2 or 3): the header fields plus the payload commitment."""
+    return canonical_json(
+        {
+            "v": version,
+            "index": index,
+            "timestamp": timestamp,
+            "previous_hash": previous_hash,
+            "nonce": nonce,
+            "payload": payload,
+        }
+    )
+
+
+def hash_fields(fields: tuple) -> str:
+    """Compute the block hash from :meth:`Block.hash_fields` output."""
+    version, index, timestamp, data, previous_hash, nonce, payload = fields
+    if version == HASH_V1:
+        preimage = _v1_preimage(index, timestamp, data, previous_hash, nonce)
+    else:
+        if payload is None:
+            payload = payload_commitment(version, data)
+        preimage = header_preimage(index, timestamp, previous_hash, nonce, payload, version)
+    return hashlib.sha256(preimage).hexdigest()
+
 
-@dataclass
 class Block:
     """A single block in the Varus sovereign chain."""
 
-    index: int
-    timestamp: float
-    data: dict[str, Any]
-    previous_hash: str
-    nonce: int = 0
-    hash: str = field(default="", init=False)
+    __slots__ = (
+        "index",
+        "timestamp",
+        "previous_hash",
+        "nonce",
+        "hash_version",
+        "hash",
+        "_data",
+        "_raw",
+        "_payload",
+        "_preimage",
+        "_preimage_key",
+    )
 
-    def __post_init__(self) -> None:
+    def __init__(
+        self,
+        index: int,
+        timestamp: float,
+        data: dict[str, Any],
+        previous_hash: str,
+        nonce: int = 0,
+        hash_version: int = DEFAULT_HASH_VERSION,
+    ) -> None:
+        if hash_version not in HASH_VERSIONS:
+            raise ValueError(
+                f"Unknown hash version {hash_version!r}; expected one of {HASH_VERSIONS}"
+            )
+        self.index = index
+        self.timestamp = timestamp
+        self._data = data
+        self._raw: bytes | None = None
+        self.previous_hash = previous_hash
+        self.nonce = nonce
+        self.hash_version = hash_version
+        self._forget_encoding()
         self.hash = self.compute_hash()
 
+    @property
+    def data(self) -> dict[str, Any]:
+        data = self._decoded()
+        # The caller may mutate the dict, so the cached encoding can't be trusted.
+        self._forget_encoding()
+        return data
+
+    @data.setter
+    def data(self, value: dict[str, Any]) -> None:
+        self._data = value
+        self._raw = None
+        self._forget_encoding()
+
+    @property
+    def is_decoded(self) -> bool:
+        """False while ``data`` is still held as undecoded raw bytes."""
+        return self._raw is None
+
+    @property
+    def has_payload(self) -> bool:
+        """False for a header-only block (see :meth:`without_payload`)."""
+        return self._data is not _NO_PAYLOAD
+
+    def _decoded(self) -> dict[str, Any]:
+        raw = self._raw  # readers may decode concurrently; test and use one snapshot
+        if raw is not None:
+            self._data = json.loads(raw)
+            self._raw = None  # only after _data is set, for readers that see None
+        data = self._data
+        if data is _NO_PAYLOAD:
+            raise PayloadUnavailable(f"Block {self.index} is header-only; its data is not stored")
+        return data
+
+    def _forget_encoding(self) -> None:
+        if self._data is not _NO_PAYLOAD:  # a bare header's commitment is all it has
+            self._payload: str | None = None
+        self._preimage: bytes | None = None
+        self._preimage_key: tuple | None = None
+
+    def payload_digest(self) -> str:
+        """The header's payload commitment (cached).
+
+        SHA-256 of the canonical encoding of ``data`` for version 2, the
+        Merkle root over its items for version 3.
+        """
+        payload = self._payload
+        if payload is None:
+            # Return the local: a concurrent ``data`` read may clear the cache.
+            payload = payload_commitment(self.hash_version, self._decoded())
+            self._payload = payload
+        return payload
+
+    def preimage(self) -> bytes:
+        """The bytes the block hash commits to (cached until a field changes)."""
+        key = (self.hash_version, self.index, self.timestamp, self.previous_hash, self.nonce)
+        preimage = self._preimage
+        if preimage is None or self._preimage_key != key:
+            if self.hash_version == HASH_V1:
+                preimage = _v1_preimage(
+                    self.index, self.timestamp, self._decoded(), self.previous_hash, self.nonce
+                )
+            else:
+                preimage = header_preimage(
+                    self.index,
+                    self.timestamp,
+                    self.previous_hash,
+                    self.nonce,
+                    self.payload_digest(),
+                    self.hash_version,
+                )
+            self._preimage = preimage
+            self._preimage_key = key
+        return preimage
+
     def compute_hash(self) -> str:
         """Compute SHA-256 hash of block contents (excluding self.hash)."""
-        block_dict = {
+        return hashlib.sha256(self.preimage()).hexdigest()
+
+    def hash_fields(self) -> tuple:
+        """Return the picklable tuple of fields the block hash commits to.
+
+        A known payload commitment is sent instead of ``data``, which is
+        both smaller and all a header-only block has.
+        """
+        payload = self._payload if self.hash_version != HASH_V1 else None
+        return (
+            self.hash_version,
+            self.index,
+            self.timestamp,
+            self._decoded() if payload is None else None,
+            self.previous_hash,
+            self.nonce,
+            payload,
+        )
+
+    def header(self) -> dict:
+        """Header fields a version-2/3 block hash can be checked from, without ``data``."""
+        return {
             "index": self.index,
             "timestamp": self.timestamp,
-            "data": self.data,
             "previous_hash": self.previous_hash,
             "nonce": self.nonce,
+            "hash_version": self.hash_version,
+            "payload": self.payload_digest(),
+            "hash": self.hash,
         }
-        block_string = json.dumps(block_dict, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+
+    def to_header_dict(self) -> dict:
+        """What a headers-only chain stores for this block.
+
+        Version-1 blocks commit to their whole ``data``, so they are kept in
+        full; later versions reduce to :meth:`header`.
+        """
+        return self.to_dict() if self.hash_version == HASH_V1 else self.header()
+
+    def without_payload(self) -> "Block":
+        """Return a header-only copy (version-1 blocks are returned as is)."""
+        if self.hash_version == HASH_V1:
+            return self
+        return Block.from_dict(self.header())
 
     def is_valid(self) -> bool:
         """Return True if stored hash matches computed hash."""
         return self.hash == self.compute_hash()
 
     def to_dict(self) -> dict:
-        """Serialize block to dict."""
-        return {
+        """Serialize block to dict.
+
+        ``hash_version`` is only included for non-legacy blocks, so version-1
+        blocks serialize exactly as they always have.  A header-only block
+        serializes as its :meth:`header`.
+        """
+        if not self.has_payload:
+            return self.header()
+        block_dict = {
             "index": self.index,
             "timestamp": self.timestamp,
-            "data": self.data,
+            "data": self._decoded(),
             "previous_hash": self.previous_hash,
             "nonce": self.nonce,
             "hash": self.hash,
         }
+        if self.hash_version != HASH_V1:
+            block_dict["hash_version"] = self.hash_version
+        return block_dict
 
     @classmethod
     def from_dict(cls, data: dict) -> "Block":
-        """Deserialize block from dict."""
+        """Deserialize block from dict (blocks without ``hash_version`` are version 1).
+
+        A dict without ``data`` but with a ``payload`` commitment (as made by
+        :meth:`header`) gives a header-only block.
+        """
+        if "data" not in data and data.get("hash_version", HASH_V1) != HASH_V1:
+            block = cls._from_header(data, _NO_PAYLOAD, None)
+            block._payload = data["payload"]
+            return block
+        return cls._from_header(data, data["data"], None)
+
+    @classmethod
+    def from_record(cls, header: dict, raw_data: bytes | None) -> "Block":
+        """Build a block whose ``data`` is decoded from *raw_data* on first use.
+
+        *header* holds every field but ``data``; with ``raw_data=None`` it is
+        a complete block dict, as for :meth:`from_dict`.
+        """
+        if raw_data is None:
+            return cls.from_dict(header)
+        return cls._from_header(header, None, raw_data)
+
+    @classmethod
+    def _from_header(cls, header: dict, data: Any, raw_data: bytes | None) -> "Block":
         block = cls.__new__(cls)
-        block.index = data["index"]
-        block.timestamp = data["timestamp"]
-        block.data = data["data"]
-        block.previous_hash = data["previous_hash"]
-        block.nonce = data["nonce"]
-        block.hash = data["hash"]
+        block.index = header["index"]
+        block.timestamp = header["timestamp"]
+        block._data = data
+        block._raw = raw_data
+        block.previous_hash = header["previous_hash"]
+        block.nonce = header["nonce"]
+        block.hash_version = header.get("hash_version", HASH_V1)
+        block.hash = header["hash"]
+        block._forget_encoding()
         return block
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Block):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
     def __repr__(self) -> str:
         return (
             f"Block(index={self.index}, "
@@ -1,47 +1,314 @@
 """Chain management and validation for the Varus sovereign chain."""
 
 import json
+import os
+import random
 import time
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 
-from .block import Block
+from .blobs import (
+    BLOB_DIR,
+    DEFAULT_BLOB_THRESHOLD,
+    BlobError,
+    BlobStore,
+    BlobUnavailable,
+    references,
+)
+from .block import DEFAULT_HASH_VERSION, HASH_V1, HASH_V3, Block, PayloadUnavailable
+from .checkpoint import CheckpointError, normalize_checkpoint, verify_checkpoint
+from .indexes import INDEX_DIR, FieldIndex, describe_indexes, open_indexes
+from .merkle import ProofError, merkle_path
+from .storage import (
+    DEFAULT_DURABILITY,
+    DEFAULT_GROUP_BLOCKS,
+    DEFAULT_GROUP_MS,
+    DURABILITY_BUFFERED,
+    SegmentStore,
+    StorageError,
+    _fsync_path,
+    store_path,
+    write_atomic,
+)
+from .validation import HASH_MISMATCH, LINK_BROKEN, find_first_failure
 
 GENESIS_HASH = "0" * 64
 CHAIN_FILE = "varus_chain.json"
+_INDEX_CHUNK = 4096  # blocks decoded at a time while catching indexes up
+FORKS_DIR = "forks"  # side chains, inside the chain store
+REORG_LOG = "reorgs.log"
+DEFAULT_KEEP_BLOCKS = 10_000  # blocks left in memory by compact()
 
 
 class ChainError(Exception):
     """Raised when chain integrity is violated."""
 
 
+class _ResidentBlocks:
+    """Block list of a compacted chain: only blocks from *base* up are held in memory.
+
+    Indexing and slicing read older blocks back from the store through
+    *read* (``read(start, stop)`` yields blocks ``start .. stop-1``), so the
+    chain code can treat it as the full list.  Genesis is kept pinned.
+    """
+
+    def __init__(
+        self, base: int, tail: list[Block], read: Callable[[int, int], Iterator[Block]]
+    ) -> None:
+        self.base = base
+        self._tail = tail
+        self._read = read
+        self._genesis = next(read(0, 1))
+
+    def __len__(self) -> int:
+        return self.base + len(self._tail)
+
+    def __iter__(self) -> Iterator[Block]:
+        yield self._genesis
+        yield from self._read(1, self.base)
+        yield from self._tail
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(start, stop)
+            older = list(self._read(start, min(stop, self.base))) if start < self.base else []
+            return older + self._tail[max(start - self.base, 0) : max(stop - self.base, 0)]
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError(f"No block at index {key}")
+        if index >= self.base:
+            return self._tail[index - self.base]
+        return self._genesis if index == 0 else next(self._read(index, index + 1))
+
+    def __delitem__(self, key: slice) -> None:
+        start = key.indices(len(self))[0]
+        if start < self.base:
+            raise IndexError("Blocks below the compaction height cannot be removed")
+        del self._tail[start - self.base :]
+
+    def append(self, block: Block) -> None:
+        self._tail.append(block)
+
+    def extend(self, blocks: list[Block]) -> None:
+        self._tail.extend(blocks)
+
+
 class VarusChain:
-    """Append-only sovereign blockchain with local JSON persistence."""
+    """Append-only sovereign blockchain persisted as a segmented block log.
+
+    ``chain_path`` names the chain; blocks live in the segment store next to
+    it (``varus_chain.json`` -> ``varus_chain.varus/``).  A legacy single-file
+    JSON chain found at ``chain_path`` is migrated into the store on first load.
+
+    ``durability`` selects how appends reach stable storage (``fsync``,
+    ``group`` or ``buffered``); see :mod:`varus.storage`.
 
-    def __init__(self, chain_path: str | Path | None = None) -> None:
+    ``hash_version`` is the encoding new blocks are hashed with; use
+    ``HASH_V3`` to make them commit to a Merkle root over their data items
+    so :meth:`prove` can produce inclusion proofs.
+
+    ``headers_only=True`` makes a light chain: it stores and validates block
+    headers (hash-linked, with each block's payload commitment) but not
+    their ``data``; bodies can be fetched from a full peer on demand and
+    checked with :meth:`attach_payload`.  The mode is recorded in the store,
+    so ``None`` (the default) follows whatever the existing chain uses.
+
+    A signed checkpoint passed to :meth:`assume_valid` lets a new node accept
+    history up to it after checking hash links only; :meth:`verify_history`
+    rehashes that assumed range later, a batch at a time.
+
+    Secondary indexes on fields of block data (:meth:`create_index`) are
+    kept up to date on every append and answer :meth:`query`.
+
+    :meth:`reorg` switches to a competing branch from a peer; the blocks it
+    replaces are kept as a side chain and every switch is logged.
+
+    :meth:`compact` snapshots the chain at a height, archives the segments
+    below it and stops holding those blocks in memory; later loads start
+    from the snapshot.  Older blocks are still read back on demand.
+
+    Items of new block data larger than ``blob_threshold`` bytes (canonical
+    JSON) are moved to a content-addressed blob store (``blob_dir``, by
+    default ``varus_blobs/`` next to the chain) and referenced by digest;
+    see :mod:`varus.blobs`.  :meth:`resolve` puts them back.  Pass
+    ``blob_threshold=None`` to keep data inline; only items shaped like a
+    reference are still stored as blobs.
+    """
+
+    def __init__(
+        self,
+        chain_path: str | Path | None = None,
+        durability: str = DEFAULT_DURABILITY,
+        group_blocks: int = DEFAULT_GROUP_BLOCKS,
+        group_ms: int = DEFAULT_GROUP_MS,
+        hash_version: int = DEFAULT_HASH_VERSION,
+        headers_only: bool | None = None,
+        blob_dir: str | Path | None = None,
+        blob_threshold: int | None = DEFAULT_BLOB_THRESHOLD,
+    ) -> None:
         self.chain_path = Path(chain_path) if chain_path else Path(CHAIN_FILE)
+        self.store = SegmentStore(
+            store_path(self.chain_path),
+            durability=durability,
+            group_blocks=group_blocks,
+            group_ms=group_ms,
+        )
+        self.hash_version = hash_version
+        self._headers_only = headers_only
+        self.blobs = BlobStore(
+            blob_dir if blob_dir else self.chain_path.parent / BLOB_DIR,
+            durable=durability != DURABILITY_BUFFERED,
+        )
+        self.blob_threshold = blob_threshold
         self._blocks: list[Block] = []
+        self._persisted = 0  # number of blocks already written to the store
+        self._validated = 0  # blocks 0 .. _validated-1 are known to be valid
+        self._checkpoint: dict | None = None  # last persisted validation checkpoint
+        self._trusted: dict | None = None  # signed checkpoint from assume_valid()
+        self._assumed = 0  # blocks 0 .. _assumed-1 were link-checked only, not rehashed
+        self._history_verified = 0  # ... of which 0 .. _history_verified-1 are rehashed since
+        self._indexes: dict[str, FieldIndex] | None = None  # opened on first use
 
     # ------------------------------------------------------------------
     # Persistence
     # ------------------------------------------------------------------
 
-    def load(self) -> None:
-        """Load chain from disk.  Creates genesis block if no file exists."""
-        if self.chain_path.exists():
-            raw = json.loads(self.chain_path.read_text())
-            self._blocks = [Block.from_dict(b) for b in raw]
-            self.validate()
+    def exists(self) -> bool:
+        """Return True if a chain (segment store or legacy JSON) is on disk."""
+        return self.store.exists() or self._has_legacy_file()
+
+    def _has_legacy_file(self) -> bool:
+        return self.chain_path.is_file() and self.chain_path != self.store.root
+
+    @property
+    def headers_only(self) -> bool:
+        """True for a light chain that stores block headers without data."""
+        if self._headers_only is None:
+            if not self.store.exists():
+                return False
+            self._headers_only = bool(self.store.option("headers_only", False))
+        return self._headers_only
+
+    def _create_store(self) -> None:
+        if self.headers_only:
+            self.store.create(headers_only=True)
+        else:
+            self.store.create()
+
+    def _record(self, block: Block) -> dict:
+        return block.to_header_dict() if self.headers_only else block.to_dict()
+
+    def load(self, validate: bool = True) -> None:
+        """Load chain from disk.  Creates genesis block if no chain exists.
+
+        Blocks above the validated checkpoint are checked unless *validate*
+        is False, for callers that run their own :meth:`validate` next.
+        """
+        if self.store.exists():
+            try:
+                self._blocks = self._read_resident()
+            except (StorageError, ValueError, KeyError) as exc:
+                raise ChainError(f"Chain store is unreadable: {exc}") from exc
+            self._persisted = len(self._blocks)
+            self._resume_from_checkpoint()
+            self._validated = max(self._validated, self.pruned_height)  # compacted when valid
+            self._apply_trusted_checkpoint()
+            if validate:
+                self.validate(full=False)
+        elif self._has_legacy_file():
+            self.import_json(self.chain_path)
         else:
             self._blocks = [self._make_genesis()]
+            self._persisted = 0
+            self._validated = 1
+            self._create_store()
             self.save()
 
+    def _read_resident(self) -> list[Block] | _ResidentBlocks:
+        """Read the blocks to hold in memory: all, or those above the compaction snapshot."""
+        base = 0
+        snapshot = self.store.read_snapshot()
+        if snapshot:
+            height = snapshot.get("height", 0)
+            if 0 < height <= self.store.height and (
+                self.store.hash_at(height - 1) == snapshot.get("tip_hash")
+            ):
+                base = height
+        blocks = [Block.from_record(h, raw) for h, raw in self.store.read_records(base)]
+        return _ResidentBlocks(base, blocks, self._read_stored) if base else blocks
+
+    def _read_stored(self, start: int, stop: int) -> Iterator[Block]:
+        records = islice(self.store.read_records(start), max(0, stop - start))
+        return (Block.from_record(h, raw) for h, raw in records)
+
     def save(self) -> None:
-        """Persist chain to disk."""
-        self.chain_path.parent.mkdir(parents=True, exist_ok=True)
-        self.chain_path.write_text(
-            json.dumps([b.to_dict() for b in self._blocks], indent=2)
-        )
+        """Append any blocks not yet written to the segment store."""
+        if not self.store.exists():
+            self._create_store()
+        pending = self._blocks[self._persisted:]
+        if pending:
+            self.store.append_many(self._record(b) for b in pending)
+            self._persisted = len(self._blocks)
+            self._update_indexes()
+
+    def flush(self) -> None:
+        """Force appends not yet fsync'd (group or buffered mode) to stable storage."""
+        if self.store.exists():
+            self.store.sync()
+
+    def destroy(self) -> None:
+        """Delete the chain from disk (segment store and any legacy JSON file)."""
+        self.store.destroy()
+        if self._has_legacy_file():
+            self.chain_path.unlink()
+        self._blocks = []
+        self._persisted = 0
+        self._validated = 0
+        self._checkpoint = None
+        self._assumed = 0
+        self._history_verified = 0
+        self._indexes = None
+
+    # ------------------------------------------------------------------
+    # Legacy JSON import / export
+    # ------------------------------------------------------------------
+
+    def import_json(self, path: str | Path) -> None:
+        """Replace the stored chain with a legacy whole-file JSON chain.
+
+        The imported chain is fully validated before anything is written.
+        """
+        raw = json.loads(Path(path).read_text())
+        blocks = [Block.from_dict(b) for b in raw]
+        previous = self._blocks
+        self._blocks = blocks
+        try:
+            self.validate()
+        except ChainError:
+            self._blocks = previous
+            raise
+        if self.headers_only:
+            blocks = [b.without_payload() for b in blocks]
+            self._blocks = blocks
+        declared = self.indexes if self.store.exists() else {}
+        options = {"headers_only": True} if self.headers_only else {}
+        self.store.rewrite((self._record(b) for b in blocks), **options)
+        self._persisted = len(blocks)
+        self._checkpoint = None
+        self._save_checkpoint()
+        self._indexes = None
+        for name, path in declared.items():  # the rewrite dropped them
+            self.create_index(name, path)
+
+    def export_json(self, path: str | Path) -> None:
+        """Write the chain in the legacy whole-file JSON format."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, json.dumps([b.to_dict() for b in self._blocks], indent=2).encode())
 
     # ------------------------------------------------------------------
     # Genesis
@@ -55,6 +322,7 @@ class VarusChain:
             timestamp=0.0,
             data={"message": "Varus sovereign chain genesis", "sovereign": True},
             previous_hash=GENESIS_HASH,
+            hash_version=HASH_V1,  # the genesis hash is shared by every node
         )
 
     @property
@@ -78,17 +346,95 @@ class VarusChain:
     def height(self) -> int:
         return len(self._blocks)
 
-    def add_block(self, data: dict[str, Any]) -> Block:
+    def add_block(self, data: dict[str, Any], hash_version: int | None = None) -> Block:
         """Append a new block to the chain and persist."""
-        block = Block(
-            index=self.height,
-            timestamp=time.time(),
-            data=data,
-            previous_hash=self.tip.hash,
-        )
-        self._blocks.append(block)
+        return self.add_blocks([data], hash_version)[0]
+
+    def add_blocks(
+        self, batch: list[dict[str, Any]], hash_version: int | None = None
+    ) -> list[Block]:
+        """Append several blocks and persist them as a single commit.
+
+        ``hash_version`` overrides the chain's default for these blocks.
+        Data items over ``blob_threshold`` bytes are stored as blobs first.
+
+        Raises
+        ------
+        ChainError
+            On a headers-only chain, which cannot store the new data.
+        """
+        if self.headers_only:
+            raise ChainError("A headers-only chain cannot author blocks.")
+        extends_validated = self._validated == len(self._blocks)
+        blocks = []
+        for data in batch:
+            data = self.blobs.externalize(data, self.blob_threshold)
+            block = Block(
+                index=self.height,
+                timestamp=time.time(),
+                data=data,
+                previous_hash=self.tip.hash,
+                hash_version=hash_version or self.hash_version,
+            )
+            self._blocks.append(block)
+            blocks.append(block)
+        if extends_validated:
+            self._validated += len(blocks)  # built locally from the validated tip
         self.save()
-        return block
+        return blocks
+
+    def extend(self, blocks: list[Block], validated: bool = False, assumed: int = 0) -> None:
+        """Append externally produced blocks (e.g. from a peer) and persist.
+
+        Blocks keep their original hashes and timestamps.  Each must link to
+        the current tip; pass ``validated=True`` when the caller has already
+        rehashed them so the validation checkpoint can advance without
+        rehashing again.  ``assumed`` says how many leading blocks were only
+        link-checked under the trusted checkpoint (see :meth:`assumable`);
+        they are left for :meth:`verify_history`.
+
+        A headers-only chain keeps only the headers of *blocks*; a full chain
+        refuses header-only blocks.
+        """
+        if not blocks:
+            return
+        if self.headers_only:
+            blocks = [b.without_payload() for b in blocks]
+        elif not all(b.has_payload for b in blocks):
+            raise ChainError("Cannot extend a full chain with header-only blocks.")
+        if blocks[0].previous_hash != self.tip.hash or blocks[0].index != self.height:
+            raise ChainError(
+                f"Block {blocks[0].index} does not extend the local tip at index {self.tip.index}."
+            )
+        extends_validated = validated and self._validated == len(self._blocks)
+        if extends_validated and assumed:
+            self._assume_up_to(len(self._blocks) + assumed)
+        self._blocks.extend(blocks)
+        if extends_validated:
+            self._validated = len(self._blocks)
+        self.save()
+
+    def attach_payload(self, block: Block) -> Block:
+        """Fill in the data of a stored header from a full copy of the block.
+
+        *block* (e.g. fetched from a full peer) must hash correctly and have
+        the hash of our header at its index.  The data is kept in memory for
+        this session only; the store keeps the header.
+
+        Raises
+        ------
+        ChainError
+            If the block is unknown or does not match our header.
+        """
+        try:
+            local = self.get_block(block.index)
+        except IndexError as exc:
+            raise ChainError(str(exc)) from exc
+        if block.hash != local.hash or not block.has_payload or not block.is_valid():
+            raise ChainError(f"Payload for block {block.index} does not match the stored header.")
+        if not local.has_payload:
+            local.data = block.data
+        return local
 
     def get_block(self, index: int) -> Block:
         """Return block at given index."""
@@ -97,64 +443,778 @@ class VarusChain:
         return self._blocks[index]
 
     def get_by_hash(self, block_hash: str) -> Block | None:
-        """Return block with matching hash, or None."""
-        for block in self._blocks:
+        """Return block with matching hash, or None (O(1) via the store index)."""
+        height = self.store.lookup_hash(block_hash) if self._persisted else None
+        if height is not None and height < len(self._blocks):
+            block = self._blocks[height]
+            if block.hash == block_hash:
+                return block
+        for block in self._blocks[self._persisted:]:
             if block.hash == block_hash:
                 return block
         return None
 
-    def all_blocks(self) -> list[Block]:
-        return list(self._blocks)
+    def height_of(self, block_hash: str) -> int | None:
+        """Return the index of the block with *block_hash*, or None."""
+        block = self.get_by_hash(block_hash)
+        return block.index if block is not None else None
+
+    # ------------------------------------------------------------------
+    # Blobs
+    # ------------------------------------------------------------------
+
+    def resolve(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Return block *data* with its blob references replaced by their content.
+
+        Raises
+        ------
+        ChainError
+            If a referenced blob is not in the local store or is corrupt.
+        """
+        try:
+            return self.blobs.resolve(data)
+        except (BlobUnavailable, BlobError) as exc:
+            raise ChainError(str(exc)) from exc
+
+    def missing_blobs(self, start: int = 0) -> list[str]:
+        """Digests of blobs referenced by blocks from index *start* on but not stored here."""
+        digests = (
+            digest
+            for block in self._blocks[start:]
+            if block.has_payload
+            for digest in references(block.data)
+        )
+        return self.blobs.missing(digests)
+
+    # ------------------------------------------------------------------
+    # Random access without load()
+    # ------------------------------------------------------------------
+
+    def read_block(self, index: int) -> Block:
+        """Read one block straight from the store index.
+
+        Does not require :meth:`load` and does not validate the chain, so
+        single-block lookups stay O(1) regardless of chain height.
+        """
+        if self._blocks:
+            return self.get_block(index)
+        return Block.from_record(*self.store.read_record(index))
+
+    def read_by_hash(self, block_hash: str) -> Block | None:
+        """Like :meth:`read_block` but keyed by block hash."""
+        if self._blocks:
+            return self.get_by_hash(block_hash)
+        height = self.store.lookup_hash(block_hash)
+        return None if height is None else self.read_block(height)
+
+    def read_tip(self) -> Block:
+        """Read the most recent block straight from the store index."""
+        if self._blocks:
+            return self.tip
+        return self.read_block(self.store.height - 1)
+
+    def all_blocks(self, start: int = 0) -> list[Block]:
+        """Return the blocks from index *start* on (read back from the store if compacted)."""
+        return list(self._blocks[start:])
+
+    def iter_blocks(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        start: int = 0,
+        limit: int | None = None,
+    ) -> Iterator[Block]:
+        """Yield blocks in chain order from index *start*, optionally in a time window.
+
+        ``since``/``until`` are inclusive bounds on block ``timestamp``,
+        found through the store's timestamp index (see
+        :meth:`SegmentStore.time_range`) rather than by reading every block.
+        Works with or without :meth:`load`; without it, blocks are read from
+        the store one at a time, so paging through history takes constant
+        memory.
+        """
+        return islice(self._iter_window(since, until, start), limit)
+
+    def _iter_window(
+        self, since: float | None, until: float | None, start: int
+    ) -> Iterator[Block]:
+        persisted = 0
+        if self.store.exists():
+            persisted = self._persisted if self._blocks else self.store.height
+            for height in self.store.time_range(since, until, start):
+                if height >= persisted:
+                    break
+                yield self.read_block(height)
+        for block in self._blocks[max(start, persisted):]:
+            if since is not None and block.timestamp < since:
+                continue
+            if until is not None and block.timestamp > until:
+                continue
+            yield block
+
+    # ------------------------------------------------------------------
+    # Secondary indexes
+    # ------------------------------------------------------------------
+
+    @property
+    def indexes(self) -> dict[str, str]:
+        """Declared secondary indexes, as ``{name: path}``."""
+        return {name: index.path for name, index in self._open_indexes().items()}
+
+    def create_index(self, name: str, path: str) -> None:
+        """Declare an index on the dotted *path* into block data and build it.
+
+        Existing blocks are indexed once now; later appends keep the index
+        current.  Re-declaring an index with the same path is a no-op.
+
+        Raises
+        ------
+        ChainError
+            On a headers-only chain, for a bad name or path, or if *name*
+            already indexes another path.
+        """
+        if self.headers_only:
+            raise ChainError("A headers-only chain has no block data to index.")
+        indexes = self._open_indexes()
+        if name in indexes:
+            if indexes[name].path != path:
+                raise ChainError(f"Index {name!r} already exists on path {indexes[name].path!r}")
+            return
+        if not self.store.exists():
+            self._create_store()
+        try:
+            indexes[name] = FieldIndex.create(self.store.root / INDEX_DIR, name, path)
+        except ValueError as exc:
+            raise ChainError(str(exc)) from exc
+        self._update_indexes()
+
+    def drop_index(self, name: str) -> None:
+        """Remove a secondary index.
+
+        Raises
+        ------
+        ChainError
+            If there is no index called *name*.
+        """
+        index = self._open_indexes().pop(name, None)
+        if index is None:
+            raise ChainError(f"No index named {name!r}")
+        index.destroy()
+
+    def _open_indexes(self) -> dict[str, FieldIndex]:
+        if self._indexes is None:
+            self._indexes = {}
+            if self.store.exists():
+                self._indexes = open_indexes(self.store.root / INDEX_DIR)
+                self._update_indexes()
+        return self._indexes
+
+    def _describe_indexes(self) -> dict[str, dict[str, Any]]:
+        """Names, paths and heights of the indexes without opening or updating them."""
+        if self._indexes is not None:
+            return {n: {"path": i.path, "height": i.height} for n, i in self._indexes.items()}
+        if not self.store.exists():
+            return {}
+        return describe_indexes(self.store.root / INDEX_DIR)
+
+    def _update_indexes(self) -> None:
+        """Index persisted blocks the indexes do not cover yet."""
+        if not self._indexes:
+            return
+        height = self._persisted if self._blocks else self.store.height
+        for index in self._indexes.values():
+            index.truncate(height)  # no-op unless the chain was cut back under the index
+        start = min(index.height for index in self._indexes.values())
+        for first in range(start, height, _INDEX_CHUNK):
+            last = min(height, first + _INDEX_CHUNK)
+            blocks = [(h, self.read_block(h).data) for h in range(first, last)]
+            for index in self._indexes.values():
+                index.add(blocks)
+
+    def _index_for(self, field: str) -> FieldIndex:
+        indexes = self._open_indexes()
+        if field in indexes:
+            return indexes[field]
+        for index in indexes.values():
+            if index.path == field:
+                return index
+        raise ChainError(f"No index on {field!r}; declare one with create_index()")
+
+    def query(
+        self,
+        equals: dict[str, Any] | None = None,
+        prefix: dict[str, str] | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int | None = None,
+        start: int = 0,
+    ) -> list[Block]:
+        """Return blocks matching every filter, in chain order.
+
+        Parameters
+        ----------
+        equals:
+            ``{index: value}`` — the indexed field equals *value* (or, for a
+            list field, contains it).  An index is named by its name or path.
+        prefix:
+            ``{index: prefix}`` — the indexed string field starts with *prefix*.
+        since, until:
+            Inclusive bounds on block ``timestamp``.
+        limit:
+            Stop after this many matches.
+        start:
+            Skip blocks below this index (for paging through results).
+
+        Field filters are answered from the indexes, so only matching blocks
+        are read and no payload is decoded.  Time bounds alone are answered
+        from the timestamp index (see :meth:`iter_blocks`).
+
+        Raises
+        ------
+        ChainError
+            If a filter names a field that has no index.
+        """
+        candidates: set[int] | None = None
+        lookups = [self._index_for(f).lookup(v) for f, v in (equals or {}).items()]
+        lookups += [self._index_for(f).lookup_prefix(p) for f, p in (prefix or {}).items()]
+        for heights in sorted(lookups, key=len):
+            candidates = set(heights) if candidates is None else candidates.intersection(heights)
+        if candidates is None:
+            return list(self.iter_blocks(since, until, start, limit))
+
+        results = []
+        for h in sorted(h for h in candidates if h >= start):
+            if limit is not None and len(results) >= limit:
+                break
+            block = self.read_block(h)
+            if since is not None and block.timestamp < since:
+                continue
+            if until is not None and block.timestamp > until:
+                continue
+            results.append(block)
+        return results
+
+    # ------------------------------------------------------------------
+    # Inclusion proofs
+    # ------------------------------------------------------------------
+
+    def prove(self, block: int | str, key: str) -> dict[str, Any]:
+        """Build an inclusion proof for item *key* of a block's data.
+
+        *block* is an index or a block hash.  The proof holds the item, its
+        Merkle path and the block header, and is checked with
+        :func:`varus.merkle.verify_proof`.
+
+        Raises
+        ------
+        ChainError
+            If the block is unknown, does not commit to a Merkle root
+            (hash version 3), or has no item *key*.
+        """
+        if isinstance(block, int):
+            try:
+                target = self.read_block(block)
+            except IndexError as exc:
+                raise ChainError(str(exc)) from exc
+        else:
+            target = self.read_by_hash(block)
+            if target is None:
+                raise ChainError(f"No block with hash {block}")
+        if target.hash_version != HASH_V3:
+            raise ChainError(
+                f"Block {target.index} has hash version {target.hash_version}; "
+                f"only version {HASH_V3} blocks commit to a Merkle root."
+            )
+        try:
+            data = target.data
+            path = merkle_path(data, key)
+        except (PayloadUnavailable, ProofError) as exc:
+            raise ChainError(f"Block {target.index}: {exc}") from exc
+        return {"key": key, "value": data[key], "path": path, "header": target.header()}
 
     # ------------------------------------------------------------------
     # Validation
     # ------------------------------------------------------------------
 
-    def validate(self) -> None:
-        """Raise ChainError if the chain is tampered or malformed."""
+    def validate(self, full: bool = True, workers: int = 1, links_only: bool = False) -> None:
+        """Raise ChainError if the chain is tampered or malformed.
+
+        With ``full=True`` (the default) every block is rehashed.  With
+        ``full=False`` only blocks above the validated checkpoint are checked,
+        plus the link from the first of them to the checkpoint tip.
+
+        ``workers > 1`` hashes large ranges across a process pool
+        (see :mod:`varus.validation`).
+
+        ``links_only=True`` checks every ``previous_hash`` link and index but
+        rehashes nothing, so block payloads are never decoded.  It proves the
+        stored headers form a chain, not that they match their contents, and
+        leaves the validated checkpoint untouched.
+        """
         if not self._blocks:
             raise ChainError("Chain has no blocks.")
+        if links_only:
+            self._check_links()
+            return
 
-        genesis = self._blocks[0]
-        if genesis.previous_hash != GENESIS_HASH:
-            raise ChainError("Genesis block has wrong previous_hash.")
-        if not genesis.is_valid():
-            raise ChainError("Genesis block hash mismatch — tampered.")
+        start = 0 if full else min(self._validated, len(self._blocks))
+        if full:
+            self._validated = 0
+            self._assumed = self._history_verified = 0
 
-        for i in range(1, len(self._blocks)):
-            current = self._blocks[i]
-            previous = self._blocks[i - 1]
+        if start == 0:
+            genesis = self._blocks[0]
+            if genesis.previous_hash != GENESIS_HASH:
+                raise ChainError("Genesis block has wrong previous_hash.")
+            if not genesis.is_valid():
+                raise ChainError("Genesis block hash mismatch — tampered.")
 
-            if not current.is_valid():
+        begin = max(start, 1)
+        failure = find_first_failure(
+            self._blocks[begin:],
+            start_index=begin,
+            previous_hash=self._blocks[begin - 1].hash,
+            workers=workers,
+        )
+        if failure:
+            kind, position = failure
+            i = begin + position
+            if kind == HASH_MISMATCH:
                 raise ChainError(
                     f"Block {i} hash mismatch — chain tampered at index {i}."
                 )
-            if current.previous_hash != previous.hash:
+            if kind == LINK_BROKEN:
                 raise ChainError(
                     f"Block {i} previous_hash does not match block {i-1} hash."
                 )
-            if current.index != i:
-                raise ChainError(
-                    f"Block {i} has wrong index {current.index}."
-                )
+            raise ChainError(
+                f"Block {i} has wrong index {self._blocks[i].index}."
+            )
+
+        self._validated = len(self._blocks)
+        self._save_checkpoint()
 
-    def is_valid(self) -> bool:
+    def _check_links(self, blocks: list[Block] | None = None) -> None:
+        blocks = self._blocks if blocks is None else blocks
+        if blocks[0].previous_hash != GENESIS_HASH:
+            raise ChainError("Genesis block has wrong previous_hash.")
+        failure = find_first_failure(blocks, check_hashes=False)
+        if failure:
+            kind, i = failure
+            if kind == LINK_BROKEN:
+                raise ChainError(f"Block {i} previous_hash does not match block {i-1} hash.")
+            raise ChainError(f"Block {i} has wrong index {blocks[i].index}.")
+
+    def is_valid(self, full: bool = True, workers: int = 1) -> bool:
         """Return True if chain passes validation."""
         try:
-            self.validate()
+            self.validate(full=full, workers=workers)
             return True
         except ChainError:
             return False
 
+    def verify_sample(self, sample_size: int, rng: random.Random | None = None) -> None:
+        """Rehash a random sample of already-validated blocks.
+
+        A cheap, periodic complement to incremental validation: history below
+        the checkpoint is not rechecked by ``validate(full=False)``, so this
+        catches on-disk or in-memory tampering probabilistically.
+
+        Raises ChainError on the first mismatch found.
+        """
+        rng = rng or random.Random()
+        validated = min(self._validated, len(self._blocks))
+        if validated == 0:
+            return
+        indices = rng.sample(range(validated), min(sample_size, validated))
+        for i in sorted(indices):
+            block = self._blocks[i]
+            if not block.is_valid():
+                self._validated = min(self._validated, i)
+                raise ChainError(f"Block {i} hash mismatch — chain tampered at index {i}.")
+            if i and block.previous_hash != self._blocks[i - 1].hash:
+                self._validated = min(self._validated, i)
+                raise ChainError(f"Block {i} previous_hash does not match block {i-1} hash.")
+
+    @property
+    def validated_height(self) -> int:
+        """Number of leading blocks known to be valid."""
+        return self._validated
+
+    @property
+    def assumed_height(self) -> int:
+        """Number of leading blocks accepted on a signed checkpoint and not yet rehashed.
+
+        0 once :meth:`verify_history` (or a full :meth:`validate`) has
+        rehashed the whole assumed range.
+        """
+        return self._assumed
+
+    # ------------------------------------------------------------------
+    # Signed checkpoints (assume-valid)
+    # ------------------------------------------------------------------
+
+    def assume_valid(self, record: dict[str, Any], trusted_keys) -> None:
+        """Trust a signed checkpoint for blocks up to its height.
+
+        Blocks ``0 .. height-1`` are then accepted after checking only their
+        hash links and that block ``height-1`` has the signed ``tip_hash``;
+        blocks above it are validated in full as usual.  Call before
+        :meth:`load` to skip rehashing on load, or on a short chain so sync
+        can accept a peer's history the same way (see :meth:`assumable`).
+
+        Raises
+        ------
+        ChainError
+            If the record is not signed by one of *trusted_keys*, names
+            another genesis, or does not match the loaded blocks.
+        """
+        try:
+            verify_checkpoint(record, trusted_keys)
+        except CheckpointError as exc:
+            raise ChainError(str(exc)) from exc
+        self._trusted = normalize_checkpoint(record)
+        if self._blocks:
+            self._apply_trusted_checkpoint()
+
+    def assumable(self, blocks: list[Block]) -> int:
+        """How many leading *blocks* (extending the tip) the trusted checkpoint covers.
+
+        Returns 0 unless the block at the checkpoint height is among
+        *blocks* and carries the signed ``tip_hash``.
+        """
+        if not self._trusted or not blocks:
+            return 0
+        covered = self._trusted["height"] - len(self._blocks)
+        if not 0 < covered <= len(blocks):
+            return 0
+        if blocks[covered - 1].hash != self._trusted["tip_hash"]:
+            return 0
+        if self.genesis.hash != self._trusted["genesis_hash"]:
+            return 0
+        return covered
+
+    def _apply_trusted_checkpoint(self) -> None:
+        if not self._trusted:
+            return
+        height = self._trusted["height"]
+        if self.genesis.hash != self._trusted["genesis_hash"]:
+            raise ChainError("Signed checkpoint is for a different chain (genesis mismatch).")
+        if height > len(self._blocks) or height <= self._validated:
+            return  # not reached yet, or already validated in full
+        if self._blocks[height - 1].hash != self._trusted["tip_hash"]:
+            raise ChainError(
+                f"Block {height - 1} does not match the signed checkpoint tip — "
+                "local history differs from the trusted chain."
+            )
+        self._check_links(self._blocks[:height])
+        self._assume_up_to(height)
+        self._validated = height
+        self._save_checkpoint()
+
+    def _assume_up_to(self, height: int) -> None:
+        if not self._assumed:
+            self._history_verified = min(self._validated, height)
+        self._assumed = max(self._assumed, height)
+
+    def verify_history(self, max_blocks: int | None = None) -> int:
+        """Rehash up to *max_blocks* of the assumed range; return how many remain.
+
+        Run repeatedly (the node does so on each health check) until it
+        returns 0, at which point the whole chain has been deep-verified.
+
+        Raises
+        ------
+        ChainError
+            On the first block that does not hash to its stored hash.  The
+            validated height drops below it, so the chain reports invalid.
+        """
+        if not self._assumed:
+            return 0
+        start = max(self._history_verified, 1)
+        end = self._assumed if max_blocks is None else min(self._assumed, start + max_blocks)
+        if self._history_verified == 0 and not self._blocks[0].is_valid():
+            self._validated = 0
+            raise ChainError("Genesis block hash mismatch — tampered.")
+        failure = find_first_failure(
+            self._blocks[start:end], start_index=start, previous_hash=self._blocks[start - 1].hash
+        )
+        if failure:
+            i = start + failure[1]
+            self._validated = min(self._validated, i)
+            self._assumed = self._history_verified = 0
+            raise ChainError(f"Block {i} hash mismatch — chain tampered at index {i}.")
+        self._history_verified = end
+        if end >= self._assumed:
+            self._assumed = self._history_verified = 0
+        self._checkpoint = None  # progress changed; force a rewrite
+        self._save_checkpoint()
+        return self._assumed - self._history_verified
+
+    def _resume_from_checkpoint(self) -> None:
+        """Trust the persisted checkpoint if it still matches the loaded blocks."""
+        self._validated = 0
+        self._assumed = self._history_verified = 0
+        checkpoint = self.store.read_validated()
+        if not checkpoint:
+            return
+        height = checkpoint.get("height", 0)
+        if 0 < height <= len(self._blocks) and (
+            self._blocks[height - 1].hash == checkpoint.get("tip_hash")
+        ):
+            self._validated = height
+            self._assumed = min(checkpoint.get("assumed", 0), height)
+            self._history_verified = min(checkpoint.get("history_verified", 0), self._assumed)
+            self._checkpoint = checkpoint
+
+    def _save_checkpoint(self) -> None:
+        """Persist the validated height, limited to blocks already on disk."""
+        height = min(self._validated, self._persisted)
+        if height == 0 or not self.store.exists():
+            return
+        if self._checkpoint and self._checkpoint.get("height") == height:
+            return
+        tip_hash = self._blocks[height - 1].hash
+        progress = {}
+        if self._assumed:
+            progress = {"assumed": self._assumed, "history_verified": self._history_verified}
+        self.store.write_validated(height, tip_hash, **progress)
+        self._checkpoint = {"height": height, "tip_hash": tip_hash, **progress}
+
+    # ------------------------------------------------------------------
+    # Forks
+    # ------------------------------------------------------------------
+
+    def reorg(
+        self, fork_index: int, branch: list[Block], validated: bool = False, rule: str = ""
+    ) -> list[Block]:
+        """Replace the blocks after *fork_index* with *branch*; return the old ones.
+
+        *branch* must continue block *fork_index* (the last block both
+        branches share).  The replaced blocks are kept as a side chain (see
+        :meth:`side_chains`) and the switch is appended to the reorg log
+        (:meth:`reorg_history`), naming the fork-choice *rule* that made it.
+        The entry is written before the chain is cut, so a crash can leave
+        an entry for a switch that never finished but never the reverse.
+        ``validated`` is as for :meth:`extend`.
+
+        Raises
+        ------
+        ChainError
+            If *branch* does not continue block *fork_index*, would replace
+            history covered by a signed checkpoint, or is header-only for a
+            full chain.
+        """
+        first = fork_index + 1
+        if not branch or not 0 <= fork_index < len(self._blocks):
+            raise ChainError(f"Nothing to reorganise onto at index {fork_index}.")
+        if branch[0].index != first or branch[0].previous_hash != self._blocks[fork_index].hash:
+            raise ChainError(f"Branch does not continue block {fork_index}.")
+        if first < self.pruned_height:
+            raise ChainError(
+                f"Refusing to replace blocks below {self.pruned_height}, "
+                "compacted into a snapshot."
+            )
+        floor = max(self._assumed, self._trusted["height"] if self._trusted else 0)
+        if first < floor:
+            raise ChainError(
+                f"Refusing to replace blocks below {floor}, covered by a signed checkpoint."
+            )
+        if not self.headers_only and not all(b.has_payload for b in branch):
+            raise ChainError("Cannot extend a full chain with header-only blocks.")
+
+        self.save()
+        removed = self._blocks[first:]
+        if removed:
+            self.add_side_chain(fork_index, removed)
+        self._log_reorg(
+            {
+                "time": time.time(),
+                "fork_index": fork_index,
+                "old_tip": self.tip.hash,
+                "new_tip": branch[-1].hash,
+                "removed": len(removed),
+                "added": len(branch),
+                "rule": rule,
+            }
+        )
+        self.store.truncate(first)
+        del self._blocks[first:]
+        self._persisted = first
+        self._validated = min(self._validated, first)
+        if self._indexes:
+            self._update_indexes()
+        self.extend(branch, validated=validated)
+        self._checkpoint = None  # the old tip may be recorded; force a rewrite
+        self._save_checkpoint()
+        return removed
+
+    def _log_reorg(self, entry: dict[str, Any]) -> None:
+        """Append *entry* to the reorg log, as durably as the store's truncation."""
+        path = self.store.root / REORG_LOG
+        created = not path.exists()
+        with path.open("a") as fh:
+            fh.write(json.dumps(entry) + "\n")
+            if self.store.durability != DURABILITY_BUFFERED:
+                fh.flush()
+                os.fsync(fh.fileno())
+        if created and self.store.durability != DURABILITY_BUFFERED:
+            _fsync_path(path.parent)
+
+    def add_side_chain(self, fork_index: int, blocks: list[Block]) -> None:
+        """Keep *blocks* (a branch forking off after *fork_index*) as a side chain.
+
+        Side chains are stored under the chain store, one JSON file per
+        branch tip; recording the same branch again is a no-op.
+        """
+        if not blocks:
+            return
+        directory = self.store.root / FORKS_DIR
+        path = directory / f"{fork_index:010d}-{blocks[-1].hash[:16]}.json"
+        if path.exists():
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        record = {
+            "fork_index": fork_index,
+            "tip_hash": blocks[-1].hash,
+            "recorded_at": time.time(),
+            "blocks": [self._record(b) for b in blocks],
+        }
+        write_atomic(path, json.dumps(record).encode(), durable=False)
+
+    def side_chains(self) -> list[dict[str, Any]]:
+        """Known side chains, oldest fork first: ``fork_index``, ``tip_hash``, ``length``, ..."""
+        directory = self.store.root / FORKS_DIR
+        if not directory.is_dir():
+            return []
+        chains = []
+        for path in sorted(directory.glob("*.json")):
+            record = json.loads(path.read_text())
+            chains.append(
+                {
+                    "fork_index": record["fork_index"],
+                    "tip_hash": record["tip_hash"],
+                    "length": len(record["blocks"]),
+                    "recorded_at": record["recorded_at"],
+                }
+            )
+        return chains
+
+    def side_chain(self, tip_hash: str) -> list[Block]:
+        """Blocks of the side chain ending at *tip_hash* (a unique prefix will do).
+
+        Raises
+        ------
+        ChainError
+            If no side chain ends at *tip_hash*.
+        """
+        directory = self.store.root / FORKS_DIR
+        for path in sorted(directory.glob("*.json")) if directory.is_dir() else []:
+            record = json.loads(path.read_text())
+            if record["tip_hash"].startswith(tip_hash):
+                return [Block.from_dict(b) for b in record["blocks"]]
+        raise ChainError(f"No side chain ends at {tip_hash!r}")
+
+    def reorg_history(self) -> list[dict[str, Any]]:
+        """Every reorganisation this chain has made, oldest first."""
+        path = self.store.root / REORG_LOG
+        if not path.exists():
+            return []
+        entries = []
+        for line in path.read_text().splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # blank, or torn by a crash while it was appended
+        return entries
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    @property
+    def pruned_height(self) -> int:
+        """Number of leading blocks not held in memory since :meth:`compact`."""
+        return self._blocks.base if isinstance(self._blocks, _ResidentBlocks) else 0
+
+    def compact(self, height: int | None = None, keep: int = DEFAULT_KEEP_BLOCKS) -> dict:
+        """Snapshot the chain at *height* and move the blocks below it out of memory.
+
+        *height* defaults to ``height - keep``.  The snapshot (the header of
+        block ``height-1`` and the validated height) is written to the
+        store, segments holding only older blocks are compressed into its
+        ``archive/`` directory, and blocks below *height* are dropped from
+        memory.  They remain readable through :meth:`get_block`,
+        :meth:`iter_blocks`, :meth:`query` and the rest, which read them back
+        from the store; later loads start from the snapshot instead of
+        replaying the whole log.
+
+        Returns the snapshot, plus ``archived_segments`` (segments compressed
+        by this call) and ``archived_height`` (blocks now in the archive).
+
+        Raises
+        ------
+        ChainError
+            If *height* is below the last compaction or above the validated
+            height; only validated history is compacted.
+        """
+        if not self._blocks:
+            raise ChainError("Chain is empty — call load() first.")
+        self.save()
+        height = self.height - keep if height is None else height
+        validated = min(self._validated, self._persisted)
+        if height < max(1, self.pruned_height):
+            raise ChainError(
+                f"Cannot compact at height {height}; the chain is compacted to "
+                f"{self.pruned_height} already."
+            )
+        if height > validated:
+            raise ChainError(
+                f"Cannot compact at height {height}; only {validated} blocks are validated."
+            )
+        tip = self._blocks[height - 1]
+        snapshot = {
+            "height": height,
+            "tip_hash": tip.hash,
+            "genesis_hash": self.genesis.hash,
+            "header": tip.header(),
+            "validated_height": validated,
+            "created_at": time.time(),
+        }
+        self.store.write_snapshot(snapshot)
+        archived = self.store.archive(height)
+        if height > self.pruned_height:
+            self._blocks = _ResidentBlocks(height, self._blocks[height:], self._read_stored)
+        return {
+            **snapshot,
+            "archived_segments": len(archived),
+            "archived_height": self.store.archived_height,
+        }
+
     # ------------------------------------------------------------------
     # Summary
     # ------------------------------------------------------------------
 
-    def summary(self) -> dict:
+    def summary(self, validate: bool = True) -> dict:
+        """Chain state for status displays.
+
+        ``valid`` comes from an incremental :meth:`validate` run; with
+        ``validate=False`` nothing is rehashed and it reports whether every
+        block is already below the validated height.  Indexes are reported
+        as they stand (``index_heights``: blocks each covers), never updated.
+        """
+        valid = self.is_valid(full=False) if validate else self._validated >= self.height
+        indexes = self._describe_indexes()
         return {
             "height": self.height,
             "genesis_hash": self.genesis.hash,
             "tip_hash": self.tip.hash,
             "tip_index": self.tip.index,
-            "valid": self.is_valid(),
+            "valid": valid,
+            "validated_height": self.validated_height,
+            "assumed_height": self.assumed_height,
+            "pruned_height": self.pruned_height,
+            "headers_only": self.headers_only,
+            "indexes": {name: index["path"] for name, index in indexes.items()},
+            "index_heights": {name: index["height"] for name, index in indexes.items()},
         }
@@ -0,0 +1,160 @@
+"""Signed checkpoints for assume-valid bootstrap of new nodes.
+
+A checkpoint names a block by ``height`` (number of blocks) and
+``tip_hash`` (hash of block ``height - 1``) on the chain identified by
+``genesis_hash``, and is signed with an Ed25519 key.  A node that trusts
+the signer can accept every block up to the checkpoint after checking only
+the hash links leading to it, instead of rehashing the whole history; see
+:meth:`VarusChain.assume_valid`.  Blocks above the checkpoint are still
+fully validated, and :meth:`VarusChain.verify_history` deep-verifies the
+assumed range later (the node does this in the background).
+
+Record format::
+
+    {"genesis_hash": "...", "height": 120000, "tip_hash": "...",
+     "signer": "<hex public key>", "signature": "<hex signature>"}
+
+Keys are hex: a 32-byte Ed25519 seed for signing, a 32-byte public key for
+verifying.  A trust set is a JSON list of public keys (or an object with a
+``"keys"`` list).
+
+PyNaCl is an optional dependency; a RuntimeError with install instructions
+is raised if it is not installed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from .block import canonical_json
+
+_SIGNING_DOMAIN = b"varus-checkpoint/1\n"
+
+
+class CheckpointError(ValueError):
+    """Raised when a checkpoint record is malformed or fails verification."""
+
+
+def _nacl():
+    """Return the ``nacl.signing`` module (requires pynacl)."""
+    try:
+        import nacl.exceptions  # type: ignore[import]
+        import nacl.signing  # type: ignore[import]
+    except ImportError as exc:
+        raise RuntimeError(
+            "pynacl is required for signed checkpoints. "
+            "Install with: pip install pynacl  "
+            "or: pip install 'varus[signing]'"
+        ) from exc
+    return nacl
+
+
+def signing_message(genesis_hash: str, height: int, tip_hash: str) -> bytes:
+    """The exact bytes a checkpoint signature covers."""
+    return _SIGNING_DOMAIN + canonical_json(
+        {"genesis_hash": genesis_hash, "height": height, "tip_hash": tip_hash}
+    )
+
+
+def generate_key() -> tuple[str, str]:
+    """Return a new ``(seed_hex, public_key_hex)`` Ed25519 keypair."""
+    nacl = _nacl()
+    key = nacl.signing.SigningKey.generate()
+    return bytes(key).hex(), bytes(key.verify_key).hex()
+
+
+def public_key(seed_hex: str) -> str:
+    """Public key (hex) for an Ed25519 seed (hex)."""
+    nacl = _nacl()
+    return bytes(nacl.signing.SigningKey(bytes.fromhex(seed_hex)).verify_key).hex()
+
+
+def sign_checkpoint(genesis_hash: str, height: int, tip_hash: str, seed_hex: str) -> dict:
+    """Build a signed checkpoint record."""
+    nacl = _nacl()
+    key = nacl.signing.SigningKey(bytes.fromhex(seed_hex))
+    signature = key.sign(signing_message(genesis_hash, height, tip_hash)).signature
+    return {
+        "genesis_hash": genesis_hash,
+        "height": height,
+        "tip_hash": tip_hash,
+        "signer": bytes(key.verify_key).hex(),
+        "signature": signature.hex(),
+    }
+
+
+def verify_checkpoint(record: dict[str, Any], trusted_keys: set[str] | frozenset[str]) -> None:
+    """Check that *record* is well formed and signed by a trusted key.
+
+    Raises
+    ------
+    CheckpointError
+        If a field is missing, the signer is not trusted, or the signature
+        does not verify.
+    """
+    try:
+        genesis_hash = str(record["genesis_hash"])
+        height = int(record["height"])
+        tip_hash = str(record["tip_hash"])
+        signer = str(record["signer"]).lower()
+        signature = bytes.fromhex(record["signature"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise CheckpointError(f"Malformed checkpoint record: {exc}") from exc
+    if height < 1:
+        raise CheckpointError("Checkpoint height must be at least 1.")
+    if signer not in {key.lower() for key in trusted_keys}:
+        raise CheckpointError(f"Checkpoint signer {signer[:16]}… is not in the trust set.")
+
+    nacl = _nacl()
+    try:
+        verify_key = nacl.signing.VerifyKey(bytes.fromhex(signer))
+        verify_key.verify(signing_message(genesis_hash, height, tip_hash), signature)
+    except (ValueError, nacl.exceptions.BadSignatureError) as exc:
+        raise CheckpointError("Checkpoint signature does not verify.") from exc
+
+
+def normalize_checkpoint(record: dict[str, Any]) -> dict[str, Any]:
+    """Return *record* with its signed fields in the types they are verified as.
+
+    :func:`verify_checkpoint` signs over ``int(height)``, so a record holding
+    ``"height": "5"`` verifies; compare the normalised copy, not the raw one.
+    """
+    return {
+        **record,
+        "genesis_hash": str(record["genesis_hash"]),
+        "height": int(record["height"]),
+        "tip_hash": str(record["tip_hash"]),
+    }
+
+
+def load_trust_set(path: str | Path) -> frozenset[str]:
+    """Read trusted public keys from a JSON list (or ``{"keys": [...]}``) file."""
+    raw = json.loads(Path(path).read_text())
+    keys = raw.get("keys", []) if isinstance(raw, dict) else raw
+    if not isinstance(keys, list) or not all(isinstance(k, str) for k in keys):
+        raise CheckpointError(f"Trust set {path} must be a list of hex public keys.")
+    return frozenset(key.lower() for key in keys)
+
+
+def load_checkpoint(path: str | Path) -> dict[str, Any]:
+    """Read a checkpoint record written by ``varus checkpoint sign``."""
+    record = json.loads(Path(path).read_text())
+    if not isinstance(record, dict):
+        raise CheckpointError(f"Checkpoint file {path} must hold a JSON object.")
+    return record
+
+
+def write_key(path: str | Path, seed_hex: str) -> None:
+    """Write a signing seed readable only by the owner."""
+    path = Path(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as fh:
+        fh.write(seed_hex + "\n")
+
+
+def read_key(path: str | Path) -> str:
+    """Read a signing seed written by :func:`write_key`."""
+    return Path(path).read_text().strip()
@@ -4,10 +4,39 @@ import argparse
 import json
 import logging
 import sys
+from datetime import datetime
 from pathlib import Path
 
-from .chain import VarusChain, ChainError
-from .node import VarusNode
+from .api import MAX_RANGE, NodeAPIError, NodeClient, NodeUnavailable
+from .block import DEFAULT_HASH_VERSION, HASH_V3, Block
+from .chain import DEFAULT_KEEP_BLOCKS, VarusChain, ChainError
+from .checkpoint import (
+    generate_key,
+    load_checkpoint,
+    load_trust_set,
+    normalize_checkpoint,
+    read_key,
+    sign_checkpoint,
+    verify_checkpoint,
+    write_key,
+)
+from .host import DEFAULT_CHAINS_DIR, DEFAULT_DISPATCH_WORKERS, ChainHost, named_chain
+from .merkle import verify_proof
+from .node import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_HISTORY_BATCH,
+    DEFAULT_PARSE_WORKERS,
+    DEFAULT_SOCKET,
+    VarusNode,
+)
+from .storage import (
+    DEFAULT_DURABILITY,
+    DEFAULT_GROUP_BLOCKS,
+    DEFAULT_GROUP_MS,
+    DURABILITY_MODES,
+)
+from .validation import default_workers
+from .watch import DEFAULT_POLL_INTERVAL, WATCH_AUTO, WATCH_MODES
 
 DEFAULT_CHAIN = Path("varus_chain.json")
 
@@ -18,6 +47,25 @@ def _get_chain(args: argparse.Namespace) -> VarusChain:
     return chain
 
 
+_NO_DAEMON = object()
+
+
+def _query_daemon(args: argparse.Namespace, op: str, **params):
+    """Ask a running node serving this chain; return ``_NO_DAEMON`` if there is none.
+
+    Raises NodeAPIError if the node rejects the request.
+    """
+    if getattr(args, "no_daemon", False):
+        return _NO_DAEMON
+    socket_path = Path(getattr(args, "socket", DEFAULT_SOCKET))
+    if not socket_path.exists():
+        return _NO_DAEMON
+    try:
+        return NodeClient(socket_path, chain=args.chain).request(op, **params)
+    except NodeUnavailable:
+        return _NO_DAEMON
+
+
 # ---------------------------------------------------------------------------
 # Sub-command handlers
 # ---------------------------------------------------------------------------
@@ -25,18 +73,20 @@ def _get_chain(args: argparse.Namespace) -> VarusChain:
 def cmd_init(args: argparse.Namespace) -> int:
     """Initialise a new chain (genesis block only)."""
     path = Path(args.chain)
-    if path.exists() and not args.force:
+    chain = VarusChain(path, headers_only=args.headers_only)
+    if chain.exists() and not args.force:
         print(f"Chain already exists at {path}. Use --force to reinitialise.")
         return 1
-    if path.exists() and args.force:
-        path.unlink()
-    chain = VarusChain(path)
+    if chain.exists() and args.force:
+        chain.destroy()
     chain.load()
     genesis = chain.genesis
     print(f"Genesis block created.")
     print(f"  index:     {genesis.index}")
     print(f"  hash:      {genesis.hash}")
     print(f"  chain:     {path}")
+    if chain.headers_only:
+        print("  mode:      headers-only")
     return 0
 
 
@@ -48,8 +98,20 @@ def cmd_add(args: argparse.Namespace) -> int:
         print(f"Invalid JSON data: {exc}", file=sys.stderr)
         return 1
 
-    chain = _get_chain(args)
-    block = chain.add_block(data)
+    hash_version = HASH_V3 if args.merkle else None
+    if hash_version and not isinstance(data, dict):
+        print("--merkle needs block data to be a JSON object", file=sys.stderr)
+        return 1
+
+    result = _query_daemon(args, "submit", data=data, hash_version=hash_version)
+    if result is _NO_DAEMON:
+        try:
+            block = _get_chain(args).add_block(data, hash_version)
+        except ChainError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+    else:
+        block = Block.from_dict(result)
     print(f"Block appended.")
     print(f"  index:         {block.index}")
     print(f"  hash:          {block.hash}")
@@ -57,71 +119,534 @@ def cmd_add(args: argparse.Namespace) -> int:
     return 0
 
 
+def _get_indexed_chain(args: argparse.Namespace) -> VarusChain:
+    """Return a chain for single-block reads.
+
+    Stores with a height index are read in place; anything else (a fresh path
+    or a legacy JSON file) falls back to a full :meth:`VarusChain.load`.
+    """
+    chain = VarusChain(getattr(args, "chain", DEFAULT_CHAIN))
+    if not chain.store.exists():
+        chain.load()
+    return chain
+
+
 def cmd_get(args: argparse.Namespace) -> int:
-    """Display a block by index."""
-    chain = _get_chain(args)
+    """Display a block by index or hash."""
+    query = {"index": int(args.block)} if args.block.isdigit() else {"hash": args.block}
     try:
-        block = chain.get_block(args.index)
-    except IndexError as exc:
+        result = _query_daemon(args, "get", **query)
+    except NodeAPIError as exc:
         print(str(exc), file=sys.stderr)
         return 1
-    print(json.dumps(block.to_dict(), indent=2))
+    if result is _NO_DAEMON:
+        chain = _get_indexed_chain(args)
+        if args.block.isdigit():
+            try:
+                block = chain.read_block(int(args.block))
+            except IndexError as exc:
+                print(str(exc), file=sys.stderr)
+                return 1
+        else:
+            block = chain.read_by_hash(args.block)
+            if block is None:
+                print(f"No block with hash {args.block}", file=sys.stderr)
+                return 1
+        result = block.to_dict()
+    if args.resolve and "data" in result:
+        try:
+            result["data"] = VarusChain(args.chain).resolve(result["data"])
+        except ChainError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def cmd_prove(args: argparse.Namespace) -> int:
+    """Print a Merkle inclusion proof for one item of a block's data."""
+    query = {"index": int(args.block)} if args.block.isdigit() else {"hash": args.block}
+    try:
+        proof = _query_daemon(args, "prove", key=args.key, **query)
+    except NodeAPIError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    if proof is _NO_DAEMON:
+        block = int(args.block) if args.block.isdigit() else args.block
+        try:
+            proof = _get_indexed_chain(args).prove(block, args.key)
+        except ChainError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+    print(json.dumps(proof, indent=2))
+    return 0
+
+
+def cmd_verify_proof(args: argparse.Namespace) -> int:
+    """Check an inclusion proof against the block hash it names."""
+    try:
+        raw = sys.stdin.read() if args.proof == "-" else Path(args.proof).read_text()
+        proof = json.loads(raw)
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"Cannot read proof: {exc}", file=sys.stderr)
+        return 1
+    if not verify_proof(proof):
+        print("Proof is INVALID.", file=sys.stderr)
+        return 2
+    header = proof["header"]
+    print(f"Proof is VALID: {proof['key']!r} is in block {header['index']} ({header['hash']})")
     return 0
 
 
 def cmd_tip(args: argparse.Namespace) -> int:
     """Display the latest block."""
-    chain = _get_chain(args)
-    print(json.dumps(chain.tip.to_dict(), indent=2))
+    result = _query_daemon(args, "tip")
+    if result is not _NO_DAEMON:
+        print(json.dumps(result, indent=2))
+        return 0
+    chain = _get_indexed_chain(args)
+    print(json.dumps(chain.read_tip().to_dict(), indent=2))
     return 0
 
 
 def cmd_status(args: argparse.Namespace) -> int:
     """Display chain summary."""
+    result = _query_daemon(args, "status")
+    if result is not _NO_DAEMON:
+        print(json.dumps(result["chain"], indent=2))
+        return 0
     chain = _get_chain(args)
     summary = chain.summary()
     print(json.dumps(summary, indent=2))
     return 0
 
 
+def cmd_follow(args: argparse.Namespace) -> int:
+    """Print blocks as the daemon appends them, one JSON object per line."""
+    socket_path = Path(args.socket)
+    client = NodeClient(socket_path, chain=args.chain)
+    received = 0
+    try:
+        for event in client.subscribe(args.start, headers_only=args.headers_only):
+            if event["event"] == "rewind":
+                print(f"Chain rewound to height {event['height']}", file=sys.stderr)
+            if event["event"] != "block":
+                continue
+            print(json.dumps(event["block"], separators=(",", ":")), flush=True)
+            received += 1
+            if args.limit is not None and received >= args.limit:
+                break
+    except NodeUnavailable as exc:
+        print(f"follow needs a daemon serving this chain: {exc}", file=sys.stderr)
+        return 1
+    except NodeAPIError as exc:
+        print(f"Subscription refused: {exc}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _parse_time(value: str) -> float:
+    """Parse a Unix timestamp or an ISO-8601 date/time (argparse ``type``)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected a Unix timestamp or ISO-8601 time, got {value!r}"
+        ) from None
+
+
+def _print_compact(block: Block) -> None:
+    print(
+        f"[{block.index:>6}]  {block.hash[:16]}...  prev={block.previous_hash[:12]}..."
+        f"  ts={block.timestamp:.0f}"
+    )
+
+
 def cmd_list(args: argparse.Namespace) -> int:
-    """List all blocks (compact view)."""
-    chain = _get_chain(args)
-    for block in chain.all_blocks():
-        print(
-            f"[{block.index:>6}]  {block.hash[:16]}...  prev={block.previous_hash[:12]}..."
-            f"  ts={block.timestamp:.0f}"
+    """List blocks (compact view), optionally a time window or a page of them."""
+    for block in _iter_blocks(args):
+        _print_compact(block)
+    return 0
+
+
+def _field_filters(pairs: list[str] | None, parse_json: bool) -> dict:
+    """Turn ``NAME=VALUE`` arguments into a filter dict (VALUE as JSON when it parses)."""
+    filters = {}
+    for pair in pairs or []:
+        name, sep, value = pair.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Expected NAME=VALUE, got {pair!r}")
+        if parse_json:
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass  # a bare string
+        filters[name] = value
+    return filters
+
+
+def cmd_query(args: argparse.Namespace) -> int:
+    """List blocks matching secondary-index and time filters."""
+    try:
+        filters = {
+            "equals": _field_filters(args.where, parse_json=True),
+            "prefix": _field_filters(args.prefix, parse_json=False),
+            "since": args.since,
+            "until": args.until,
+        }
+        blocks = list(_iter_query(args, filters))
+    except (ValueError, ChainError, NodeAPIError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps([b.to_dict() for b in blocks], indent=2))
+        return 0
+    for block in blocks:
+        _print_compact(block)
+    return 0
+
+
+def _iter_query(args: argparse.Namespace, filters: dict):
+    """Yield matching blocks, paging through a running node when there is one."""
+    start, remaining = 0, args.limit
+    while remaining is None or remaining > 0:
+        limit = MAX_RANGE if remaining is None else min(MAX_RANGE, remaining)
+        page = _query_daemon(args, "query", start=start, limit=limit, **filters)
+        if page is _NO_DAEMON:
+            if start == 0:
+                yield from _get_indexed_chain(args).query(**filters, limit=args.limit)
+            return
+        for raw in page:
+            yield Block.from_dict(raw)
+        if len(page) < limit:
+            return
+        start = page[-1]["index"] + 1
+        if remaining is not None:
+            remaining -= len(page)
+
+
+def cmd_index(args: argparse.Namespace) -> int:
+    """Add, drop or list secondary indexes on block data fields."""
+    try:
+        if args.index_command == "add":
+            result = _query_daemon(args, "create_index", name=args.name, path=args.path)
+        elif args.index_command == "drop":
+            result = _query_daemon(args, "drop_index", name=args.name)
+        else:
+            status = _query_daemon(args, "status")
+            result = status if status is _NO_DAEMON else status["chain"]["indexes"]
+        if result is _NO_DAEMON:
+            chain = _get_indexed_chain(args)
+            if args.index_command == "add":
+                chain.create_index(args.name, args.path)
+            elif args.index_command == "drop":
+                chain.drop_index(args.name)
+            result = chain.indexes
+    except (ChainError, NodeAPIError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    for name, path in sorted(result.items()):
+        print(f"{name}\t{path}")
+    return 0
+
+
+def cmd_forks(args: argparse.Namespace) -> int:
+    """Show side chains and the reorganisations the chain has made."""
+    chain = VarusChain(args.chain)
+    print(
+        json.dumps(
+            {"side_chains": chain.side_chains(), "reorgs": chain.reorg_history()}, indent=2
         )
+    )
     return 0
 
 
+def cmd_compact(args: argparse.Namespace) -> int:
+    """Snapshot the chain, archive old segments and drop old blocks from memory."""
+    try:
+        result = _query_daemon(args, "compact", height=args.height, keep=args.keep)
+        if result is _NO_DAEMON:
+            result = _get_chain(args).compact(args.height, args.keep)
+    except (ChainError, NodeAPIError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def _iter_blocks(args: argparse.Namespace):
+    """Yield the requested blocks, paging through a running node when there is one.
+
+    Without a node, blocks are streamed from the store's indexes rather than
+    loading the chain.
+    """
+    window = {"since": args.since, "until": args.until}
+    start, remaining = args.start, args.limit
+    while remaining is None or remaining > 0:
+        limit = MAX_RANGE if remaining is None else min(MAX_RANGE, remaining)
+        page = _query_daemon(args, "range", start=start, limit=limit, **window)
+        if page is _NO_DAEMON:
+            if start == args.start:
+                chain = _get_indexed_chain(args)
+                yield from chain.iter_blocks(start=start, limit=remaining, **window)
+            return
+        for raw in page:
+            yield Block.from_dict(raw)
+        if len(page) < limit:
+            return
+        start = page[-1]["index"] + 1
+        if remaining is not None:
+            remaining -= len(page)
+
+
+def _trusted_checkpoint(args: argparse.Namespace):
+    """Read ``--assume-valid``/``--checkpoint`` and ``--trust``; None if not given."""
+    record_path = getattr(args, "assume_valid", None) or getattr(args, "checkpoint", None)
+    if not record_path:
+        return None
+    if not args.trust:
+        raise ValueError("A signed checkpoint needs --trust FILE listing trusted public keys.")
+    return load_checkpoint(record_path), load_trust_set(args.trust)
+
+
 def cmd_validate(args: argparse.Namespace) -> int:
-    """Validate the entire chain."""
-    chain = _get_chain(args)
+    """Validate the chain (full rescan unless --quick, --links-only or --assume-valid)."""
+    chain = VarusChain(getattr(args, "chain", DEFAULT_CHAIN))
+    try:
+        trusted = _trusted_checkpoint(args)
+    except (OSError, ValueError, RuntimeError) as exc:
+        print(f"Cannot use checkpoint: {exc}", file=sys.stderr)
+        return 1
     try:
-        chain.validate()
-        print(f"Chain is VALID. height={chain.height}")
+        if trusted:
+            chain.assume_valid(*trusted)
+        chain.load(validate=not args.links_only)  # a links-only check must not rehash
+        chain.validate(
+            full=not (args.quick or trusted),
+            workers=args.workers or default_workers(),
+            links_only=args.links_only,
+        )
+        scope = " (links only)" if args.links_only else ""
+        if chain.assumed_height:
+            scope += f" (assumed valid below {chain.assumed_height})"
+        print(f"Chain is VALID{scope}. height={chain.height}")
         return 0
     except ChainError as exc:
         print(f"Chain is INVALID: {exc}", file=sys.stderr)
         return 2
 
 
+def cmd_checkpoint_keygen(args: argparse.Namespace) -> int:
+    """Create an Ed25519 signing key for checkpoints and print its public key."""
+    path = Path(args.keyfile)
+    if path.exists() and not args.force:
+        print(f"{path} already exists. Use --force to overwrite.", file=sys.stderr)
+        return 1
+    try:
+        seed, public = generate_key()
+    except RuntimeError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    write_key(path, seed)
+    print(public)
+    return 0
+
+
+def cmd_checkpoint_sign(args: argparse.Namespace) -> int:
+    """Sign the local chain at --height (default: the tip) and print the record."""
+    chain = _get_chain(args)
+    height = args.height or chain.height
+    if not 0 < height <= chain.height:
+        print(f"Height {height} is outside the chain (height={chain.height}).", file=sys.stderr)
+        return 1
+    try:
+        record = sign_checkpoint(
+            chain.genesis.hash, height, chain.get_block(height - 1).hash, read_key(args.key)
+        )
+    except (OSError, ValueError, RuntimeError) as exc:
+        print(f"Cannot sign checkpoint: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(record, indent=2))
+    return 0
+
+
+def cmd_checkpoint_verify(args: argparse.Namespace) -> int:
+    """Check a checkpoint's signature against the trust set (and the local chain, if any)."""
+    try:
+        record = load_checkpoint(args.record)
+        verify_checkpoint(record, load_trust_set(args.trust))
+        record = normalize_checkpoint(record)
+    except (OSError, ValueError, RuntimeError) as exc:
+        print(f"Checkpoint is INVALID: {exc}", file=sys.stderr)
+        return 2
+    chain = VarusChain(args.chain)
+    if chain.exists():
+        chain.load()
+        height = record["height"]
+        if chain.genesis.hash != record["genesis_hash"]:
+            print("Checkpoint is for a different chain (genesis mismatch).", file=sys.stderr)
+            return 2
+        if height <= chain.height and chain.get_block(height - 1).hash != record["tip_hash"]:
+            print(f"Checkpoint does not match local block {height - 1}.", file=sys.stderr)
+            return 2
+    print(f"Checkpoint is VALID: height={record['height']} signer={record['signer'][:16]}…")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Export the chain as a legacy whole-file JSON document."""
+    chain = _get_chain(args)
+    chain.export_json(args.output)
+    print(f"Exported {chain.height} blocks to {args.output}")
+    return 0
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    """Replace the chain with a legacy whole-file JSON document."""
+    chain = VarusChain(args.chain)
+    try:
+        chain.import_json(args.input)
+    except (OSError, ValueError, KeyError, ChainError) as exc:
+        print(f"Import failed: {exc}", file=sys.stderr)
+        return 1
+    print(f"Imported {chain.height} blocks from {args.input}")
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    """Benchmark synthetic chains and print (or save) the JSON report."""
+    from .bench import (  # only this command needs the benchmark suite
+        DEFAULT_APPEND_BATCH,
+        DEFAULT_LOOKUPS,
+        DEFAULT_PAYLOAD_BYTES,
+        DEFAULT_TOLERANCE,
+        compare,
+        run_benchmarks,
+    )
+
+    # The parser leaves these unset so it need not import the suite.
+    payload_bytes = DEFAULT_PAYLOAD_BYTES if args.payload_bytes is None else args.payload_bytes
+    batch = DEFAULT_APPEND_BATCH if args.batch is None else args.batch
+    lookups = DEFAULT_LOOKUPS if args.lookups is None else args.lookups
+    tolerance = DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance
+    try:
+        baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    except (OSError, ValueError) as exc:
+        print(f"Cannot read baseline: {exc}", file=sys.stderr)
+        return 1
+    try:
+        report = run_benchmarks(
+            args.blocks,
+            payload_bytes,
+            workdir=args.dir,
+            batch=batch,
+            lookups=lookups,
+            durability=args.durability,
+            hash_version=HASH_V3 if args.merkle else DEFAULT_HASH_VERSION,
+            sync=not args.no_sync,
+        )
+    except (OSError, ChainError) as exc:
+        print(f"Benchmark failed: {exc}", file=sys.stderr)
+        return 1
+    if baseline is not None:
+        report["regressions"] = compare(report, baseline, tolerance)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        print(f"Wrote benchmark report to {args.output}")
+    else:
+        print(output)
+    for entry in report.get("regressions", []):
+        print(
+            f"REGRESSION {entry['blocks']} blocks: {entry['metric']} "
+            f"{entry['baseline']} -> {entry['current']}",
+            file=sys.stderr,
+        )
+    return 1 if report.get("regressions") else 0
+
+
+def _sizes(value: str) -> list[int]:
+    """Parse a comma-separated list of chain sizes, e.g. ``10000,100000`` (argparse ``type``)."""
+    try:
+        sizes = [int(part.replace("_", "")) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a list of block counts: {value!r}") from None
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError(f"block counts must be positive: {value!r}")
+    return sizes
+
+
 def cmd_daemon(args: argparse.Namespace) -> int:
     """Start the Varus node daemon (blocking)."""
     logging.basicConfig(
         level=logging.DEBUG if args.debug else logging.INFO,
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
+    try:
+        trusted = _trusted_checkpoint(args)
+    except (OSError, ValueError, RuntimeError) as exc:
+        print(f"Cannot use checkpoint: {exc}", file=sys.stderr)
+        return 1
+    checkpoint, trusted_keys = trusted or (None, frozenset())
+    if args.chain_name:
+        return _host_chains(args, checkpoint, trusted_keys)
     node = VarusNode(
         chain_path=args.chain,
+        socket_path=None if args.no_socket else args.socket,
         inbox_dir=args.inbox,
         tick=args.tick,
+        durability=args.durability,
+        group_blocks=args.group_blocks,
+        group_ms=args.group_ms,
+        watch=args.watch,
+        poll_interval=args.poll_interval,
+        batch_size=args.batch_size,
+        parse_workers=args.parse_workers,
+        hash_version=HASH_V3 if args.merkle else DEFAULT_HASH_VERSION,
+        checkpoint=checkpoint,
+        trusted_keys=trusted_keys,
+        history_batch=args.history_batch,
     )
     node.start()
     return 0
 
 
+def _host_chains(args: argparse.Namespace, checkpoint, trusted_keys) -> int:
+    """Run one node hosting every ``--chain-name`` under ``--chains-dir``."""
+    if args.inbox is not None:
+        print("Named chains use their own inboxes; --inbox does not apply", file=sys.stderr)
+        return 1
+    if checkpoint is not None and len(args.chain_name) > 1:
+        print("A checkpoint belongs to one chain; host it alone", file=sys.stderr)
+        return 1
+    host = ChainHost(
+        root=args.chains_dir,
+        names=args.chain_name,
+        socket_path=None if args.no_socket else args.socket,
+        workers=args.workers,
+        tick=args.tick,
+        watch=args.watch,
+        poll_interval=args.poll_interval,
+        parse_workers=args.parse_workers,
+        durability=args.durability,
+        group_blocks=args.group_blocks,
+        group_ms=args.group_ms,
+        batch_size=args.batch_size,
+        hash_version=HASH_V3 if args.merkle else DEFAULT_HASH_VERSION,
+        checkpoint=checkpoint,
+        trusted_keys=trusted_keys,
+        history_batch=args.history_batch,
+    )
+    host.start()
+    return 0
+
+
 def cmd_submit(args: argparse.Namespace) -> int:
     """Submit a block to the node inbox (for daemon processing)."""
     try:
@@ -130,12 +655,20 @@ def cmd_submit(args: argparse.Namespace) -> int:
         print(f"Invalid JSON data: {exc}", file=sys.stderr)
         return 1
 
-    inbox_dir = Path(args.inbox)
+    if args.inbox is not None:
+        inbox_dir = Path(args.inbox)
+    elif args.chain_name:
+        inbox_dir = named_chain(args.chains_dir, args.chain_name[0])[1]
+    else:
+        inbox_dir = Path("varus_inbox")
     inbox_dir.mkdir(parents=True, exist_ok=True)
 
     import time, uuid
     filename = f"{time.time():.6f}_{uuid.uuid4().hex[:8]}.json"
-    (inbox_dir / filename).write_text(json.dumps(data))
+    # Write under a temp name then rename, so the daemon never sees a partial file.
+    tmp = inbox_dir / f".{filename}.tmp"
+    tmp.write_text(json.dumps(data))
+    tmp.rename(inbox_dir / filename)
     print(f"Submitted to inbox: {filename}")
     return 0
 
@@ -152,7 +685,30 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--chain",
         default=str(DEFAULT_CHAIN),
-        help="Path to chain JSON file (default: varus_chain.json)",
+        help="Chain path; blocks are stored in <name>.varus/ (default: varus_chain.json)",
+    )
+    parser.add_argument(
+        "--chain-name",
+        action="append",
+        metavar="NAME",
+        help="Use the named chain <chains-dir>/<NAME>.json and its inbox instead of --chain; "
+        "repeat with daemon to host several chains in one node",
+    )
+    parser.add_argument(
+        "--chains-dir",
+        default=str(DEFAULT_CHAINS_DIR),
+        help=f"Directory of named chains (default: {DEFAULT_CHAINS_DIR})",
+    )
+    parser.add_argument(
+        "--socket",
+        default=str(DEFAULT_SOCKET),
+        help=f"Node query socket; used automatically when a daemon serves this chain "
+        f"(default: {DEFAULT_SOCKET})",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always read the chain from disk, even if a daemon is running",
     )
 
     sub = parser.add_subparsers(dest="command", required=True)
@@ -160,18 +716,41 @@ def build_parser() -> argparse.ArgumentParser:
     # init
     p_init = sub.add_parser("init", help="Initialise a new chain")
     p_init.add_argument("--force", action="store_true", help="Overwrite existing chain")
+    p_init.add_argument(
+        "--headers-only",
+        action="store_true",
+        help="Light chain: store and sync block headers only, fetch payloads on demand",
+    )
     p_init.set_defaults(func=cmd_init)
 
     # add
     p_add = sub.add_parser("add", help="Append a block")
     p_add.add_argument("data", help='JSON data string, e.g. \'{"key": "value"}\'')
+    p_add.add_argument(
+        "--merkle",
+        action="store_true",
+        help="Commit to a Merkle root over the data items (enables `varus prove`)",
+    )
     p_add.set_defaults(func=cmd_add)
 
     # get
-    p_get = sub.add_parser("get", help="Get block by index")
-    p_get.add_argument("index", type=int, help="Block index")
+    p_get = sub.add_parser("get", help="Get block by index or hash")
+    p_get.add_argument("block", help="Block index or hash")
+    p_get.add_argument(
+        "--resolve", action="store_true", help="Inline blob-stored data items (see varus.blobs)"
+    )
     p_get.set_defaults(func=cmd_get)
 
+    # prove / verify-proof
+    p_prove = sub.add_parser("prove", help="Inclusion proof for one item of a block's data")
+    p_prove.add_argument("block", help="Block index or hash")
+    p_prove.add_argument("key", help="Top-level key of the block data")
+    p_prove.set_defaults(func=cmd_prove)
+
+    p_verify = sub.add_parser("verify-proof", help="Check a proof printed by `varus prove`")
+    p_verify.add_argument("proof", help="Proof JSON file, or - for stdin")
+    p_verify.set_defaults(func=cmd_verify_proof)
+
     # tip
     p_tip = sub.add_parser("tip", help="Show the latest block")
     p_tip.set_defaults(func=cmd_tip)
@@ -180,20 +759,274 @@ def build_parser() -> argparse.ArgumentParser:
     p_status = sub.add_parser("status", help="Show chain summary")
     p_status.set_defaults(func=cmd_status)
 
+    # follow
+    p_follow = sub.add_parser("follow", help="Stream blocks from the daemon as they are appended")
+    p_follow.add_argument(
+        "--from",
+        dest="start",
+        type=int,
+        default=None,
+        help="First block index to send (default: the next block appended)",
+    )
+    p_follow.add_argument(
+        "--headers-only", action="store_true", help="Send block headers without data"
+    )
+    p_follow.add_argument(
+        "--limit", type=int, default=None, help="Exit after this many blocks"
+    )
+    p_follow.set_defaults(func=cmd_follow)
+
     # list
-    p_list = sub.add_parser("list", help="List all blocks")
+    p_list = sub.add_parser("list", help="List blocks")
+    p_list.add_argument(
+        "--since", type=_parse_time, default=None, help="Earliest timestamp (Unix or ISO-8601)"
+    )
+    p_list.add_argument(
+        "--until", type=_parse_time, default=None, help="Latest timestamp (Unix or ISO-8601)"
+    )
+    p_list.add_argument(
+        "--from", dest="start", type=int, default=0, help="First block index to list"
+    )
+    p_list.add_argument("--limit", type=int, default=None, help="List at most N blocks")
     p_list.set_defaults(func=cmd_list)
 
+    # query
+    p_query = sub.add_parser("query", help="Find blocks by indexed data fields and time")
+    p_query.add_argument(
+        "--where",
+        action="append",
+        metavar="INDEX=VALUE",
+        help="Indexed field equals VALUE (parsed as JSON if possible); repeatable",
+    )
+    p_query.add_argument(
+        "--prefix",
+        action="append",
+        metavar="INDEX=PREFIX",
+        help="Indexed string field starts with PREFIX; repeatable",
+    )
+    p_query.add_argument(
+        "--since", type=_parse_time, default=None, help="Earliest timestamp (Unix or ISO-8601)"
+    )
+    p_query.add_argument(
+        "--until", type=_parse_time, default=None, help="Latest timestamp (Unix or ISO-8601)"
+    )
+    p_query.add_argument("--limit", type=int, default=None, help="Stop after N matches")
+    p_query.add_argument("--json", action="store_true", help="Print full blocks as JSON")
+    p_query.set_defaults(func=cmd_query)
+
+    # index
+    p_index = sub.add_parser("index", help="Manage secondary indexes on block data fields")
+    index_sub = p_index.add_subparsers(dest="index_command", required=True)
+    p_index_add = index_sub.add_parser("add", help="Index a dotted data path, e.g. sender.id")
+    p_index_add.add_argument("name", help="Index name used by `varus query`")
+    p_index_add.add_argument("path", help="Dotted path into block data")
+    index_sub.add_parser("list", help="List indexes")
+    p_index_drop = index_sub.add_parser("drop", help="Remove an index")
+    p_index_drop.add_argument("name", help="Index name")
+    p_index.set_defaults(func=cmd_index)
+
+    # forks
+    p_forks = sub.add_parser("forks", help="Show side chains and the reorganisation log")
+    p_forks.set_defaults(func=cmd_forks)
+
+    # compact
+    p_compact = sub.add_parser(
+        "compact", help="Snapshot the chain and archive old segments (compressed)"
+    )
+    p_compact.add_argument(
+        "--height", type=int, default=None, help="Snapshot height (default: height - --keep)"
+    )
+    p_compact.add_argument(
+        "--keep",
+        type=int,
+        default=DEFAULT_KEEP_BLOCKS,
+        help=f"Recent blocks to keep in memory (default: {DEFAULT_KEEP_BLOCKS})",
+    )
+    p_compact.set_defaults(func=cmd_compact)
+
     # validate
     p_val = sub.add_parser("validate", help="Validate chain integrity")
+    p_val.add_argument(
+        "--quick",
+        action="store_true",
+        help="Only check blocks above the last validated checkpoint",
+    )
+    p_val.add_argument(
+        "--links-only",
+        action="store_true",
+        help="Check hash links and indexes from block headers without rehashing payloads",
+    )
+    p_val.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to hash blocks (0 = one per CPU core)",
+    )
+    p_val.add_argument(
+        "--assume-valid",
+        metavar="RECORD",
+        default=None,
+        help="Signed checkpoint; history below it is link-checked instead of rehashed",
+    )
+    p_val.add_argument("--trust", default=None, help="JSON list of trusted public keys")
     p_val.set_defaults(func=cmd_validate)
 
+    # checkpoint
+    p_cp = sub.add_parser("checkpoint", help="Create, sign and verify signed checkpoints")
+    cp_sub = p_cp.add_subparsers(dest="checkpoint_command", required=True)
+    p_keygen = cp_sub.add_parser("keygen", help="Create a signing key, print its public key")
+    p_keygen.add_argument("keyfile", help="Where to write the private key (mode 0600)")
+    p_keygen.add_argument("--force", action="store_true", help="Overwrite an existing key")
+    p_keygen.set_defaults(func=cmd_checkpoint_keygen)
+    p_sign = cp_sub.add_parser("sign", help="Sign the chain at a height")
+    p_sign.add_argument("--key", required=True, help="Private key file from `keygen`")
+    p_sign.add_argument("--height", type=int, default=None, help="Blocks covered (default: all)")
+    p_sign.set_defaults(func=cmd_checkpoint_sign)
+    p_cpv = cp_sub.add_parser("verify", help="Check a checkpoint against a trust set")
+    p_cpv.add_argument("record", help="Checkpoint JSON file")
+    p_cpv.add_argument("--trust", required=True, help="JSON list of trusted public keys")
+    p_cpv.set_defaults(func=cmd_checkpoint_verify)
+
+    # export
+    p_export = sub.add_parser("export", help="Export chain as legacy JSON")
+    p_export.add_argument("output", help="Destination JSON file")
+    p_export.set_defaults(func=cmd_export)
+
+    # import
+    p_import = sub.add_parser("import", help="Import a legacy JSON chain")
+    p_import.add_argument("input", help="Source JSON file")
+    p_import.set_defaults(func=cmd_import)
+
+    # bench
+    p_bench = sub.add_parser(
+        "bench", help="Benchmark append, load, validate, lookups and sync on synthetic chains"
+    )
+    p_bench.add_argument(
+        "--blocks",
+        type=_sizes,
+        default=[10_000],
+        help="Comma-separated chain sizes to benchmark (default: 10000)",
+    )
+    p_bench.add_argument(
+        "--payload-bytes",
+        type=int,
+        default=None,
+        help="Approximate JSON size of each block's data, in bytes",
+    )
+    p_bench.add_argument(
+        "--batch",
+        type=int,
+        default=None,
+        help="Blocks appended per commit",
+    )
+    p_bench.add_argument(
+        "--lookups",
+        type=int,
+        default=None,
+        help="get_by_hash calls timed per chain",
+    )
+    p_bench.add_argument(
+        "--durability",
+        choices=DURABILITY_MODES,
+        default=DEFAULT_DURABILITY,
+        help="Durability mode of the benchmark chains",
+    )
+    p_bench.add_argument("--merkle", action="store_true", help="Build hash version 3 blocks")
+    p_bench.add_argument("--no-sync", action="store_true", help="Skip the sync benchmarks")
+    p_bench.add_argument(
+        "--dir", default=None, help="Build chains here and keep them (default: a temp dir)"
+    )
+    p_bench.add_argument("--output", default=None, help="Write the JSON report to this file")
+    p_bench.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        default=None,
+        help="Report metrics worse than in this earlier report; exit 1 if any",
+    )
+    p_bench.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="Allowed slowdown for --compare, as a fraction",
+    )
+    p_bench.set_defaults(func=cmd_bench)
+
     # daemon
     p_daemon = sub.add_parser("daemon", help="Start the node daemon")
     p_daemon.add_argument("--inbox", default=None, help="Inbox directory path")
     p_daemon.add_argument(
         "--tick", type=int, default=10, help="Health-check interval in seconds"
     )
+    p_daemon.add_argument(
+        "--watch",
+        choices=WATCH_MODES,
+        default=WATCH_AUTO,
+        help="How to detect inbox files: inotify, polling, or auto (inotify if available)",
+    )
+    p_daemon.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between inbox scans when polling",
+    )
+    p_daemon.add_argument(
+        "--durability",
+        choices=DURABILITY_MODES,
+        default=DEFAULT_DURABILITY,
+        help="fsync every commit, group-commit, or leave writes OS-buffered",
+    )
+    p_daemon.add_argument(
+        "--group-blocks",
+        type=int,
+        default=DEFAULT_GROUP_BLOCKS,
+        help="Group commit: fsync after this many blocks",
+    )
+    p_daemon.add_argument(
+        "--group-ms",
+        type=int,
+        default=DEFAULT_GROUP_MS,
+        help="Group commit: fsync at most this many milliseconds after a write",
+    )
+    p_daemon.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Inbox items claimed and appended per commit (default: {DEFAULT_BATCH_SIZE})",
+    )
+    p_daemon.add_argument(
+        "--parse-workers",
+        type=int,
+        default=DEFAULT_PARSE_WORKERS,
+        help=f"Threads parsing claimed inbox items (default: {DEFAULT_PARSE_WORKERS})",
+    )
+    p_daemon.add_argument(
+        "--merkle",
+        action="store_true",
+        help="Make inbox blocks commit to a Merkle root over their data items",
+    )
+    p_daemon.add_argument(
+        "--no-socket", action="store_true", help="Do not serve the query API socket"
+    )
+    p_daemon.add_argument(
+        "--checkpoint",
+        metavar="RECORD",
+        default=None,
+        help="Signed checkpoint to assume valid; older history is verified in the background",
+    )
+    p_daemon.add_argument("--trust", default=None, help="JSON list of trusted public keys")
+    p_daemon.add_argument(
+        "--history-batch",
+        type=int,
+        default=DEFAULT_HISTORY_BATCH,
+        help="Assumed-valid blocks rehashed per health check",
+    )
+    p_daemon.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_DISPATCH_WORKERS,
+        help="With several --chain-name: chains appended to at the same time "
+        f"(default: {DEFAULT_DISPATCH_WORKERS})",
+    )
     p_daemon.add_argument("--debug", action="store_true", help="Enable debug logging")
     p_daemon.set_defaults(func=cmd_daemon)
 
@@ -201,7 +1034,9 @@ def build_parser() -> argparse.ArgumentParser:
     p_submit = sub.add_parser("submit", help="Submit block data to daemon inbox")
     p_submit.add_argument("data", help="JSON data string")
     p_submit.add_argument(
-        "--inbox", default="varus_inbox", help="Inbox directory path"
+        "--inbox",
+        default=None,
+        help="Inbox directory path (default: the named chain's inbox, else varus_inbox)",
     )
     p_submit.set_defaults(func=cmd_submit)
 
@@ -211,6 +1046,13 @@ def build_parser() -> argparse.ArgumentParser:
 def main(argv: list[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.chain_name:
+        if len(args.chain_name) > 1 and args.command != "daemon":
+            parser.error("only daemon takes more than one --chain-name")
+        try:
+            args.chain = str(named_chain(args.chains_dir, args.chain_name[0])[0])
+        except ValueError as exc:
+            parser.error(str(exc))
     return args.func(args)
 
 
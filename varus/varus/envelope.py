@@ -0,0 +1,193 @@
+"""Wire format for chain transfers: compressed, chunked envelopes.
+
+A snapshot or delta is sent as one or more *chunk* envelopes.  Each is a
+JSON header line followed by that chunk's blocks as newline-delimited JSON,
+compressed as one stream::
+
+    {"type": "varus_chain_delta", "transfer_id": "varus-...", "seq": 0,
+     "final": false, "first_index": 120, "anchor_index": 119,
+     "anchor_hash": "...", "count": 812, "last_hash": "...",
+     "encoding": "zlib", ...}\\n
+    <zlib of b'{"index":120,...}\\n{"index":121,...}\\n...'>
+
+A chunk is cut once it holds ``chunk_bytes`` of uncompressed block JSON, so
+envelope size is bounded however many blocks are transferred.  Every chunk
+after the first of a snapshot names the block it continues
+(``anchor_hash``), so a receiver can apply each chunk as soon as its anchor
+is in the chain -- in any order, and after a restart.  :func:`iter_blocks`
+inflates the body a slice at a time, so a receiver holds one decoded block
+at a time rather than the whole transfer.
+
+Envelopes without blocks (adverts, payload requests) and single-envelope
+snapshots from older nodes are plain JSON objects with no header line;
+:func:`split_envelope` tells the two apart.
+"""
+
+from __future__ import annotations
+
+import json
+import lzma
+import zlib
+from typing import Any, Iterable, Iterator
+
+ENCODING_ZLIB = "zlib"
+ENCODING_LZMA = "lzma"
+ENCODING_NONE = "none"
+ENCODINGS = (ENCODING_ZLIB, ENCODING_LZMA, ENCODING_NONE)
+DEFAULT_ENCODING = ENCODING_ZLIB
+
+DEFAULT_CHUNK_BYTES = 1 << 20  # uncompressed block JSON per chunk
+_INFLATE_BYTES = 64 * 1024  # decompressed bytes produced per step
+
+
+class EnvelopeError(ValueError):
+    """Raised for a chunk envelope that is truncated or malformed."""
+
+
+def _compressor(encoding: str):
+    if encoding == ENCODING_ZLIB:
+        return zlib.compressobj(6)
+    if encoding == ENCODING_LZMA:
+        return lzma.LZMACompressor()
+    if encoding == ENCODING_NONE:
+        return None
+    raise ValueError(f"Unknown encoding {encoding!r}; expected one of {ENCODINGS}")
+
+
+def encode_chunks(
+    header: dict[str, Any],
+    blocks: Iterable[dict],
+    first_index: int,
+    anchor_hash: str | None = None,
+    encoding: str = DEFAULT_ENCODING,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """Yield the chunk envelopes carrying *blocks*, one at a time.
+
+    *header* holds the fields shared by every chunk (``type``, ``sender``,
+    ``transfer_id``, ...).  *blocks* are block dicts starting at chain
+    index *first_index*; *anchor_hash* is the hash of the block before them
+    (``None`` for a snapshot starting at genesis).  At least one chunk is
+    produced, so an empty transfer still reaches the peer as an advert.
+    """
+    chunk_bytes = max(1, chunk_bytes)
+    seq, index = 0, first_index
+    pending: list[bytes] = []
+    size = 0
+    last_hash = anchor_hash
+
+    def chunk(final: bool) -> bytes:
+        body = b"".join(pending)
+        compressor = _compressor(encoding)
+        if compressor is not None:
+            body = compressor.compress(body) + compressor.flush()
+        start = index - len(pending)
+        fields = {
+            **header,
+            "envelope_id": f"{header['transfer_id']}.{seq}",
+            "seq": seq,
+            "final": final,
+            "first_index": start,
+            "count": len(pending),
+            "last_hash": last_hash,
+            "encoding": encoding,
+        }
+        if start > 0:
+            fields["anchor_index"] = start - 1
+            fields["anchor_hash"] = chunk_anchor
+        return json.dumps(fields, separators=(",", ":")).encode() + b"\n" + body
+
+    chunk_anchor = anchor_hash
+    for block in blocks:
+        line = json.dumps(block, separators=(",", ":")).encode() + b"\n"
+        pending.append(line)
+        size += len(line)
+        index += 1
+        last_hash = block["hash"]
+        if size >= chunk_bytes:
+            yield chunk(final=False)
+            seq += 1
+            pending, size, chunk_anchor = [], 0, last_hash
+    yield chunk(final=True)
+
+
+def split_envelope(envelope_bytes: bytes) -> tuple[dict[str, Any], bytes | None]:
+    """Return ``(header, body)``; *body* is None for a plain JSON envelope.
+
+    Raises
+    ------
+    ValueError
+        If the header (or plain envelope) is not JSON.
+    """
+    head, sep, body = envelope_bytes.partition(b"\n")
+    if not sep:
+        return json.loads(envelope_bytes), None
+    header = json.loads(head)
+    if not isinstance(header, dict):
+        raise EnvelopeError("Chunk header is not a JSON object")
+    return header, body
+
+
+def _inflate(body: bytes, encoding: str) -> Iterator[bytes]:
+    if encoding == ENCODING_NONE:
+        for start in range(0, len(body), _INFLATE_BYTES):
+            yield body[start : start + _INFLATE_BYTES]
+        return
+    if encoding == ENCODING_ZLIB:
+        inflater = zlib.decompressobj()
+    elif encoding == ENCODING_LZMA:
+        inflater = lzma.LZMADecompressor()
+    else:
+        raise EnvelopeError(f"Unknown encoding {encoding!r}")
+    data = body
+    try:
+        while not inflater.eof:
+            out = inflater.decompress(data, _INFLATE_BYTES)
+            if encoding == ENCODING_ZLIB:
+                data = inflater.unconsumed_tail
+                stalled = not out and not data
+            else:
+                data = b""  # LZMADecompressor buffers unused input itself
+                stalled = not out and inflater.needs_input
+            if stalled and not inflater.eof:
+                raise EnvelopeError("Chunk body is truncated")
+            yield out
+    except (zlib.error, lzma.LZMAError) as exc:
+        raise EnvelopeError(f"Chunk body does not decompress: {exc}") from exc
+
+
+def iter_blocks(header: dict[str, Any], body: bytes) -> Iterator[dict]:
+    """Decode a chunk body incrementally, yielding one block dict at a time.
+
+    Raises
+    ------
+    EnvelopeError
+        If the body is corrupt or holds a different number of blocks than
+        the header's ``count``.
+    """
+    buffered = b""
+    count = 0
+    for piece in _inflate(body, header.get("encoding", DEFAULT_ENCODING)):
+        buffered += piece
+        *lines, buffered = buffered.split(b"\n")
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise EnvelopeError(f"Bad block record in chunk: {exc}") from exc
+            count += 1
+    if buffered.strip() or count != header.get("count", count):
+        raise EnvelopeError(
+            f"Chunk holds {count} complete blocks, header says {header.get('count')}"
+        )
+
+
+def read_envelope(envelope_bytes: bytes) -> dict[str, Any]:
+    """Decode a whole envelope into one dict, with chunk blocks under ``blocks``.
+
+    Meant for inspection and tests; the sync path streams instead.
+    """
+    header, body = split_envelope(envelope_bytes)
+    if body is None:
+        return header
+    return {**header, "blocks": list(iter_blocks(header, body))}
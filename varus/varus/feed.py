@@ -0,0 +1,195 @@
+"""Push feed of newly appended blocks for node subscribers.
+
+The node hands every batch it appends to :meth:`BlockFeed.publish`, which
+only appends the blocks to each subscriber's bounded buffer and wakes it --
+publishing never blocks the writer, however slow a subscriber is.
+
+A :class:`Subscription` hands out events in chain order from its next
+height.  When that block is not in the buffer -- the subscription started
+below the tip, or the buffer overflowed and dropped its oldest blocks while
+the subscriber was busy -- it reads the missing range from the chain
+instead, a page at a time.  A slow subscriber therefore falls back to
+reading the store at its own pace and never loses blocks, while memory per
+subscriber stays bounded by its buffer.
+
+Events are dicts::
+
+    {"event": "block", "block": {...}}        # full block, or header only
+    {"event": "rewind", "height": 118}        # chain was truncated below us
+
+A subscription may start above the tip; it then waits for that height.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Callable, Iterable
+
+from .block import Block
+
+DEFAULT_BUFFER_BLOCKS = 1024  # blocks buffered per subscriber
+MAX_BUFFER_BLOCKS = 65536
+MAX_SUBSCRIBERS = 64
+PAGE_BLOCKS = 1000  # blocks read from the chain per catch-up step
+
+
+class FeedError(RuntimeError):
+    """Raised when a subscription cannot be opened."""
+
+
+class Subscription:
+    """One subscriber's position in the feed; see :meth:`BlockFeed.subscribe`."""
+
+    def __init__(
+        self,
+        feed: "BlockFeed",
+        start: int,
+        headers_only: bool = False,
+        buffer: int = DEFAULT_BUFFER_BLOCKS,
+    ) -> None:
+        self.feed = feed
+        self.start = self.next = max(0, start)
+        self.headers_only = headers_only
+        self.buffer = max(1, buffer)
+        self.sent = 0
+        self.dropped = 0  # buffered blocks overwritten before they were taken
+        self.closed = False
+        self._queue: deque[Block] = deque(maxlen=self.buffer)
+        self._cond = threading.Condition()
+
+    def push(self, blocks: Iterable[Block]) -> None:
+        with self._cond:
+            for block in blocks:
+                if len(self._queue) == self.buffer:
+                    self.dropped += 1
+                self._queue.append(block)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def events(self, timeout: float | None = None, limit: int = PAGE_BLOCKS) -> list[dict]:
+        """Wait up to *timeout* seconds for blocks from :attr:`next` on.
+
+        Returns up to *limit* events in chain order, or an empty list if
+        nothing arrived (or the subscription was closed).
+        """
+        with self._cond:
+            if not self._queue and self.next >= self.feed.height() and not self.closed:
+                self._cond.wait(timeout)
+            if self.closed:
+                return []
+            while self._queue and self._queue[0].index < self.next:
+                self._queue.popleft()
+            blocks = []
+            while self._queue and len(blocks) < limit and self._queue[0].index == self.next:
+                blocks.append(self._queue.popleft())
+                self.next += 1
+        if not blocks:
+            height = self.feed.height()
+            if height < self.next and self.next > self.start:  # blocks we sent are gone
+                self.start = self.next = height
+                return [{"event": "rewind", "height": height}]
+            if height > self.next:
+                blocks = self.feed.read(self.next, min(limit, height - self.next))
+                if blocks:
+                    self.next = blocks[-1].index + 1
+                    with self._cond:
+                        while self._queue and self._queue[0].index < self.next:
+                            self._queue.popleft()
+        self.sent += len(blocks)
+        return [{"event": "block", "block": self._encode(block)} for block in blocks]
+
+    def _encode(self, block: Block) -> dict:
+        if self.headers_only or not block.has_payload:
+            return block.to_header_dict()
+        return block.to_dict()
+
+    def stats(self) -> dict:
+        return {
+            "next": self.next,
+            "headers_only": self.headers_only,
+            "buffered": len(self._queue),
+            "buffer": self.buffer,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+class BlockFeed:
+    """Fan newly appended blocks out to subscribers.
+
+    Parameters
+    ----------
+    read:
+        ``read(start, limit)`` returns up to *limit* blocks from chain index
+        *start*; used when a subscriber is behind its buffer.
+    height:
+        Returns the current chain height.
+    max_subscribers:
+        Open subscriptions allowed at once.
+    """
+
+    def __init__(
+        self,
+        read: Callable[[int, int], list[Block]],
+        height: Callable[[], int],
+        max_subscribers: int = MAX_SUBSCRIBERS,
+    ) -> None:
+        self.read = read
+        self.height = height
+        self.max_subscribers = max_subscribers
+        self._subscriptions: list[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        start: int | None = None,
+        headers_only: bool = False,
+        buffer: int = DEFAULT_BUFFER_BLOCKS,
+    ) -> Subscription:
+        """Open a subscription from chain index *start* (default: the next block).
+
+        Raises
+        ------
+        FeedError
+            If ``max_subscribers`` subscriptions are already open.
+        """
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                raise FeedError(f"Too many subscribers (max {self.max_subscribers})")
+            position = self.height() if start is None else start
+            subscription = Subscription(self, position, headers_only, buffer)
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, blocks: list[Block]) -> None:
+        """Hand freshly appended *blocks* to every subscriber (never blocks on them)."""
+        if not blocks:
+            return
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.push(blocks)
+
+    def close(self) -> None:
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "subscriptions": [s.stats() for s in self._subscriptions],
+            }
@@ -0,0 +1,138 @@
+"""Fork detection and fork choice for chain sync.
+
+Finding the common ancestor
+---------------------------
+Because every block commits to its predecessor, two chains that disagree at
+some index disagree at every index after it: "same hash at index *i*" is
+true for a prefix of indices and false after.  :func:`find_fork_point`
+binary-searches that boundary, so locating the last common block costs
+O(log n) hash comparisons instead of a walk over the overlap.
+
+A peer that is on a different branch can't be sent a delta anchored at its
+tip (we don't have it).  Adverts therefore carry a *block locator*
+(:func:`block_locator`): the hashes at the tip, tip-1, tip-2, tip-4, ...
+down to genesis.  The sender anchors its delta at the highest locator entry
+it shares, which is within a factor of two of the real fork point; the
+receiver then pins the fork point down with :func:`find_fork_point`.
+
+Fork choice
+-----------
+When a peer's branch competes with ours, a fork-choice rule decides which
+one the chain follows; the loser is kept as a side chain (see
+:meth:`VarusChain.add_side_chain` and :meth:`VarusChain.reorg`).  A rule is
+any callable ``rule(local_branch, remote_branch) -> bool`` returning True to
+switch to the remote branch; both branches start right after the common
+ancestor.  Built in (see :data:`FORK_CHOICE_RULES`):
+
+- ``longest``  — the branch with more blocks (the default; ties keep ours).
+- ``heaviest`` — the branch with more cumulative work, where a block's work
+  is ``2 ** (leading zero bits of its hash)``.
+- ``earliest`` — the branch whose first block has the earlier timestamp
+  (ties broken by the lower hash), i.e. first seen wins.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Sequence
+
+from .block import Block
+
+ForkChoice = Callable[[Sequence[Block], Sequence[Block]], bool]
+
+LOCATOR_DENSE = 8  # most recent blocks listed one by one before the gaps double
+
+
+def block_locator(height: int, hash_at: Callable[[int], str]) -> list[list]:
+    """``[[index, hash], ...]`` from the tip down to genesis, exponentially spaced."""
+    locator = []
+    index, step = height - 1, 1
+    while index > 0:
+        locator.append([index, hash_at(index)])
+        if len(locator) >= LOCATOR_DENSE:
+            step *= 2
+        index -= step
+    if height:
+        locator.append([0, hash_at(0)])
+    return locator
+
+
+def locator_anchor(locator: list, height: int, hash_at: Callable[[int], str]) -> int | None:
+    """Highest locator index whose hash matches ours, or None if none does."""
+    for entry in locator or []:
+        try:
+            index, block_hash = int(entry[0]), entry[1]
+        except (TypeError, ValueError, IndexError):
+            continue
+        if 0 <= index < height and hash_at(index) == block_hash:
+            return index
+    return None
+
+
+def find_fork_point(
+    remote: Sequence[Block], first_index: int, height: int, hash_at: Callable[[int], str]
+) -> int:
+    """Return the index of the last block *remote* shares with the local chain.
+
+    *remote* holds consecutive blocks starting at chain index *first_index*;
+    the local block at ``first_index - 1`` (a delta's anchor) is taken as
+    shared.  Returns ``first_index - 1`` if even the first overlapping block
+    differs.  Uses binary search, so about ``log2(overlap)`` hashes are
+    compared.
+    """
+    lo = first_index - 1  # known shared
+    hi = min(height, first_index + len(remote)) - 1  # last index both chains have
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if remote[mid - first_index].hash == hash_at(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def block_work(block: Block) -> int:
+    """Work a block's hash represents: ``2 ** leading zero bits``."""
+    value = int(block.hash, 16)
+    return 2 ** (len(block.hash) * 4 - value.bit_length())
+
+
+def longest(local: Sequence[Block], remote: Sequence[Block]) -> bool:
+    return len(remote) > len(local)
+
+
+def heaviest(local: Sequence[Block], remote: Sequence[Block]) -> bool:
+    return sum(map(block_work, remote)) > sum(map(block_work, local))
+
+
+def earliest(local: Sequence[Block], remote: Sequence[Block]) -> bool:
+    if not remote:
+        return False
+    if not local:
+        return True
+    return (remote[0].timestamp, remote[0].hash) < (local[0].timestamp, local[0].hash)
+
+
+FORK_CHOICE_RULES: dict[str, ForkChoice] = {
+    "longest": longest,
+    "heaviest": heaviest,
+    "earliest": earliest,
+}
+DEFAULT_FORK_CHOICE = "longest"
+
+
+def get_fork_choice(rule: str | ForkChoice) -> tuple[str, ForkChoice]:
+    """Resolve a rule name (or callable) to ``(name, callable)``.
+
+    Raises
+    ------
+    ValueError
+        For an unknown rule name.
+    """
+    if callable(rule):
+        return getattr(rule, "__name__", "custom"), rule
+    try:
+        return rule, FORK_CHOICE_RULES[rule]
+    except KeyError:
+        raise ValueError(
+            f"Unknown fork-choice rule {rule!r}; expected one of {sorted(FORK_CHOICE_RULES)}"
+        ) from None
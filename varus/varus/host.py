@@ -0,0 +1,330 @@
+"""Host several named chains in one Varus node.
+
+Each hosted chain keeps its own storage, inbox and lock -- it is a
+:class:`~varus.node.VarusNode` that is never started on its own -- and the
+host drives them all from one process::
+
+    varus_chains/
+        audit.json          # chain path (blocks in audit.varus/)
+        audit.varus/
+        audit.inbox/        # inbox namespace of "audit"
+        payments.varus/
+        payments.inbox/
+        varus_blobs/        # blob store shared by the hosted chains
+
+One watcher covers every inbox and a shared dispatcher pool runs the work:
+a *step* appends at most one inbox batch to one chain, preceded by its
+health check when that is due.  Chains with work wait in a round-robin
+queue and a chain goes to the back of it after each step, so a chain with a
+deep inbox gets one batch per turn and cannot starve the others.  A chain
+has at most one step running at a time; its reads are served concurrently
+under its own lock.  Claimed items are parsed on a second shared pool.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+from .api import NodeAPIServer
+from .node import (
+    DEFAULT_PARSE_WORKERS,
+    DEFAULT_SOCKET,
+    DEFAULT_TICK,
+    VarusNode,
+)
+from .watch import DEFAULT_POLL_INTERVAL, WATCH_AUTO, InboxWatcher, make_watcher
+
+logger = logging.getLogger("varus.host")
+
+DEFAULT_CHAINS_DIR = Path("varus_chains")
+DEFAULT_DISPATCH_WORKERS = 4  # chains worked on at the same time
+INBOX_SUFFIX = ".inbox"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+def named_chain(root: str | Path, name: str) -> tuple[Path, Path]:
+    """Return ``(chain_path, inbox_dir)`` of the chain called *name* under *root*.
+
+    Raises
+    ------
+    ValueError
+        If *name* is not 1-64 letters, digits, ``_`` or ``-`` (starting with
+        a letter or digit).
+    """
+    if not isinstance(name, str) or not _NAME_RE.match(name):
+        raise ValueError(f"Invalid chain name {name!r}: use letters, digits, '_' and '-'")
+    root = Path(root)
+    return root / f"{name}.json", root / f"{name}{INBOX_SUFFIX}"
+
+
+class ChainHost:
+    """Node hosting the named chains *names* under *root*.
+
+    Parameters
+    ----------
+    root:
+        Directory holding the chains and their inboxes.
+    names:
+        Chains to host; created on first start if they do not exist.
+    socket_path:
+        Query API socket serving every hosted chain, or None.
+    workers:
+        Dispatcher threads, i.e. chains appended to at the same time.
+    tick:
+        Seconds between health checks of each chain.
+    watch, poll_interval:
+        How inboxes are watched (see :func:`~varus.watch.make_watcher`).
+    parse_workers:
+        Threads parsing claimed inbox items, shared by all chains.
+    **node_options:
+        Passed to each chain's :class:`~varus.node.VarusNode` (durability,
+        batch size, hash version, checkpoint, ...).
+    """
+
+    def __init__(
+        self,
+        root: str | Path = DEFAULT_CHAINS_DIR,
+        names: Iterable[str] = (),
+        socket_path: str | Path | None = DEFAULT_SOCKET,
+        workers: int = DEFAULT_DISPATCH_WORKERS,
+        tick: int = DEFAULT_TICK,
+        watch: str = WATCH_AUTO,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        parse_workers: int = DEFAULT_PARSE_WORKERS,
+        **node_options: Any,
+    ) -> None:
+        self.root = Path(root)
+        self.workers = max(1, workers)
+        self.tick = tick
+        self.watch = watch
+        self.poll_interval = poll_interval
+        self.parse_workers = max(1, parse_workers)
+        self.node_options = node_options
+        self.nodes: dict[str, VarusNode] = {}
+        self.api = NodeAPIServer(self, socket_path) if socket_path else None
+        self._parser: ThreadPoolExecutor | None = None
+        self._watcher: InboxWatcher | None = None
+        self._running = False
+        self._cond = threading.Condition()
+        self._ready: deque[str] = deque()  # chains waiting for a step, in turn order
+        self._queued: set[str] = set()  # chains in _ready or running a step
+        self._running_steps: set[str] = set()
+        self._next_health: dict[str, float] = {}
+        self.steps = 0
+        for name in names:
+            self.add_chain(name)
+
+    def add_chain(self, name: str) -> VarusNode:
+        """Host the chain called *name*; call before :meth:`start`.
+
+        Raises
+        ------
+        ValueError
+            If the name is invalid or already hosted.
+        RuntimeError
+            If the host is running.
+        """
+        if self._running:
+            raise RuntimeError("Chains must be added before the host starts")
+        if name in self.nodes:
+            raise ValueError(f"Chain {name!r} is already hosted")
+        chain_path, inbox_dir = named_chain(self.root, name)
+        node = VarusNode(
+            chain_path=chain_path,
+            inbox_dir=inbox_dir,
+            socket_path=None,
+            tick=self.tick,
+            parse_workers=self.parse_workers,
+            name=name,
+            **self.node_options,
+        )
+        self.nodes[name] = node
+        return node
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Load every chain then dispatch their inboxes (blocking)."""
+        if not self.nodes:
+            raise RuntimeError("No chains to host")
+        logger.info("Varus host starting with %d chains…", len(self.nodes))
+        self.open()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_signal)
+        if self.api is not None:
+            self.api.start()
+        try:
+            self._loop()
+        finally:
+            if self.api is not None:
+                self.api.stop()
+
+    def open(self) -> None:
+        """Load every chain and recover inbox batches interrupted by a crash."""
+        self._parser = ThreadPoolExecutor(
+            max_workers=self.parse_workers, thread_name_prefix="varus-parse"
+        )
+        for node in self.nodes.values():
+            node._parser = self._parser
+            node._open()
+            node._recover_claimed()
+            node._running = True
+        now = time.monotonic()
+        self._next_health = {name: now for name in self.nodes}
+        self._running = True
+
+    def stop(self) -> None:
+        logger.info("Varus host stopping.")
+        self._running = False
+        if self._watcher is not None:
+            self._watcher.wake()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _handle_signal(self, signum: int, frame: Any) -> None:
+        logger.info("Signal %d received — shutting down.", signum)
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def _loop(self) -> None:
+        """Run chain steps on the dispatcher pool until stopped."""
+        inboxes = [node.inbox.inbox_dir for node in self.nodes.values()]
+        self._watcher = make_watcher(inboxes[0], self.watch, self.poll_interval)
+        for inbox_dir in inboxes[1:]:
+            self._watcher.add(inbox_dir)
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="varus-dispatch")
+        try:
+            while self._running:
+                self._schedule()
+                with self._cond:
+                    self._launch(pool)
+                    busy = bool(self._running_steps)
+                    if busy:
+                        self._cond.wait(self._until_health())
+                if not busy and self._running:
+                    self._watcher.wait(self._until_health())
+        finally:
+            pool.shutdown(wait=True)
+            self._watcher.close()
+            self._watcher = None
+            self.close()
+        logger.info("Host loop exited cleanly.")
+
+    def close(self) -> None:
+        """Flush every chain and release the parse pool."""
+        for node in self.nodes.values():
+            node._running = False
+            node.feed.close()
+            with node._lock.write():
+                node.chain.flush()
+        if self._parser is not None:
+            self._parser.shutdown()
+            self._parser = None
+
+    def _schedule(self) -> None:
+        """Queue every chain with inbox items or a health check due, behind those waiting."""
+        now = time.monotonic()
+        with self._cond:
+            for name, node in self.nodes.items():
+                if name in self._queued:
+                    continue
+                if now >= self._next_health[name] or node.inbox.count():
+                    self._queued.add(name)
+                    self._ready.append(name)
+
+    def _launch(self, pool: ThreadPoolExecutor) -> None:
+        """Start queued steps in turn order while workers are free; hold ``_cond``."""
+        while self._ready and len(self._running_steps) < self.workers:
+            name = self._ready.popleft()
+            self._running_steps.add(name)
+            pool.submit(self._step, name)
+
+    def _until_health(self) -> float:
+        return max(0.0, min(self._next_health.values()) - time.monotonic())
+
+    def run_pending(self) -> int:
+        """Run steps on the calling thread until no chain has work; return how many ran.
+
+        Chains take turns exactly as on the dispatcher pool.  Meant for
+        tests and tools that drive the host without :meth:`start`.
+        """
+        ran = 0
+        self._schedule()
+        while self._ready:
+            name = self._ready.popleft()
+            self._running_steps.add(name)
+            self._step(name)
+            ran += 1
+            self._schedule()
+        return ran
+
+    def _step(self, name: str) -> None:
+        """Health-check *name* if due, then append at most one inbox batch."""
+        node = self.nodes[name]
+        try:
+            if time.monotonic() >= self._next_health[name]:
+                node._health_check()
+                self._next_health[name] = time.monotonic() + self.tick
+            node._process_inbox(max_batches=1)
+        except Exception:  # one failing chain must not take the host down
+            logger.exception("Step failed for chain %s", name)
+        finally:
+            with self._cond:
+                self.steps += 1
+                self._running_steps.discard(name)
+                self._queued.discard(name)
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Status and routing
+    # ------------------------------------------------------------------
+
+    def status(self) -> dict:
+        """Host status with every chain's node status, by name; never blocks on a writer."""
+        with self._cond:
+            dispatcher = {
+                "workers": self.workers,
+                "steps": self.steps,
+                "running": sorted(self._running_steps),
+                "waiting": list(self._ready),
+            }
+        return {
+            "running": self._running,
+            "root": str(self.root),
+            "dispatcher": dispatcher,
+            "chains": {name: node.status() for name, node in self.nodes.items()},
+        }
+
+    def chains(self) -> dict[str, dict]:
+        """Published chain view of every hosted chain, by name."""
+        return {name: node.status()["chain"] for name, node in self.nodes.items()}
+
+    def select(self, chain: str | None = None, name: str | None = None) -> VarusNode | None:
+        """The hosted node named *name* and/or serving chain path *chain*.
+
+        With neither given, the only hosted chain, or None if there are several.
+        """
+        if name is not None:
+            node = self.nodes.get(name)
+            return node.select(chain) if node is not None else None
+        if chain is not None:
+            return next((n for n in self.nodes.values() if n.serves(chain)), None)
+        return next(iter(self.nodes.values())) if len(self.nodes) == 1 else None
+
+    def submit_block(self, name: str, data: dict[str, Any], hash_version: int | None = None):
+        """Thread-safe block submission to the chain called *name*."""
+        return self.nodes[name].submit_block(data, hash_version)
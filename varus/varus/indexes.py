@@ -0,0 +1,232 @@
+"""Secondary indexes over fields of block ``data``.
+
+An index maps the value found at a dotted path inside ``data`` (``type``,
+``sender.id``, ...) to the heights of the blocks holding it, so
+:meth:`VarusChain.query` can find matching blocks without decoding any other
+payload.
+
+Layout (inside the chain's segment store)::
+
+    varus_chain.varus/indexes/
+        <name>.json   {"path": "sender.id", "height": 1200}
+        <name>.log    one line per indexed block: [height, value, ...]
+
+``height`` in the ``.json`` file is the number of blocks the log covers.
+Log lines are appended before ``height`` is advanced, so on open any line at
+or past ``height`` (or torn by a crash) is dropped and those blocks are
+indexed again; the index never disagrees with the chain.
+
+Scalars are indexed as they are; a list indexes each of its scalar elements
+(e.g. tags).  Objects, and blocks without the path, are not indexed.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable
+
+from .block import canonical_json
+from .storage import write_atomic
+
+INDEX_DIR = "indexes"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+_MISSING = object()
+
+
+def _scalars(value: Any) -> list[Any]:
+    items = value if isinstance(value, list) else [value]
+    return [v for v in items if v is None or isinstance(v, (str, int, float, bool))]
+
+
+class FieldIndex:
+    """Value -> block heights for one dotted path into block ``data``."""
+
+    def __init__(self, directory: Path, name: str, path: str, height: int = 0) -> None:
+        self.directory = Path(directory)
+        self.name = name
+        self.path = path
+        self.height = height  # blocks 0 .. height-1 are indexed
+        self._keys = tuple(path.split("."))
+        self._postings: dict[bytes, list[int]] = {}
+        self._strings: list[str] | None = None  # sorted string values, for prefix lookups
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / f"{self.name}.json"
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / f"{self.name}.log"
+
+    # ------------------------------------------------------------------
+    # Create / open
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def create(cls, directory: Path, name: str, path: str) -> "FieldIndex":
+        """Declare a new, empty index.
+
+        Raises
+        ------
+        ValueError
+            If *name* is not a plain file-safe identifier or *path* is empty.
+        """
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Bad index name {name!r}: use letters, digits, '_', '.', '-'")
+        if not path or "" in path.split("."):
+            raise ValueError(f"Bad index path {path!r}: expected dotted keys such as 'sender.id'")
+        index = cls(directory, name, path)
+        index.directory.mkdir(parents=True, exist_ok=True)
+        index.log_path.write_bytes(b"")
+        index._write_meta()
+        return index
+
+    @classmethod
+    def open(cls, meta_path: Path) -> "FieldIndex":
+        """Load an index, dropping log lines past its recorded height."""
+        meta = json.loads(meta_path.read_text())
+        index = cls(meta_path.parent, meta_path.stem, meta["path"], meta.get("height", 0))
+        index._load_log()
+        return index
+
+    def _load_log(self) -> None:
+        if not self.log_path.exists():
+            self.log_path.write_bytes(b"")
+            self.height = 0
+            return
+        keep = 0
+        with self.log_path.open("rb") as fh:
+            for line in fh:
+                try:
+                    height, *values = json.loads(line)
+                except ValueError:
+                    break  # torn tail
+                if not line.endswith(b"\n") or height >= self.height:
+                    break
+                self._post(height, values)
+                keep += len(line)
+        if keep != self.log_path.stat().st_size:
+            with self.log_path.open("r+b") as fh:
+                fh.truncate(keep)
+
+    def _write_meta(self) -> None:
+        # Derived data: a lost update is rebuilt on open, so no fsync.
+        write_atomic(
+            self.meta_path,
+            json.dumps({"path": self.path, "height": self.height}).encode(),
+            durable=False,
+        )
+
+    def truncate(self, height: int) -> None:
+        """Forget blocks at or above *height* (the chain was cut back under the index)."""
+        if height >= self.height:
+            return
+        keep = 0
+        with self.log_path.open("rb") as fh:
+            for line in fh:
+                if json.loads(line)[0] >= height:
+                    break
+                keep += len(line)
+        with self.log_path.open("r+b") as fh:
+            fh.truncate(keep)
+        for key, postings in list(self._postings.items()):
+            del postings[bisect_left(postings, height) :]
+            if not postings:
+                del self._postings[key]
+                self._strings = None
+        self.height = height
+        self._write_meta()
+
+    def destroy(self) -> None:
+        self.meta_path.unlink(missing_ok=True)
+        self.log_path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def extract(self, data: Any) -> list[Any]:
+        """Indexable values at this index's path in *data* (empty if absent)."""
+        value = data
+        for key in self._keys:
+            if not isinstance(value, dict):
+                return []
+            value = value.get(key, _MISSING)
+            if value is _MISSING:
+                return []
+        return _scalars(value)
+
+    def add(self, blocks: Iterable[tuple[int, Any]]) -> None:
+        """Index ``(height, data)`` pairs, which must continue from :attr:`height`."""
+        lines = []
+        for height, data in blocks:
+            if height < self.height:
+                continue  # already covered
+            if height != self.height:
+                raise ValueError(f"Index {self.name} covers {self.height} blocks, got {height}")
+            values = self.extract(data)
+            if values:
+                self._post(height, values)
+                lines.append(canonical_json([height, *values]) + b"\n")
+            self.height = height + 1
+        if lines:
+            with self.log_path.open("ab") as fh:
+                fh.write(b"".join(lines))
+        self._write_meta()
+
+    def _post(self, height: int, values: list[Any]) -> None:
+        for key in {canonical_json(v) for v in values}:
+            postings = self._postings.get(key)
+            if postings is None:
+                postings = self._postings[key] = []
+                if key.startswith(b'"'):
+                    self._strings = None
+            if not postings or postings[-1] != height:
+                postings.append(height)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def lookup(self, value: Any) -> list[int]:
+        """Heights of blocks whose value at the path equals *value*, ascending."""
+        return list(self._postings.get(canonical_json(value), ()))
+
+    def lookup_prefix(self, prefix: str) -> list[int]:
+        """Heights of blocks whose string value at the path starts with *prefix*."""
+        if self._strings is None:
+            self._strings = sorted(
+                json.loads(key) for key in self._postings if key.startswith(b'"')
+            )
+        heights: set[int] = set()
+        for value in self._strings[bisect_left(self._strings, prefix) :]:
+            if not value.startswith(prefix):
+                break
+            heights.update(self._postings[canonical_json(value)])
+        return sorted(heights)
+
+
+def open_indexes(directory: Path) -> dict[str, FieldIndex]:
+    """Open every index declared under *directory*."""
+    if not directory.is_dir():
+        return {}
+    return {meta.stem: FieldIndex.open(meta) for meta in sorted(directory.glob("*.json"))}
+
+
+def describe_indexes(directory: Path) -> dict[str, dict[str, Any]]:
+    """``{name: {"path": ..., "height": ...}}`` as recorded on disk, reading no logs."""
+    if not directory.is_dir():
+        return {}
+    described = {}
+    for meta_path in sorted(directory.glob("*.json")):
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            continue  # dropped or being replaced meanwhile
+        described[meta_path.stem] = {"path": meta["path"], "height": meta.get("height", 0)}
+    return described
+
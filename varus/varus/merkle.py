@@ -0,0 +1,131 @@
+"""Merkle commitments over block data items, with inclusion proofs.
+
+A hash-version-3 block commits to a Merkle root over the top-level items of
+its ``data`` dict instead of a digest of the whole payload.  One item can
+then be proven to be in the block with O(log n) sibling hashes plus the
+block header, without the rest of the payload or the rest of the chain.
+
+Tree layout
+-----------
+- Leaves are the ``(key, value)`` items sorted by key; a leaf hash is
+  ``sha256(0x00 || canonical_json([key, value]))``.
+- An inner node is ``sha256(0x01 || left || right)``.  The prefixes keep
+  leaves and inner nodes from being confused for one another.
+- A level with an odd node count promotes its last node unchanged (no
+  duplication, so two different item lists never share a root).
+- The root of an empty dict is ``sha256(b"")``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any
+
+from .block import HASH_V3, canonical_json, header_preimage
+
+LEFT = "L"
+RIGHT = "R"
+
+
+class ProofError(ValueError):
+    """Raised when an inclusion proof cannot be built or does not verify."""
+
+
+def leaf_hash(key: str, value: Any) -> bytes:
+    return hashlib.sha256(b"\x00" + canonical_json([key, value])).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _leaves(data: dict[str, Any]) -> tuple[list[str], list[bytes]]:
+    if not isinstance(data, dict):
+        raise ProofError("Merkle commitments need block data to be a JSON object")
+    keys = sorted(data)
+    return keys, [leaf_hash(key, data[key]) for key in keys]
+
+
+def _next_level(level: list[bytes]) -> list[bytes]:
+    paired = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        paired.append(level[-1])
+    return paired
+
+
+def merkle_root(data: dict[str, Any]) -> str:
+    """Hex Merkle root over the items of *data*."""
+    _, level = _leaves(data)
+    if not level:
+        return hashlib.sha256(b"").hexdigest()
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_path(data: dict[str, Any], key: str) -> list[list[str]]:
+    """Sibling hashes from the leaf for *key* up to the root.
+
+    Each step is ``[side, hash]`` where *side* says whether the sibling sits
+    to the left or right of the running hash.
+
+    Raises
+    ------
+    ProofError
+        If *key* is not an item of *data*.
+    """
+    keys, level = _leaves(data)
+    if key not in data:
+        raise ProofError(f"Block data has no item {key!r}")
+    position = keys.index(key)
+    path: list[list[str]] = []
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            path.append([LEFT if sibling < position else RIGHT, level[sibling].hex()])
+        level = _next_level(level)
+        position //= 2
+    return path
+
+
+def root_from_path(key: str, value: Any, path: list[list[str]]) -> str:
+    """Recompute the root an item and its sibling path commit to."""
+    digest = leaf_hash(key, value)
+    for side, sibling_hex in path:
+        sibling = bytes.fromhex(sibling_hex)
+        if side == LEFT:
+            digest = _node_hash(sibling, digest)
+        elif side == RIGHT:
+            digest = _node_hash(digest, sibling)
+        else:
+            raise ProofError(f"Bad proof step side {side!r}")
+    return digest.hex()
+
+
+def verify_proof(proof: dict[str, Any]) -> bool:
+    """Check an inclusion proof produced by :meth:`VarusChain.prove`.
+
+    Recomputes the Merkle root from the item and its path, then the block
+    hash from the header fields and that root.  A True result shows the item
+    is committed to by the block whose hash is ``proof["header"]["hash"]``;
+    whether that hash belongs to the chain is for the caller (or a light
+    client holding the header chain) to check.
+    """
+    try:
+        header = proof["header"]
+        if header["hash_version"] != HASH_V3:
+            return False
+        root = root_from_path(proof["key"], proof["value"], proof["path"])
+        if root != header["payload"]:
+            return False
+        preimage = header_preimage(
+            header["index"],
+            header["timestamp"],
+            header["previous_hash"],
+            header["nonce"],
+            root,
+            version=HASH_V3,
+        )
+    except (KeyError, TypeError, ValueError):
+        return False
+    return hashlib.sha256(preimage).hexdigest() == header["hash"]
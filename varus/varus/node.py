@@ -1,43 +1,287 @@
 """Varus node daemon — maintains and validates the sovereign chain."""
 
+import heapq
 import json
 import logging
+import os
 import signal
 import sys
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
-
-from .chain import VarusChain
+from typing import Any, Iterator
+
+from .api import NodeAPIServer
+from .block import DEFAULT_HASH_VERSION
+from .chain import ChainError, VarusChain
+from .feed import BlockFeed
+from .storage import (
+    DEFAULT_DURABILITY,
+    DEFAULT_GROUP_BLOCKS,
+    DEFAULT_GROUP_MS,
+    DURABILITY_BUFFERED,
+    DURABILITY_FSYNC,
+    store_path,
+    write_atomic,
+)
+from .watch import DEFAULT_POLL_INTERVAL, WATCH_AUTO, InboxWatcher, make_watcher
 
 logger = logging.getLogger("varus.node")
 
-DEFAULT_TICK = 10  # seconds between health checks
+DEFAULT_TICK = 10  # seconds between health checks (inbox is event-driven)
+DEFAULT_DEEP_SCAN_EVERY = 30  # health checks between sampled deep scans
+DEFAULT_DEEP_SCAN_SAMPLE = 256  # blocks rehashed per deep scan
 DEFAULT_SOCKET = Path("/tmp/varus_node.sock")
+DEFAULT_BATCH_SIZE = 512  # inbox files claimed per batch
+DEFAULT_PARSE_WORKERS = 4  # threads reading and parsing claimed files
+DEFAULT_HISTORY_BATCH = 4096  # assumed-valid blocks rehashed per health check
 _STOP_EVENT = threading.Event()
 
 
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+class RollingStats:
+    """Summary statistics over a bounded window of recent samples."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            last = self._samples[-1] if self._samples else None
+        if not samples:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "last": round(last, 3),
+            "mean": round(sum(samples) / len(samples), 3),
+            "p50": round(samples[len(samples) // 2], 3),
+            "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max": round(samples[-1], 3),
+        }
+
+
+class Throughput:
+    """Blocks per second appended over a sliding time window."""
+
+    def __init__(self, window: float = 60.0) -> None:
+        self.window = window
+        self._events: deque[tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def add(self, count: int, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._events.append((now, count))
+            self.total += count
+            self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+
+    def snapshot(self, now: float | None = None) -> dict:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            recent = sum(count for _, count in self._events)
+        return {
+            "total": self.total,
+            "window_s": self.window,
+            "blocks_per_sec": round(recent / self.window, 3),
+        }
+
+
+def submitted_at(path: Path) -> float | None:
+    """Submission time encoded in an inbox filename (``<epoch>_<id>.json``)."""
+    try:
+        return float(path.name.split("_", 1)[0])
+    except ValueError:
+        return None
+
+
 # ---------------------------------------------------------------------------
 # Inbox: simple file-based block submission queue
 # ---------------------------------------------------------------------------
 
 class BlockInbox:
-    """Watch a directory for pending block requests written as JSON files."""
+    """Watch a directory for pending block requests written as JSON files.
+
+    Items are processed in claimed batches: :meth:`claim` renames up to
+    ``limit`` files into ``processing/`` so producers and other scans never
+    see them again, and a batch journal (:meth:`begin`) records the chain
+    height it is being appended at.  After a crash, :meth:`claimed` and
+    :meth:`journal` tell the node which claimed items were committed and
+    which must be replayed.  Unparseable items are moved to ``rejected/``.
+    """
+
+    PROCESSING = "processing"
+    REJECTED = "rejected"
+    JOURNAL = "batch.json"
 
     def __init__(self, inbox_dir: Path) -> None:
         self.inbox_dir = inbox_dir
-        self.inbox_dir.mkdir(parents=True, exist_ok=True)
+        self.processing_dir = inbox_dir / self.PROCESSING
+        self.rejected_dir = inbox_dir / self.REJECTED
+        for directory in (self.inbox_dir, self.processing_dir, self.rejected_dir):
+            directory.mkdir(parents=True, exist_ok=True)
 
     def pending(self) -> list[Path]:
-        return sorted(self.inbox_dir.glob("*.json"))
+        return [self.inbox_dir / name for name in sorted(self._names(self.inbox_dir))]
+
+    def _names(self, directory: Path) -> list[str]:
+        try:
+            with os.scandir(directory) as entries:
+                return [
+                    e.name for e in entries
+                    if e.name.endswith(".json") and not e.name.startswith(".") and e.is_file()
+                ]
+        except FileNotFoundError:
+            return []
+
+    def count(self) -> int:
+        """Number of unclaimed items (no sort, no Path objects)."""
+        return len(self._names(self.inbox_dir))
+
+    def claim(self, limit: int = DEFAULT_BATCH_SIZE) -> list[Path]:
+        """Atomically move the oldest *limit* items into ``processing/``.
+
+        Returns the claimed paths in submission order.  Items that vanish
+        before they can be renamed (claimed elsewhere) are skipped.
+        """
+        claimed = []
+        for name in heapq.nsmallest(limit, self._names(self.inbox_dir)):
+            target = self.processing_dir / name
+            try:
+                os.rename(self.inbox_dir / name, target)
+            except FileNotFoundError:
+                continue
+            claimed.append(target)
+        return claimed
+
+    def claimed(self) -> list[Path]:
+        """Items claimed by a previous run but not yet removed."""
+        names = sorted(n for n in self._names(self.processing_dir) if n != self.JOURNAL)
+        return [self.processing_dir / n for n in names]
+
+    def begin(self, paths: list[Path], height: int, durable: bool = True) -> None:
+        """Journal that *paths* are about to be appended starting at *height*."""
+        payload = {"height": height, "items": [p.name for p in paths]}
+        write_atomic(self.processing_dir / self.JOURNAL, json.dumps(payload).encode(), durable)
+
+    def journal(self) -> dict[str, Any] | None:
+        try:
+            return json.loads((self.processing_dir / self.JOURNAL).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def finish(self, paths: list[Path]) -> None:
+        """Remove a committed batch and its journal."""
+        for path in paths:
+            self.discard(path)
+        (self.processing_dir / self.JOURNAL).unlink(missing_ok=True)
+
+    def reject(self, path: Path) -> None:
+        try:
+            os.rename(path, self.rejected_dir / path.name)
+        except FileNotFoundError:
+            pass
+
+    def read(self, path: Path) -> dict[str, Any]:
+        return json.loads(path.read_text())
+
+    def discard(self, path: Path) -> None:
+        path.unlink(missing_ok=True)
 
     def consume(self, path: Path) -> dict[str, Any]:
-        data = json.loads(path.read_text())
-        path.unlink()
+        data = self.read(path)
+        self.discard(path)
         return data
 
 
+def _parse_item(path: Path) -> dict[str, Any] | Exception:
+    """Read and validate one claimed item; errors are returned, not raised."""
+    try:
+        data = json.loads(path.read_bytes())
+    except (OSError, ValueError) as exc:
+        return exc
+    if not isinstance(data, dict):
+        return ValueError(f"block data must be a JSON object, got {type(data).__name__}")
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Locking
+# ---------------------------------------------------------------------------
+
+class ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds back new readers.
+
+    The time each acquisition spent waiting is recorded in :attr:`wait_ms`
+    (``{"read": RollingStats, "write": RollingStats}``, milliseconds).  Not
+    reentrant.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self.wait_ms = {"read": RollingStats(), "write": RollingStats()}
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        started = time.perf_counter()
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self.wait_ms["read"].add((time.perf_counter() - started) * 1000)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        started = time.perf_counter()
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        self.wait_ms["write"].add((time.perf_counter() - started) * 1000)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        return {mode: stats.snapshot() for mode, stats in self.wait_ms.items()}
+
+
 # ---------------------------------------------------------------------------
 # VarusNode
 # ---------------------------------------------------------------------------
@@ -48,9 +292,27 @@ class VarusNode:
 
     Responsibilities:
     - Load and validate the chain on start.
-    - Accept new block data via the file-based inbox.
-    - Periodically re-validate the chain and log health status.
-    - Expose a simple status dict for introspection.
+    - Accept new block data via the file-based inbox, waking as soon as a
+      file lands (inotify on Linux, polling elsewhere).
+    - Every ``tick`` seconds, validate new blocks and log health status;
+      every ``deep_scan_every`` checks, rehash a random sample of older blocks.
+    - With a signed ``checkpoint`` from one of ``trusted_keys``, skip
+      rehashing history below it on load and instead deep-verify it
+      ``history_batch`` blocks per health check.
+    - Expose a simple status dict for introspection, including
+      submit-to-append latency and lock-wait times.
+    - Serve the local query API on ``socket_path`` (see :mod:`varus.api`)
+      so CLI reads don't have to reload the chain, and push every appended
+      block to its subscribers (see :mod:`varus.feed`).
+
+    The chain is guarded by a :class:`ReadWriteLock`: appends and other
+    changes take it exclusively, while API reads and health checks share
+    it.  After every change the node publishes a fresh chain summary, which
+    :meth:`status` returns without taking the lock at all.
+
+    A node is also the per-chain unit of a :class:`~varus.host.ChainHost`,
+    which drives several of them from one shared dispatcher instead of
+    calling :meth:`start`.
     """
 
     def __init__(
@@ -58,15 +320,55 @@ class VarusNode:
         chain_path: str | Path | None = None,
         inbox_dir: str | Path | None = None,
         tick: int = DEFAULT_TICK,
+        deep_scan_every: int = DEFAULT_DEEP_SCAN_EVERY,
+        deep_scan_sample: int = DEFAULT_DEEP_SCAN_SAMPLE,
+        durability: str = DEFAULT_DURABILITY,
+        group_blocks: int = DEFAULT_GROUP_BLOCKS,
+        group_ms: int = DEFAULT_GROUP_MS,
+        watch: str = WATCH_AUTO,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        socket_path: str | Path | None = DEFAULT_SOCKET,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        parse_workers: int = DEFAULT_PARSE_WORKERS,
+        hash_version: int = DEFAULT_HASH_VERSION,
+        checkpoint: dict[str, Any] | None = None,
+        trusted_keys: frozenset[str] = frozenset(),
+        history_batch: int = DEFAULT_HISTORY_BATCH,
+        name: str | None = None,
     ) -> None:
         chain_path = Path(chain_path) if chain_path else Path("varus_chain.json")
         inbox_dir = Path(inbox_dir) if inbox_dir else chain_path.parent / "varus_inbox"
 
-        self.chain = VarusChain(chain_path)
+        self.name = name or chain_path.stem
+
+        self.chain = VarusChain(
+            chain_path,
+            durability=durability,
+            group_blocks=group_blocks,
+            group_ms=group_ms,
+            hash_version=hash_version,
+        )
         self.inbox = BlockInbox(inbox_dir)
+        self.checkpoint = checkpoint
+        self.trusted_keys = trusted_keys
+        self.history_batch = max(1, history_batch)
         self.tick = tick
+        self.deep_scan_every = deep_scan_every
+        self.deep_scan_sample = deep_scan_sample
+        self.watch = watch
+        self.poll_interval = poll_interval
+        self._watcher: InboxWatcher | None = None
+        self.api = NodeAPIServer(self, socket_path) if socket_path else None
+        self.batch_size = max(1, batch_size)
+        self.parse_workers = max(1, parse_workers)
+        self._parser: ThreadPoolExecutor | None = None
+        self._health_checks = 0
         self._running = False
-        self._lock = threading.Lock()
+        self._lock = ReadWriteLock()
+        self._view: dict | None = None  # chain summary published by the last writer
+        self.feed = BlockFeed(self._read_blocks, lambda: self.chain.height)
+        self.latency = RollingStats()  # submit-to-append, milliseconds
+        self.throughput = Throughput()
 
     # ------------------------------------------------------------------
     # Lifecycle
@@ -75,23 +377,43 @@ class VarusNode:
     def start(self) -> None:
         """Load chain then enter the main loop (blocking)."""
         logger.info("Varus node starting…")
+        self._open()
+
+        self._running = True
+        _STOP_EVENT.clear()
+        self._install_signal_handlers()
+        if self.api is not None:
+            self.api.start()
+        try:
+            self._loop()
+        finally:
+            if self.api is not None:
+                self.api.stop()
+
+    def _open(self) -> None:
+        """Load the chain (assuming the checkpoint valid) and publish its first view."""
+        if self.checkpoint:
+            self.chain.assume_valid(self.checkpoint, self.trusted_keys)
+            logger.info(
+                "Assuming valid up to signed checkpoint at height %d", self.checkpoint["height"]
+            )
         self.chain.load()
+        with self._writing():
+            valid = self.chain.is_valid(full=False)
         logger.info(
-            "Chain loaded. height=%d tip=%s valid=%s",
+            "Chain %s loaded. height=%d tip=%s valid=%s",
+            self.name,
             self.chain.height,
             self.chain.tip.hash[:12],
-            self.chain.is_valid(),
+            valid,
         )
 
-        self._running = True
-        _STOP_EVENT.clear()
-        self._install_signal_handlers()
-        self._loop()
-
     def stop(self) -> None:
         logger.info("Varus node stopping.")
         self._running = False
         _STOP_EVENT.set()
+        if self._watcher is not None:
+            self._watcher.wake()
 
     def _install_signal_handlers(self) -> None:
         for sig in (signal.SIGINT, signal.SIGTERM):
@@ -106,38 +428,165 @@ class VarusNode:
     # ------------------------------------------------------------------
 
     def _loop(self) -> None:
-        while self._running:
-            self._process_inbox()
-            self._health_check()
-            _STOP_EVENT.wait(timeout=self.tick)
-
+        """Process the inbox whenever it changes; health-check every ``tick``."""
+        self._watcher = make_watcher(self.inbox.inbox_dir, self.watch, self.poll_interval)
+        self._recover_claimed()
+        next_health = time.monotonic()
+        try:
+            while self._running:
+                self._process_inbox()
+                if time.monotonic() >= next_health:
+                    self._health_check()
+                    next_health = time.monotonic() + self.tick
+                if not self._running:
+                    break
+                self._watcher.wait(max(0.0, next_health - time.monotonic()))
+        finally:
+            self._watcher.close()
+            self._watcher = None
+            self.feed.close()
+            if self._parser is not None:
+                self._parser.shutdown()
+                self._parser = None
+
+        with self._lock.write():
+            self.chain.flush()
         logger.info("Node loop exited cleanly.")
 
     # ------------------------------------------------------------------
     # Inbox processing
     # ------------------------------------------------------------------
 
-    def _process_inbox(self) -> None:
-        for path in self.inbox.pending():
-            try:
-                data = self.inbox.consume(path)
-                with self._lock:
-                    block = self.chain.add_block(data)
-                logger.info(
-                    "Block appended: index=%d hash=%s",
-                    block.index,
-                    block.hash[:12],
-                )
-            except Exception as exc:
-                logger.error("Failed to process inbox item %s: %s", path.name, exc)
+    def _process_inbox(self, max_batches: int | None = None) -> bool:
+        """Claim, parse and append inbox items in ordered batches.
+
+        Each batch is claimed atomically, parsed on the worker pool while the
+        previous batch is being appended, and appended with one durable
+        commit.  Claimed files are removed only after the commit, so a crash
+        mid-batch leaves them in ``processing/`` for :meth:`_recover_claimed`.
+
+        Stops after *max_batches* batches if given; returns True if items
+        were left in the inbox.
+        """
+        claimed = self.inbox.claim(self.batch_size)
+        parsing = self._parse(claimed)
+        batches = 0
+        while claimed:
+            batches += 1
+            last = max_batches is not None and batches >= max_batches
+            next_claimed = [] if last else self.inbox.claim(self.batch_size)
+            next_parsing = self._parse(next_claimed)  # overlaps with this append
+            self._append_batch(claimed, [future.result() for future in parsing])
+            claimed, parsing = next_claimed, next_parsing
+            if last:
+                return self.inbox.count() > 0
+        return False
+
+    def _parse(self, paths: list[Path]) -> list[Future]:
+        if self._parser is None:
+            self._parser = ThreadPoolExecutor(
+                max_workers=self.parse_workers, thread_name_prefix="varus-parse"
+            )
+        return [self._parser.submit(_parse_item, path) for path in paths]
+
+    def _append_batch(self, paths: list[Path], parsed: list[Any]) -> None:
+        good_paths: list[Path] = []
+        batch: list[dict[str, Any]] = []
+        for path, item in zip(paths, parsed):
+            if isinstance(item, Exception):
+                logger.error("Rejected inbox item %s: %s", path.name, item)
+                self.inbox.reject(path)
+            else:
+                good_paths.append(path)
+                batch.append(item)
+        if not batch:
+            return
+
+        with self._writing():
+            self.inbox.begin(
+                good_paths,
+                self.chain.height,
+                durable=self.chain.store.durability != DURABILITY_BUFFERED,
+            )
+            blocks = self.chain.add_blocks(batch)
+            self.feed.publish(blocks)  # under the lock, so subscribers see chain order
+        if self.chain.store.durability != DURABILITY_FSYNC:
+            self.chain.flush()  # the items are deleted next, so their blocks must be on disk
+        self._record_appended(good_paths, len(blocks))
+        self.inbox.finish(good_paths)
+        for block in blocks:
+            logger.info(
+                "Block appended: index=%d hash=%s",
+                block.index,
+                block.hash[:12],
+            )
+
+    def _record_appended(self, paths: list[Path], count: int) -> None:
+        appended_at = time.time()
+        self.throughput.add(count)
+        for path in paths:
+            submitted = submitted_at(path)
+            if submitted is not None:
+                self.latency.add(max(0.0, appended_at - submitted) * 1000)
+
+    def _recover_claimed(self) -> None:
+        """Replay items a previous run claimed but did not finish.
+
+        The batch journal records the height the batch was appended at, so
+        items that already made it into the chain are dropped instead of
+        being appended twice.
+        """
+        paths = self.inbox.claimed()
+        if not paths:
+            return
+        journal = self.inbox.journal()
+        if journal is not None:
+            with self._lock.read():
+                appended = self.chain.height - journal["height"]
+            committed = max(0, min(len(journal["items"]), appended))
+            done = set(journal["items"][:committed])
+            if done:
+                logger.info("Dropping %d inbox items committed before restart", len(done))
+                self.inbox.finish([p for p in paths if p.name in done])
+                paths = [p for p in paths if p.name not in done]
+        self.inbox.finish([])  # clear the journal
+        if paths:
+            logger.info("Replaying %d claimed inbox items", len(paths))
+            for start in range(0, len(paths), self.batch_size):
+                chunk = paths[start : start + self.batch_size]
+                self._append_batch(chunk, [future.result() for future in self._parse(chunk)])
 
     # ------------------------------------------------------------------
     # Health check
     # ------------------------------------------------------------------
 
     def _health_check(self) -> None:
-        with self._lock:
-            valid = self.chain.is_valid()
+        """Validate new blocks and verify history under the write lock.
+
+        The checks advance the validated mark, rewrite ``validated.json`` and
+        fill block caches, so they must not overlap readers.  Each check is
+        bounded (new blocks only, one history batch, one sample), which keeps
+        readers waiting only briefly; ``status`` is served from the published
+        view throughout.
+        """
+        self._health_checks += 1
+        deep = self.deep_scan_every > 0 and self._health_checks % self.deep_scan_every == 0
+        with self._writing():
+            valid = self.chain.is_valid(full=False)
+            if valid and self.chain.assumed_height:
+                try:
+                    remaining = self.chain.verify_history(self.history_batch)
+                    if not remaining:
+                        logger.info("Assumed-valid history fully verified.")
+                except ChainError as exc:
+                    logger.error("History verification failed: %s", exc)
+                    valid = False
+            if valid and deep:
+                try:
+                    self.chain.verify_sample(self.deep_scan_sample)
+                except ChainError as exc:
+                    logger.error("Deep scan failed: %s", exc)
+                    valid = False
             height = self.chain.height
         if valid:
             logger.debug("Health OK — height=%d", height)
@@ -149,18 +598,63 @@ class VarusNode:
     # ------------------------------------------------------------------
 
     def status(self) -> dict:
-        with self._lock:
-            return {
-                "running": self._running,
-                "chain": self.chain.summary(),
-                "inbox_pending": len(self.inbox.pending()),
-            }
+        """Node status; the chain part is the last published view, so this never blocks."""
+        view = self._view
+        if view is None:
+            with self._lock.read():
+                view = self._publish()
+        return {
+            "running": self._running,
+            "chain": view,
+            "inbox_pending": self.inbox.count(),
+            "latency_ms": self.latency.snapshot(),
+            "throughput": self.throughput.snapshot(),
+            "lock_wait_ms": self._lock.snapshot(),
+            "feed": self.feed.stats(),
+        }
+
+    def chains(self) -> dict[str, dict]:
+        """Published chain view by chain name (just this node's)."""
+        return {self.name: self.status()["chain"]}
+
+    def select(self, chain: str | None = None, name: str | None = None) -> "VarusNode | None":
+        """This node if it serves the chain at path *chain* and named *name* (if given)."""
+        if name is not None and name != self.name:
+            return None
+        if chain is not None and not self.serves(chain):
+            return None
+        return self
+
+    def serves(self, chain: str | Path) -> bool:
+        return store_path(Path(chain)).resolve() == self.chain.store.root.resolve()
+
+    def _read_blocks(self, start: int, limit: int) -> list:
+        """Blocks from index *start* for subscribers catching up, under the read lock."""
+        with self._lock.read():
+            return list(self.chain.iter_blocks(start=start, limit=limit))
+
+    def _publish(self) -> dict:
+        """Replace the published chain view; call with the lock held (either side)."""
+        view = self.chain.summary(validate=False)
+        self._view = view
+        return view
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold the write lock, publishing a fresh view before it is released."""
+        with self._lock.write():
+            try:
+                yield
+            finally:
+                self._publish()
 
     # ------------------------------------------------------------------
     # Convenience: submit a block without going through the inbox
     # ------------------------------------------------------------------
 
-    def submit_block(self, data: dict[str, Any]):
+    def submit_block(self, data: dict[str, Any], hash_version: int | None = None):
         """Thread-safe block submission (used by tests / programmatic API)."""
-        with self._lock:
-            return self.chain.add_block(data)
+        with self._writing():
+            block = self.chain.add_block(data, hash_version)
+            self.feed.publish([block])
+        return block
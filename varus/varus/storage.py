@@ -0,0 +1,943 @@
+"""Append-only segmented log storage for the Varus sovereign chain.
+
+Each block is written as one checksummed JSON record (one line) at the end of
+the active segment file.  When the active segment grows past ``segment_size`` bytes a new
+segment is started.  A small ``manifest.json`` lists the segments in order so
+``read_all()`` can replay the chain without scanning the directory.
+
+Layout::
+
+    varus_chain.varus/
+        manifest.json
+        height.idx
+        time.idx
+        time-late.idx
+        snapshot.json
+        archive/
+            segment-000000.log.xz
+        segment-000001.log
+        ...
+
+Appending a block costs one small write, independent of chain height.
+
+``height.idx`` holds one fixed-width entry per block (segment id, byte
+offset, raw SHA-256 hash), so the entry for height *h* lives at byte
+``h * entry_size`` and any block can be read with two seeks.  Hash lookups go
+through a dict built from the same file on first use.
+
+``time.idx`` is parallel to it: per block, its timestamp and the running
+maximum of timestamps up to it.  The running maximum never decreases, so
+the first block that can be at or after a given time is found by bisection.
+Blocks whose timestamp is below the running maximum (clock skew, blocks
+from peers) are rare; their heights are listed in ``time-late.idx`` so a
+time-window scan can stop at the first block past the window and then check
+just those.  See :meth:`SegmentStore.time_range`.
+
+Old segments can be moved into ``archive/`` as lzma-compressed copies
+(:meth:`SegmentStore.archive`, used by ``varus compact``).  The manifest
+marks them archived and the index entries are unchanged, so every read
+path inflates them transparently; the last inflated segment is cached for
+sequential scans.  Archived history cannot be truncated.
+
+Durability is configurable per store:
+
+- ``fsync``    — every append is fsync'd before it returns.
+- ``group``    — appends are fsync'd together every ``group_blocks`` blocks or
+  ``group_ms`` milliseconds, whichever comes first.
+- ``buffered`` — writes are left to the OS page cache until
+  :meth:`SegmentStore.sync` is called.
+
+Records carry a CRC32 of their body, so a record torn by a crash is detected
+and truncated from the end of the last segment on the next open.  Metadata
+files (manifest, checkpoint) are replaced atomically via temp file + rename,
+and :meth:`SegmentStore.rewrite` builds a whole new store beside the old
+one before swapping it in.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import lzma
+import os
+import shutil
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+STORE_VERSION = 1
+STORE_SUFFIX = ".varus"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "height.idx"
+TIME_INDEX_FILE = "time.idx"
+LATE_FILE = "time-late.idx"
+VALIDATED_FILE = "validated.json"
+SNAPSHOT_FILE = "snapshot.json"
+ARCHIVE_DIR = "archive"
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024  # bytes
+_LAYOUT_KEYS = ("version", "segment_size", "segments")  # manifest keys that are not options
+# Siblings of the store directory used by rewrite(): built, complete, replaced.
+_BUILD, _READY, _RETIRED = ".tmp", ".new", ".old"
+
+DURABILITY_FSYNC = "fsync"
+DURABILITY_GROUP = "group"
+DURABILITY_BUFFERED = "buffered"
+DURABILITY_MODES = (DURABILITY_FSYNC, DURABILITY_GROUP, DURABILITY_BUFFERED)
+DEFAULT_DURABILITY = DURABILITY_FSYNC
+DEFAULT_GROUP_BLOCKS = 64
+DEFAULT_GROUP_MS = 50
+
+# segment id (u32), byte offset within segment (u64), raw sha256 digest
+_INDEX_ENTRY = struct.Struct("<IQ32s")
+# block timestamp, running max of timestamps up to and including this block
+_TIME_ENTRY = struct.Struct("<dd")
+# height of a block whose timestamp is below the running max before it
+_LATE_ENTRY = struct.Struct("<Q")
+_TIME_CHUNK = 4096  # time.idx entries read at a time by time_range()
+
+
+class StorageError(Exception):
+    """Raised when the on-disk store is missing or malformed."""
+
+
+def store_path(chain_path: str | Path) -> Path:
+    """Return the segment store directory that belongs to *chain_path*.
+
+    ``varus_chain.json`` maps to ``varus_chain.varus/``.  A path that already
+    ends in ``.varus`` is used as-is.
+    """
+    chain_path = Path(chain_path)
+    if chain_path.suffix == STORE_SUFFIX:
+        return chain_path
+    return chain_path.with_suffix(STORE_SUFFIX)
+
+
+def _segment_name(segment_id: int) -> str:
+    return f"segment-{segment_id:06d}.log"
+
+
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: Path, data: bytes, durable: bool = True) -> None:
+    """Replace *path* with *data* so readers never observe a partial file."""
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        fh.write(data)
+        if durable:
+            fh.flush()
+            os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    if durable:
+        _fsync_path(path.parent)
+
+
+def _write_json_atomic(path: Path, payload: dict, durable: bool = True) -> None:
+    write_atomic(path, json.dumps(payload, indent=2).encode(), durable)
+
+
+_DATA_KEY = b',"data":'
+
+
+def encode_record(block_dict: dict) -> bytes:
+    """Serialize a block dict as a single ``<crc32> <json>\\n`` record.
+
+    ``data`` is written last so :func:`split_record` can decode the header
+    fields without touching the payload.
+    """
+    if "data" in block_dict:
+        block_dict = {k: v for k, v in block_dict.items() if k != "data"} | {
+            "data": block_dict["data"]
+        }
+    body = json.dumps(block_dict, separators=(",", ":")).encode()
+    return b"%08x " % zlib.crc32(body) + body + b"\n"
+
+
+def _record_body(line: bytes) -> bytes:
+    """Strip and verify the checksum prefix of one record line.
+
+    Records without a checksum prefix (written before checksums were added)
+    are accepted as plain JSON.
+    """
+    line = line.rstrip(b"\n")
+    if line.startswith(b"{"):
+        return line
+    crc, sep, body = line.partition(b" ")
+    try:
+        valid = bool(sep) and len(crc) == 8 and int(crc, 16) == zlib.crc32(body)
+    except ValueError:
+        valid = False
+    if not valid:
+        raise StorageError("Record checksum mismatch")
+    return body
+
+
+def decode_record(line: bytes) -> dict:
+    """Parse one record, verifying its checksum."""
+    return json.loads(_record_body(line))
+
+
+def split_record(line: bytes) -> tuple[dict, bytes | None]:
+    """Parse one record's header, leaving ``data`` as raw JSON bytes.
+
+    Returns ``(header, raw_data)``.  Records written before ``data`` was
+    moved to the end are decoded in full and returned as ``(record, None)``.
+    """
+    body = _record_body(line)
+    pos = body.find(_DATA_KEY)
+    if pos > 0 and body.endswith(b"}"):
+        # Header values are numbers and hex strings, so the first ',"data":'
+        # is the data key; it is the last key iff the header parses alone.
+        try:
+            header = json.loads(body[:pos] + b"}")
+        except ValueError:
+            header = None
+        if header is not None and "hash" in header and "previous_hash" in header:
+            return header, body[pos + len(_DATA_KEY) : -1]
+    return json.loads(body), None
+
+
+class SegmentStore:
+    """Append-only block log split across size-bounded segment files.
+
+    Reads may run on several threads at once; appends, truncation and
+    archiving need the store to themselves.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        durability: str = DEFAULT_DURABILITY,
+        group_blocks: int = DEFAULT_GROUP_BLOCKS,
+        group_ms: int = DEFAULT_GROUP_MS,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Unknown durability mode {durability!r}; expected one of {DURABILITY_MODES}"
+            )
+        self.root = Path(root)
+        self.segment_size = segment_size
+        self.durability = durability
+        self.group_blocks = group_blocks
+        self.group_ms = group_ms
+        self._sync_lock = threading.Lock()
+        self._open_lock = threading.RLock()
+        self._dirty: set[Path] = set()
+        self._unsynced = 0
+        self._sync_timer: threading.Timer | None = None
+        self._manifest: dict | None = None
+        self._index_synced = False
+        self._height = 0
+        self._hashes: dict[bytes, int] | None = None
+        self._time_synced = False
+        self._time_max = float("-inf")
+        self._inflated: tuple[int, bytes] | None = None  # last archived segment read
+        self._finish_swap()
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / MANIFEST_FILE
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def _load_manifest(self) -> dict:
+        if self._manifest is None:
+            if not self.exists():
+                raise StorageError(f"No chain store at {self.root}")
+            manifest = json.loads(self.manifest_path.read_text())
+            if manifest.get("version") != STORE_VERSION:
+                raise StorageError(
+                    f"Unsupported store version {manifest.get('version')!r} at {self.root}"
+                )
+            self._manifest = manifest
+        return self._manifest
+
+    def _write_manifest(self, manifest: dict) -> None:
+        """Atomically replace the manifest (temp file + rename)."""
+        _write_json_atomic(self.manifest_path, manifest, self._durable_metadata)
+        self._manifest = manifest
+
+    # ------------------------------------------------------------------
+    # Validation checkpoint
+    # ------------------------------------------------------------------
+
+    def read_validated(self) -> dict | None:
+        """Return the ``{"height", "tip_hash"}`` validation checkpoint, if any."""
+        path = self.root / VALIDATED_FILE
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text())
+        except ValueError:
+            return None
+
+    def write_validated(self, height: int, tip_hash: str, **progress: int) -> None:
+        """Record that blocks ``0 .. height-1`` passed validation.
+
+        *progress* carries extra counters kept alongside (e.g. how much of an
+        assumed-valid range has been rehashed).
+        """
+        _write_json_atomic(
+            self.root / VALIDATED_FILE,
+            {"height": height, "tip_hash": tip_hash, **progress},
+            self._durable_metadata,
+        )
+
+    def read_snapshot(self) -> dict | None:
+        """Return the state snapshot written by :meth:`write_snapshot`, if any."""
+        path = self.root / SNAPSHOT_FILE
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text())
+        except ValueError:
+            return None
+
+    def write_snapshot(self, snapshot: dict) -> None:
+        """Record the chain state at a compaction height (see ``VarusChain.compact``)."""
+        _write_json_atomic(self.root / SNAPSHOT_FILE, snapshot, self._durable_metadata)
+
+    def create(self, **options: Any) -> None:
+        """Initialise an empty store (one empty segment).
+
+        *options* are recorded in the manifest and read back with
+        :meth:`option` (e.g. ``headers_only=True`` for a light chain).
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / _segment_name(0)).touch()
+        self.index_path.touch()
+        (self.root / TIME_INDEX_FILE).touch()
+        (self.root / LATE_FILE).touch()
+        self._write_manifest(
+            {
+                "version": STORE_VERSION,
+                "segment_size": self.segment_size,
+                "segments": [{"id": 0, "first_index": 0}],
+                **options,
+            }
+        )
+
+    def option(self, name: str, default: Any = None) -> Any:
+        """Return a store option recorded by :meth:`create`."""
+        return self._load_manifest().get(name, default)
+
+    def destroy(self) -> None:
+        """Remove the store directory and everything in it."""
+        self._reset_state()
+        if self.root.exists():
+            shutil.rmtree(self.root)
+
+    def _reset_state(self) -> None:
+        """Forget every cached view of the directory (it is being replaced)."""
+        self._cancel_timer()
+        self._dirty.clear()
+        self._unsynced = 0
+        self._manifest = None
+        self._index_synced = False
+        self._height = 0
+        self._hashes = None
+        self._time_synced = False
+        self._time_max = float("-inf")
+        self._inflated = None
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def segments(self) -> list[dict]:
+        """Return manifest entries for every segment, oldest first."""
+        return list(self._load_manifest()["segments"])
+
+    def segment_path(self, segment_id: int) -> Path:
+        return self.root / _segment_name(segment_id)
+
+    def archive_path(self, segment_id: int) -> Path:
+        return self.root / ARCHIVE_DIR / (_segment_name(segment_id) + ".xz")
+
+    def _archived(self) -> dict[int, int]:
+        """``{segment_id: uncompressed size}`` for every archived segment."""
+        return {s["id"]: s["size"] for s in self.segments() if s.get("archived")}
+
+    @property
+    def archived_height(self) -> int:
+        """Number of leading blocks whose segments are archived."""
+        segments = self.segments()
+        live = [s for s in segments if not s.get("archived")]
+        return live[0]["first_index"] if live else 0  # the active segment is never archived
+
+    def _segment_size(self, segment_id: int) -> int:
+        archived = self._archived()
+        if segment_id in archived:
+            return archived[segment_id]
+        return self.segment_path(segment_id).stat().st_size
+
+    def _open_segment(self, segment_id: int) -> BinaryIO:
+        """Open a segment for reading, inflating it first if it is archived."""
+        if segment_id not in self._archived():
+            return self.segment_path(segment_id).open("rb")
+        inflated = self._inflated
+        if inflated is None or inflated[0] != segment_id:
+            inflated = (segment_id, lzma.decompress(self.archive_path(segment_id).read_bytes()))
+            self._inflated = inflated
+        return io.BytesIO(inflated[1])
+
+    def archive(self, below: int) -> list[dict]:
+        """Compress every segment holding only records below *below* into ``archive/``.
+
+        Returns the manifest entries of the segments archived by this call.
+        The active segment is never archived.  Each compressed copy is
+        written, then recorded in the manifest, then the plain segment is
+        removed, so a crash part-way leaves at worst a redundant file.
+        """
+        self._ensure_index()
+        self.sync()
+        manifest = dict(self._load_manifest())
+        segments = [dict(s) for s in manifest["segments"]]
+        archived = []
+        for segment, following in zip(segments, segments[1:]):
+            if segment.get("archived") or following["first_index"] > below:
+                continue
+            raw = self.segment_path(segment["id"]).read_bytes()
+            target = self.archive_path(segment["id"])
+            target.parent.mkdir(exist_ok=True)
+            write_atomic(target, lzma.compress(raw), self._durable_metadata)
+            segment.update(archived=True, size=len(raw))
+            archived.append(segment)
+        if archived:
+            manifest["segments"] = segments
+            self._write_manifest(manifest)
+            for segment in archived:
+                self.segment_path(segment["id"]).unlink(missing_ok=True)
+        return archived
+
+    def _active_segment(self) -> dict:
+        return self._load_manifest()["segments"][-1]
+
+    def _roll(self, first_index: int) -> dict:
+        """Start a new segment whose first record will be *first_index*."""
+        manifest = dict(self._load_manifest())
+        segment = {"id": manifest["segments"][-1]["id"] + 1, "first_index": first_index}
+        self.segment_path(segment["id"]).touch()
+        manifest["segments"] = manifest["segments"] + [segment]
+        self._write_manifest(manifest)
+        return segment
+
+    # ------------------------------------------------------------------
+    # Height / hash index
+    # ------------------------------------------------------------------
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILE
+
+    def _ensure_index(self) -> None:
+        """Reconcile ``height.idx`` with the segments after open or a crash.
+
+        Entries pointing past the end of their segment are dropped and any
+        records written after the last entry are indexed, so only the tail of
+        the log is ever re-read.
+        """
+        if self._index_synced:
+            return
+        with self._open_lock:  # concurrent readers may race to open the store
+            if not self._index_synced:
+                self._reconcile_index()
+
+    def _reconcile_index(self) -> None:
+        self._load_manifest()
+        if not self.index_path.exists():
+            self.index_path.touch()
+        size = self.index_path.stat().st_size
+        count = size // _INDEX_ENTRY.size
+        segments = {s["id"]: self._segment_size(s["id"]) for s in self.segments()}
+
+        with self.index_path.open("r+b") as fh:
+            # Drop dangling entries (index written, record lost).
+            while count:
+                fh.seek((count - 1) * _INDEX_ENTRY.size)
+                seg_id, offset, _ = _INDEX_ENTRY.unpack(fh.read(_INDEX_ENTRY.size))
+                if seg_id in segments and offset < segments[seg_id]:
+                    break
+                count -= 1
+            fh.truncate(count * _INDEX_ENTRY.size)
+
+            if count:
+                fh.seek((count - 1) * _INDEX_ENTRY.size)
+                seg_id, offset, _ = _INDEX_ENTRY.unpack(fh.read(_INDEX_ENTRY.size))
+                with self._open_segment(seg_id) as seg:
+                    seg.seek(offset)
+                    seg.readline()
+                    resume = (seg_id, seg.tell())
+            else:
+                resume = (self.segments()[0]["id"], 0)
+
+            fh.seek(count * _INDEX_ENTRY.size)
+            for seg_id, offset, header, _ in self._scan(*resume):
+                fh.write(_INDEX_ENTRY.pack(seg_id, offset, bytes.fromhex(header["hash"])))
+                count += 1
+
+        self._height = count
+        self._index_synced = True
+
+    def _scan(
+        self, start_segment: int, start_offset: int
+    ) -> Iterator[tuple[int, int, dict, bytes | None]]:
+        """Yield ``(segment_id, offset, header, raw_data)`` to the end of the log.
+
+        See :func:`split_record` for the ``header``/``raw_data`` split.
+
+        A bad record that runs to the end of the last segment is a torn write
+        from a crash; it is truncated away.  A bad record anywhere else means
+        the log is corrupt and raises :class:`StorageError`.
+        """
+        segments = self.segments()
+        for segment in segments:
+            if segment["id"] < start_segment:
+                continue
+            path = self.segment_path(segment["id"])
+            end = self._segment_size(segment["id"])
+            offset = start_offset if segment["id"] == start_segment else 0
+            torn_at = None
+            with self._open_segment(segment["id"]) as fh:
+                fh.seek(offset)
+                for line in fh:
+                    if line.strip():
+                        try:
+                            if not line.endswith(b"\n"):
+                                raise StorageError("Record is missing its terminator")
+                            header, raw = split_record(line)
+                        except (StorageError, ValueError) as exc:
+                            if segment is segments[-1] and offset + len(line) == end:
+                                torn_at = offset
+                                break
+                            raise StorageError(
+                                f"Corrupt record in {path.name} at offset {offset}: {exc}"
+                            ) from exc
+                        yield segment["id"], offset, header, raw
+                    offset += len(line)
+            if torn_at is not None:
+                with path.open("r+b") as fh:
+                    fh.truncate(torn_at)
+
+    @property
+    def height(self) -> int:
+        """Number of blocks in the store."""
+        self._ensure_index()
+        return self._height
+
+    def _entry(self, height: int) -> tuple[int, int, bytes]:
+        self._ensure_index()
+        if height < 0 or height >= self._height:
+            raise IndexError(f"No block at index {height}")
+        with self.index_path.open("rb") as fh:
+            fh.seek(height * _INDEX_ENTRY.size)
+            return _INDEX_ENTRY.unpack(fh.read(_INDEX_ENTRY.size))
+
+    def locate(self, height: int) -> tuple[int, int]:
+        """Return ``(segment_id, offset)`` of the record at *height*."""
+        seg_id, offset, _ = self._entry(height)
+        return seg_id, offset
+
+    def hash_at(self, height: int) -> str:
+        """Return the block hash at *height* without reading the segment."""
+        return self._entry(height)[2].hex()
+
+    def read_at(self, height: int) -> dict:
+        """Read the single block record at *height*."""
+        return decode_record(self._read_line(height))
+
+    def read_record(self, height: int) -> tuple[dict, bytes | None]:
+        """Like :meth:`read_at` but split as by :func:`split_record`."""
+        return split_record(self._read_line(height))
+
+    def _read_line(self, height: int) -> bytes:
+        seg_id, offset = self.locate(height)
+        with self._open_segment(seg_id) as fh:
+            fh.seek(offset)
+            return fh.readline()
+
+    def lookup_hash(self, block_hash: str) -> int | None:
+        """Return the height of the block with *block_hash*, or None."""
+        try:
+            key = bytes.fromhex(block_hash)
+        except ValueError:
+            return None
+        if self._hashes is None:
+            self._ensure_index()
+            raw = self.index_path.read_bytes()[: self._height * _INDEX_ENTRY.size]
+            self._hashes = {
+                entry[2]: height for height, entry in enumerate(_INDEX_ENTRY.iter_unpack(raw))
+            }
+        return self._hashes.get(key)
+
+    # ------------------------------------------------------------------
+    # Timestamp index
+    # ------------------------------------------------------------------
+
+    @property
+    def time_index_path(self) -> Path:
+        return self.root / TIME_INDEX_FILE
+
+    @property
+    def late_path(self) -> Path:
+        return self.root / LATE_FILE
+
+    def _ensure_time_index(self) -> None:
+        """Bring ``time.idx`` and ``time-late.idx`` level with ``height.idx``.
+
+        Entries past the block height are dropped and missing ones are read
+        from the records, so stores written before the timestamp index
+        existed get one on first use.
+        """
+        if self._time_synced:
+            return
+        with self._open_lock:
+            if not self._time_synced:
+                self._reconcile_time_index()
+
+    def _reconcile_time_index(self) -> None:
+        self._ensure_index()
+        height = self._height
+        for path in (self.time_index_path, self.late_path):
+            if not path.exists():
+                path.touch()
+        count = min(self.time_index_path.stat().st_size // _TIME_ENTRY.size, height)
+        late_entries = _LATE_ENTRY.iter_unpack(self._read_whole(self.late_path))
+        late = [h for (h,) in late_entries if h < count]
+
+        with self.time_index_path.open("r+b") as fh:
+            fh.truncate(count * _TIME_ENTRY.size)
+            running = float("-inf")
+            if count:
+                fh.seek((count - 1) * _TIME_ENTRY.size)
+                _, running = _TIME_ENTRY.unpack(fh.read(_TIME_ENTRY.size))
+            entries = []
+            if count < height:
+                for _, _, header, _ in self._scan(*self.locate(count)):
+                    running = self._time_entry(
+                        count + len(entries), header, running, entries, late
+                    )
+                    if count + len(entries) == height:
+                        break
+            fh.seek(count * _TIME_ENTRY.size)
+            fh.write(b"".join(entries))
+
+        write_atomic(self.late_path, b"".join(_LATE_ENTRY.pack(h) for h in late), durable=False)
+        self._time_max = running
+        self._time_synced = True
+
+    @staticmethod
+    def _time_entry(
+        height: int, block: dict, running: float, entries: list[bytes], late: list[int]
+    ) -> float:
+        timestamp = block.get("timestamp")
+        timestamp = running if timestamp is None else float(timestamp)
+        if timestamp < running:
+            late.append(height)
+        running = max(running, timestamp)
+        entries.append(_TIME_ENTRY.pack(timestamp, running))
+        return running
+
+    @staticmethod
+    def _read_whole(path: Path) -> bytes:
+        data = path.read_bytes()
+        return data[: len(data) - len(data) % _LATE_ENTRY.size]
+
+    def _append_times(self, block_dicts: list[dict]) -> None:
+        entries: list[bytes] = []
+        late: list[int] = []
+        running = self._time_max
+        for offset, block_dict in enumerate(block_dicts):
+            running = self._time_entry(self._height + offset, block_dict, running, entries, late)
+        with self.time_index_path.open("ab") as fh:
+            fh.write(b"".join(entries))
+        if late:
+            with self.late_path.open("ab") as fh:
+                fh.write(b"".join(_LATE_ENTRY.pack(h) for h in late))
+        self._time_max = running
+
+    def timestamp_at(self, height: int) -> float:
+        """Return the timestamp of the block at *height* without reading its record."""
+        self._ensure_time_index()
+        if height < 0 or height >= self._height:
+            raise IndexError(f"No block at index {height}")
+        with self.time_index_path.open("rb") as fh:
+            fh.seek(height * _TIME_ENTRY.size)
+            return _TIME_ENTRY.unpack(fh.read(_TIME_ENTRY.size))[0]
+
+    def time_range(
+        self, since: float | None = None, until: float | None = None, start: int = 0
+    ) -> Iterator[int]:
+        """Yield, in ascending order, heights from *start* of blocks with
+        ``since <= timestamp <= until`` (either bound may be None).
+
+        Finds the first candidate by bisection over the running maximum,
+        then reads the index forward in fixed-size chunks, so memory stays
+        constant however many blocks match.
+        """
+        self._ensure_time_index()
+        height = self._height
+        with self.time_index_path.open("rb") as fh:
+            first = max(start, 0)
+            if since is not None:
+                lo, hi = first, height
+                while lo < hi:  # first height whose running max reaches *since*
+                    mid = (lo + hi) // 2
+                    fh.seek(mid * _TIME_ENTRY.size)
+                    if _TIME_ENTRY.unpack(fh.read(_TIME_ENTRY.size))[1] < since:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                first = lo
+
+            stop = height
+            position = first
+            fh.seek(first * _TIME_ENTRY.size)
+            while position < stop:
+                chunk = fh.read(min(_TIME_CHUNK, stop - position) * _TIME_ENTRY.size)
+                if not chunk:
+                    break
+                for timestamp, running in _TIME_ENTRY.iter_unpack(chunk):
+                    if until is not None and running > until:
+                        stop = position  # only late blocks can match from here on
+                        break
+                    if (since is None or timestamp >= since) and (
+                        until is None or timestamp <= until
+                    ):
+                        yield position
+                    position += 1
+
+            if stop < height:
+                late = _LATE_ENTRY.iter_unpack(self._read_whole(self.late_path))
+                for (h,) in late:
+                    if stop <= h < height:
+                        fh.seek(h * _TIME_ENTRY.size)
+                        timestamp = _TIME_ENTRY.unpack(fh.read(_TIME_ENTRY.size))[0]
+                        if (since is None or timestamp >= since) and timestamp <= until:
+                            yield h
+
+    # ------------------------------------------------------------------
+    # Read / append
+    # ------------------------------------------------------------------
+
+    def read_all(self) -> Iterator[dict]:
+        """Yield every stored block dict in chain order."""
+        for header, raw in self.read_records():
+            if raw is not None:
+                header["data"] = json.loads(raw)
+            yield header
+
+    def read_records(self, start: int = 0) -> Iterator[tuple[dict, bytes | None]]:
+        """Yield ``(header, raw_data)`` for every block from *start*, payloads undecoded."""
+        self._ensure_index()  # repairs a torn tail before the full read
+        if start and start >= self._height:
+            return
+        resume = self.locate(start) if start else (self.segments()[0]["id"], 0)
+        for _, _, header, raw in self._scan(*resume):
+            yield header, raw
+
+    def append(self, block_dict: dict) -> None:
+        """Append a single block record."""
+        self.append_many([block_dict])
+
+    def append_many(self, block_dicts: Iterable[dict]) -> None:
+        """Append block records in order, rolling segments as they fill.
+
+        The whole batch is one commit: under ``fsync`` durability it costs a
+        single fsync per touched segment.  Records are written to the segment
+        before their index entries, so a crash between the two is repaired by
+        :meth:`_ensure_index`.
+        """
+        self._ensure_time_index()
+        segment = self._active_segment()
+        path = self.segment_path(segment["id"])
+        size = path.stat().st_size
+        entries: list[tuple[int, int, bytes]] = []
+        written: list[dict] = []
+        fh = path.open("ab")
+        try:
+            for block_dict in block_dicts:
+                record = encode_record(block_dict)
+                if size and size + len(record) > self.segment_size:
+                    self._commit(fh)
+                    fh.close()
+                    segment = self._roll(block_dict["index"])
+                    path = self.segment_path(segment["id"])
+                    fh = path.open("ab")
+                    size = 0
+                fh.write(record)
+                written.append(block_dict)
+                entries.append((segment["id"], size, bytes.fromhex(block_dict["hash"])))
+                size += len(record)
+            self._commit(fh)
+        finally:
+            fh.close()
+
+        with self.index_path.open("ab") as idx:
+            idx.write(b"".join(_INDEX_ENTRY.pack(*entry) for entry in entries))
+        self._append_times(written)
+        if self._hashes is not None:
+            for offset, entry in enumerate(entries):
+                self._hashes[entry[2]] = self._height + offset
+        self._height += len(entries)
+
+        self._note_appended(len(entries))
+
+    # ------------------------------------------------------------------
+    # Durability
+    # ------------------------------------------------------------------
+
+    @property
+    def _durable_metadata(self) -> bool:
+        return self.durability != DURABILITY_BUFFERED
+
+    def _commit(self, fh) -> None:
+        """Make the records written to *fh* durable according to the mode."""
+        fh.flush()
+        if self.durability == DURABILITY_FSYNC:
+            os.fsync(fh.fileno())
+        else:  # synced by the group timer or an explicit sync()
+            with self._sync_lock:
+                self._dirty.add(Path(fh.name))
+
+    def _note_appended(self, count: int) -> None:
+        if self.durability != DURABILITY_GROUP or not count:
+            return
+        with self._sync_lock:
+            self._unsynced += count
+            due = self._unsynced >= self.group_blocks
+            if not due and self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.group_ms / 1000, self.sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+        if due:
+            self.sync()
+
+    def _cancel_timer(self) -> None:
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+    @property
+    def unsynced(self) -> int:
+        """Blocks appended since the last group commit (``group`` mode only)."""
+        return self._unsynced
+
+    def sync(self) -> None:
+        """Flush appends not yet fsync'd (a pending group commit or buffered writes)."""
+        with self._sync_lock:
+            self._cancel_timer()
+            dirty, self._dirty = self._dirty, set()
+            self._unsynced = 0
+            for path in dirty:
+                if path.exists():
+                    _fsync_path(path)
+
+    def truncate(self, height: int) -> None:
+        """Drop every record at or above *height* (used to reorganise the chain).
+
+        Segments are cut before the index files, so a crash part-way through
+        leaves index entries past the end of the log, which
+        :meth:`_ensure_index` drops on the next open.
+        """
+        self._ensure_time_index()
+        if height >= self._height:
+            return
+        if height < 1:
+            raise StorageError("Refusing to truncate away the genesis block")
+        if height < self.archived_height:
+            raise StorageError(
+                f"Refusing to truncate into archived history (below {self.archived_height})"
+            )
+        self.sync()
+        seg_id, offset = self.locate(height)
+        manifest = dict(self._load_manifest())
+        dropped = [s["id"] for s in manifest["segments"] if s["id"] > seg_id]
+        manifest["segments"] = [s for s in manifest["segments"] if s["id"] <= seg_id]
+        self._write_manifest(manifest)
+        with self.segment_path(seg_id).open("r+b") as fh:
+            fh.truncate(offset)
+            if self._durable_metadata:
+                os.fsync(fh.fileno())
+        for segment_id in dropped:
+            self.segment_path(segment_id).unlink(missing_ok=True)
+
+        for path, size in (
+            (self.index_path, _INDEX_ENTRY.size),
+            (self.time_index_path, _TIME_ENTRY.size),
+        ):
+            with path.open("r+b") as fh:
+                fh.truncate(height * size)
+        late = _LATE_ENTRY.iter_unpack(self._read_whole(self.late_path))
+        kept = [h for (h,) in late if h < height]
+        write_atomic(self.late_path, b"".join(_LATE_ENTRY.pack(h) for h in kept), durable=False)
+        with self.time_index_path.open("rb") as fh:
+            fh.seek((height - 1) * _TIME_ENTRY.size)
+            self._time_max = _TIME_ENTRY.unpack(fh.read(_TIME_ENTRY.size))[1]
+        self._height = height
+        self._hashes = None
+
+    def rewrite(self, block_dicts: Iterable[dict], **options: Any) -> None:
+        """Replace the whole store with *block_dicts* (used for imports).
+
+        Options recorded by :meth:`create` are kept; *options* add to them.
+        The new store is built and fsync'd in a sibling directory and only
+        then swapped in, so a crash or a bad record leaves the old chain
+        whole (see :meth:`_finish_swap`).
+        """
+        if self.exists():
+            manifest = self._load_manifest()
+            options = {k: v for k, v in manifest.items() if k not in _LAYOUT_KEYS} | options
+        building, ready, retired = (self._sibling(s) for s in (_BUILD, _READY, _RETIRED))
+        for leftover in (building, ready, retired):  # from a rewrite that was cut short
+            shutil.rmtree(leftover, ignore_errors=True)
+        try:
+            new = SegmentStore(building, self.segment_size, DURABILITY_FSYNC)
+            new.create(**options)
+            new.append_many(block_dicts)
+            for path in building.iterdir():
+                if path.is_file():
+                    _fsync_path(path)
+            _fsync_path(building)
+            os.rename(building, ready)  # the new store is complete from here on
+        except BaseException:
+            shutil.rmtree(building, ignore_errors=True)
+            raise
+        self._reset_state()
+        if self.root.exists():
+            os.rename(self.root, retired)
+        os.rename(ready, self.root)
+        _fsync_path(self.root.parent)
+        shutil.rmtree(retired, ignore_errors=True)
+
+    def _sibling(self, suffix: str) -> Path:
+        return self.root.with_name(self.root.name + suffix)
+
+    def _finish_swap(self) -> None:
+        """Complete a :meth:`rewrite` interrupted between its two renames.
+
+        Only runs while the store directory is missing: a complete new store
+        is moved into place, otherwise the old one is put back.
+        """
+        if self.root.exists():
+            return
+        for candidate in (self._sibling(_READY), self._sibling(_RETIRED)):
+            try:
+                os.rename(candidate, self.root)
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(self._sibling(_RETIRED), ignore_errors=True)
+            return
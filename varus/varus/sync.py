@@ -1,11 +1,47 @@
 """P2P chain synchronization via SKComm FileTransport.
 
-Export: serializes the local chain as a JSON envelope and drops it into
-the SKComm FileTransport outbox directory so peers can pick it up.
-
-Import: polls the FileTransport inbox for varus chain snapshots, validates
-each received chain fully (per-block hashes + link integrity + genesis check),
-then merges any blocks that extend the local tip (longest-chain rule).
+Export: serializes the local chain and drops it into the SKComm
+FileTransport outbox directory so peers can pick it up.  When the recipient
+has advertised its height and tip hash (and that tip is part of the local
+chain), only the blocks after it are sent as a *delta* anchored to that tip;
+otherwise a full snapshot is sent.  Either goes out as compressed chunk
+envelopes of bounded size (see :mod:`varus.envelope`).
+
+Import: polls the FileTransport inbox for varus envelopes.  Adverts update
+the known state of the sending peer.  For deltas and full snapshots the
+overlap with the local chain is checked first with a single hash comparison
+at the local tip; only the suffix that extends the tip is then validated
+(per-block hashes + link integrity) and merged.  An envelope whose
+advertised tip is already in the local chain (e.g. the same snapshot relayed
+by several peers) is skipped without decoding its blocks.
+
+Chunks are decoded and validated a block at a time as they arrive, so memory
+stays flat however long the transfer.  A chunk whose predecessor has not
+arrived yet is staged under ``<store>/incoming/`` and applied once it can
+be, so out-of-order and interrupted transfers resume where they stopped.
+Single-envelope JSON snapshots and deltas from older nodes are still read.
+
+Forks: if the overlap disagrees, the common ancestor is found by binary
+search, the remote branch is validated from it, and a fork-choice rule
+(``longest`` by default; see :mod:`varus.forks`) decides whether to
+reorganise onto it.  The losing branch is kept as a side chain.  Adverts
+carry a block locator so a peer on another branch still gets a delta.
+
+Every outgoing envelope carries the sender's ``height``, ``tip_hash``,
+``genesis_hash`` and ``headers_only`` flag, so any envelope doubles as an
+advert.
+
+Headers-only (light) chains: a peer that advertises ``headers_only`` is sent
+block headers (with their payload commitments) instead of full blocks.  A
+light node fetches bodies on demand with :meth:`ChainSync.request_payloads`;
+the full peer answers with a payloads envelope, and each body is checked
+against the stored header before it is attached.
+
+Blobs: blocks carry only references to large data items (see
+:mod:`varus.blobs`), so envelopes never include blob content.  After new
+blocks are merged, the receiver asks the sender for the referenced blobs it
+does not already hold (:meth:`ChainSync.request_blobs`); the reply is
+checked against each digest before it is stored.
 
 Usage::
 
@@ -16,7 +52,8 @@ Usage::
     chain.load()
 
     sync = ChainSync(chain, agent_name="my-node")
-    sync.export_chain(recipient="peer-node")   # push to outbox
+    sync.advertise(recipient="peer-node")      # tell the peer our height/tip
+    sync.export_chain(recipient="peer-node")   # push to outbox (delta if possible)
     results = sync.import_chain()              # pull from inbox
 
 skcomm is an optional dependency; an ImportError with a clear message is
@@ -27,16 +64,69 @@ from __future__ import annotations
 
 import json
 import logging
+import re
+import shutil
 import time
 import uuid
 from pathlib import Path
+from typing import Any
 
+from .blobs import BlobError
 from .block import Block
-from .chain import GENESIS_HASH, ChainError, VarusChain
+from .chain import ChainError, VarusChain
+from .envelope import (
+    DEFAULT_CHUNK_BYTES,
+    DEFAULT_ENCODING,
+    ENCODINGS,
+    EnvelopeError,
+    encode_chunks,
+    iter_blocks,
+    split_envelope,
+)
+from .forks import (
+    DEFAULT_FORK_CHOICE,
+    ForkChoice,
+    block_locator,
+    find_fork_point,
+    get_fork_choice,
+    locator_anchor,
+)
+from .storage import write_atomic
+from .validation import HASH_MISMATCH, LINK_BROKEN, find_first_failure
 
 logger = logging.getLogger("varus.sync")
 
 _ENVELOPE_TYPE = "varus_chain_snapshot"
+_DELTA_TYPE = "varus_chain_delta"
+_ADVERT_TYPE = "varus_chain_advert"
+_PAYLOAD_REQUEST_TYPE = "varus_payload_request"
+_PAYLOADS_TYPE = "varus_payloads"
+_BLOB_REQUEST_TYPE = "varus_blob_request"
+_BLOBS_TYPE = "varus_blobs"
+_VARUS_TYPES = (
+    _ENVELOPE_TYPE,
+    _DELTA_TYPE,
+    _ADVERT_TYPE,
+    _PAYLOAD_REQUEST_TYPE,
+    _PAYLOADS_TYPE,
+    _BLOB_REQUEST_TYPE,
+    _BLOBS_TYPE,
+)
+
+MAX_PAYLOADS_PER_REQUEST = 1000
+MAX_BLOBS_PER_REQUEST = 1000
+
+INCOMING_DIR = "incoming"  # chunks waiting for their anchor, inside the chain store
+STAGED_MAX_AGE = 24 * 3600  # seconds an incomplete transfer is kept
+_STREAM_BATCH = 512  # received blocks validated and appended per step
+_TRANSFER_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Outgoing envelopes put their header fields first, so these can be read from
+# the first bytes of an envelope without decoding the block list.
+_HEADER_PEEK_BYTES = 1024
+_HEADER_STR_RE = re.compile(rb'"(type|envelope_id|sender|tip_hash)"\s*:\s*"([^"\\]{0,128})"')
+_HEADER_INT_RE = re.compile(rb'"height"\s*:\s*(\d+)')
+_HEADER_LIGHT_RE = re.compile(rb'"headers_only"\s*:\s*true')
 
 
 class ChainSync:
@@ -52,6 +142,25 @@ class ChainSync:
         Override the SKComm outbox directory (default: ``~/.skcomm/outbox``).
     inbox_path:
         Override the SKComm inbox directory (default: ``~/.skcomm/inbox``).
+    workers:
+        Processes used to hash received chains (1 = validate inline).
+    fork_choice:
+        Rule deciding between our branch and a competing one from a peer:
+        ``"longest"`` (default), ``"heaviest"``, ``"earliest"`` or a callable
+        (see :mod:`varus.forks`).
+    compression:
+        How outgoing blocks are compressed: ``"zlib"`` (default), ``"lzma"``
+        or ``"none"`` (see :mod:`varus.envelope`).
+    chunk_bytes:
+        Uncompressed block JSON per outgoing chunk envelope (and blob
+        content per blobs envelope).
+    fetch_blobs:
+        Request the blobs referenced by merged blocks that are missing
+        locally from the peer that sent the blocks.
+    transport:
+        Object with FileTransport's ``send(envelope_bytes, recipient)`` and
+        ``receive()`` to use instead of an SKComm FileTransport (e.g. the
+        in-memory one in :mod:`varus.bench`).
     """
 
     def __init__(
@@ -60,9 +169,27 @@ class ChainSync:
         agent_name: str = "varus",
         outbox_path: Path | str | None = None,
         inbox_path: Path | str | None = None,
+        workers: int = 1,
+        fork_choice: str | ForkChoice = DEFAULT_FORK_CHOICE,
+        compression: str = DEFAULT_ENCODING,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        fetch_blobs: bool = True,
+        transport: Any = None,
     ) -> None:
+        if compression not in ENCODINGS:
+            raise ValueError(f"Unknown compression {compression!r}; expected one of {ENCODINGS}")
         self.chain = chain
         self.agent_name = agent_name
+        self.workers = workers
+        self.compression = compression
+        self.chunk_bytes = chunk_bytes
+        self.fetch_blobs = fetch_blobs
+        self.transport = transport
+        self.fork_choice, self._prefer_remote = get_fork_choice(fork_choice)
+        # Last advertised state per peer: {"height", "tip_hash", "headers_only", "locator"}
+        self.peers: dict[str, dict] = {}
+        self.last_fork: dict | None = None  # fork met by the envelope being processed
+        self.last_transfer: dict | None = None  # chunk progress of that envelope
         self._outbox = (
             Path(outbox_path).expanduser()
             if outbox_path
@@ -79,7 +206,9 @@ class ChainSync:
     # ------------------------------------------------------------------
 
     def _make_transport(self):
-        """Return a configured FileTransport (requires skcomm)."""
+        """Return the configured transport, by default a FileTransport (requires skcomm)."""
+        if self.transport is not None:
+            return self.transport
         try:
             from skcomm.transports.file import FileTransport  # type: ignore[import]
         except ImportError as exc:
@@ -94,48 +223,147 @@ class ChainSync:
     # Export
     # ------------------------------------------------------------------
 
-    def export_chain(self, recipient: str = "peer") -> str:
-        """Serialize the local chain and write it to the FileTransport outbox.
+    def export_chain(self, recipient: str = "peer", full: bool = False) -> str:
+        """Send the recipient the blocks it is missing via the FileTransport outbox.
+
+        If *recipient* has advertised a tip that is part of the local chain,
+        a delta with only the blocks after that tip is sent.  Otherwise (or
+        with ``full=True``) the whole chain is sent as a snapshot.  Either is
+        written as compressed chunk envelopes of at most ``chunk_bytes``
+        each, encoded one at a time (see :mod:`varus.envelope`).
 
         Parameters
         ----------
         recipient:
             Target agent name.  The file transport uses this for logging only;
             actual routing is handled by the shared directory.
+        full:
+            Always send a full snapshot, ignoring the peer's advertised state.
 
         Returns
         -------
         str
-            The ``envelope_id`` of the snapshot that was written.
+            The ``transfer_id`` shared by the chunks that were written.
 
         Raises
         ------
         RuntimeError
             If the transport send fails.
         """
-        transport = self._make_transport()
+        anchor = None if full else self._peer_anchor(recipient)
+        headers = self.peers.get(recipient, {}).get("headers_only", False)
+        encode = Block.to_header_dict if headers else Block.to_dict
+        first = 0 if anchor is None else anchor + 1
+        blocks = self.chain.all_blocks(first)
+        header = self._envelope(_ENVELOPE_TYPE if anchor is None else _DELTA_TYPE)
+        transfer_id = header.pop("envelope_id")
+        header["transfer_id"] = transfer_id
+        chunks = encode_chunks(
+            header,
+            (encode(b) for b in blocks),
+            first,
+            anchor_hash=None if anchor is None else self.chain.get_block(anchor).hash,
+            encoding=self.compression,
+            chunk_bytes=self.chunk_bytes,
+        )
+        sent = 0
+        for chunk in chunks:
+            self._send_bytes(chunk, recipient)
+            sent += 1
+        logger.info(
+            "Exported %s height=%d blocks=%d chunks=%d transfer=%s recipient=%s",
+            "delta" if anchor is not None else "chain",
+            self.chain.height,
+            len(blocks),
+            sent,
+            transfer_id[:12],
+            recipient,
+        )
+        return transfer_id
+
+    def advertise(self, recipient: str = "peer") -> str:
+        """Send our height, tip hash and block locator so *recipient* can reply with a delta.
+
+        The locator lets a peer on another branch anchor the delta near the
+        fork point rather than sending a full snapshot.
+        """
+        envelope = self._envelope(_ADVERT_TYPE, locator=self._locator())
+        self._send(envelope, recipient)
+        logger.debug(
+            "Advertised height=%d tip=%s to %s",
+            self.chain.height,
+            self.chain.tip.hash[:12],
+            recipient,
+        )
+        return envelope["envelope_id"]
+
+    def request_payloads(self, recipient: str, indices: list[int]) -> str:
+        """Ask a full peer for the data of the blocks at *indices*.
+
+        The reply is handled by :meth:`import_chain`, which attaches each
+        body that matches our stored header (see
+        :meth:`VarusChain.attach_payload`).
+        """
+        indices = sorted(set(indices))[:MAX_PAYLOADS_PER_REQUEST]
+        envelope = self._envelope(_PAYLOAD_REQUEST_TYPE, indices=indices)
+        self._send(envelope, recipient)
+        logger.debug("Requested %d payloads from %s", len(indices), recipient)
+        return envelope["envelope_id"]
 
-        envelope_id = f"varus-{uuid.uuid4().hex[:12]}"
+    def request_blobs(self, recipient: str, digests: list[str]) -> str:
+        """Ask *recipient* for the blobs named by *digests*.
+
+        The reply is handled by :meth:`import_chain`, which stores each blob
+        whose content matches its digest.
+        """
+        digests = list(dict.fromkeys(digests))[:MAX_BLOBS_PER_REQUEST]
+        envelope = self._envelope(_BLOB_REQUEST_TYPE, digests=digests)
+        self._send(envelope, recipient)
+        logger.debug("Requested %d blobs from %s", len(digests), recipient)
+        return envelope["envelope_id"]
+
+    def _envelope(self, envelope_type: str, **payload) -> dict:
         envelope = {
-            "envelope_id": envelope_id,
-            "type": _ENVELOPE_TYPE,
+            "envelope_id": f"varus-{uuid.uuid4().hex[:12]}",
+            "type": envelope_type,
             "sender": self.agent_name,
             "timestamp": time.time(),
-            "chain": [b.to_dict() for b in self.chain.all_blocks()],
+            "height": self.chain.height,
+            "tip_hash": self.chain.tip.hash,
+            "genesis_hash": self.chain.genesis.hash,
+            "headers_only": self.chain.headers_only,
         }
-        envelope_bytes = json.dumps(envelope, separators=(",", ":")).encode()
+        envelope.update(payload)
+        return envelope
 
+    def _send(self, envelope: dict, recipient: str) -> None:
+        self._send_bytes(json.dumps(envelope, separators=(",", ":")).encode(), recipient)
+
+    def _send_bytes(self, envelope_bytes: bytes, recipient: str) -> None:
+        transport = self._make_transport()
         result = transport.send(envelope_bytes, recipient)
         if not result.success:
             raise RuntimeError(f"FileTransport.send failed: {result.error}")
 
-        logger.info(
-            "Exported chain height=%d envelope=%s recipient=%s",
-            self.chain.height,
-            envelope_id[:12],
-            recipient,
-        )
-        return envelope_id
+    def _locator(self) -> list[list]:
+        return block_locator(self.chain.height, self._hash_at)
+
+    def _hash_at(self, index: int) -> str:
+        return self.chain.get_block(index).hash
+
+    def _peer_anchor(self, peer: str) -> int | None:
+        """Return the index of the last block we know *peer* shares with us.
+
+        That is its advertised tip if the tip is in our chain, else the
+        highest matching entry of its block locator.
+        """
+        state = self.peers.get(peer)
+        if not state:
+            return None
+        index = self.chain.height_of(state.get("tip_hash", ""))
+        if index is not None and index == state.get("height", 0) - 1:
+            return index
+        return locator_anchor(state.get("locator"), self.chain.height, self._hash_at)
 
     # ------------------------------------------------------------------
     # Import
@@ -144,8 +372,9 @@ class ChainSync:
     def import_chain(self) -> list[dict]:
         """Poll the FileTransport inbox for chain snapshots and merge new blocks.
 
-        Each envelope is validated fully before any merge is attempted.
-        Non-varus envelopes are silently skipped.
+        Snapshots are validated fully and deltas are validated from their
+        anchor before any merge is attempted.  Non-varus envelopes are
+        silently skipped.
 
         Returns
         -------
@@ -158,7 +387,20 @@ class ChainSync:
             - ``blocks_added`` (int) — blocks appended to local chain.
             - ``chain_height`` (int) — local chain height after merge.
             - ``error`` (str) — present only on failure.
-            - ``skipped`` (bool) — present when the envelope was not a chain snapshot.
+            - ``skipped`` (bool) — present when the envelope was not a varus envelope.
+            - ``advert`` (bool) — present for advert envelopes (nothing merged).
+            - ``payloads_sent`` / ``payloads_attached`` (int) — present for
+              payload requests and replies.
+            - ``blobs_sent`` / ``blobs_stored`` (int) — present for blob
+              requests and replies.
+            - ``blobs_requested`` (int) — present when merged blocks
+              reference blobs we lacked and they were asked for.
+            - ``fork`` (dict) — present when the envelope carried a competing
+              branch: ``fork_index``, ``local_blocks``, ``remote_blocks``,
+              ``rule`` and ``reorg`` (whether we switched to it).
+            - ``transfer`` (dict) — present for chunk envelopes:
+              ``transfer_id``, ``seq``, ``final`` and ``staged`` (True when
+              the chunk was kept on disk until the blocks before it arrive).
         """
         transport = self._make_transport()
         results: list[dict] = []
@@ -172,53 +414,413 @@ class ChainSync:
 
     def _process_envelope(self, envelope_bytes: bytes) -> dict:
         """Validate and merge a single raw envelope."""
+        duplicate = self._skip_known_tip(envelope_bytes)
+        if duplicate is not None:
+            return duplicate
+
         try:
-            envelope = json.loads(envelope_bytes)
-        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+            envelope, body = split_envelope(envelope_bytes)
+        except (ValueError, UnicodeDecodeError) as exc:
             logger.warning("Skipping non-JSON envelope: %s", exc)
             return {"ok": False, "error": f"JSON decode error: {exc}"}
 
-        if envelope.get("type") != _ENVELOPE_TYPE:
-            return {"ok": False, "skipped": True, "reason": "not a varus_chain_snapshot"}
+        envelope_type = envelope.get("type")
+        if envelope_type not in _VARUS_TYPES:
+            return {"ok": False, "skipped": True, "reason": "not a varus chain envelope"}
 
         envelope_id = envelope.get("envelope_id", "?")
         sender = envelope.get("sender", "?")
-        raw_blocks = envelope.get("chain", [])
-
+        self._note_peer(sender, envelope)
+
+        if envelope_type == _ADVERT_TYPE:
+            return {
+                "ok": True,
+                "advert": True,
+                "envelope_id": envelope_id,
+                "sender": sender,
+                "blocks_added": 0,
+                "chain_height": self.chain.height,
+            }
+
+        if envelope_type == _PAYLOAD_REQUEST_TYPE:
+            return self._answer_payload_request(envelope, envelope_id, sender)
+        if envelope_type == _PAYLOADS_TYPE:
+            return self._attach_payloads(envelope, envelope_id, sender)
+        if envelope_type == _BLOB_REQUEST_TYPE:
+            return self._answer_blob_request(envelope, envelope_id, sender)
+        if envelope_type == _BLOBS_TYPE:
+            return self._store_blobs(envelope, envelope_id, sender)
+
+        self.last_fork = self.last_transfer = None
         try:
-            remote_blocks = _validate_remote_chain(raw_blocks)
-        except ChainError as exc:
+            if body is not None:
+                added = self._merge_chunk(envelope, body, envelope_bytes)
+            elif envelope_type == _DELTA_TYPE:
+                added = self._merge_delta(envelope)
+            else:
+                added = self._merge_blocks(_parse_blocks(envelope.get("chain")))
+        except (ChainError, EnvelopeError) as exc:
             logger.error(
                 "Received invalid chain from sender=%s envelope=%s: %s",
                 sender, envelope_id[:12], exc,
             )
             return {"ok": False, "envelope_id": envelope_id, "sender": sender, "error": str(exc)}
 
-        added = self._merge_blocks(remote_blocks)
         logger.info(
             "Imported from sender=%s envelope=%s: blocks_added=%d height=%d",
             sender, envelope_id[:12], added, self.chain.height,
         )
-        return {
+        result = {
             "ok": True,
             "envelope_id": envelope_id,
             "sender": sender,
             "blocks_added": added,
             "chain_height": self.chain.height,
         }
+        if self.last_fork:
+            result["fork"] = self.last_fork
+        if self.last_transfer:
+            result["transfer"] = self.last_transfer
+        if added and self.fetch_blobs and not self.chain.headers_only:
+            missing = self.chain.missing_blobs(self.chain.height - added)
+            if missing:
+                self.request_blobs(sender, missing)
+                result["blobs_requested"] = len(missing[:MAX_BLOBS_PER_REQUEST])
+        return result
+
+    def _skip_known_tip(self, envelope_bytes: bytes) -> dict | None:
+        """Return a result for a snapshot/delta whose tip we already hold.
+
+        Only the envelope header is read.  Skipping is safe even if the header
+        lies: the only envelope dropped is the one making the claim.
+        """
+        head = envelope_bytes[:_HEADER_PEEK_BYTES].partition(b"\n")[0]
+        fields = {}
+        for match in _HEADER_STR_RE.finditer(head):
+            fields.setdefault(match.group(1).decode(), match.group(2).decode())
+        if fields.get("type") not in (_ENVELOPE_TYPE, _DELTA_TYPE):
+            return None
+        tip_hash = fields.get("tip_hash")
+        if not tip_hash or self.chain.height_of(tip_hash) is None:
+            return None
+
+        sender = fields.get("sender", "?")
+        height = _HEADER_INT_RE.search(head)
+        if height:
+            self.peers[sender] = {
+                "height": int(height.group(1)),
+                "tip_hash": tip_hash,
+                "headers_only": _HEADER_LIGHT_RE.search(head) is not None,
+            }
+        logger.debug(
+            "Skipping envelope from %s: tip %s already in local chain.", sender, tip_hash[:12]
+        )
+        return {
+            "ok": True,
+            "duplicate": True,
+            "envelope_id": fields.get("envelope_id", "?"),
+            "sender": sender,
+            "blocks_added": 0,
+            "chain_height": self.chain.height,
+        }
+
+    def _note_peer(self, sender: str, envelope: dict) -> None:
+        """Remember the height/tip a peer reported in any envelope header."""
+        if "height" in envelope and "tip_hash" in envelope:
+            self.peers[sender] = {
+                "height": envelope["height"],
+                "tip_hash": envelope["tip_hash"],
+                "headers_only": bool(envelope.get("headers_only", False)),
+                "locator": envelope.get("locator"),
+            }
+
+    def _answer_payload_request(self, envelope: dict, envelope_id: str, sender: str) -> dict:
+        """Send *sender* the bodies it asked for that we hold in full."""
+        blocks = []
+        for index in envelope.get("indices", [])[:MAX_PAYLOADS_PER_REQUEST]:
+            try:
+                block = self.chain.get_block(int(index))
+            except (IndexError, TypeError, ValueError):
+                continue
+            if block.has_payload:
+                blocks.append(block.to_dict())
+        self._send(self._envelope(_PAYLOADS_TYPE, blocks=blocks), sender)
+        return {
+            "ok": True,
+            "envelope_id": envelope_id,
+            "sender": sender,
+            "payloads_sent": len(blocks),
+            "chain_height": self.chain.height,
+        }
+
+    def _attach_payloads(self, envelope: dict, envelope_id: str, sender: str) -> dict:
+        """Attach received bodies that match our stored headers."""
+        attached = 0
+        errors = []
+        for raw in envelope.get("blocks") or []:
+            try:
+                self.chain.attach_payload(Block.from_dict(raw))
+                attached += 1
+            except (ChainError, KeyError, TypeError) as exc:
+                errors.append(str(exc))
+        if errors:
+            logger.warning(
+                "Rejected %d payloads from sender=%s: %s", len(errors), sender, errors[0]
+            )
+        result = {
+            "ok": not errors,
+            "envelope_id": envelope_id,
+            "sender": sender,
+            "payloads_attached": attached,
+            "chain_height": self.chain.height,
+        }
+        if errors:
+            result["error"] = errors[0]
+        return result
+
+    def _answer_blob_request(self, envelope: dict, envelope_id: str, sender: str) -> dict:
+        """Send *sender* the requested blobs we hold, ``chunk_bytes`` per envelope."""
+        sent = 0
+        batch: dict[str, str] = {}
+        size = 0
+        for digest in map(str, envelope.get("digests", [])[:MAX_BLOBS_PER_REQUEST]):
+            try:
+                content = self.chain.blobs.get(digest).decode()
+            except (LookupError, BlobError):
+                continue
+            if batch and size + len(content) > self.chunk_bytes:
+                self._send(self._envelope(_BLOBS_TYPE, blobs=batch), sender)
+                batch, size = {}, 0
+            batch[digest] = content
+            size += len(content)
+            sent += 1
+        if batch:
+            self._send(self._envelope(_BLOBS_TYPE, blobs=batch), sender)
+        return {
+            "ok": True,
+            "envelope_id": envelope_id,
+            "sender": sender,
+            "blobs_sent": sent,
+            "chain_height": self.chain.height,
+        }
+
+    def _store_blobs(self, envelope: dict, envelope_id: str, sender: str) -> dict:
+        """Store received blobs whose content matches their digest."""
+        stored = 0
+        errors = []
+        blobs = envelope.get("blobs")
+        for digest, content in (blobs if isinstance(blobs, dict) else {}).items():
+            try:
+                self.chain.blobs.put(str(content).encode(), digest)
+                stored += 1
+            except BlobError as exc:
+                errors.append(str(exc))
+        if errors:
+            logger.warning("Rejected %d blobs from sender=%s: %s", len(errors), sender, errors[0])
+        result = {
+            "ok": not errors,
+            "envelope_id": envelope_id,
+            "sender": sender,
+            "blobs_stored": stored,
+            "chain_height": self.chain.height,
+        }
+        if errors:
+            result["error"] = errors[0]
+        return result
+
+    def _merge_delta(self, envelope: dict) -> int:
+        """Validate and append the blocks of a delta envelope.
+
+        The anchor must be a block we hold; the rest is handled by
+        :meth:`_extend_from`.
+
+        Raises
+        ------
+        ChainError
+            If the anchor is unknown or the new blocks fail validation.
+        """
+        genesis_hash = envelope.get("genesis_hash")
+        if genesis_hash is not None and genesis_hash != self.chain.genesis.hash:
+            logger.warning(
+                "Remote genesis %s != local %s — ignoring delta.",
+                genesis_hash[:12],
+                self.chain.genesis.hash[:12],
+            )
+            return 0
+
+        anchor_index = envelope.get("anchor_index")
+        anchor_hash = envelope.get("anchor_hash", "")
+        if anchor_index is None or self.chain.height_of(anchor_hash) != anchor_index:
+            raise ChainError(
+                f"Delta anchor {anchor_hash[:12]!r} at index {anchor_index} "
+                "is not in the local chain."
+            )
+
+        blocks = _parse_blocks(envelope.get("blocks"), allow_empty=True)
+        return self._extend_from(blocks, anchor_index + 1)
+
+    def _merge_chunk(self, header: dict, body: bytes, envelope_bytes: bytes) -> int:
+        """Apply one chunk envelope, or stage it until the blocks before it arrive.
+
+        After a chunk is applied, staged chunks that now continue the chain
+        are applied too, so a transfer received out of order (or cut short
+        and resumed after a restart) completes as soon as its gaps are filled.
+
+        Raises
+        ------
+        ChainError
+            If the chunk's blocks fail validation.
+        EnvelopeError
+            If the chunk is corrupt.
+        """
+        genesis_hash = header.get("genesis_hash")
+        if genesis_hash is not None and genesis_hash != self.chain.genesis.hash:
+            logger.warning(
+                "Remote genesis %s != local %s — ignoring chunk.",
+                genesis_hash[:12],
+                self.chain.genesis.hash[:12],
+            )
+            return 0
+        transfer_id = str(header.get("transfer_id", ""))
+        self.last_transfer = {
+            "transfer_id": transfer_id,
+            "seq": header.get("seq", 0),
+            "final": bool(header.get("final", True)),
+            "staged": False,
+        }
+        added = self._apply_chunk(header, body)
+        if added is not None:
+            return added + self._drain_staged()
+        if not _TRANSFER_ID_RE.match(transfer_id):
+            raise EnvelopeError(f"Bad transfer id {transfer_id!r}")
+        staged = self._stage_chunk(header, envelope_bytes)
+        added = self._drain_staged()
+        self.last_transfer["staged"] = staged.exists()
+        return added
+
+    def _apply_chunk(self, header: dict, body: bytes) -> int | None:
+        """Stream a chunk's blocks into the chain; None if it can't be applied yet.
+
+        Blocks are decoded one at a time; those we already hold are skipped
+        and the rest are validated and appended :data:`_STREAM_BATCH` at a
+        time.  Returns None when the chunk's anchor is not in the chain yet,
+        or when the chunk forks from it (the fork is settled once the whole
+        transfer is here; see :meth:`_drain_staged`).
+        """
+        first = int(header.get("first_index", 0))
+        if first > 0 and self.chain.height_of(header.get("anchor_hash") or "") != first - 1:
+            return None
+        last_hash = header.get("last_hash")
+        if last_hash and self.chain.height_of(last_hash) is not None:
+            return 0  # already applied
+
+        added, batch, batch_first = 0, [], first
+        for position, raw in enumerate(iter_blocks(header, body), first):
+            block = _parse_blocks([raw])[0]
+            if not batch and position < self.chain.height:
+                if block.hash != self._hash_at(position):
+                    return None  # forks here
+                batch_first = position + 1
+                continue
+            batch.append(block)
+            if len(batch) >= _STREAM_BATCH:
+                added += self._extend_from(batch, batch_first)
+                batch_first += len(batch)
+                batch = []
+        if batch:
+            added += self._extend_from(batch, batch_first)
+        return added
+
+    @property
+    def _incoming(self) -> Path:
+        return self.chain.store.root / INCOMING_DIR
+
+    def _stage_chunk(self, header: dict, envelope_bytes: bytes) -> Path:
+        directory = self._incoming / header["transfer_id"]
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{int(header.get('seq', 0)):06d}.chunk"
+        write_atomic(path, envelope_bytes, durable=False)
+        return path
+
+    def _drain_staged(self) -> int:
+        """Apply staged chunks that now continue the chain; return blocks added.
+
+        Transfers idle for longer than :data:`STAGED_MAX_AGE` are dropped.
+        """
+        if not self._incoming.is_dir():
+            return 0
+        added = 0
+        progress = True
+        while progress:
+            progress = False
+            for directory in sorted(self._incoming.iterdir()):
+                if time.time() - directory.stat().st_mtime > STAGED_MAX_AGE:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    continue
+                try:
+                    applied = self._drain_transfer(directory)
+                except (ChainError, ValueError) as exc:
+                    logger.warning("Dropping staged transfer %s: %s", directory.name, exc)
+                    shutil.rmtree(directory, ignore_errors=True)
+                    continue
+                if applied is not None:
+                    added += applied
+                    progress = True
+        return added
+
+    def _drain_transfer(self, directory: Path) -> int | None:
+        """Apply the staged chunks of one transfer in order, as far as possible.
+
+        A chunk that forks from the chain is only merged once every chunk
+        from it to the final one is staged; the fork is then settled over
+        the whole remote branch by :meth:`_extend_from` (holding that branch
+        in memory).  Returns None if nothing could be applied.
+        """
+        chunks = sorted(directory.glob("*.chunk"))
+        applied = None
+        for position, path in enumerate(chunks):
+            header, body = split_envelope(path.read_bytes())
+            added = self._apply_chunk(header, body)
+            if added is None:
+                break
+            path.unlink()
+            applied = (applied or 0) + added
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+            return applied
+
+        first = int(header.get("first_index", 0))
+        if first > 0 and self.chain.height_of(header.get("anchor_hash") or "") != first - 1:
+            return applied  # still waiting for the chunks before this one
+        rest = [split_envelope(p.read_bytes()) for p in chunks[position:]]
+        seqs = [h.get("seq") for h, _ in rest]
+        if seqs != list(range(seqs[0], seqs[0] + len(seqs))) or not rest[-1][0].get("final"):
+            return applied  # fork: wait for the rest of the branch
+        blocks = _parse_blocks([raw for h, b in rest for raw in iter_blocks(h, b)])
+        shutil.rmtree(directory, ignore_errors=True)
+        return (applied or 0) + self._extend_from(blocks, first)
 
     def _merge_blocks(self, remote_blocks: list[Block]) -> int:
-        """Append validated remote blocks that extend the local chain.
+        """Merge a remote snapshot into the local chain.
 
         Rules:
         1. Remote genesis hash must match local genesis hash.
-        2. Overlapping blocks must hash-match (no forks accepted).
-        3. Only strictly longer chains trigger an append (longest-chain rule).
+        2. A snapshot whose tip we already hold adds nothing.
+        3. Otherwise :meth:`_extend_from` appends the part past our tip, or
+           settles a fork with the fork-choice rule.
+
+        Only blocks past the common ancestor are rehashed; the prefix we
+        already hold is never revalidated.
 
         Returns
         -------
         int
             Number of blocks appended (0 if nothing was added).
+
+        Raises
+        ------
+        ChainError
+            If the new blocks fail validation.
         """
         if not remote_blocks:
             return 0
@@ -232,83 +834,151 @@ class ChainSync:
             )
             return 0
 
-        current_height = self.chain.height
-        if len(remote_blocks) <= current_height:
+        if self.chain.height_of(remote_blocks[-1].hash) is not None:
             logger.debug(
-                "Remote height %d not longer than local %d — nothing to merge.",
-                len(remote_blocks),
-                current_height,
+                "Remote tip %s already in local chain — nothing to merge.",
+                remote_blocks[-1].hash[:12],
             )
             return 0
 
-        # Verify that the overlap is consistent (no fork)
-        for i in range(current_height):
-            if self.chain.get_block(i).hash != remote_blocks[i].hash:
-                logger.error(
-                    "Chain fork at index %d (local=%s remote=%s) — ignoring.",
-                    i,
-                    self.chain.get_block(i).hash[:12],
-                    remote_blocks[i].hash[:12],
-                )
-                return 0
+        return self._extend_from(remote_blocks, 0)
+
+    def _extend_from(self, blocks: list[Block], first_index: int) -> int:
+        """Merge *blocks*, consecutive remote blocks starting at chain index *first_index*.
+
+        *first_index* is at most our height and block ``first_index - 1`` is
+        shared.  One hash comparison at the end of the overlap tells whether
+        the remote blocks continue our chain; if so the part past our tip is
+        validated as a continuation of the tip and appended.  If not, the
+        common ancestor is found by binary search and the fork is settled by
+        :meth:`_settle_fork`.
+
+        When the chain trusts a signed checkpoint inside the suffix (see
+        :meth:`VarusChain.assume_valid`), the blocks up to it are only
+        link-checked and the rest are validated in full.
+        """
+        height = self.chain.height
+        tip = self.chain.tip
+        overlap_end = min(height, first_index + len(blocks)) - 1
+        if overlap_end >= first_index and (
+            blocks[overlap_end - first_index].hash != self._hash_at(overlap_end)
+        ):
+            fork_index = find_fork_point(blocks, first_index, height, self._hash_at)
+            if fork_index < 0:
+                raise ChainError("Received chain shares no blocks with the local chain.")
+            return self._settle_fork(fork_index, blocks[fork_index + 1 - first_index :])
+        if first_index + len(blocks) <= height:
+            return 0
+
+        suffix = blocks[height - first_index :]
+        assumed = self.chain.assumable(suffix)
+        if assumed:
+            _check_suffix(suffix[:assumed], tip, check_hashes=False)
+            _check_suffix(suffix[assumed:], suffix[assumed - 1], self.workers)
+        else:
+            _check_suffix(suffix, tip, self.workers)
+        self.chain.extend(suffix, validated=True, assumed=assumed)
+        return len(suffix)
 
-        # Append blocks beyond the local tip
-        for block in remote_blocks[current_height:]:
-            self.chain._blocks.append(block)  # preserve original hashes/timestamps
+    def _settle_fork(self, fork_index: int, branch: list[Block]) -> int:
+        """Choose between our blocks after *fork_index* and the remote *branch*.
 
-        self.chain.save()
-        return len(remote_blocks) - current_height
+        The remote branch is validated first, so a rule can trust its
+        hashes.  The losing branch is kept as a side chain.
 
+        Returns
+        -------
+        int
+            Blocks appended: ``len(branch)`` after a reorg, else 0.
 
-# ------------------------------------------------------------------
-# Module-level validation helper (no class state needed)
-# ------------------------------------------------------------------
+        Raises
+        ------
+        ChainError
+            If *branch* fails validation, or the switch would replace
+            history covered by a signed checkpoint.
+        """
+        _check_suffix(branch, self.chain.get_block(fork_index), self.workers)
+        local = self.chain.all_blocks(fork_index + 1)
+        switch = bool(self._prefer_remote(local, branch))
+        self.last_fork = {
+            "fork_index": fork_index,
+            "local_blocks": len(local),
+            "remote_blocks": len(branch),
+            "rule": self.fork_choice,
+            "reorg": switch,
+        }
+        if not switch:
+            logger.info(
+                "Chain fork after index %d (local=%s remote=%s): keeping local branch (%s).",
+                fork_index,
+                self.chain.tip.hash[:12],
+                branch[-1].hash[:12],
+                self.fork_choice,
+            )
+            self.chain.add_side_chain(fork_index, branch)
+            return 0
+        removed = self.chain.reorg(fork_index, branch, validated=True, rule=self.fork_choice)
+        logger.warning(
+            "Reorganised after index %d: %d blocks replaced by %d (%s), new tip %s.",
+            fork_index,
+            len(removed),
+            len(branch),
+            self.fork_choice,
+            self.chain.tip.hash[:12],
+        )
+        return len(branch)
 
-def _validate_remote_chain(raw_blocks: list) -> list[Block]:
-    """Parse and fully validate a list of raw block dicts from a peer.
 
-    Checks:
-    - Non-empty
-    - Each block's stored hash matches its computed hash
-    - ``previous_hash`` links are consistent
-    - ``index`` fields are sequential from 0
-    - Genesis ``previous_hash`` equals the canonical sentinel
+# ------------------------------------------------------------------
+# Module-level validation helpers (no class state needed)
+# ------------------------------------------------------------------
 
-    Returns
-    -------
-    list[Block]
-        Validated Block objects.
+def _parse_blocks(raw_blocks, allow_empty: bool = False) -> list[Block]:
+    """Decode raw block dicts without hashing them.
 
     Raises
     ------
     ChainError
-        On any integrity violation.
+        If the list is missing/empty or a block is malformed.
     """
-    if not raw_blocks:
+    if not raw_blocks and not allow_empty:
         raise ChainError("Received empty chain.")
+    try:
+        return [Block.from_dict(b) for b in raw_blocks or []]
+    except (KeyError, TypeError) as exc:
+        raise ChainError(f"Malformed block in received chain: {exc}") from exc
 
-    blocks: list[Block] = [Block.from_dict(b) for b in raw_blocks]
 
-    if blocks[0].previous_hash != GENESIS_HASH:
-        raise ChainError(
-            f"Genesis previous_hash {blocks[0].previous_hash[:12]!r} "
-            f"does not match sentinel {GENESIS_HASH[:12]!r}."
-        )
+def _check_suffix(
+    blocks: list[Block], anchor: Block, workers: int = 1, check_hashes: bool = True
+) -> None:
+    """Validate *blocks* as the direct continuation of *anchor*.
 
-    for i, block in enumerate(blocks):
-        if not block.is_valid():
+    ``check_hashes=False`` checks links and indices only.
+
+    Raises
+    ------
+    ChainError
+        On any integrity violation.
+    """
+    failure = find_first_failure(
+        blocks,
+        start_index=anchor.index + 1,
+        previous_hash=anchor.hash,
+        workers=workers,
+        check_hashes=check_hashes,
+    )
+    if failure:
+        kind, position = failure
+        i = anchor.index + 1 + position
+        if kind == HASH_MISMATCH:
             raise ChainError(
                 f"Block {i} hash mismatch in received chain (tampered or corrupt)."
             )
-        if block.index != i:
-            raise ChainError(
-                f"Block at position {i} has wrong index field {block.index}."
-            )
-
-    for i in range(1, len(blocks)):
-        if blocks[i].previous_hash != blocks[i - 1].hash:
+        if kind == LINK_BROKEN:
             raise ChainError(
                 f"Chain link broken between block {i - 1} and {i} in received chain."
             )
-
-    return blocks
+        raise ChainError(
+            f"Block at position {i} has wrong index field {blocks[position].index}."
+        )
@@ -0,0 +1,191 @@
+"""Inbox directory watchers for the Varus node.
+
+The node blocks in :meth:`InboxWatcher.wait` between inbox passes.  On Linux
+an inotify watcher wakes it as soon as a file is written or renamed into the
+inbox; elsewhere (or if inotify is unavailable) a polling watcher compares
+directory listings every ``poll_interval`` seconds.
+
+Both watchers can be woken early with :meth:`InboxWatcher.wake`, which the
+node uses on shutdown, and can watch further directories added with
+:meth:`InboxWatcher.add` (one watcher serves every inbox of a
+:class:`~varus.host.ChainHost`).
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+logger = logging.getLogger("varus.watch")
+
+DEFAULT_POLL_INTERVAL = 1.0  # seconds between directory scans when polling
+
+WATCH_AUTO = "auto"
+WATCH_INOTIFY = "inotify"
+WATCH_POLL = "poll"
+WATCH_MODES = (WATCH_AUTO, WATCH_INOTIFY, WATCH_POLL)
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+
+class InboxWatcher(ABC):
+    """Base class: block until the inbox may have new files."""
+
+    @abstractmethod
+    def wait(self, timeout: float | None) -> bool:
+        """Wait up to *timeout* seconds; return True if the inbox changed."""
+
+    @abstractmethod
+    def wake(self) -> None:
+        """Make a pending or the next :meth:`wait` return immediately."""
+
+    @abstractmethod
+    def add(self, path: Path) -> None:
+        """Also watch the inbox directory *path*."""
+
+    def close(self) -> None:
+        """Release any OS resources held by the watcher."""
+
+
+class PollingWatcher(InboxWatcher):
+    """Portable watcher that rescans the directory every ``poll_interval``."""
+
+    def __init__(self, path: Path, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.path = Path(path)
+        self.paths = [self.path]
+        self.poll_interval = poll_interval
+        self._woken = threading.Event()
+        self._seen = self._listing()
+
+    def add(self, path: Path) -> None:
+        self.paths.append(Path(path))
+        self._seen = self._listing()
+
+    def _listing(self) -> frozenset[str]:
+        names: set[str] = set()
+        for directory in self.paths:
+            try:
+                names.update(str(p) for p in directory.glob("*.json"))
+            except OSError:
+                pass
+        return frozenset(names)
+
+    def wait(self, timeout: float | None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            step = self.poll_interval if remaining is None else min(self.poll_interval, remaining)
+            if self._woken.wait(step):
+                self._woken.clear()
+                return True
+            listing = self._listing()
+            if listing - self._seen:
+                self._seen = listing
+                return True
+            self._seen = listing
+
+    def wake(self) -> None:
+        self._woken.set()
+
+
+class InotifyWatcher(InboxWatcher):
+    """Linux inotify watcher (via ctypes; no third-party dependency).
+
+    Wakes on ``IN_CLOSE_WRITE`` and ``IN_MOVED_TO`` in the inbox directory.
+
+    Raises
+    ------
+    OSError
+        If inotify is not available on this system.
+    """
+
+    def __init__(self, path: Path) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self.path = Path(path)
+        self._libc = libc
+        self._fd = fd
+        try:
+            self.add(self.path)
+        except OSError:
+            os.close(fd)
+            raise
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+
+    def add(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(Path(path)), _IN_CLOSE_WRITE | _IN_MOVED_TO
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}")
+
+    def wait(self, timeout: float | None) -> bool:
+        readable, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        for fd in readable:
+            _drain(fd)
+        return bool(readable)
+
+    def wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _drain(fd: int) -> None:
+    try:
+        while os.read(fd, 4096):
+            pass
+    except (BlockingIOError, InterruptedError):
+        pass
+
+
+def make_watcher(
+    path: Path, mode: str = WATCH_AUTO, poll_interval: float = DEFAULT_POLL_INTERVAL
+) -> InboxWatcher:
+    """Return the best available watcher for *path*.
+
+    ``auto`` tries inotify and falls back to polling; ``inotify`` raises if it
+    is unavailable; ``poll`` always polls.
+    """
+    if mode not in WATCH_MODES:
+        raise ValueError(f"Unknown watch mode {mode!r}; expected one of {WATCH_MODES}")
+    if mode != WATCH_POLL:
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError) as exc:
+            if mode == WATCH_INOTIFY:
+                raise
+            logger.info(
+                "inotify unavailable (%s) — polling inbox every %.1fs", exc, poll_interval
+            )
+    return PollingWatcher(path, poll_interval)